@@ -19,6 +19,8 @@ from scipy.spatial.distance import squareform
 import warnings
 warnings.filterwarnings('ignore')
 
+from .correlation_engine import factor_correlation_matrix
+
 
 class FactorCorrelationAnalyzer:
     """
@@ -93,11 +95,14 @@ class FactorCorrelationAnalyzer:
     def calculate_correlation(
         self,
         method: str = 'spearman',
-        time_window: Optional[int] = None
+        time_window: Optional[int] = None,
+        cross_sectional: bool = False
     ) -> pd.DataFrame:
         """
         计算因子间的相关系数矩阵
 
+        全部因子按日期分块堆叠后用矩阵乘法一次算出，见 correlation_engine
+
         参数：
         ----------
         method : str
@@ -105,29 +110,25 @@ class FactorCorrelationAnalyzer:
         time_window : int, optional
             时间窗口，如果指定则计算滚动相关性
             如果为None，则使用全样本计算
+        cross_sectional : bool
+            True时计算逐日截面相关系数的时间平均，
+            False时把所有(日期, 股票)观测混合计算
 
         返回：
         ----------
         corr_matrix : pd.DataFrame
             因子相关系数矩阵
         """
-        # 将因子数据展平
-        factor_series = {}
-
-        for factor_name, factor_data in self.aligned_factors.items():
-            if time_window is None:
-                # 全样本：展平所有数据
-                factor_series[factor_name] = factor_data.stack().dropna()
-            else:
-                # 滚动窗口：只使用最近time_window期的数据
-                recent_data = factor_data.iloc[-time_window:]
-                factor_series[factor_name] = recent_data.stack().dropna()
-
-        # 创建DataFrame计算相关性
-        factor_df = pd.DataFrame(factor_series)
+        if time_window is None:
+            # 全样本
+            factors = self.aligned_factors
+        else:
+            # 滚动窗口：只使用最近time_window期的数据
+            factors = {name: data.iloc[-time_window:] for name, data in self.aligned_factors.items()}
 
-        # 计算相关系数
-        self.correlation_matrix = factor_df.corr(method=method)
+        self.correlation_matrix = factor_correlation_matrix(
+            factors, method=method, cross_sectional=cross_sectional
+        )
 
         return self.correlation_matrix
 
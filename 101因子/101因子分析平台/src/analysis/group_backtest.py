@@ -190,135 +190,42 @@ class GroupBacktestEngine:
                                freq: str,
                                commission: float,
                                slippage: float) -> Dict:
-        """执行分组回测"""
+        """执行分组回测
+
+        整个面板一次性计算：按调仓日分组打标签，收益按所属调仓区间
+        (current_date, next_date] 分组求均值，持仓变化由标签矩阵差分得到。
+        """
         # 获取调仓日期
         all_dates = sorted(factor_df['date'].unique())
-        rebalance_dates = self._get_rebalance_dates(all_dates, freq)
-
-        group_returns_list = []
-        long_short_returns_list = []
-
-        # 交易明细记录
-        trade_details = []
-        previous_long_stocks = set()  # 上一期做多组合的股票
-        previous_short_stocks = set()  # 上一期做空组合的股票
-
-        # 按时间回测
-        for i in range(len(rebalance_dates) - 1):
-            current_date = rebalance_dates[i]
-            next_date = rebalance_dates[i + 1]
-
-            # 获取当前日期的因子
-            current_factors = factor_df[factor_df['date'] == current_date].copy()
-
-            if len(current_factors) < n_groups * 3:
-                continue
-
-            # 分组
-            current_factors['group'] = self._assign_groups(
-                current_factors['factor'].values,
-                current_factors['stock_code'].values,
-                n_groups
-            )
-
-            # 获取做多和做空组合的股票
-            # 做多：第1组（group=0），做空：最后一组（group=n_groups-1）
-            long_stocks = set(current_factors[current_factors['group'] == 0]['stock_code'].tolist())
-            short_stocks = set(current_factors[current_factors['group'] == n_groups - 1]['stock_code'].tolist())
-
-            # 计算收益
-            period_returns = returns_df[
-                (returns_df['date'] > current_date) &
-                (returns_df['date'] <= next_date)
-            ].copy()
-
-            if len(period_returns) == 0:
-                continue
-
-            # 计算各分组收益（扣减交易成本）
-            group_ret = self._calculate_group_returns_with_cost(
-                current_factors, period_returns, commission, slippage
-            )
-
-            if group_ret is not None:
-                group_ret['date'] = current_date
-                group_returns_list.append(group_ret)
-
-                # 记录交易明细
-                self._record_trade_details(
-                    trade_details,
-                    current_date,
-                    current_factors,
-                    long_stocks,
-                    short_stocks,
-                    previous_long_stocks,
-                    previous_short_stocks,
-                    n_groups
-                )
-
-                # 更新上期持仓
-                previous_long_stocks = long_stocks
-                previous_short_stocks = short_stocks
-
-            # 计算多空收益
-            if group_ret is not None and len(group_ret) > 1:
-                # 复制group_ret以避免修改原数据
-                group_ret_copy = group_ret.copy()
-
-                # 移除date列（如果存在）
-                if isinstance(group_ret_copy, pd.Series):
-                    # Series: 检查并移除date索引项
-                    if 'date' in group_ret_copy.index:
-                        group_ret_clean = group_ret_copy.drop('date')
-                    else:
-                        group_ret_clean = group_ret_copy
-
-                    long_group = group_ret_clean.idxmax()
-                    short_group = group_ret_clean.idxmin()
-                    long_short_ret = group_ret_clean[long_group] - group_ret_clean[short_group]
-                else:
-                    # DataFrame: 移除date列
-                    if 'date' in group_ret_copy.columns:
-                        group_ret_clean = group_ret_copy.drop(columns=['date'])
-                    else:
-                        group_ret_clean = group_ret_copy
-
-                    if len(group_ret_clean.columns) > 0:
-                        # 选择第一个数值列
-                        numeric_cols = group_ret_clean.select_dtypes(include=[np.number]).columns
-                        if len(numeric_cols) > 0:
-                            col = numeric_cols[0]
-                            long_group = group_ret_clean[col].idxmax()
-                            short_group = group_ret_clean[col].idxmin()
-                            long_short_ret = group_ret_clean.loc[long_group, col] - group_ret_clean.loc[short_group, col]
-                        else:
-                            long_short_ret = None
-                    else:
-                        long_short_ret = None
-
-                long_short_returns_list.append({
-                    'date': current_date,
-                    'long_short_return': long_short_ret
-                })
-
-        # 整理结果
-        if group_returns_list:
-            group_returns_df = pd.DataFrame(group_returns_list)
-            group_returns_df = group_returns_df.set_index('date')
-        else:
-            group_returns_df = pd.DataFrame()
-
-        if long_short_returns_list:
-            long_short_series = pd.DataFrame(long_short_returns_list)
-            long_short_series = long_short_series.set_index('date')
+        rebalance_dates = pd.DatetimeIndex(self._get_rebalance_dates(all_dates, freq))
+
+        # 各调仓日的分组标签（最后一个调仓日之后没有持有期）
+        labels = factor_df.loc[
+            factor_df['date'].isin(rebalance_dates[:-1]), ['date', 'stock_code', 'factor']
+        ]
+        counts = labels.groupby('date')['stock_code'].transform('size')
+        labels = labels[counts >= n_groups * 3].copy()
+        labels['group'] = self._assign_group_labels(labels, n_groups)
+
+        # 各持有期内每只股票的平均日收益（扣减交易成本）
+        stock_returns = self._period_stock_returns(returns_df, rebalance_dates)
+        stock_returns['ret'] = stock_returns['ret'] - (commission + slippage)
+
+        # 分组收益：持有期内有收益记录的股票参与分组均值
+        merged = labels.merge(stock_returns, on=['date', 'stock_code'], how='inner')
+        group_returns_df = merged.groupby(['date', 'group'])['ret'].mean().unstack('group')
+        group_returns_df.columns.name = None
+
+        # 多空收益：最好组与最差组之差
+        if not group_returns_df.empty:
+            long_short_series = (group_returns_df.max(axis=1) - group_returns_df.min(axis=1)).to_frame('long_short_return')
         else:
             long_short_series = pd.DataFrame()
 
-        # 转换交易明细为DataFrame
-        trade_details_df = pd.DataFrame(trade_details)
+        # 交易明细与换手率：只统计有分组收益的调仓期
+        traded = labels[labels['date'].isin(group_returns_df.index)]
+        trade_details_df, turnover_df = self._build_trade_details(traded, n_groups)
         if not trade_details_df.empty:
-            # 按日期排序
-            trade_details_df = trade_details_df.sort_values('date')
             print(f"[DEBUG] 交易明细记录数: {len(trade_details_df)}")
         else:
             print("[WARNING] 没有生成交易明细")
@@ -327,147 +234,92 @@ class GroupBacktestEngine:
             'group_returns': group_returns_df,
             'long_short_returns': long_short_series,
             'trade_details': trade_details_df,  # 添加交易明细
-            'n_periods': len(group_returns_list)
+            'turnover': turnover_df,
+            'n_periods': len(group_returns_df)
         }
 
-    def _assign_groups(self, factor_values: np.ndarray,
-                       stock_codes: np.ndarray,
-                       n_groups: int) -> np.ndarray:
-        """分配分组"""
-        # 创建排序索引
-        sorted_indices = np.argsort(factor_values)
-
-        groups = np.zeros(len(factor_values), dtype=int)
-
-        group_size = len(sorted_indices) // n_groups
+    def _assign_group_labels(self, labels: pd.DataFrame, n_groups: int) -> np.ndarray:
+        """按日期分配分组（1 ~ n_groups），因子值从小到大，NaN 排在最后
 
-        for i in range(n_groups):
-            start_idx = i * group_size
-            end_idx = (i + 1) * group_size if i < n_groups - 1 else len(sorted_indices)
+        每组 n // n_groups 只，余数并入最后一组。
+        """
+        position = labels.groupby('date')['factor'].rank(method='first', na_option='bottom').to_numpy() - 1
+        size = labels.groupby('date')['factor'].transform('size').to_numpy()
+        group_size = size // n_groups
+        return np.minimum(position // group_size, n_groups - 1).astype(int) + 1
 
-            groups[sorted_indices[start_idx:end_idx]] = i + 1
+    def _period_stock_returns(self, returns_df: pd.DataFrame,
+                              rebalance_dates: pd.DatetimeIndex) -> pd.DataFrame:
+        """每个持有期 (rebalance_dates[k], rebalance_dates[k+1]] 内各股票的平均日收益
 
-        return groups
+        对于日收益率数据取平均日收益而不是复合收益，避免收益被放大。
 
-    def _record_trade_details(self,
-                             trade_details: list,
-                             current_date: pd.Timestamp,
-                             current_factors: pd.DataFrame,
-                             long_stocks: set,
-                             short_stocks: set,
-                             previous_long_stocks: set,
-                             previous_short_stocks: set,
-                             n_groups: int) -> None:
-        """
-        记录交易明细
-
-        Args:
-            trade_details: 交易明细列表（引用传递）
-            current_date: 当前调仓日期
-            current_factors: 当前因子数据
-            long_stocks: 当前做多组合股票集合
-            short_stocks: 当前做空组合股票集合
-            previous_long_stocks: 上期做多组合股票集合
-            previous_short_stocks: 上期做空组合股票集合
-            n_groups: 分组数量
+        Returns:
+            DataFrame: columns [date, stock_code, ret]，date 为持有期起始的调仓日
         """
-        # 计算权重（等权重）
-        long_weight = 1.0 / len(long_stocks) if long_stocks else 0
-        short_weight = 1.0 / len(short_stocks) if short_stocks else 0
-
-        # 做多组合：新买入的股票
-        for stock in long_stocks - previous_long_stocks:
-            stock_factor = current_factors[current_factors['stock_code'] == stock]
-            if not stock_factor.empty:
-                factor_val = stock_factor['factor'].iloc[0]
-                trade_details.append({
-                    'date': current_date,
-                    'symbol': stock,
-                    'direction': '做多',
-                    'action': '买入',
-                    'price': np.nan,  # 分组回测中没有逐笔价格，使用收盘价平均
-                    'weight': long_weight,
-                    'factor_value': factor_val,
-                    'group': 1  # 第1组
-                })
-
-        # 做多组合：卖出的股票
-        for stock in previous_long_stocks - long_stocks:
-            trade_details.append({
-                'date': current_date,
-                'symbol': stock,
-                'direction': '做多',
-                'action': '卖出',
-                'price': np.nan,
-                'weight': 0,
-                'factor_value': np.nan,
-                'group': 1
-            })
-
-        # 做空组合：新卖出的股票
-        for stock in short_stocks - previous_short_stocks:
-            stock_factor = current_factors[current_factors['stock_code'] == stock]
-            if not stock_factor.empty:
-                factor_val = stock_factor['factor'].iloc[0]
-                trade_details.append({
-                    'date': current_date,
-                    'symbol': stock,
-                    'direction': '做空',
-                    'action': '卖出',
-                    'price': np.nan,
-                    'weight': short_weight,
-                    'factor_value': factor_val,
-                    'group': n_groups  # 最后一组
-                })
-
-        # 做空组合：平仓的股票
-        for stock in previous_short_stocks - short_stocks:
-            trade_details.append({
-                'date': current_date,
-                'symbol': stock,
-                'direction': '做空',
-                'action': '平仓',
-                'price': np.nan,
-                'weight': 0,
-                'factor_value': np.nan,
-                'group': n_groups
-            })
-
-    def _calculate_group_returns_with_cost(self,
-                                          factor_df: pd.DataFrame,
-                                          returns_df: pd.DataFrame,
-                                          commission: float,
-                                          slippage: float) -> Optional[pd.Series]:
-        """计算考虑交易成本的分组收益"""
-        group_returns = {}
-
-        # 获取日期范围内的股票收益（支持ret或return列）
         ret_col = 'ret' if 'ret' in returns_df.columns else 'return'
+        period = rebalance_dates.searchsorted(returns_df['date'].to_numpy(), side='left') - 1
+        in_range = (period >= 0) & (period < len(rebalance_dates) - 1)
 
-        # 修复：对于日收益率数据，应该计算平均日收益
-        # 而不是复合收益，避免收益被放大
-        stock_returns = returns_df.groupby('stock_code')[ret_col].mean()
-
-        # 扣减交易成本（按调仓次数分摊）
-        # 假设每次调仓的成本是commission + slippage
-        total_cost = commission + slippage
-        stock_returns = stock_returns - total_cost
+        period_returns = pd.DataFrame({
+            'date': rebalance_dates[period[in_range]],
+            'stock_code': returns_df['stock_code'].to_numpy()[in_range],
+            'ret': returns_df[ret_col].to_numpy(dtype=float)[in_range],
+        })
+        return period_returns.groupby(['date', 'stock_code'], sort=False)['ret'].mean().reset_index()
 
-        # 计算各分组收益
-        for group_id in range(1, factor_df['group'].max() + 1):
-            group_stocks = factor_df[factor_df['group'] == group_id]['stock_code'].values
+    def _build_trade_details(self, labels: pd.DataFrame, n_groups: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """由相邻调仓期的持仓矩阵差分生成交易明细和换手率
 
-            # 获取这些股票的收益
-            valid_stocks = [s for s in group_stocks if s in stock_returns.index]
+        做多组合为第1组（因子值最小），做空组合为第 n_groups 组。
 
-            if len(valid_stocks) > 0:
-                group_ret = stock_returns.loc[valid_stocks].mean()
-                group_returns[group_id] = group_ret
-
-        if group_returns:
-            return pd.Series(group_returns)
-        else:
-            return None
+        Returns:
+            (交易明细, 换手率)；换手率为各组合每期换入股票占比
+        """
+        columns = ['date', 'symbol', 'direction', 'action', 'price', 'weight', 'factor_value', 'group']
+        if labels.empty:
+            return pd.DataFrame(), pd.DataFrame()
+
+        dates = pd.DatetimeIndex(sorted(labels['date'].unique()))
+        factor_mat = labels.drop_duplicates(['date', 'stock_code']).pivot(
+            index='date', columns='stock_code', values='factor'
+        ).reindex(dates)
+        group_mat = labels.drop_duplicates(['date', 'stock_code']).pivot(
+            index='date', columns='stock_code', values='group'
+        ).reindex(dates)
+
+        frames = []
+        turnover = {}
+        for direction, group_id, open_action, close_action in (
+            ('做多', 1, '买入', '卖出'),
+            ('做空', n_groups, '卖出', '平仓'),
+        ):
+            held = (group_mat == group_id).to_numpy()
+            previous = np.vstack([np.zeros((1, held.shape[1]), dtype=bool), held[:-1]])
+            opened = held & ~previous
+            closed = previous & ~held
+            n_held = held.sum(axis=1)
+            weight = np.divide(1.0, n_held, out=np.zeros(len(n_held)), where=n_held > 0)
+            turnover[direction] = np.divide(opened.sum(axis=1), n_held, out=np.zeros(len(n_held)), where=n_held > 0)
+
+            for mask, action, is_open in ((opened, open_action, True), (closed, close_action, False)):
+                rows, cols = np.nonzero(mask)
+                frames.append(pd.DataFrame({
+                    'date': dates[rows],
+                    'symbol': group_mat.columns[cols],
+                    'direction': direction,
+                    'action': action,
+                    'price': np.nan,  # 分组回测中没有逐笔价格
+                    'weight': weight[rows] if is_open else 0.0,
+                    'factor_value': factor_mat.to_numpy()[rows, cols] if is_open else np.nan,
+                    'group': group_id,
+                    '_order': len(frames),
+                }))
+
+        trade_details_df = pd.concat(frames, ignore_index=True)
+        trade_details_df = trade_details_df.sort_values(['date', '_order'], kind='stable')
+        trade_details_df = trade_details_df[columns].reset_index(drop=True)
+        return trade_details_df, pd.DataFrame(turnover, index=dates)
 
     def _get_rebalance_dates(self, all_dates, freq: str) -> list:
         """获取调仓日期"""
@@ -13,6 +13,66 @@ project_path = os.path.join(os.path.dirname(__file__), '..', '..')
 sys.path.insert(0, project_path)
 
 
+def to_matrix(data) -> pd.DataFrame:
+    """[date, symbol] 索引的 Series 转为 日期×股票 矩阵；DataFrame 原样返回
+
+    同一 (date, symbol) 出现多次的数据无法确定取值，直接丢弃。
+    """
+    if isinstance(data, pd.DataFrame):
+        return data
+    data = data[~data.index.duplicated(keep=False)]
+    return data.unstack(level=1)
+
+
+def rank_rows(values: np.ndarray) -> np.ndarray:
+    """逐行计算平均排名（从1开始），NaN 不参与排名且保持为 NaN
+
+    等价于 DataFrame.rank(axis=1, method='average')，但只做一次整体排序。
+    """
+    n_rows, n_cols = values.shape
+    if values.size == 0:
+        return values.astype(float)
+
+    order = np.argsort(values, axis=1)
+    flat = np.take_along_axis(values, order, axis=1).ravel()
+
+    # 相同取值为一组（NaN 与任何值都不相等，各自成组），每行重新开始分组
+    new_group = np.empty(flat.size, dtype=bool)
+    new_group[0] = True
+    np.not_equal(flat[1:], flat[:-1], out=new_group[1:])
+    new_group[::n_cols] = True
+
+    starts = np.flatnonzero(new_group)
+    ends = np.append(starts[1:], flat.size)
+    group_rank = (starts + ends - 1) / 2 - (starts // n_cols) * n_cols + 1
+    sorted_ranks = group_rank[np.cumsum(new_group) - 1]
+    sorted_ranks[np.isnan(flat)] = np.nan
+
+    ranks = np.empty((n_rows, n_cols), dtype=float)
+    np.put_along_axis(ranks, order, sorted_ranks.reshape(n_rows, n_cols), axis=1)
+    return ranks
+
+
+def masked_corr(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """逐行计算 x 与 y 的皮尔逊相关系数，只使用两者都非 NaN 的位置
+
+    Returns:
+        (相关系数, 每行有效点数, 每行是否存在零方差)
+    """
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    counts = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x0 = np.where(valid, x, 0.0)
+        y0 = np.where(valid, y, 0.0)
+        dx = np.where(valid, x0 - (x0.sum(axis=1) / counts)[:, None], 0.0)
+        dy = np.where(valid, y0 - (y0.sum(axis=1) / counts)[:, None], 0.0)
+        var_x = np.einsum('ij,ij->i', dx, dx)
+        var_y = np.einsum('ij,ij->i', dy, dy)
+        ic = np.einsum('ij,ij->i', dx, dy) / np.sqrt(var_x * var_y)
+    zero_var = ~(var_x > 0) | ~(var_y > 0)
+    return ic, counts, zero_var
+
+
 class ICAnalysis:
     """
     IC (Information Coefficient) 分析类
@@ -89,102 +149,72 @@ class ICAnalysis:
             for warning in data_quality['warnings']:
                 print(f"  - {warning}")
 
-        # 确保数据按日期对齐
+        # 确保数据按日期对齐，并一次性转为 日期×股票 矩阵
         aligned_factor, aligned_returns = factor_data.align(returns_data, join='inner')
-        
-        # 按日期分组计算IC
-        ic_values = []
-        ic_dates = []
-        
-        # 按日期分组
-        factor_by_date = aligned_factor.groupby(level=0)
-        returns_by_date = aligned_returns.groupby(level=0)
-        
-        # 获取所有日期
-        factor_date_keys = list(factor_by_date.groups.keys())
-        return_date_keys = list(returns_by_date.groups.keys())
-        
-        # 获取共同的日期
-        common_date_keys = set(factor_date_keys) & set(return_date_keys)
-        
-        # 转换为可比较的类型并排序
-        sorted_common_dates = sorted(common_date_keys, key=lambda x: str(x))
-        
-        for date in sorted_common_dates:
-            try:
-                # 获取当天的因子值和收益率
-                daily_factors = factor_by_date.get_group(date)
-                daily_returns = returns_by_date.get_group(date)
-                
-                # 确保它们有相同的股票
-                factor_symbols = set(daily_factors.index.get_level_values(1))
-                return_symbols = set(daily_returns.index.get_level_values(1))
-                common_symbols = factor_symbols.intersection(return_symbols)
-                
-                if len(common_symbols) < 2:  # 需要至少2个数据点来计算相关性
-                    continue
-                
-                # 创建对应的数据对
-                factor_vals = []
-                return_vals = []
-                
-                for symbol in common_symbols:
-                    factor_key = (date, symbol)
-                    return_key = (date, symbol)
-                    
-                    if factor_key in daily_factors.index and return_key in daily_returns.index:
-                        factor_val = daily_factors.loc[factor_key]
-                        return_val = daily_returns.loc[return_key]
-                        
-                        # 检查是否为有效数值 - 修复Series判断问题
-                        try:
-                            factor_is_valid = not pd.isna(factor_val)
-                            return_is_valid = not pd.isna(return_val)
-                            
-                            if factor_is_valid and return_is_valid:
-                                factor_vals.append(factor_val)
-                                return_vals.append(return_val)
-                        except Exception:
-                            # 如果出现类型错误，跳过这个数据点
-                            continue
-                
-                # 计算当日IC
-                if len(factor_vals) >= 2:  # 至少需要2个点来计算相关性
-                    factors_np = np.array(factor_vals)
-                    returns_np = np.array(return_vals)
-                    
-                    # 检查是否有足够的数据和变化
-                    if len(factors_np) > 1:
-                        # 检查数据是否有变化（否则相关系数未定义）
-                        if np.var(factors_np) > 0 and np.var(returns_np) > 0:
-                            # 计算皮尔逊相关系数
-                            correlation_matrix = np.corrcoef(factors_np, returns_np)
-                            ic_value = correlation_matrix[0, 1]
-                            
-                            if not np.isnan(ic_value):
-                                ic_values.append(ic_value)
-                                ic_dates.append(date)
-                            else:
-                                ic_values.append(0.0)  # 用0代替NaN
-                                ic_dates.append(date)
-                        else:
-                            # 如果数据没有变化，相关系数为0
-                            ic_values.append(0.0)
-                            ic_dates.append(date)
-                    else:
-                        ic_values.append(0.0)
-                        ic_dates.append(date)
-                
-            except Exception as e:
-                print(f"计算 {date} 的IC时出错: {e}")
-                import traceback
-                traceback.print_exc()
-        
-        if ic_values:
-            ic_series = pd.Series(ic_values, index=pd.Index(ic_dates, name='date'), name='ic')
-            return ic_series
-        else:
+        factor_mat = to_matrix(aligned_factor)
+        returns_mat = to_matrix(aligned_returns).reindex(index=factor_mat.index, columns=factor_mat.columns)
+
+        ic, counts, zero_var = masked_corr(factor_mat.to_numpy(dtype=float),
+                                           returns_mat.to_numpy(dtype=float))
+
+        # 至少需要2个有效数据点；数据无变化或相关系数为NaN时记为0
+        keep = counts >= 2
+        ic = np.where(zero_var | np.isnan(ic), 0.0, ic)[keep]
+        if len(ic) == 0:
             return pd.Series([], dtype=float, name='ic')
+        return pd.Series(ic, index=pd.Index(factor_mat.index[keep], name='date'), name='ic')
+
+    def calculate_ic_matrix(self, factors: Dict[str, pd.Series],
+                            prices: pd.DataFrame,
+                            horizons: Tuple[int, ...] = (1, 5, 10, 20),
+                            methods: Tuple[str, ...] = ('pearson', 'rank'),
+                            min_stocks: int = 2) -> pd.DataFrame:
+        """
+        批量计算多个因子、多个持有期的IC
+
+        因子与价格各自只转换一次为 日期×股票 矩阵，所有日期的截面相关系数
+        通过掩码后的矩阵运算一次得到。
+
+        Args:
+            factors: {因子名: 因子数据}，因子数据为 [date, symbol] 索引的 Series 或 日期×股票 DataFrame
+            prices: 收盘价，[date, symbol] 索引的 Series 或 日期×股票 DataFrame
+            horizons: 远期收益持有期（交易日）
+            methods: 'pearson'（普通IC）和/或 'rank'（Rank IC）
+            min_stocks: 当日有效股票数少于该值时IC为NaN
+
+        Returns:
+            pd.DataFrame: 索引为日期，列为 MultiIndex (factor, method, horizon)
+        """
+        price_mat = to_matrix(prices).sort_index()
+        results = {}
+
+        for factor_name, factor in factors.items():
+            factor_mat = to_matrix(factor)
+            dates = price_mat.index.intersection(factor_mat.index)
+            symbols = price_mat.columns.intersection(factor_mat.columns)
+            f = factor_mat.reindex(index=dates, columns=symbols).to_numpy(dtype=float)
+            p = price_mat.reindex(columns=symbols)
+
+            for horizon in horizons:
+                fwd = (p.shift(-horizon) / p - 1).reindex(index=dates).to_numpy(dtype=float)
+                for method in methods:
+                    if method == 'pearson':
+                        ic, counts, _ = masked_corr(f, fwd)
+                    elif method == 'rank':
+                        valid = ~np.isnan(f) & ~np.isnan(fwd)
+                        ic, counts, _ = masked_corr(rank_rows(np.where(valid, f, np.nan)),
+                                                    rank_rows(np.where(valid, fwd, np.nan)))
+                    else:
+                        raise ValueError(f"不支持的IC计算方法: {method}")
+                    ic[counts < min_stocks] = np.nan
+                    results[(factor_name, method, horizon)] = pd.Series(ic, index=dates)
+
+        if not results:
+            return pd.DataFrame()
+        ic_df = pd.DataFrame(results)
+        ic_df.columns.names = ['factor', 'method', 'horizon']
+        ic_df.index.name = 'date'
+        return ic_df
     
     def calculate_ic_stats(self, ic_series) -> Dict:
         """
@@ -269,6 +269,28 @@ class DuckDBDataManager:
         """
         return self.storage.load_batch(stock_codes, period, start_date, end_date, adjust_type)
 
+    def load_frame(self, stock_codes: List[str], period: str = '1d',
+                   start_date: str = None, end_date: str = None,
+                   adjust_type: str = 'none', fields: List[str] = None,
+                   layout: str = 'long') -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """
+        一次查询批量加载（长表或宽表），参见 DuckDBStorage.load_frame
+
+        Args:
+            stock_codes: 股票代码列表
+            period: 周期
+            start_date: 开始日期
+            end_date: 结束日期
+            adjust_type: 复权类型
+            fields: 行情字段
+            layout: 'long' 或 'wide'
+
+        Returns:
+            以 (date, stock_code) 为索引的长表，或 {字段: 宽表}
+        """
+        return self.storage.load_frame(stock_codes, period, start_date, end_date,
+                                       adjust_type, fields, layout)
+
     def update_data(self, stock_codes: List[str] = None, period: str = '1d',
                     adjust_types: List[str] = None):
         """
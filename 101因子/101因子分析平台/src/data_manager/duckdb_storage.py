@@ -10,6 +10,134 @@ from typing import List, Dict, Optional, Tuple, Union
 from datetime import datetime
 import warnings
 
+# stock_daily 中可读取的行情字段；价格字段参与复权，成交量/成交额不复权
+BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+PRICE_FIELDS = ['open', 'high', 'low', 'close']
+
+# adj_factor.trade_date 可能是 DATE，也可能是 'YYYYMMDD' 字符串
+_FACTOR_DATE_SQL = (
+    "COALESCE(TRY_CAST(a.trade_date AS DATE), "
+    "CAST(TRY_STRPTIME(CAST(a.trade_date AS VARCHAR), '%Y%m%d') AS DATE))"
+)
+
+
+def has_adj_factor_table(con) -> bool:
+    """数据库中是否有 adj_factor 复权因子表"""
+    return con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'adj_factor'"
+    ).fetchone()[0] > 0
+
+
+def codes_without_adj_factor(con, stock_codes: List[str], end_date: str = None) -> List[str]:
+    """没有可用复权因子（截至 end_date）的股票代码"""
+    if not has_adj_factor_table(con):
+        return list(stock_codes)
+    conditions = ["a.ts_code IN (SELECT UNNEST(?::VARCHAR[]))", "a.adj_factor > 0"]
+    params: list = [list(stock_codes)]
+    if end_date:
+        conditions.append(f"{_FACTOR_DATE_SQL} <= ?")
+        params.append(end_date)
+    rows = con.execute(
+        f"SELECT DISTINCT a.ts_code FROM adj_factor a WHERE {' AND '.join(conditions)}", params
+    ).fetchall()
+    covered = {row[0] for row in rows}
+    return [code for code in stock_codes if code not in covered]
+
+
+def load_bars_arrow(con, stock_codes: List[str], period: str = '1d',
+                    start_date: str = None, end_date: str = None,
+                    adjust_type: str = 'none',
+                    fields: Optional[List[str]] = None) -> 'pyarrow.Table':
+    """
+    一次查询批量读取多只股票的日线（长表，按 stock_code, date 排序），结果直接以 Arrow 表返回
+
+    复权在 SQL 中通过 JOIN adj_factor 完成：
+    - 'front'（前复权）：价格 × 当日因子 / 截至 end_date 的最新因子
+    - 'back'（后复权）：价格 × 当日因子
+    当日没有因子时沿用之前最近一次的因子（更早则用最早的因子）；
+    完全没有因子的股票返回不复权价格，可先用 codes_without_adj_factor() 筛出另行处理。
+
+    Args:
+        con: DuckDB 连接（可以是只读连接）
+        stock_codes: 股票代码列表
+        period: 周期
+        start_date: 开始日期
+        end_date: 结束日期
+        adjust_type: 复权类型 ('none', 'front', 'back')
+        fields: 需要的行情字段，默认全部 BAR_FIELDS
+
+    Returns:
+        pyarrow.Table，列为 stock_code, date 和所选字段
+    """
+    fields = [f for f in (fields or BAR_FIELDS) if f in BAR_FIELDS]
+
+    conditions = ["d.stock_code IN (SELECT stock_code FROM codes)", "d.period = ?"]
+    params: list = [list(stock_codes), period]
+    if start_date:
+        conditions.append("d.date >= ?")
+        params.append(start_date)
+    if end_date:
+        conditions.append("d.date <= ?")
+        params.append(end_date)
+
+    bars_sql = f"""
+        SELECT d.stock_code, d.date, {', '.join(f'd.{f}' for f in fields)}
+        FROM stock_daily d
+        WHERE {' AND '.join(conditions)}
+    """
+
+    if adjust_type not in ('front', 'back') or not has_adj_factor_table(con):
+        if adjust_type not in ('none', 'front', 'back'):
+            warnings.warn(f"未知的复权类型 {adjust_type}，返回不复权数据")
+        query = f"""
+            WITH codes AS (SELECT UNNEST(?::VARCHAR[]) AS stock_code)
+            SELECT * FROM ({bars_sql}) b
+            ORDER BY b.stock_code ASC, b.date ASC
+        """
+        return con.execute(query, params).fetch_arrow_table()
+
+    latest_filter = ""
+    if end_date:
+        latest_filter = "FILTER (WHERE date <= ?)"
+        params.append(end_date)
+
+    if adjust_type == 'front':
+        ratio_sql = "COALESCE(j.adj_factor, f.earliest) / f.latest"
+    else:
+        ratio_sql = "COALESCE(j.adj_factor, f.earliest)"
+
+    select_fields = [
+        f"j.{f} * COALESCE({ratio_sql}, 1.0) AS {f}" if f in PRICE_FIELDS else f"j.{f}"
+        for f in fields
+    ]
+
+    query = f"""
+        WITH codes AS (SELECT UNNEST(?::VARCHAR[]) AS stock_code),
+        bars AS ({bars_sql}),
+        factors AS (
+            SELECT a.ts_code AS stock_code, {_FACTOR_DATE_SQL} AS date, a.adj_factor
+            FROM adj_factor a
+            WHERE a.ts_code IN (SELECT stock_code FROM codes) AND a.adj_factor > 0
+        ),
+        factor_bounds AS (
+            SELECT stock_code,
+                   arg_max(adj_factor, date) {latest_filter} AS latest,
+                   arg_min(adj_factor, date) AS earliest
+            FROM factors
+            GROUP BY stock_code
+        ),
+        joined AS (
+            SELECT b.*, a.adj_factor
+            FROM bars b
+            ASOF LEFT JOIN factors a ON b.stock_code = a.stock_code AND b.date >= a.date
+        )
+        SELECT j.stock_code, j.date, {', '.join(select_fields)}
+        FROM joined j
+        LEFT JOIN factor_bounds f ON j.stock_code = f.stock_code
+        ORDER BY j.stock_code ASC, j.date ASC
+    """
+    return con.execute(query, params).fetch_arrow_table()
+
 
 class DuckDBStorage:
     """
@@ -389,11 +517,74 @@ class DuckDBStorage:
             warnings.warn(f"加载不复权数据失败 ({stock_code}): {e}")
             return pd.DataFrame()
 
+    def load_frame(self, stock_codes: List[str], period: str = '1d',
+                   start_date: str = None, end_date: str = None,
+                   adjust_type: str = 'none', fields: Optional[List[str]] = None,
+                   layout: str = 'long') -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """
+        一次查询批量加载多只股票（复权在SQL中完成，经Arrow直接转换为DataFrame）
+
+        没有复权因子的股票（或库中没有 adj_factor 表时）逐个从QMT获取复权数据。
+
+        Args:
+            stock_codes: 股票代码列表
+            period: 周期
+            start_date: 开始日期
+            end_date: 结束日期
+            adjust_type: 复权类型 ('none', 'front', 'back')
+            fields: 行情字段，默认 open/high/low/close/volume/amount
+            layout: 'long' 返回以 (date, stock_code) 为索引的长表；
+                    'wide' 返回 {字段: DataFrame(日期 × 股票)}
+
+        Returns:
+            长表 DataFrame 或 {字段: 宽表} 字典
+        """
+        fields = [f for f in (fields or BAR_FIELDS) if f in BAR_FIELDS]
+        codes = list(dict.fromkeys(stock_codes or []))
+
+        frames = []
+        if codes:
+            sql_codes = codes
+            qmt_codes = []
+            if adjust_type in ('front', 'back'):
+                qmt_codes = codes_without_adj_factor(self.con, codes, end_date)
+                sql_codes = [code for code in codes if code not in set(qmt_codes)]
+
+            if sql_codes:
+                table = load_bars_arrow(self.con, sql_codes, period, start_date, end_date, adjust_type, fields)
+                frames.append(table.to_pandas())
+
+            for code in qmt_codes:
+                df = self._load_adjusted_from_qmt(code, period, adjust_type)
+                if df.empty:
+                    continue
+                if 'date' not in df.columns:
+                    df = df.reset_index()
+                df['date'] = pd.to_datetime(df['date'])
+                if start_date:
+                    df = df[df['date'] >= pd.Timestamp(start_date)]
+                if end_date:
+                    df = df[df['date'] <= pd.Timestamp(end_date)]
+                df = df.assign(stock_code=code)
+                frames.append(df[['stock_code', 'date'] + [f for f in fields if f in df.columns]])
+
+        if frames:
+            long_df = pd.concat(frames, ignore_index=True)
+            long_df['date'] = pd.to_datetime(long_df['date']).astype('datetime64[ns]')
+        else:
+            long_df = pd.DataFrame(columns=['stock_code', 'date'] + fields)
+        long_df = long_df.set_index(['date', 'stock_code']).sort_index()
+
+        if layout == 'wide':
+            wide = long_df[fields].unstack('stock_code')
+            return {field: wide[field] for field in fields}
+        return long_df
+
     def load_batch(self, stock_codes: List[str], period: str = '1d',
                    start_date: str = None, end_date: str = None,
                    adjust_type: str = 'none') -> Dict[str, pd.DataFrame]:
         """
-        批量加载多个股票的数据（按需从QMT获取复权）
+        批量加载多个股票的数据（一次查询，复权在SQL中通过 adj_factor 完成）
 
         Args:
             stock_codes: 股票代码列表
@@ -403,58 +594,31 @@ class DuckDBStorage:
             adjust_type: 复权类型
 
         Returns:
-            {stock_code: DataFrame} 字典
+            {stock_code: DataFrame} 字典；不复权时 date 为普通列，复权时 date 为索引
         """
         if not stock_codes:
             return {}
 
-        # 如果是不复权，批量从DuckDB读取（高效）
-        if adjust_type == 'none':
-            codes_str = ", ".join([f"'{code}'" for code in stock_codes])
-
-            where_conditions = [
-                f"stock_code IN ({codes_str})",
-                f"period = '{period}'"
-            ]
-
-            if start_date:
-                where_conditions.append(f"date >= '{start_date}'")
-            if end_date:
-                where_conditions.append(f"date <= '{end_date}'")
-
-            query = f"""
-                SELECT stock_code, date, open, high, low, close, volume, amount
-                FROM stock_daily
-                WHERE {' AND '.join(where_conditions)}
-                ORDER BY stock_code, date ASC
-            """
-
-            try:
-                df_all = self.con.execute(query).df()
-
-                # 分组返回
-                result = {}
-                for code in stock_codes:
-                    df_code = df_all[df_all['stock_code'] == code].copy()
-                    if not df_code.empty:
-                        df_code = df_code.drop(columns=['stock_code'])
-                        result[code] = df_code
-
-                return result
+        try:
+            long_df = self.load_frame(stock_codes, period, start_date, end_date, adjust_type)
+        except Exception as e:
+            warnings.warn(f"批量加载数据失败: {e}")
+            return {}
 
-            except Exception as e:
-                warnings.warn(f"批量加载数据失败: {e}")
-                return {}
+        # 按股票拆分（一次分组，而不是对每只股票做一次布尔筛选）
+        grouped = {
+            code: df.droplevel('stock_code')
+            for code, df in long_df.groupby(level='stock_code', sort=False)
+        }
 
-        # 如果需要复权，逐个从QMT获取（稍慢但准确）
-        else:
-            result = {}
-            for code in stock_codes:
-                df = self._load_adjusted_from_qmt(code, period, adjust_type)
-                if not df.empty:
-                    result[code] = df
+        result = {}
+        for code in stock_codes:
+            df_code = grouped.get(code)
+            if df_code is None or df_code.empty:
+                continue
+            result[code] = df_code.reset_index() if adjust_type == 'none' else df_code
 
-            return result
+        return result
 
     def calculate_indicators(self, stock_code: str, start_date: str, end_date: str,
                             indicators: List[str] = None) -> pd.DataFrame:
@@ -225,7 +225,7 @@ class HybridDataManager:
         """
         result = {}
 
-        # 优先从DuckDB批量加载
+        # 优先从DuckDB批量加载（一次查询）
         if self.use_duckdb and self.duckdb_manager:
             try:
                 result = self.duckdb_manager.load_batch(
@@ -235,14 +235,13 @@ class HybridDataManager:
                 # 如果DuckDB中有部分数据，记录一下
                 if result:
                     self.stats['duckdb_hits'] += len(result)
-                    missing_codes = set(stock_codes) - set(result.keys())
+                    missing_codes = [code for code in stock_codes if code not in result]
 
-                    # 对于缺失的代码，尝试从SQLite加载
+                    # 对于缺失的代码，一次性从SQLite批量加载
                     if missing_codes and self.sqlite_manager:
-                        for code in missing_codes:
-                            df = self.load_data(code, period, adjust_type)
-                            if not df.empty:
-                                result[code] = df
+                        result.update(self._load_batch_from_sqlite(
+                            missing_codes, period, start_date, end_date, adjust_type
+                        ))
 
                     return result
 
@@ -251,19 +250,31 @@ class HybridDataManager:
 
         # 从SQLite批量加载
         if self.sqlite_manager:
-            try:
-                result = self.sqlite_manager.storage.load_batch(
-                    stock_codes, period, start_date, end_date, adjust_type
-                )
+            result = self._load_batch_from_sqlite(stock_codes, period, start_date, end_date, adjust_type)
 
-                # 自动迁移
-                if self.auto_migrate and self.use_duckdb and self.duckdb_manager:
-                    for code, df in result.items():
-                        if not df.empty:
-                            self._migrate_record(df, code, period, adjust_type)
+        return result
 
-            except Exception as e:
-                warnings.warn(f"从SQLite批量加载失败: {e}")
+    def _load_batch_from_sqlite(self, stock_codes: List[str], period: str,
+                                start_date: str, end_date: str,
+                                adjust_type: str) -> Dict[str, pd.DataFrame]:
+        """从本地文件存储批量加载，并按需迁移到DuckDB"""
+        result = {}
+        try:
+            # 本地文件存储按数据类型分目录，日线目录为 daily
+            data_type = 'daily' if period == '1d' else period
+            result = self.sqlite_manager.storage.load_batch(
+                stock_codes, data_type, start_date, end_date
+            )
+            self.stats['sqlite_hits'] += len(result)
+
+            # 自动迁移
+            if self.auto_migrate and self.use_duckdb and self.duckdb_manager:
+                for code, df in result.items():
+                    if not df.empty:
+                        self._migrate_record(df, code, period, adjust_type)
+
+        except Exception as e:
+            warnings.warn(f"从SQLite批量加载失败: {e}")
 
         return result
 
@@ -1,17 +1,60 @@
 """
 Parquet文件存储管理
 提供高效的行列式存储，支持压缩和快速查询
+
+存储布局（按数据类型分目录）：
+    daily/dataset/year=2024/month=3/part-<序号>-0.parquet
+
+- 按年/月做 Hive 分区，同一分区内多个标的的数据写在同一文件中，按 (symbol, date) 排序，
+  行组统计信息可用于按标的裁剪
+- 读取通过 pyarrow.dataset 完成：先按日期范围裁剪分区，再把标的/日期过滤条件和列投影
+  下推到文件扫描，多个文件由 pyarrow 多线程并发读取
+- 写入（保存/追加）只新增分区文件、不改写已有文件；同一 (symbol, date) 以写入序号
+  最大的一行为准，optimize_storage() 负责合并小文件
+- 旧版本的单标的文件（daily/<symbol>.parquet）仍可读取，optimize_storage() 会将其迁入分区数据集
 """
 
+import os
+import time
+import threading
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 import warnings
 
+# 分区数据集所在的子目录
+DATASET_DIR = 'dataset'
+
+# 数据集中的保留列
+SYMBOL_COLUMN = 'symbol'
+DATE_COLUMN = 'date'
+SEQ_COLUMN = '_seq'  # 写入序号，用于同一 (symbol, date) 多次写入时取最新
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('year', pa.int16()), ('month', pa.int8())]),
+    flavor='hive'
+)
+
+# 合并后每个行组的行数：约 1500 个标的一个月的日线，既能按标的裁剪行组又不至于过碎
+ROW_GROUP_ROWS = 32 * 1024
+
+_seq_lock = threading.Lock()
+_last_seq = 0
+
+
+def _next_seq() -> int:
+    """单调递增的写入序号（纳秒时间戳，同一纳秒内多次写入时顺延）"""
+    global _last_seq
+    with _seq_lock:
+        _last_seq = max(time.time_ns(), _last_seq + 1)
+        return _last_seq
+
 
 class ParquetStorage:
     """Parquet文件存储管理器"""
@@ -33,17 +76,92 @@ class ParquetStorage:
         (self.root_dir / 'daily').mkdir(parents=True, exist_ok=True)
         (self.root_dir / 'factors').mkdir(parents=True, exist_ok=True)
 
+    # ==================== 路径 ====================
+
+    def _type_dir(self, data_type: str) -> Path:
+        """数据类型对应的目录（因子数据存放在 factors/）"""
+        return self.root_dir / ('factors' if data_type == 'factor' else data_type)
+
+    def _dataset_dir(self, data_type: str) -> Path:
+        return self._type_dir(data_type) / DATASET_DIR
+
+    def _legacy_path(self, symbol: str, data_type: str) -> Path:
+        """旧版本单标的文件路径"""
+        return self._type_dir(data_type) / f"{symbol}.parquet"
+
+    def _legacy_symbols(self, data_type: str) -> set:
+        """存在旧版本单标的文件的标的"""
+        data_dir = self._type_dir(data_type)
+        if not data_dir.exists():
+            return set()
+        return {f.stem for f in data_dir.glob('*.parquet') if f.is_file()}
+
+    def _dataset_files(self, data_type: str) -> List[Path]:
+        dataset_dir = self._dataset_dir(data_type)
+        if not dataset_dir.exists():
+            return []
+        return sorted(p for p in dataset_dir.glob('year=*/month=*/*.parquet') if p.is_file())
+
+    # ==================== 写入 ====================
+
+    def _to_rows(self, df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+        """把单标的日期索引数据转换为数据集行（date/symbol 为普通列）"""
+        if not isinstance(df.index, pd.DatetimeIndex) and DATE_COLUMN in df.columns:
+            df = df.set_index(DATE_COLUMN)
+        index = pd.DatetimeIndex(pd.to_datetime(df.index))
+        if index.tz is not None:
+            index = index.tz_localize(None)
+
+        rows = df.reset_index(drop=True)
+        rows = rows.drop(columns=[c for c in (SYMBOL_COLUMN, DATE_COLUMN) if c in rows.columns])
+        rows.insert(0, DATE_COLUMN, index.values)
+        rows.insert(0, SYMBOL_COLUMN, symbol)
+        return rows
+
+    def _write_rows(self, rows: pd.DataFrame, data_type: str, seq: Optional[int] = None) -> float:
+        """
+        把行写入分区数据集（只新增文件），返回写入的文件大小（MB）
+
+        Args:
+            rows: 含 symbol/date 列的数据
+            data_type: 数据类型
+            seq: 写入序号，默认取新序号；合并文件时沿用行上已有的序号
+        """
+        rows = rows.sort_values([SYMBOL_COLUMN, DATE_COLUMN], kind='mergesort')
+        dates = pd.DatetimeIndex(rows[DATE_COLUMN])
+        rows = rows.assign(year=dates.year.astype('int16'), month=dates.month.astype('int8'))
+        if seq is not None or SEQ_COLUMN not in rows.columns:
+            rows[SEQ_COLUMN] = _next_seq() if seq is None else seq
+
+        table = pa.Table.from_pandas(rows, preserve_index=False)
+        written = []
+        ds.write_dataset(
+            table,
+            self._dataset_dir(data_type),
+            format='parquet',
+            partitioning=PARTITIONING,
+            basename_template=f"part-{_next_seq()}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=ds.ParquetFileFormat().make_write_options(compression=self.compression),
+            max_rows_per_group=ROW_GROUP_ROWS,
+            min_rows_per_group=min(ROW_GROUP_ROWS, len(rows)),
+            file_visitor=lambda f: written.append(f.path),
+        )
+        return sum(os.path.getsize(p) for p in written) / (1024 * 1024)
+
     def save_data(self, df: pd.DataFrame, symbol: str,
                   data_type: str = 'daily',
                   partition_by: str = None) -> Tuple[bool, float]:
         """
-        保存数据到Parquet文件
+        保存数据到Parquet数据集
+
+        已存在的同日期数据以本次写入为准，其余日期的数据保留。
 
         Args:
             df: 要保存的数据
             symbol: 标的代码
             data_type: 数据类型 (daily/minute/factor)
-            partition_by: 分区方式 (year/month/None)
+            partition_by: 保留参数兼容性（数据集固定按年/月分区）
 
         Returns:
             (success, file_size_mb)
@@ -53,161 +171,263 @@ class ParquetStorage:
                 warnings.warn(f"数据为空，跳过保存: {symbol}")
                 return False, 0
 
-            # 构建文件路径
-            if data_type == 'factor':
-                # 因子数据：factors/factor_name/symbol.parquet
-                file_path = self.root_dir / 'factors' / f"{symbol}.parquet"
-            else:
-                # 行情数据：daily/symbol.parquet
-                file_path = self.root_dir / data_type / f"{symbol}.parquet"
+            file_size = self._write_rows(self._to_rows(df, symbol), data_type)
+            return True, file_size
 
-            file_path.parent.mkdir(parents=True, exist_ok=True)
+        except Exception as e:
+            warnings.warn(f"保存数据失败: {symbol}, 错误: {e}")
+            return False, 0
 
-            # 确保日期索引是datetime类型
-            if isinstance(df.index, pd.DatetimeIndex):
-                df.index = df.index.tz_localize(None)
+    def save_batch(self, data_dict: Dict[str, pd.DataFrame],
+                   data_type: str = 'daily') -> Dict[str, Tuple[bool, float]]:
+        """
+        批量保存数据（全部标的一次写入，每个分区只新增一个文件）
 
-            # 保存为Parquet
-            df.to_parquet(
-                file_path,
-                engine='pyarrow',
-                compression=self.compression,
-                index=True
-            )
+        Args:
+            data_dict: {symbol: DataFrame} 字典
+            data_type: 数据类型
 
-            # 获取文件大小
-            file_size = file_path.stat().st_size / (1024 * 1024)  # MB
+        Returns:
+            {symbol: (success, file_size_mb)}，file_size_mb 按行数分摊
+        """
+        results = {}
+        frames = {}
 
-            return True, file_size
+        for symbol, df in data_dict.items():
+            if df is None or df.empty:
+                warnings.warn(f"数据为空，跳过保存: {symbol}")
+                results[symbol] = (False, 0)
+                continue
+            try:
+                frames[symbol] = self._to_rows(df, symbol)
+            except Exception as e:
+                warnings.warn(f"保存数据失败: {symbol}, 错误: {e}")
+                results[symbol] = (False, 0)
+
+        if frames:
+            rows = pd.concat(frames.values(), ignore_index=True)
+            try:
+                total_size = self._write_rows(rows, data_type)
+            except Exception as e:
+                warnings.warn(f"批量保存数据失败: {e}")
+                results.update({symbol: (False, 0) for symbol in frames})
+            else:
+                for symbol, frame in frames.items():
+                    results[symbol] = (True, total_size * len(frame) / len(rows))
 
-        except Exception as e:
-            warnings.warn(f"保存数据失败: {symbol}, 错误: {e}")
-            return False, 0
+        return {symbol: results[symbol] for symbol in data_dict}
 
-    def load_data(self, symbol: str,
-                  data_type: str = 'daily',
-                  start_date: str = None,
-                  end_date: str = None) -> pd.DataFrame:
+    def append_data(self, df: pd.DataFrame, symbol: str,
+                    data_type: str = 'daily') -> bool:
         """
-        从Parquet文件加载数据
+        追加数据（增量更新）
+
+        只写入新增的分区文件，不读取、不改写已有数据；重复日期以本次数据为准。
 
         Args:
+            df: 要追加的数据
             symbol: 标的代码
             data_type: 数据类型
-            start_date: 开始日期
-            end_date: 结束日期
 
         Returns:
-            DataFrame
+            是否成功
         """
         try:
-            # 构建文件路径
-            if data_type == 'factor':
-                file_path = self.root_dir / 'factors' / f"{symbol}.parquet"
-            else:
-                file_path = self.root_dir / data_type / f"{symbol}.parquet"
+            if df.empty:
+                return True
+            self._write_rows(self._to_rows(df, symbol), data_type)
+            return True
 
-            if not file_path.exists():
-                return pd.DataFrame()
+        except Exception as e:
+            warnings.warn(f"追加数据失败: {symbol}, 错误: {e}")
+            return False
+
+    # ==================== 读取 ====================
+
+    @staticmethod
+    def _partition_filter(start_date: str = None, end_date: str = None) -> Optional[ds.Expression]:
+        """日期范围对应的年/月分区过滤条件"""
+        year, month = ds.field('year'), ds.field('month')
+        expr = None
+        if start_date:
+            start = pd.Timestamp(start_date)
+            expr = (year > start.year) | ((year == start.year) & (month >= start.month))
+        if end_date:
+            end = pd.Timestamp(end_date)
+            end_expr = (year < end.year) | ((year == end.year) & (month <= end.month))
+            expr = end_expr if expr is None else expr & end_expr
+        return expr
+
+    @staticmethod
+    def _unified_schema(fragments) -> Optional[pa.Schema]:
+        """合并各文件的 schema（不同批次写入的列可能不同），不兼容时返回 None"""
+        schemas = [fragment.physical_schema for fragment in fragments]
+        try:
+            return pa.unify_schemas(schemas, promote_options='permissive')
+        except TypeError:
+            # pyarrow < 14 不支持 promote_options
+            pass
+        except pa.ArrowInvalid:
+            return None
+        try:
+            return pa.unify_schemas(schemas)
+        except pa.ArrowInvalid:
+            return None
 
-            # 读取数据
-            df = pd.read_parquet(file_path, engine='pyarrow')
+    def _scan(self, data_type: str,
+              symbols: Optional[List[str]] = None,
+              start_date: str = None,
+              end_date: str = None,
+              columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        扫描分区数据集，返回去重后的行（含 symbol/date 列，按 symbol/date 排序）
 
-            # 确保日期索引
-            if not isinstance(df.index, pd.DatetimeIndex):
-                if 'date' in df.columns:
-                    df = df.set_index('date')
-                    df.index = pd.to_datetime(df.index)
+        日期范围先用于裁剪分区，再与标的条件一起下推到文件扫描；columns 只读取需要的列。
+        """
+        dataset_dir = self._dataset_dir(data_type)
+        if not dataset_dir.exists():
+            return pd.DataFrame()
 
-            # 过滤日期范围
-            if start_date:
-                df = df[df.index >= start_date]
-            if end_date:
-                df = df[df.index <= end_date]
+        dataset = ds.dataset(dataset_dir, format='parquet', partitioning=PARTITIONING)
+        partition_expr = self._partition_filter(start_date, end_date)
+        fragments = list(dataset.get_fragments(filter=partition_expr)
+                         if partition_expr is not None else dataset.get_fragments())
+        if not fragments:
+            return pd.DataFrame()
 
+        row_filter = None
+        if symbols is not None:
+            row_filter = ds.field(SYMBOL_COLUMN).isin(list(symbols))
+        if start_date:
+            start_expr = ds.field(DATE_COLUMN) >= pa.scalar(pd.Timestamp(start_date).to_pydatetime())
+            row_filter = start_expr if row_filter is None else row_filter & start_expr
+        if end_date:
+            end_expr = ds.field(DATE_COLUMN) <= pa.scalar(pd.Timestamp(end_date).to_pydatetime())
+            row_filter = end_expr if row_filter is None else row_filter & end_expr
+
+        schema = self._unified_schema(fragments)
+        if schema is not None:
+            read_columns = None
+            if columns is not None:
+                wanted = [SYMBOL_COLUMN, DATE_COLUMN, SEQ_COLUMN] + list(columns)
+                read_columns = [c for c in dict.fromkeys(wanted) if c in schema.names]
+            scan_dataset = ds.FileSystemDataset(fragments, schema, ds.ParquetFileFormat(),
+                                                filesystem=dataset.filesystem)
+            table = scan_dataset.to_table(columns=read_columns, filter=row_filter, use_threads=True)
+            df = table.to_pandas()
+        else:
+            # 各批次列类型冲突，逐文件读取后由 pandas 合并
+            frames = [fragment.to_table(filter=row_filter).to_pandas() for fragment in fragments]
+            df = pd.concat(frames, ignore_index=True)
+            if columns is not None:
+                df = df[[c for c in [SYMBOL_COLUMN, DATE_COLUMN, SEQ_COLUMN] + list(columns) if c in df.columns]]
+
+        if df.empty:
             return df
 
-        except Exception as e:
-            warnings.warn(f"加载数据失败: {symbol}, 错误: {e}")
+        # 同一 (symbol, date) 多次写入时保留序号最大的一行
+        df = df.sort_values([SYMBOL_COLUMN, DATE_COLUMN, SEQ_COLUMN], kind='mergesort')
+        df = df.drop_duplicates([SYMBOL_COLUMN, DATE_COLUMN], keep='last')
+        return df.reset_index(drop=True)
+
+    def _load_legacy(self, symbol: str, data_type: str,
+                     start_date: str = None, end_date: str = None,
+                     columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """读取旧版本的单标的文件"""
+        file_path = self._legacy_path(symbol, data_type)
+        if not file_path.exists():
             return pd.DataFrame()
 
-    def save_batch(self, data_dict: Dict[str, pd.DataFrame],
-                   data_type: str = 'daily') -> Dict[str, Tuple[bool, float]]:
+        df = pd.read_parquet(file_path, engine='pyarrow')
+
+        # 确保日期索引
+        if not isinstance(df.index, pd.DatetimeIndex):
+            if 'date' in df.columns:
+                df = df.set_index('date')
+                df.index = pd.to_datetime(df.index)
+
+        # 过滤日期范围
+        if start_date:
+            df = df[df.index >= start_date]
+        if end_date:
+            df = df[df.index <= end_date]
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+        return df
+
+    def load_data(self, symbol: str,
+                  data_type: str = 'daily',
+                  start_date: str = None,
+                  end_date: str = None,
+                  columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
-        批量保存数据
+        从Parquet数据集加载数据
 
         Args:
-            data_dict: {symbol: DataFrame} 字典
+            symbol: 标的代码
             data_type: 数据类型
+            start_date: 开始日期
+            end_date: 结束日期
+            columns: 只读取的列（默认全部）
 
         Returns:
-            {symbol: (success, file_size_mb)}
+            以日期为索引的 DataFrame
         """
-        results = {}
-
-        for symbol, df in data_dict.items():
-            success, size = self.save_data(df, symbol, data_type)
-            results[symbol] = (success, size)
-
-        return results
+        return self.load_batch([symbol], data_type, start_date, end_date, columns).get(symbol, pd.DataFrame())
 
     def load_batch(self, symbols: List[str],
                    data_type: str = 'daily',
                    start_date: str = None,
-                   end_date: str = None) -> Dict[str, pd.DataFrame]:
+                   end_date: str = None,
+                   columns: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
         """
-        批量加载数据
+        批量加载数据（一次数据集扫描，而非逐个文件读取）
 
         Args:
             symbols: 标的代码列表
             data_type: 数据类型
             start_date: 开始日期
             end_date: 结束日期
+            columns: 只读取的列（默认全部）
 
         Returns:
             {symbol: DataFrame}
         """
         results = {}
 
-        for symbol in symbols:
-            df = self.load_data(symbol, data_type, start_date, end_date)
-            if not df.empty:
-                results[symbol] = df
-
-        return results
-
-    def append_data(self, df: pd.DataFrame, symbol: str,
-                    data_type: str = 'daily') -> bool:
-        """
-        追加数据到现有文件（增量更新）
-
-        Args:
-            df: 要追加的数据
-            symbol: 标的代码
-            data_type: 数据类型
-
-        Returns:
-            是否成功
-        """
         try:
-            # 加载现有数据
-            existing_df = self.load_data(symbol, data_type)
-
-            if not existing_df.empty:
-                # 合并数据，去重
-                combined_df = pd.concat([existing_df, df])
-                combined_df = combined_df[~combined_df.index.duplicated(keep='last')]
-                combined_df = combined_df.sort_index()
-            else:
-                combined_df = df
-
-            # 保存合并后的数据
-            success, _ = self.save_data(combined_df, symbol, data_type)
-            return success
-
+            rows = self._scan(data_type, symbols, start_date, end_date, columns)
         except Exception as e:
-            warnings.warn(f"追加数据失败: {symbol}, 错误: {e}")
-            return False
+            warnings.warn(f"加载数据失败: {data_type}, 错误: {e}")
+            rows = pd.DataFrame()
+
+        # 尚未迁移到数据集的旧版本单标的文件（写入序号视为 0，数据集中的新数据优先）
+        legacy_symbols = self._legacy_symbols(data_type).intersection(symbols)
+        if legacy_symbols:
+            frames = [rows] if not rows.empty else []
+            for symbol in sorted(legacy_symbols):
+                try:
+                    df = self._load_legacy(symbol, data_type, start_date, end_date, columns)
+                except Exception as e:
+                    warnings.warn(f"加载数据失败: {symbol}, 错误: {e}")
+                    continue
+                if not df.empty:
+                    frames.append(self._to_rows(df, symbol).assign(**{SEQ_COLUMN: 0}))
+            if frames:
+                rows = pd.concat(frames, ignore_index=True)
+                rows = rows.sort_values([SYMBOL_COLUMN, DATE_COLUMN, SEQ_COLUMN], kind='mergesort')
+                rows = rows.drop_duplicates([SYMBOL_COLUMN, DATE_COLUMN], keep='last')
+
+        if not rows.empty:
+            value_columns = [c for c in rows.columns if c not in (SYMBOL_COLUMN, SEQ_COLUMN)]
+            for symbol, group in rows.groupby(SYMBOL_COLUMN, sort=False, observed=True):
+                df = group[value_columns].set_index(DATE_COLUMN)
+                # 其他批次写入时才有的列在本标的中为空，去掉全空列以保持与单文件读取一致
+                results[str(symbol)] = df.dropna(axis=1, how='all') if columns is None else df
+
+        return {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+    # ==================== 查询与维护 ====================
 
     def get_available_symbols(self, data_type: str = 'daily') -> List[str]:
         """
@@ -220,14 +440,17 @@ class ParquetStorage:
             标的代码列表
         """
         try:
-            data_dir = self.root_dir / data_type
+            data_dir = self._type_dir(data_type)
 
             if not data_dir.exists():
                 return []
 
-            parquet_files = list(data_dir.glob('*.parquet'))
+            symbols = self._legacy_symbols(data_type)
 
-            symbols = [f.stem for f in parquet_files if f.is_file()]
+            if self._dataset_files(data_type):
+                dataset = ds.dataset(self._dataset_dir(data_type), format='parquet', partitioning=PARTITIONING)
+                column = dataset.to_table(columns=[SYMBOL_COLUMN], use_threads=True).column(SYMBOL_COLUMN)
+                symbols.update(str(s) for s in column.unique().to_pylist())
 
             return sorted(symbols)
 
@@ -238,39 +461,40 @@ class ParquetStorage:
     def get_file_info(self, symbol: str,
                       data_type: str = 'daily') -> Optional[Dict]:
         """
-        获取文件信息
+        获取标的数据信息
 
         Args:
             symbol: 标的代码
             data_type: 数据类型
 
         Returns:
-            文件信息字典
+            信息字典；数据集中的标的与其他标的共用分区文件，
+            file_size_mb 按该标的行数占比估算
         """
         try:
-            if data_type == 'factor':
-                file_path = self.root_dir / 'factors' / f"{symbol}.parquet"
-            else:
-                file_path = self.root_dir / data_type / f"{symbol}.parquet"
-
-            if not file_path.exists():
+            df = self.load_data(symbol, data_type)
+            if df.empty:
                 return None
 
-            # 读取Parquet元数据
-            parquet_file = pq.ParquetFile(file_path)
-            metadata = parquet_file.metadata
-
-            # 读取数据获取日期范围
-            df = pd.read_parquet(file_path, engine='pyarrow')
+            legacy_path = self._legacy_path(symbol, data_type)
+            if legacy_path.exists():
+                file_path = legacy_path
+                file_size = legacy_path.stat().st_size
+            else:
+                file_path = self._dataset_dir(data_type)
+                files = self._dataset_files(data_type)
+                total_rows = sum(pq.ParquetFile(f).metadata.num_rows for f in files)
+                total_size = sum(f.stat().st_size for f in files)
+                file_size = total_size * len(df) / total_rows if total_rows else 0
 
             return {
                 'symbol': symbol,
                 'file_path': str(file_path),
-                'file_size_mb': round(file_path.stat().st_size / (1024 * 1024), 2),
-                'num_rows': metadata.num_rows,
-                'num_columns': metadata.num_columns,
-                'start_date': str(df.index.min()) if not df.empty else None,
-                'end_date': str(df.index.max()) if not df.empty else None,
+                'file_size_mb': round(file_size / (1024 * 1024), 2),
+                'num_rows': len(df),
+                'num_columns': len(df.columns) + 1,
+                'start_date': str(df.index.min()),
+                'end_date': str(df.index.max()),
                 'compression': self.compression
             }
 
@@ -280,7 +504,9 @@ class ParquetStorage:
 
     def delete_data(self, symbol: str, data_type: str = 'daily') -> bool:
         """
-        删除数据文件
+        删除标的数据
+
+        数据集中的分区文件与其他标的共用，需要改写含有该标的的文件。
 
         Args:
             symbol: 标的代码
@@ -290,16 +516,29 @@ class ParquetStorage:
             是否成功
         """
         try:
-            if data_type == 'factor':
-                file_path = self.root_dir / 'factors' / f"{symbol}.parquet"
-            else:
-                file_path = self.root_dir / data_type / f"{symbol}.parquet"
-
-            if file_path.exists():
-                file_path.unlink()
-                return True
-
-            return False
+            deleted = False
+
+            legacy_path = self._legacy_path(symbol, data_type)
+            if legacy_path.exists():
+                legacy_path.unlink()
+                deleted = True
+
+            for file_path in self._dataset_files(data_type):
+                table = pq.read_table(file_path)
+                mask = pc.equal(table.column(SYMBOL_COLUMN), symbol)
+                if not pc.any(mask).as_py():
+                    continue
+                remaining = table.filter(pc.invert(mask))
+                if remaining.num_rows:
+                    tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+                    pq.write_table(remaining, tmp_path, compression=self.compression,
+                                   row_group_size=ROW_GROUP_ROWS)
+                    os.replace(tmp_path, file_path)
+                else:
+                    file_path.unlink()
+                deleted = True
+
+            return deleted
 
         except Exception as e:
             warnings.warn(f"删除数据失败: {symbol}, 错误: {e}")
@@ -325,12 +564,14 @@ class ParquetStorage:
                     data_type = data_type_dir.name
 
                     parquet_files = list(data_type_dir.glob('*.parquet'))
-                    num_symbols = len(parquet_files)
-                    size_mb = sum(f.stat().st_size for f in parquet_files) / (1024 * 1024)
+                    dataset_files = self._dataset_files(data_type)
+                    num_symbols = len(self.get_available_symbols(data_type)) if dataset_files else len(parquet_files)
+                    size_mb = sum(f.stat().st_size for f in parquet_files + dataset_files) / (1024 * 1024)
 
                     stats['data_types'][data_type] = {
                         'count': num_symbols,
-                        'size_mb': round(size_mb, 2)
+                        'size_mb': round(size_mb, 2),
+                        'files': len(parquet_files) + len(dataset_files)
                     }
 
                     stats['total_symbols'] += num_symbols
@@ -345,25 +586,65 @@ class ParquetStorage:
 
     def optimize_storage(self, data_type: str = 'daily'):
         """
-        优化存储：压缩、重建索引等
+        优化存储
+
+        1. 把旧版本的单标的文件迁入分区数据集
+        2. 每个月份分区内的多个小文件合并为一个文件：按 (symbol, date) 去重排序，
+           行组大小为 ROW_GROUP_ROWS
 
         Args:
             data_type: 数据类型
         """
         try:
-            data_dir = self.root_dir / data_type
+            data_dir = self._type_dir(data_type)
 
             if not data_dir.exists():
                 return
 
-            parquet_files = list(data_dir.glob('*.parquet'))
-
-            print(f"优化存储: {len(parquet_files)} 个文件")
-
-            # 这里可以添加更多优化操作
-            # 例如：重新压缩、重建索引等
-
-            print("存储优化完成")
+            # 1. 迁移旧文件（迁移数据的写入序号早于数据集中已有的数据）
+            legacy_files = sorted(data_dir.glob('*.parquet'))
+            if legacy_files:
+                print(f"迁移旧格式文件: {len(legacy_files)} 个")
+                frames = []
+                for file_path in legacy_files:
+                    df = self._load_legacy(file_path.stem, data_type)
+                    if not df.empty:
+                        frames.append(self._to_rows(df, file_path.stem))
+                if frames:
+                    self._write_rows(pd.concat(frames, ignore_index=True), data_type, seq=0)
+                for file_path in legacy_files:
+                    file_path.unlink()
+
+            # 2. 合并分区内的小文件
+            partitions: Dict[Path, List[Path]] = {}
+            for file_path in self._dataset_files(data_type):
+                partitions.setdefault(file_path.parent, []).append(file_path)
+
+            compacted = 0
+            for partition_dir, files in partitions.items():
+                if len(files) <= 1:
+                    continue
+                tables = [pq.read_table(f) for f in files]
+                try:
+                    table = pa.concat_tables(tables, promote_options='permissive')
+                except TypeError:
+                    table = pa.concat_tables(tables, promote=True)
+                rows = table.to_pandas()
+                rows = rows.sort_values([SYMBOL_COLUMN, DATE_COLUMN, SEQ_COLUMN], kind='mergesort')
+                rows = rows.drop_duplicates([SYMBOL_COLUMN, DATE_COLUMN], keep='last')
+                rows = rows.sort_values([SYMBOL_COLUMN, DATE_COLUMN], kind='mergesort')
+
+                # 先写临时文件（以 . 开头，读取时被忽略），再替换旧文件
+                target = partition_dir / f"part-{_next_seq()}-0.parquet"
+                tmp_path = partition_dir / f".{target.name}.tmp"
+                pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), tmp_path,
+                               compression=self.compression, row_group_size=ROW_GROUP_ROWS)
+                os.replace(tmp_path, target)
+                for file_path in files:
+                    file_path.unlink()
+                compacted += len(files)
+
+            print(f"存储优化完成: 合并 {compacted} 个文件，共 {len(self._dataset_files(data_type))} 个分区文件")
 
         except Exception as e:
             warnings.warn(f"存储优化失败: {e}")
@@ -2,6 +2,7 @@
 WorldQuant 101 Alpha因子实现
 基于已有的alpha101.py和alpha_factors.py整合实现
 """
+import copy
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional
@@ -12,6 +13,7 @@ import os
 project_path = os.path.join(os.path.dirname(__file__), '..', '..')
 sys.path.insert(0, project_path)
 
+from src.factor_engine.expression_graph import evaluate_shared
 from src.factor_engine.operators import (
     ts_sum, sma, stddev, correlation, covariance,
     ts_rank, ts_min, ts_max, delta, delay, rank,
@@ -24,6 +26,12 @@ class Alpha101Factors:
     """
     WorldQuant 101 Alpha因子实现类
     """
+
+    # 基础字段；批量计算时按字段共享中间结果
+    FIELDS = ('open', 'high', 'low', 'close', 'volume', 'vwap', 'returns')
+    # 共享计算图试算使用的数据规模
+    PROBE_ROWS = 30
+    PROBE_COLS = 4
     
     def __init__(self, data: pd.DataFrame):
         """
@@ -833,18 +841,29 @@ class Alpha101Factors:
         Returns:
             Dict[str, pd.DataFrame]: 因子名称到因子值的映射
         """
-        factors = {}
         factor_methods = [method for method in dir(self) if method.startswith('alpha') and method[5:].isdigit()]
-        
+
+        # 共享相同的子表达式（如 sma(volume, 20)、rank(open)），见 expression_graph
+        probe = copy.copy(self)
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            sliced = value.iloc[:self.PROBE_ROWS, :self.PROBE_COLS] if isinstance(value, pd.DataFrame) else value.iloc[:self.PROBE_ROWS]
+            setattr(probe, name, sliced)
+
+        factors, errors, cache = evaluate_shared(
+            factor_methods,
+            lambda name: getattr(self, name)(),
+            {name: getattr(self, name) for name in self.FIELDS},
+            probe=(lambda name: getattr(probe, name)(), {name: getattr(probe, name) for name in self.FIELDS}),
+        )
+
         for method_name in factor_methods:
-            try:
-                method = getattr(self, method_name)
-                factor_value = method()
-                factors[method_name] = factor_value
+            if method_name in factors:
                 print(f"成功计算因子: {method_name}")
-            except Exception as e:
-                print(f"计算因子 {method_name} 时出错: {e}")
-        
+            else:
+                print(f"计算因子 {method_name} 时出错: {errors[method_name]}")
+        print(f"共享子表达式: 复用 {cache.hits} 次, 实际计算 {cache.misses} 次")
+
         return factors
 
     def calculate_single_factor(self, factor_name: str) -> pd.DataFrame:
@@ -4,8 +4,12 @@ Alpha191因子实现（部分）
 """
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, List, Optional
 from .operators import *
+from .expression_graph import evaluate_shared
+
+# 共享计算图试算使用的行数
+PROBE_ROWS = 60
 
 
 class Alpha191Factors:
@@ -839,6 +843,34 @@ class Alpha191Factors:
         """
         ((correlation(sma(data['volume'],20), data['low'], 5) + ((data['high'] + data['low']) / 2)) - data['close'])
 
+def calculate_alpha191_factors(data: pd.DataFrame, factor_names: Optional[List[str]] = None) -> Dict[str, pd.Series]:
+    """
+    批量计算Alpha191因子，相同的子表达式（如 sma(volume, 20)、delay(close, 1)）只计算一次
+
+    Args:
+        data: 包含OHLCV数据的DataFrame
+        factor_names: 因子名称列表，默认全部
+
+    Returns:
+        Dict[str, pd.Series]: 因子名称到因子值的映射（计算出错的因子不包含在内）
+    """
+    names = factor_names or get_alpha191_factors_list()
+    # 因子只通过 data[列名] / data.get 取字段，传入固定的字段字典使各因子拿到同一批对象
+    fields = {column: data[column] for column in data.columns}
+    probe_fields = {column: series.iloc[:PROBE_ROWS] for column, series in fields.items()}
+
+    factors, errors, cache = evaluate_shared(
+        names,
+        lambda name: getattr(Alpha191Factors, name)(fields),
+        fields,
+        probe=(lambda name: getattr(Alpha191Factors, name)(probe_fields), probe_fields),
+    )
+    for name, error in errors.items():
+        print(f"计算因子 {name} 时出错: {error}")
+    print(f"共享子表达式: 复用 {cache.hits} 次, 实际计算 {cache.misses} 次")
+    return factors
+
+
 def calculate_alpha191_factor(data: pd.DataFrame, factor_name: str) -> pd.Series:
     """
     计算指定的Alpha191因子
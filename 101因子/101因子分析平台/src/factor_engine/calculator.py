@@ -13,7 +13,26 @@ project_path = os.path.join(os.path.dirname(__file__), '..', '..')
 sys.path.insert(0, project_path)
 
 from src.factor_engine.alpha101 import Alpha101Factors
-from src.factor_engine.alpha191 import Alpha191Factors, calculate_alpha191_factor
+from src.factor_engine.alpha191 import Alpha191Factors, calculate_alpha191_factor, calculate_alpha191_factors
+from src.factor_engine import incremental, operators
+
+# 增量更新的因子面板默认保存位置（ParquetStorage 根目录，数据类型为 factor）
+DEFAULT_FACTOR_STORE_DIR = os.path.join(project_path, 'data', 'factors')
+FACTOR_DATA_TYPE = 'factor'
+
+# EasyXT 项目根目录（共享因子缓存 core.factor_cache 所在位置）
+WORKSPACE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+
+
+def _get_shared_cache():
+    """EasyXT 共享因子缓存，与 EasyFactor、回测因子计算器共用；不可用时返回None"""
+    if WORKSPACE_PATH not in sys.path:
+        sys.path.append(WORKSPACE_PATH)
+    try:
+        from core.factor_cache import get_factor_cache
+    except ImportError:
+        return None
+    return get_factor_cache()
 
 
 class FactorCalculator:
@@ -50,14 +69,69 @@ class FactorCalculator:
             pd.DataFrame: 加载的数据
         """
         print(f"正在加载数据: {symbols} 从 {start_date} 到 {end_date}")
-        self.raw_data = self._get_api().get_market_data(
-            symbols=symbols,
-            start_date=start_date,
-            end_date=end_date,
-            fields=fields
-        )
+        self.raw_data = self._load_from_duckdb(symbols, start_date, end_date, fields)
+        if self.raw_data is None:
+            self.raw_data = self._get_api().get_market_data(
+                symbols=symbols,
+                start_date=start_date,
+                end_date=end_date,
+                fields=fields
+            )
         print(f"数据加载完成，形状: {self.raw_data.shape}")
         return self.raw_data
+
+    def _load_from_duckdb(self, symbols: List[str], start_date: str, end_date: str,
+                          fields: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        从本地DuckDB一次查询批量加载（SQL中按 adj_factor 复权，经Arrow直接转换）
+
+        Returns:
+            索引为[date, symbol]的数据；数据库不可用或缺少部分股票时返回None，
+            由EasyXT数据源加载
+        """
+        try:
+            import duckdb
+            from src.data_manager.config_loader import get_duckdb_path
+            from src.data_manager.duckdb_storage import BAR_FIELDS, load_bars_arrow
+        except ImportError:
+            return None
+
+        if isinstance(symbols, str):
+            symbols = [s.strip() for s in symbols.split(',') if s.strip()]
+
+        db_path = get_duckdb_path()
+        if not symbols or not os.path.exists(db_path):
+            return None
+
+        try:
+            con = duckdb.connect(db_path, read_only=True)
+            try:
+                table = load_bars_arrow(con, symbols, '1d', start_date, end_date,
+                                        adjust_type='front', fields=fields or BAR_FIELDS)
+            finally:
+                con.close()
+        except Exception as e:
+            print(f"[WARN] 从DuckDB批量加载失败，改用EasyXT数据源: {e}")
+            return None
+
+        df = table.to_pandas()
+        loaded = set(df['stock_code'].unique()) if not df.empty else set()
+        missing = [s for s in symbols if s not in loaded]
+        if missing:
+            print(f"[INFO] DuckDB中缺少 {len(missing)} 只股票的数据，改用EasyXT数据源")
+            return None
+
+        df['date'] = pd.to_datetime(df['date']).astype('datetime64[ns]')
+        df = df.rename(columns={'stock_code': 'symbol'}).set_index(['date', 'symbol']).sort_index()
+
+        # 与EasyXT数据加载器一致的衍生字段
+        if all(col in df.columns for col in ['high', 'low', 'close']):
+            df['vwap'] = (df['high'] + df['low'] + df['close']) / 3
+        if 'close' in df.columns:
+            df['returns'] = df.groupby(level=1)['close'].pct_change(fill_method=None)
+
+        print(f"[OK] 从DuckDB批量加载 {len(symbols)} 只股票, 共 {len(df)} 条")
+        return df
     
     def calculate_factors(self, factor_names: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
         """
@@ -74,16 +148,41 @@ class FactorCalculator:
         
         print("开始计算因子...")
         alpha_calculator = Alpha101Factors(self.raw_data)
-        
+        cache = _get_shared_cache()
+        cache_keys = {}
+        if cache is not None:
+            # 缓存键：因子实现及算子源码 + 股票池 + 日期范围 + 输入数据指纹（区分复权方式/数据更新）
+            from core.factor_cache import data_fingerprint
+            dates = self.raw_data.index.get_level_values('date')
+            symbols = self.raw_data.index.get_level_values('symbol').unique()
+            fingerprint = data_fingerprint(self.raw_data)
+            for name in factor_names or self.get_factor_names():
+                method = getattr(Alpha101Factors, name, None)
+                if method is not None:
+                    cache_keys[name] = cache.make_key((name, method, operators), symbols, dates.min(), dates.max(),
+                                                      data=fingerprint)
+
         if factor_names is None:
-            # 计算所有因子
-            self.factor_data = alpha_calculator.calculate_all_factors()
+            # 计算所有因子：全部命中缓存时直接使用，否则整体计算（共享子表达式）后写入缓存
+            cached = {name: cache.get(key) for name, key in cache_keys.items()} if cache is not None else {}
+            if cached and all(value is not None for value in cached.values()):
+                self.factor_data = cached
+                print(f"全部 {len(cached)} 个因子命中共享缓存")
+            else:
+                self.factor_data = alpha_calculator.calculate_all_factors()
+                for name, value in self.factor_data.items():
+                    if name in cache_keys and isinstance(value, (pd.DataFrame, pd.Series)) and not value.empty:
+                        cache.put(cache_keys[name], value)
         else:
             # 计算指定因子
             self.factor_data = {}
             for factor_name in factor_names:
                 try:
-                    factor_value = alpha_calculator.calculate_single_factor(factor_name)
+                    factor_value = cache.get(cache_keys[factor_name]) if factor_name in cache_keys else None
+                    if factor_value is None:
+                        factor_value = alpha_calculator.calculate_single_factor(factor_name)
+                        if factor_name in cache_keys and not factor_value.empty:
+                            cache.put(cache_keys[factor_name], factor_value)
                     self.factor_data[factor_name] = factor_value
                     print(f"成功计算因子: {factor_name}")
                 except Exception as e:
@@ -186,6 +285,198 @@ class FactorCalculator:
             # 不支持的因子
             raise ValueError(f"不支持的因子: {factor_name}。仅支持alpha001-alpha101和alpha102-alpha191")
 
+    def calculate_multiple_factors(self, data: pd.DataFrame, factor_names: List[str]) -> List[pd.Series]:
+        """
+        计算多个因子：Alpha191因子一次批量计算（共享子表达式），Alpha101因子逐个计算
+
+        Args:
+            data: 输入数据
+            factor_names: 因子名称列表
+
+        Returns:
+            List[pd.Series]: 与 factor_names 一一对应的因子值，计算出错的因子为空Series
+        """
+        alpha191_names = [name for name in factor_names
+                          if name.startswith('alpha') and 102 <= int(name[5:]) <= 191]
+        alpha191_values = calculate_alpha191_factors(data, alpha191_names) if alpha191_names else {}
+
+        results = []
+        for name in factor_names:
+            if name not in alpha191_names:
+                results.append(self.calculate_single_factor(data, name))
+                continue
+            factor_values = alpha191_values.get(name)
+            if isinstance(factor_values, pd.Series):
+                factor_values.name = name
+            else:
+                factor_values = pd.Series(index=data.index, dtype=float, name=name)
+            results.append(factor_values)
+        return results
+
+    # ==================== 增量更新 ====================
+
+    def estimate_lookbacks(self, factor_names: Optional[List[str]] = None,
+                           safety_margin: int = 5) -> Dict[str, Optional[int]]:
+        """
+        估计各因子的回看窗口（计算一天的因子值需要的交易日数）
+
+        Args:
+            factor_names: 因子名称列表，默认全部Alpha101因子
+            safety_margin: 在估计值之上额外保留的交易日数
+
+        Returns:
+            {因子名: 回看窗口}，依赖全部历史或无法计算的因子为None
+        """
+        factor_names = factor_names or self.get_factor_names()
+        return incremental.estimate_lookbacks(factor_names, safety_margin)
+
+    @staticmethod
+    def _factor_storage(storage=None):
+        if storage is None:
+            from src.data_manager.parquet_storage import ParquetStorage
+            storage = ParquetStorage(DEFAULT_FACTOR_STORE_DIR)
+        return storage
+
+    @staticmethod
+    def _history_start(date: pd.Timestamp, trading_days: int) -> str:
+        """覆盖 trading_days 个交易日的自然日起点（按每年约240个交易日并预留长假余量）"""
+        calendar_days = int(trading_days * 365 / 240) + 30
+        return (date - pd.Timedelta(days=calendar_days)).strftime('%Y-%m-%d')
+
+    def update_factors_incremental(self, symbols: List[str], end_date: str,
+                                   factor_names: Optional[List[str]] = None,
+                                   storage=None,
+                                   start_date: Optional[str] = None,
+                                   lookbacks: Optional[Dict[str, Optional[int]]] = None,
+                                   safety_margin: int = 5) -> Dict[str, pd.DataFrame]:
+        """
+        增量更新因子面板：只加载 max_lookback + new_days 个交易日的数据，
+        计算后把新增交易日的因子值追加到已保存的面板
+
+        new_days 为已保存面板最后日期之后、end_date 之前（含）的交易日数。
+        面板中还没有的因子（新增因子）从 start_date 起全量回填。
+        截面因子依赖股票池，每次更新应使用与建立面板时相同的股票池。
+
+        Args:
+            symbols: 股票代码列表
+            end_date: 更新截止日期
+            factor_names: 因子名称列表，默认全部Alpha101因子
+            storage: ParquetStorage 实例，默认保存在 data/factors
+            start_date: 面板起始日期；首次建立面板、回填新增因子或含依赖全部历史的因子时必需
+            lookbacks: 预先估计的回看窗口（见 estimate_lookbacks）
+            safety_margin: 估计回看窗口时的安全余量
+
+        Returns:
+            Dict[str, pd.DataFrame]: 新增交易日（回填因子为全部交易日）的因子值（日期 × 股票）
+        """
+        factor_names = factor_names or self.get_factor_names()
+        lookbacks = lookbacks or self.estimate_lookbacks(factor_names, safety_margin)
+        storage = self._factor_storage(storage)
+
+        stored = storage.load_batch(symbols, FACTOR_DATA_TYPE, columns=factor_names)
+        initial = len(stored) < len(symbols)
+        if initial and start_date is None:
+            raise ValueError("因子面板中缺少部分股票，首次建立面板需要提供 start_date")
+
+        # 任一股票缺少（或全为空）的因子视为新增因子，需要回填
+        backfill = [] if initial else [
+            name for name in factor_names
+            if any(name not in df.columns or df[name].isna().all() for df in stored.values())]
+        if backfill and start_date is None:
+            raise ValueError(f"因子面板中缺少因子 {backfill}，回填需要提供 start_date")
+        existing = [name for name in factor_names if name not in backfill]
+
+        last_date = None
+        if not initial and existing:
+            last_date = min(pd.Timestamp(df[existing].dropna(how='all').index.max()) for df in stored.values())
+
+        unbounded = [name for name in existing if lookbacks.get(name) is None]
+        if unbounded and start_date is None:
+            print(f"[WARN] 以下因子依赖全部历史，未提供 start_date，跳过: {unbounded}")
+            factor_names = [name for name in factor_names if name not in unbounded]
+            existing = [name for name in existing if name not in unbounded]
+            unbounded = []
+        if not factor_names:
+            return {}
+
+        if initial or unbounded or backfill:
+            load_start = start_date
+        else:
+            max_lookback = max(lookbacks[name] for name in existing)
+            load_start = self._history_start(last_date, max_lookback)
+
+        data = self.load_data(symbols, load_start, end_date)
+        dates = data.index.get_level_values('date').unique().sort_values()
+        new_dates = dates if last_date is None else dates[dates > last_date]
+        if len(new_dates) == 0 and not backfill:
+            print(f"因子面板已是最新（{last_date.date()}）")
+            return {}
+
+        self.factor_data = {}
+        if existing and len(new_dates):
+            print(f"增量计算 {len(existing)} 个因子, 新增 {len(new_dates)} 个交易日")
+            self.factor_data.update(incremental.incremental_tail(data, existing, lookbacks, len(new_dates)))
+        if backfill:
+            print(f"回填 {len(backfill)} 个新增因子: {backfill}")
+            self.factor_data.update(incremental.compute_factors(data, backfill))
+
+        rows = incremental.factor_rows_by_symbol(self.factor_data)
+        if backfill:
+            # 同一 (股票, 日期) 只保留最后写入的一行，回填的行需带上已保存的其他因子
+            saved = storage.load_batch(list(rows), FACTOR_DATA_TYPE)
+            rows = {symbol: df.combine_first(saved[symbol]) if symbol in saved else df
+                    for symbol, df in rows.items()}
+        storage.save_batch(rows, FACTOR_DATA_TYPE)
+        return self.factor_data
+
+    def check_incremental_consistency(self, symbols: List[str], end_date: str,
+                                      factor_names: Optional[List[str]] = None,
+                                      new_days: int = 5,
+                                      sample_size: int = 50,
+                                      lookbacks: Optional[Dict[str, Optional[int]]] = None,
+                                      safety_margin: int = 5,
+                                      seed: int = 0,
+                                      start_date: Optional[str] = None) -> Dict:
+        """
+        一致性检查：在抽样股票上比较最后 new_days 个交易日的增量结果与全量重算结果
+
+        全量结果从 start_date 起计算；未提供时使用 REFERENCE_HISTORY_DAYS 与
+        十倍最大回看窗口中的较大者，远长于增量计算使用的数据。
+
+        Args:
+            symbols: 股票池
+            end_date: 截止日期
+            factor_names: 因子名称列表，默认全部Alpha101因子
+            new_days: 比较的交易日数
+            sample_size: 抽样股票数（截面因子在抽样股票池内计算）
+            lookbacks: 预先估计的回看窗口
+            safety_margin: 估计回看窗口时的安全余量
+            seed: 抽样随机种子
+            start_date: 全量重算的起始日期（如面板起始日期）
+
+        Returns:
+            {'ok': 是否全部一致, 'symbols': 抽样股票, 'factors': {因子: 误差统计}}
+        """
+        factor_names = factor_names or self.get_factor_names()
+        lookbacks = lookbacks or self.estimate_lookbacks(factor_names, safety_margin)
+
+        rng = np.random.default_rng(seed)
+        sample = sorted(rng.choice(symbols, size=min(sample_size, len(symbols)), replace=False).tolist())
+
+        if start_date is None:
+            bounded = [lookbacks[name] for name in factor_names if lookbacks.get(name) is not None]
+            history = max(incremental.REFERENCE_HISTORY_DAYS, 10 * (max(bounded, default=0) + new_days))
+            start_date = self._history_start(pd.Timestamp(end_date), history)
+        data = self.load_data(sample, start_date, end_date)
+
+        report, ok = incremental.check_consistency(data, factor_names, lookbacks, new_days)
+        failed = [name for name, result in report.items() if not result['ok']]
+        if failed:
+            print(f"[WARN] 增量结果与全量重算不一致的因子: {failed}")
+        else:
+            print(f"增量结果与全量重算一致（{len(report)} 个因子, {len(sample)} 只股票）")
+        return {'ok': ok, 'symbols': sample, 'factors': report}
+
     def get_factor_names(self) -> List[str]:
         """
         获取所有可用的因子名称
@@ -0,0 +1,222 @@
+"""
+因子表达式共享计算图
+
+批量计算 Alpha101/Alpha191 全部因子时，大量中间结果（如 sma(volume, 20)、
+rank(open)、correlation(open, volume, 10)、delta(close, 1)）会在不同因子中
+被重复计算。本模块在算子调用层面构建表达式图：
+
+- 每次算子调用的表达式键 = (算子名, 各参数的键)，参数为基础字段（open/close/...）
+  或已登记的算子结果时使用其表达式键，标量/小数组按取值作为键；
+  相同子表达式只计算一次（hash-consing）
+- 参数中含有未登记的中间结果（如 close - open 这类算术结果）时，直接调用算子，不参与共享
+- 计算前先在少量数据上试算一遍，记录每个表达式最后被哪个因子使用；
+  正式计算时按因子顺序执行，某个因子算完后释放不再被引用的中间结果
+
+共享模式下算子返回的是缓存对象，因子代码不得原地修改算子的返回值
+（现有因子只原地修改 copy() 或算术运算得到的新对象）。
+
+用法：
+    results, errors, cache = evaluate_shared(
+        names, lambda name: compute(name, fields), fields,
+        probe=(lambda name: compute(name, small_fields), small_fields),
+    )
+"""
+import contextlib
+import contextvars
+import functools
+import inspect
+import io
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_ACTIVE_CACHE: contextvars.ContextVar = contextvars.ContextVar('factor_expression_cache', default=None)
+
+# 小数组（如 regbeta 的自变量序列）按内容作为键的长度上限
+_MAX_ARRAY_KEY = 1024
+
+
+def shared_operator(func: Callable) -> Callable:
+    """算子装饰器：存在活动的共享缓存时按表达式键复用结果，否则直接调用"""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _ACTIVE_CACHE.get()
+        if cache is None:
+            return func(*args, **kwargs)
+        return cache.call(func, signature, args, kwargs)
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def operator_handler(handler):
+    """在当前上下文中由 handler.call(func, signature, args, kwargs) 接管全部共享算子调用
+
+    共享缓存之外的调用记录（如 incremental 中的回看窗口追踪）也通过该入口挂接。
+    """
+    token = _ACTIVE_CACHE.set(handler)
+    try:
+        yield handler
+    finally:
+        _ACTIVE_CACHE.reset(token)
+
+
+class SharedExpressionCache:
+    """共享子表达式缓存
+
+    Attributes:
+        hits: 命中次数（省去的重复计算）
+        misses: 实际计算次数
+    """
+
+    def __init__(self, plan: Optional[Dict[Hashable, int]] = None):
+        self.plan = plan or {}        # 表达式键 → 最后使用它的因子序号
+        self.current = 0              # 当前正在计算的因子序号
+        self.hits = 0
+        self.misses = 0
+        self._values: Dict[Hashable, Any] = {}
+        self._release_at: Dict[Hashable, int] = {}
+        self._objects: Dict[int, Tuple[Hashable, Any]] = {}  # id(对象) → (键, 对象)
+        self._trace: Optional[Dict[Hashable, int]] = None
+
+    # ───── 基础字段与上下文 ─────
+
+    def register(self, name: str, value: Any):
+        """登记基础字段（整个计算期间保留）"""
+        self._objects[id(value)] = (('field', name), value)
+
+    @contextlib.contextmanager
+    def activate(self):
+        """在当前上下文中启用共享（线程/协程间互不影响）"""
+        with operator_handler(self):
+            yield self
+
+    @contextlib.contextmanager
+    def tracing(self):
+        """试算模式：记录每个表达式最后被使用的因子序号，结束后作为释放计划"""
+        self._trace = {}
+        try:
+            yield self
+        finally:
+            self.plan = self._trace
+            self._trace = None
+
+    # ───── 计算与释放 ─────
+
+    def call(self, func: Callable, signature: inspect.Signature, args: tuple, kwargs: dict) -> Any:
+        key = self._expression_key(func, signature, args, kwargs)
+        if key is None:
+            return func(*args, **kwargs)
+
+        if self._trace is not None:
+            self._trace[key] = self.current
+        self._release_at[key] = max(self._release_at.get(key, self.current), self.current)
+
+        if key in self._values:
+            self.hits += 1
+            return self._values[key]
+
+        self.misses += 1
+        result = func(*args, **kwargs)
+        self._values[key] = result
+        self._objects[id(result)] = (key, result)
+        self._release_at[key] = max(self.plan.get(key, self.current), self.current)
+        return result
+
+    def release(self, index: int) -> int:
+        """第 index 个因子计算完成后，释放之后不再使用的中间结果，返回释放数量"""
+        expired = [key for key, last in self._release_at.items() if last <= index and key in self._values]
+        for key in expired:
+            value = self._values.pop(key)
+            self._objects.pop(id(value), None)
+            del self._release_at[key]
+        return len(expired)
+
+    def is_shared(self, value: Any) -> bool:
+        """value 是否为缓存中的算子结果"""
+        entry = self._objects.get(id(value))
+        return entry is not None and entry[1] is value and entry[0] in self._values
+
+    # ───── 表达式键 ─────
+
+    def _expression_key(self, func, signature, args, kwargs) -> Optional[Hashable]:
+        try:
+            bound = signature.bind(*args, **kwargs)
+        except TypeError:
+            return None
+        bound.apply_defaults()
+
+        parts = []
+        for name, value in bound.arguments.items():
+            value_key = self._value_key(value)
+            if value_key is None:
+                return None
+            parts.append((name, value_key))
+        return (func.__module__, func.__qualname__, tuple(parts))
+
+    def _value_key(self, value) -> Optional[Hashable]:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            entry = self._objects.get(id(value))
+            if entry is not None and entry[1] is value:
+                return entry[0]
+            return None
+        if value is None or isinstance(value, (bool, int, float, str, np.integer, np.floating)):
+            return (type(value).__name__, value)
+        if isinstance(value, np.ndarray) and value.size <= _MAX_ARRAY_KEY:
+            return ('ndarray', value.dtype.str, value.shape, value.tobytes())
+        return None
+
+
+def evaluate_shared(names: List[str],
+                    evaluate: Callable[[str], Any],
+                    fields: Dict[str, Any],
+                    probe: Optional[Tuple[Callable[[str], Any], Dict[str, Any]]] = None
+                    ) -> Tuple[Dict[str, Any], Dict[str, Exception], SharedExpressionCache]:
+    """按顺序计算一组因子，共享相同的子表达式
+
+    Args:
+        names: 因子名称（决定计算和释放顺序）
+        evaluate: 计算单个因子的函数，内部使用 fields 中的对象调用算子
+        fields: 基础字段 {名称: 对象}，必须是 evaluate 实际使用的同一批对象
+        probe: (试算函数, 试算字段)，在少量数据上跑一遍以确定中间结果的释放时机；
+               不提供时每个中间结果在产生它的因子算完后即释放（仅因子内部共享）
+
+    Returns:
+        (结果, 出错的因子及异常, 缓存统计)
+    """
+    plan = None
+    if probe is not None:
+        probe_evaluate, probe_fields = probe
+        tracer = SharedExpressionCache()
+        for name, value in probe_fields.items():
+            tracer.register(name, value)
+        # 试算只用于记录调用结构，屏蔽因子代码中的调试输出
+        with tracer.tracing(), tracer.activate(), contextlib.redirect_stdout(io.StringIO()):
+            for index, name in enumerate(names):
+                tracer.current = index
+                try:
+                    probe_evaluate(name)
+                except Exception:
+                    pass
+        plan = tracer.plan
+
+    cache = SharedExpressionCache(plan)
+    for name, value in fields.items():
+        cache.register(name, value)
+
+    results, errors = {}, {}
+    with cache.activate():
+        for index, name in enumerate(names):
+            cache.current = index
+            try:
+                result = evaluate(name)
+                # 因子直接返回算子结果时复制一份，避免多个因子共用同一个对象
+                results[name] = result.copy() if cache.is_shared(result) else result
+            except Exception as e:
+                errors[name] = e
+            finally:
+                cache.release(index)
+    return results, errors, cache
@@ -0,0 +1,263 @@
+"""
+因子增量计算
+
+每日更新时无需用全部历史重算因子：每个因子的取值只依赖最近若干个交易日的数据
+（回看窗口）。只要加载 max_lookback + new_days 个交易日，计算后取最后 new_days 行
+追加到已保存的因子面板即可。
+
+回看窗口的确定：
+- 追踪：在算子调用层（expression_graph.operator_handler）记录每次调用的窗口参数，
+  结果的回看 = 各输入回看的最大值 + 本算子窗口（rolling 类为 window-1，
+  delta/delay 为 period，sma_ema 取权重衰减到 SMA_EMA_TOLERANCE 以下所需的长度）。
+  算术运算得到的中间结果无法追踪，按该因子此前出现过的最大回看处理
+- 预热：结果开头全为 NaN 的行数作为下限，覆盖因子代码直接调用 pandas 滚动/平移的情况；
+  预热期占满试算数据的因子视为依赖全部历史（回看为 None，每次用全部数据计算）
+- 一致性检查：在抽样股票上比较增量结果与用长得多的历史全量重算的结果（consistency_report）
+
+截面算子（rank/scale 等）依赖同一交易日的全部股票，增量计算必须使用与全量计算相同的股票池。
+"""
+import contextlib
+import io
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.factor_engine.alpha101 import Alpha101Factors
+from src.factor_engine.expression_graph import operator_handler
+
+# 平移类算子：需要 period 行历史（rolling 类算子需要 window-1 行）
+SHIFT_OPERATORS = {'delta', 'delay'}
+# sma_ema 递归加权：早于该权重的历史视为已不影响结果
+SMA_EMA_TOLERANCE = 1e-8
+
+# 基础字段自身的回看（returns 由 close 的 pct_change 得到）
+FIELD_LOOKBACKS = {'returns': 1}
+
+# 估计回看窗口使用的合成数据规模
+PROBE_ROWS = 300
+PROBE_SYMBOLS = 20
+
+# 一致性检查的容差。截面排名会放大滚动计算在不同起点下的舍入误差
+# （取值几乎相同的股票名次互换），允许不超过 MISMATCH_TOLERANCE 的单元格超出 RTOL/ATOL
+RTOL = 1e-6
+ATOL = 1e-6
+MISMATCH_TOLERANCE = 0.01
+# 一致性检查中全量重算使用的最少交易日数（约三年），远长于常见因子的回看窗口
+REFERENCE_HISTORY_DAYS = 750
+
+
+def operator_lookback(name: str, arguments: Dict) -> int:
+    """单次算子调用需要的历史行数（不含输入自身的回看）"""
+    if name == 'sma_ema':
+        n, m = arguments.get('n'), arguments.get('m')
+        if not n or not m or m >= n:
+            return 0
+        return int(math.ceil(math.log(SMA_EMA_TOLERANCE) / math.log(1 - m / n)))
+    if name == 'regbeta':
+        x = arguments.get('x')
+        return max(len(x) - 1, 0) if x is not None else 0
+    if name == 'returns':
+        return 1
+
+    lookback = 0
+    for arg in ('window', 'period'):
+        value = arguments.get(arg)
+        if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+            lookback = max(lookback, int(value) if name in SHIFT_OPERATORS else int(value) - 1)
+    return max(lookback, 0)
+
+
+class LookbackTracer:
+    """算子调用追踪器：按调用链累计每个中间结果的回看窗口"""
+
+    def __init__(self, fields: Dict[str, object]):
+        self._fields = {id(value): FIELD_LOOKBACKS.get(name, 0) for name, value in fields.items()}
+        self._objects = list(fields.values())  # 持有引用，避免 id 被复用
+        self._lookbacks: Dict[int, int] = dict(self._fields)
+        self.max_lookback = max(self._fields.values(), default=0)
+
+    def reset(self):
+        """开始追踪新的因子"""
+        self._lookbacks = dict(self._fields)
+        self._objects = self._objects[:len(self._fields)]
+        self.max_lookback = max(self._fields.values(), default=0)
+
+    def lookback_of(self, value) -> int:
+        return self._lookbacks.get(id(value), self.max_lookback)
+
+    def call(self, func: Callable, signature, args: tuple, kwargs: dict):
+        try:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+        except TypeError:
+            return func(*args, **kwargs)
+
+        upstream = 0
+        for value in bound.arguments.values():
+            if isinstance(value, (pd.DataFrame, pd.Series)):
+                upstream = max(upstream, self.lookback_of(value))
+        lookback = upstream + operator_lookback(func.__name__, bound.arguments)
+
+        result = func(*args, **kwargs)
+        self._lookbacks[id(result)] = lookback
+        self._objects.append(result)
+        self.max_lookback = max(self.max_lookback, lookback)
+        return result
+
+
+def synthetic_panel(n_rows: int, n_symbols: int = PROBE_SYMBOLS, seed: int = 0) -> pd.DataFrame:
+    """随机游走行情，索引为[date, symbol]，用于追踪回看窗口"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2000-01-03', periods=n_rows)
+    symbols = [f'{600000 + i:06d}.SH' for i in range(n_symbols)]
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_rows, n_symbols)), axis=0))
+    open_ = close * np.exp(rng.normal(0, 0.01, close.shape))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, close.shape))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, close.shape))
+    volume = rng.uniform(1e5, 1e6, close.shape).round()
+
+    index = pd.MultiIndex.from_product([dates, symbols], names=['date', 'symbol'])
+    return pd.DataFrame({
+        'open': open_.ravel(), 'high': high.ravel(), 'low': low.ravel(),
+        'close': close.ravel(), 'volume': volume.ravel(),
+    }, index=index)
+
+
+def tail_rows(data: pd.DataFrame, n_rows: int) -> pd.DataFrame:
+    """取[date, symbol]数据中最后 n_rows 个交易日"""
+    dates = data.index.get_level_values('date').unique().sort_values()
+    if len(dates) <= n_rows:
+        return data
+    return data[data.index.get_level_values('date') >= dates[-n_rows]]
+
+
+def compute_factors(data: pd.DataFrame, factor_names: List[str]) -> Dict[str, pd.DataFrame]:
+    """计算因子（日期 × 股票），屏蔽因子代码中的调试输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        calculator = Alpha101Factors(data)
+        return {name: calculator.calculate_single_factor(name) for name in factor_names}
+
+
+def compare_panels(left: pd.DataFrame, right: pd.DataFrame) -> Dict[str, float]:
+    """比较两个因子面板（共同日期/股票）
+
+    Returns:
+        {'max_abs_diff': 最大绝对误差, 'mismatch_ratio': 超出容差（含 NaN 位置不一致）的单元格占比}
+    """
+    left, right = left.align(right, join='inner')
+    a = left.to_numpy(dtype=float)
+    b = right.to_numpy(dtype=float)
+    if a.size == 0:
+        return {'max_abs_diff': 0.0, 'mismatch_ratio': 0.0}
+    close = np.isclose(a, b, rtol=RTOL, atol=ATOL, equal_nan=True)
+    both = ~np.isnan(a) & ~np.isnan(b)
+    return {
+        'max_abs_diff': float(np.max(np.abs(a[both] - b[both]))) if both.any() else 0.0,
+        'mismatch_ratio': float(1 - close.mean()),
+    }
+
+
+def trace_lookback(factor_name: str, data: pd.DataFrame) -> Optional[int]:
+    """在 data 上追踪一次因子计算，返回所需的历史行数；计算出错时返回 None
+
+    取算子窗口累计值与结果开头全为 NaN 的行数（预热期）中的较大者，
+    后者覆盖因子代码中直接使用 pandas 滚动/平移的情况。
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        calculator = Alpha101Factors(data)
+        tracer = LookbackTracer({name: getattr(calculator, name) for name in Alpha101Factors.FIELDS})
+        try:
+            with operator_handler(tracer):
+                result = getattr(calculator, factor_name)()
+        except Exception:
+            return None
+
+    lookback = tracer.lookback_of(result)
+    if isinstance(result, (pd.DataFrame, pd.Series)) and len(result):
+        valid = result.notna().to_numpy().reshape(len(result), -1).any(axis=1)
+        if not valid.any():
+            # 预热期占满试算数据时无法判断回看长度，视为依赖全部历史
+            return None
+        lookback = max(lookback, int(valid.argmax()))
+    return lookback
+
+
+def estimate_lookbacks(factor_names: List[str], safety_margin: int = 5) -> Dict[str, Optional[int]]:
+    """估计各因子的回看窗口（交易日数，含安全余量）
+
+    Returns:
+        {因子名: 回看窗口}，依赖全部历史或无法计算的因子为 None
+    """
+    probe = synthetic_panel(PROBE_ROWS)
+    lookbacks = {}
+    for name in factor_names:
+        lookback = trace_lookback(name, probe)
+        lookbacks[name] = None if lookback is None else lookback + safety_margin
+    return lookbacks
+
+
+def incremental_tail(data: pd.DataFrame, factor_names: List[str],
+                     lookbacks: Dict[str, Optional[int]], new_days: int) -> Dict[str, pd.DataFrame]:
+    """只用最后 max_lookback + new_days 个交易日计算，返回各因子最后 new_days 行
+
+    回看窗口为 None 的因子使用 data 的全部数据计算。
+    """
+    bounded = [name for name in factor_names if lookbacks.get(name) is not None]
+    unbounded = [name for name in factor_names if lookbacks.get(name) is None]
+
+    factors = {}
+    if bounded:
+        window_rows = max(lookbacks[name] for name in bounded) + new_days
+        factors.update(compute_factors(tail_rows(data, window_rows), bounded))
+    if unbounded:
+        factors.update(compute_factors(data, unbounded))
+    return {name: factors[name].iloc[-new_days:] for name in factor_names}
+
+
+def factor_rows_by_symbol(factors: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """{因子: 日期×股票} 转为 {股票: 日期×因子}，用于按标的保存因子面板"""
+    if not factors:
+        return {}
+    panel = pd.concat(factors, axis=1, names=['factor', 'symbol'])
+    return {str(symbol): panel.xs(symbol, axis=1, level='symbol')
+            for symbol in panel.columns.get_level_values('symbol').unique()}
+
+
+def consistency_report(incremental: Dict[str, pd.DataFrame],
+                       full: Dict[str, pd.DataFrame],
+                       tolerance: float = MISMATCH_TOLERANCE) -> Tuple[Dict[str, Dict[str, float]], bool]:
+    """逐因子比较增量结果与全量结果
+
+    Args:
+        incremental: 增量计算结果
+        full: 全量计算结果
+        tolerance: 超出 RTOL/ATOL 的单元格占比上限（绝对值）
+
+    Returns:
+        ({因子: {'max_abs_diff', 'mismatch_ratio', 'ok'}}, 是否全部一致)
+    """
+    report = {}
+    for name, value in incremental.items():
+        reference = full.get(name)
+        if reference is None:
+            report[name] = {'max_abs_diff': float('inf'), 'mismatch_ratio': 1.0, 'ok': False}
+            continue
+        result = compare_panels(value, reference)
+        result['ok'] = result['mismatch_ratio'] <= tolerance
+        report[name] = result
+    return report, all(result['ok'] for result in report.values())
+
+
+def check_consistency(data: pd.DataFrame, factor_names: List[str],
+                      lookbacks: Dict[str, Optional[int]], new_days: int,
+                      tolerance: float = MISMATCH_TOLERANCE) -> Tuple[Dict[str, Dict[str, float]], bool]:
+    """在 data 上比较最后 new_days 行的增量结果与全量重算结果
+
+    全量结果用 data 的全部数据计算，data 应远长于最大回看窗口（见 REFERENCE_HISTORY_DAYS），
+    回看窗口估计不足时增量结果才会与之出现差异。
+    """
+    incremental = incremental_tail(data, factor_names, lookbacks, new_days)
+    full = {name: value.iloc[-new_days:] for name, value in compute_factors(data, factor_names).items()}
+    return consistency_report(incremental, full, tolerance)
@@ -7,7 +7,20 @@ import numpy as np
 from typing import Union
 from scipy.stats import rankdata
 
+from . import rolling_kernels
+from .expression_graph import shared_operator
 
+
+def _apply_kernel(df: Union[pd.DataFrame, pd.Series], kernel, *args) -> Union[pd.DataFrame, pd.Series]:
+    """在整块二维数组上运行滚动内核，保持原索引和列"""
+    values = df.to_numpy(dtype=np.float64)
+    if values.ndim == 1:
+        result = kernel(values.reshape(-1, 1), *args).ravel()
+        return pd.Series(result, index=df.index, name=df.name)
+    return pd.DataFrame(kernel(values, *args), index=df.index, columns=df.columns)
+
+
+@shared_operator
 def ts_sum(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列求和
@@ -22,6 +35,7 @@ def ts_sum(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     return df.rolling(window=window).sum()
 
 
+@shared_operator
 def sma(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     简单移动平均
@@ -36,6 +50,7 @@ def sma(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     return df.rolling(window=window).mean()
 
 
+@shared_operator
 def stddev(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     标准差
@@ -50,6 +65,7 @@ def stddev(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     return df.rolling(window=window).std()
 
 
+@shared_operator
 def correlation(x: pd.DataFrame, y: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     相关系数
@@ -65,6 +81,7 @@ def correlation(x: pd.DataFrame, y: pd.DataFrame, window: int = 10) -> pd.DataFr
     return x.rolling(window=window).corr(y).fillna(0).replace([np.inf, -np.inf], 0)
 
 
+@shared_operator
 def covariance(x: pd.DataFrame, y: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     协方差
@@ -93,6 +110,7 @@ def rolling_rank(na: np.ndarray) -> float:
     return rankdata(na, method='min')[-1]
 
 
+@shared_operator
 def ts_rank(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列排名
@@ -104,9 +122,10 @@ def ts_rank(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     Returns:
         pd.DataFrame: 时间序列排名结果
     """
-    return df.rolling(window).apply(rolling_rank, raw=True)
+    return _apply_kernel(df, rolling_kernels.rolling_rank_last, window, 'min')
 
 
+@shared_operator
 def ts_min(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列最小值
@@ -121,6 +140,7 @@ def ts_min(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     return df.rolling(window).min()
 
 
+@shared_operator
 def ts_max(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列最大值
@@ -135,6 +155,7 @@ def ts_max(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     return df.rolling(window).max()
 
 
+@shared_operator
 def delta(df: pd.DataFrame, period: int = 1) -> pd.DataFrame:
     """
     差分
@@ -149,6 +170,7 @@ def delta(df: pd.DataFrame, period: int = 1) -> pd.DataFrame:
     return df.diff(periods=period)
 
 
+@shared_operator
 def delay(df: pd.DataFrame, period: int = 1) -> pd.DataFrame:
     """
     延迟（滞后）
@@ -163,6 +185,7 @@ def delay(df: pd.DataFrame, period: int = 1) -> pd.DataFrame:
     return df.shift(periods=period)
 
 
+@shared_operator
 def rank(df: pd.DataFrame) -> pd.DataFrame:
     """
     横截面排名（按行排名）
@@ -182,6 +205,7 @@ def rank(df: pd.DataFrame) -> pd.DataFrame:
         return df.rank(axis=1, pct=True, method='min')
 
 
+@shared_operator
 def scale(df: pd.DataFrame, k: float = 1) -> pd.DataFrame:
     """
     缩放（使绝对值之和等于k）
@@ -196,6 +220,7 @@ def scale(df: pd.DataFrame, k: float = 1) -> pd.DataFrame:
     return df.mul(k).div(np.abs(df).sum(axis=1), axis=0)
 
 
+@shared_operator
 def ts_argmax(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列最大值位置
@@ -207,9 +232,10 @@ def ts_argmax(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     Returns:
         pd.DataFrame: 最大值位置结果
     """
-    return df.rolling(window).apply(np.argmax, raw=True) + 1
+    return _apply_kernel(df, rolling_kernels.rolling_argmax, window) + 1
 
 
+@shared_operator
 def ts_argmin(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列最小值位置
@@ -221,9 +247,10 @@ def ts_argmin(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     Returns:
         pd.DataFrame: 最小值位置结果
     """
-    return df.rolling(window).apply(np.argmin, raw=True) + 1
+    return _apply_kernel(df, rolling_kernels.rolling_argmin, window) + 1
 
 
+@shared_operator
 def decay_linear(df: pd.DataFrame, period: int = 10) -> pd.DataFrame:
     """
     线性衰减加权移动平均
@@ -237,15 +264,10 @@ def decay_linear(df: pd.DataFrame, period: int = 10) -> pd.DataFrame:
     """
     weights = np.arange(1, period + 1)
     weights = weights / weights.sum()
-    
-    def linear_decay(x):
-        if len(x) < period:
-            return np.nan
-        return np.sum(weights * x[-period:])
-    
-    return df.rolling(window=period).apply(linear_decay, raw=True)
+    return _apply_kernel(df, rolling_kernels.rolling_weighted_sum, weights)
 
 
+@shared_operator
 def signedpower(df: pd.DataFrame, power: float) -> pd.DataFrame:
     """
     符号幂函数
@@ -260,6 +282,7 @@ def signedpower(df: pd.DataFrame, power: float) -> pd.DataFrame:
     return np.power(np.abs(df), power) * np.sign(df)
 
 
+@shared_operator
 def product(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列乘积
@@ -274,6 +297,7 @@ def product(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     return df.rolling(window=window).apply(np.prod, raw=True)
 
 
+@shared_operator
 def returns(df: pd.DataFrame) -> pd.DataFrame:
     """
     计算收益率
@@ -305,6 +329,7 @@ def sector_industry_exposure(df: pd.DataFrame, classification: str = 'sw_l1') ->
 
 # ==================== Alpha191 新增算子 ====================
 
+@shared_operator
 def ts_lowday(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列窗口内最小值的位置（从1开始计数）
@@ -316,15 +341,11 @@ def ts_lowday(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     Returns:
         pd.DataFrame: 最小值位置结果
     """
-    def find_lowday(x):
-        if len(x) < window or np.all(np.isnan(x)):
-            return np.nan
-        # 返回最小值的位置，从末尾开始计数
-        return len(x) - np.argmin(x[-window:])
-
-    return df.rolling(window=window).apply(find_lowday, raw=True)
+    # 返回最小值的位置，从末尾开始计数
+    return window - _apply_kernel(df, rolling_kernels.rolling_argmin, window)
 
 
+@shared_operator
 def ts_highday(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列窗口内最大值的位置（从1开始计数）
@@ -336,15 +357,11 @@ def ts_highday(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     Returns:
         pd.DataFrame: 最大值位置结果
     """
-    def find_highday(x):
-        if len(x) < window or np.all(np.isnan(x)):
-            return np.nan
-        # 返回最大值的位置，从末尾开始计数
-        return len(x) - np.argmax(x[-window:])
-
-    return df.rolling(window=window).apply(find_highday, raw=True)
+    # 返回最大值的位置，从末尾开始计数
+    return window - _apply_kernel(df, rolling_kernels.rolling_argmax, window)
 
 
+@shared_operator
 def wma(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     加权移动平均（指数衰减权重）
@@ -360,15 +377,10 @@ def wma(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     weights = np.array(range(window-1, -1, -1))
     weights = np.power(0.9, weights)
     sum_weights = np.sum(weights)
-
-    def weighted_mean(x):
-        if len(x) < window:
-            return np.nan
-        return np.sum(weights * x[-window:]) / sum_weights
-
-    return df.rolling(window=window).apply(weighted_mean, raw=True)
+    return _apply_kernel(df, rolling_kernels.rolling_weighted_sum, weights) / sum_weights
 
 
+@shared_operator
 def count(cond: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列窗口内满足条件的计数
@@ -383,6 +395,7 @@ def count(cond: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     return cond.rolling(window=window).sum()
 
 
+@shared_operator
 def sumif(df: pd.DataFrame, window: int = 10, cond: pd.DataFrame = None) -> pd.DataFrame:
     """
     时间序列窗口内条件求和
@@ -403,6 +416,7 @@ def sumif(df: pd.DataFrame, window: int = 10, cond: pd.DataFrame = None) -> pd.D
     return masked.rolling(window=window).sum()
 
 
+@shared_operator
 def abs_func(df: pd.DataFrame) -> pd.DataFrame:
     """
     绝对值
@@ -416,6 +430,7 @@ def abs_func(df: pd.DataFrame) -> pd.DataFrame:
     return np.abs(df)
 
 
+@shared_operator
 def sign_func(df: pd.DataFrame) -> pd.DataFrame:
     """
     符号函数
@@ -429,6 +444,7 @@ def sign_func(df: pd.DataFrame) -> pd.DataFrame:
     return np.sign(df)
 
 
+@shared_operator
 def log_func(df: pd.DataFrame) -> pd.DataFrame:
     """
     自然对数
@@ -442,6 +458,7 @@ def log_func(df: pd.DataFrame) -> pd.DataFrame:
     return np.log(df.replace(0, np.nan).fillna(1e-10))
 
 
+@shared_operator
 def minimum(df1: pd.DataFrame, df2: pd.DataFrame) -> pd.DataFrame:
     """
     两个DataFrame的最小值
@@ -456,6 +473,7 @@ def minimum(df1: pd.DataFrame, df2: pd.DataFrame) -> pd.DataFrame:
     return df1.minimum(df2)
 
 
+@shared_operator
 def maximum(df1: pd.DataFrame, df2: pd.DataFrame) -> pd.DataFrame:
     """
     两个DataFrame的最大值
@@ -483,6 +501,7 @@ def sequence(n: int) -> np.ndarray:
     return np.arange(1, n + 1)
 
 
+@shared_operator
 def regbeta(df: pd.DataFrame, x: np.ndarray) -> pd.DataFrame:
     """
     线性回归系数（y ~ x的斜率）
@@ -515,6 +534,7 @@ def regbeta(df: pd.DataFrame, x: np.ndarray) -> pd.DataFrame:
     return df.rolling(window=window).apply(calc_beta, raw=True)
 
 
+@shared_operator
 def sma_ema(df: pd.DataFrame, n: int, m: int) -> pd.DataFrame:
     """
     SMA的指数加权版本（类似于EMA）
@@ -532,6 +552,7 @@ def sma_ema(df: pd.DataFrame, n: int, m: int) -> pd.DataFrame:
     return df.ewm(alpha=alpha, adjust=False).mean()
 
 
+@shared_operator
 def ts_prod(df: pd.DataFrame, window: int = 10) -> pd.DataFrame:
     """
     时间序列乘积
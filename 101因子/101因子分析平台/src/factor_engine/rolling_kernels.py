@@ -0,0 +1,186 @@
+"""
+滚动窗口计算内核
+
+为 ts_rank / ts_argmax / ts_argmin / decay_linear / wma / ts_lowday / ts_highday
+等算子提供整块二维数组上的滑动窗口实现，替代逐列 rolling().apply(回调)。
+
+约定：
+- 输入为二维 float64 数组，axis=0 为时间，axis=1 为股票
+- 与 rolling(window).apply 一致：窗口未满或窗口内含 NaN/inf 时结果为 NaN
+  （pandas 滚动计算会把 inf 视为缺失值）
+- 结果与原回调实现逐位一致：排名/位置为整数计数；加权和先逐元素相乘，
+  再沿连续的最后一维用 np.sum 求和，与回调中 np.sum(weights * x) 的累加顺序相同
+
+安装 numba 时，排名与最大/最小值位置使用编译后的逐列循环
+（最大/最小值位置使用单调队列，O(T)）；否则使用 NumPy 滑动视图分块计算。
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# NumPy 分块计算时每块展开的窗口元素上限（约 32MB float64）
+CHUNK_ELEMENTS = 1 << 22
+
+
+def valid_windows(values: np.ndarray, window: int) -> np.ndarray:
+    """各窗口是否完整且只含有限值，形状与 values 相同"""
+    n_rows = values.shape[0]
+    valid = np.zeros(values.shape, dtype=bool)
+    if window <= 0 or n_rows < window:
+        return valid
+    nan_count = np.zeros((n_rows + 1,) + values.shape[1:], dtype=np.int64)
+    np.cumsum(~np.isfinite(values), axis=0, out=nan_count[1:])
+    valid[window - 1:] = (nan_count[window:] - nan_count[:-window]) == 0
+    return valid
+
+
+def _iter_windows(values: np.ndarray, window: int):
+    """按时间分块产出 (起始行, 窗口视图)，窗口视图形状为 (块行数, 列数, window)"""
+    windows = sliding_window_view(values, window, axis=0)
+    step = max(1, CHUNK_ELEMENTS // max(1, values.shape[1] * window))
+    for start in range(0, windows.shape[0], step):
+        yield start, windows[start:start + step]
+
+
+def _finish(result: np.ndarray, values: np.ndarray, window: int) -> np.ndarray:
+    result[~valid_windows(values, window)] = np.nan
+    return result
+
+
+# ==================== NumPy 实现 ====================
+
+def _rank_last_numpy(values: np.ndarray, window: int, average: bool) -> np.ndarray:
+    result = np.full(values.shape, np.nan)
+    for start, block in _iter_windows(values, window):
+        last = block[..., -1:]
+        less = (block < last).sum(axis=-1)
+        if average:
+            equal = (block == last).sum(axis=-1)
+            ranks = less + (equal + 1) / 2
+        else:
+            ranks = less + 1.0
+        result[window - 1 + start:window - 1 + start + len(block)] = ranks
+    return result
+
+
+def _arg_extreme_numpy(values: np.ndarray, window: int, find_max: bool) -> np.ndarray:
+    result = np.full(values.shape, np.nan)
+    for start, block in _iter_windows(values, window):
+        positions = block.argmax(axis=-1) if find_max else block.argmin(axis=-1)
+        result[window - 1 + start:window - 1 + start + len(block)] = positions
+    return result
+
+
+# ==================== numba 实现 ====================
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _rank_last_numba(values, window, average):
+        n_rows, n_cols = values.shape
+        result = np.full((n_rows, n_cols), np.nan)
+        for j in range(n_cols):
+            for t in range(window - 1, n_rows):
+                last = values[t, j]
+                less = 0
+                equal = 0
+                for k in range(t - window + 1, t + 1):
+                    v = values[k, j]
+                    if v < last:
+                        less += 1
+                    elif v == last:
+                        equal += 1
+                if average:
+                    result[t, j] = less + (equal + 1) / 2
+                else:
+                    result[t, j] = less + 1.0
+        return result
+
+    @njit(cache=True)
+    def _arg_extreme_numba(values, window, find_max):
+        # 单调队列：队首为窗口内最早出现的最大（最小）值下标
+        n_rows, n_cols = values.shape
+        result = np.full((n_rows, n_cols), np.nan)
+        queue = np.empty(n_rows, dtype=np.int64)
+        for j in range(n_cols):
+            head = 0
+            tail = 0
+            for t in range(n_rows):
+                v = values[t, j]
+                if not np.isfinite(v):
+                    # NaN/inf：含它的窗口都无效，清空队列
+                    head = 0
+                    tail = 0
+                    continue
+                if find_max:
+                    while tail > head and values[queue[tail - 1], j] < v:
+                        tail -= 1
+                else:
+                    while tail > head and values[queue[tail - 1], j] > v:
+                        tail -= 1
+                queue[tail] = t
+                tail += 1
+                if queue[head] <= t - window:
+                    head += 1
+                if t >= window - 1:
+                    result[t, j] = queue[head] - (t - window + 1)
+        return result
+
+
+# ==================== 对外接口 ====================
+
+def rolling_rank_last(values: np.ndarray, window: int, method: str = 'min') -> np.ndarray:
+    """窗口内最后一个值的排名（从1开始）
+
+    method='min' 与 scipy.stats.rankdata(x, method='min')[-1] 一致，
+    method='average' 与 pd.Series(x).rank().iloc[-1] 一致。
+    """
+    average = method == 'average'
+    if values.shape[0] < window:
+        return np.full(values.shape, np.nan)
+    if NUMBA_AVAILABLE:
+        result = _rank_last_numba(values, window, average)
+    else:
+        result = _rank_last_numpy(values, window, average)
+    return _finish(result, values, window)
+
+
+def rolling_argmax(values: np.ndarray, window: int) -> np.ndarray:
+    """窗口内最大值的位置（从0开始，相同取值取最早出现者），与 np.argmax 一致"""
+    if values.shape[0] < window:
+        return np.full(values.shape, np.nan)
+    if NUMBA_AVAILABLE:
+        result = _arg_extreme_numba(values, window, True)
+    else:
+        result = _arg_extreme_numpy(values, window, True)
+    return _finish(result, values, window)
+
+
+def rolling_argmin(values: np.ndarray, window: int) -> np.ndarray:
+    """窗口内最小值的位置（从0开始，相同取值取最早出现者），与 np.argmin 一致"""
+    if values.shape[0] < window:
+        return np.full(values.shape, np.nan)
+    if NUMBA_AVAILABLE:
+        result = _arg_extreme_numba(values, window, False)
+    else:
+        result = _arg_extreme_numpy(values, window, False)
+    return _finish(result, values, window)
+
+
+def rolling_weighted_sum(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """窗口加权和 np.sum(weights * x)，weights[-1] 对应窗口内最新的值
+
+    使用 np.sum 沿连续内存求和以保持与逐窗口回调相同的累加顺序，
+    因此不使用卷积或编译循环。
+    """
+    window = len(weights)
+    result = np.full(values.shape, np.nan)
+    if values.shape[0] < window:
+        return result
+    for start, block in _iter_windows(values, window):
+        result[window - 1 + start:window - 1 + start + len(block)] = np.sum(block * weights, axis=-1)
+    return _finish(result, values, window)
@@ -4,8 +4,12 @@
 """
 import json
 import uuid
-from typing import Dict, List, Any, Callable, Optional
-from dataclasses import dataclass, field
+import functools
+import hashlib
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Callable, Optional, Set
+from dataclasses import dataclass, field, replace
 import pandas as pd
 import numpy as np
 import sys
@@ -15,6 +19,80 @@ import os
 project_path = os.path.join(os.path.dirname(__file__), '..', '..')
 sys.path.insert(0, project_path)
 
+# 节点结果缓存目录（data/cache 已在 .gitignore 中）
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.join(project_path, 'data', 'cache', 'workflow'))
+
+# 结果依赖外部数据源的节点：每次都重新执行，不落盘缓存；
+# 其结果指纹参与下游节点的缓存键，数据未变化时下游仍可命中缓存
+NON_CACHEABLE_TYPES = {'data_loader'}
+
+# 缓存格式版本，节点执行逻辑有不兼容改动时递增
+CACHE_VERSION = 1
+
+
+def _update_fingerprint(hasher, obj: Any):
+    """把对象内容写入哈希（DataFrame/Series 按值和索引计算，与对象身份无关）"""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        hasher.update(type(obj).__name__.encode())
+        labels = list(obj.columns) if isinstance(obj, pd.DataFrame) else [obj.name]
+        hasher.update(repr((labels, list(obj.index.names), [str(t) for t in np.atleast_1d(obj.dtypes)])).encode())
+        try:
+            hasher.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+        except TypeError:
+            # 单元格中含不可哈希对象（如 list）时退回序列化
+            hasher.update(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    elif isinstance(obj, dict):
+        hasher.update(b'dict')
+        for key in sorted(obj, key=repr):
+            hasher.update(repr(key).encode())
+            _update_fingerprint(hasher, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        hasher.update(type(obj).__name__.encode())
+        for item in obj:
+            _update_fingerprint(hasher, item)
+    elif isinstance(obj, np.ndarray) and obj.dtype != object:
+        hasher.update(repr((obj.dtype.str, obj.shape)).encode())
+        hasher.update(np.ascontiguousarray(obj).tobytes())
+    elif obj is None or isinstance(obj, (bool, int, float, str, np.generic, pd.Timestamp)):
+        hasher.update(repr(obj).encode())
+    else:
+        try:
+            hasher.update(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            hasher.update(repr(obj).encode())
+
+
+def fingerprint(obj: Any) -> str:
+    """计算节点参数或结果的内容指纹"""
+    hasher = hashlib.sha256()
+    _update_fingerprint(hasher, obj)
+    return hasher.hexdigest()
+
+
+# 节点执行时调用的包（相对 src 目录）：因子公式（alpha101/alpha191）、算子、中性化与分析代码
+# 改动后旧缓存同样需要失效
+FINGERPRINT_PACKAGES = ('factor_engine', 'analysis')
+
+
+@functools.lru_cache(maxsize=1)
+def _module_fingerprint() -> str:
+    """本模块及节点所调用包的源码指纹：执行器、因子或算子代码改动后旧缓存自动失效"""
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    files = [os.path.abspath(__file__)]
+    for package in FINGERPRINT_PACKAGES:
+        for root, dirs, names in os.walk(os.path.join(src_dir, package)):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith('.py'))
+    hasher = hashlib.sha256()
+    for path in files:
+        hasher.update(os.path.relpath(path, src_dir).replace(os.sep, '/').encode())
+        try:
+            with open(path, 'rb') as f:
+                hasher.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            hasher.update(b'\0')
+    return hasher.hexdigest()
+
 
 @dataclass
 class Node:
@@ -34,10 +112,20 @@ class WorkflowEngine:
     支持可视化节点式因子构建和策略编排
     """
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, use_cache: bool = True,
+                 max_workers: Optional[int] = None):
+        """
+        Args:
+            cache_dir: 节点结果缓存目录，默认 data/cache/workflow
+            use_cache: 是否复用/保存节点结果缓存
+            max_workers: 同一层级并行执行的最大进程数，1 表示全部在当前进程中顺序执行
+        """
         self.nodes: Dict[str, Node] = {}
         self.connections: List[Dict[str, str]] = []
         self.execution_order: List[str] = []
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.use_cache = use_cache
+        self.max_workers = max_workers
     
     def add_node(self, node_type: str, position: Dict[str, float], params: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -116,22 +204,21 @@ class WorkflowEngine:
             'risk_manager': 10
         }
 
-        # 按优先级排序节点
-        sorted_nodes = sorted(
-            self.nodes.items(),
-            key=lambda x: priority.get(x[1].node_type, 999)
-        )
-
-        # 自动连接相邻的节点
-        for i in range(len(sorted_nodes) - 1):
-            from_id, from_node = sorted_nodes[i]
-            to_id, to_node = sorted_nodes[i + 1]
+        # 按优先级分层：同一优先级的节点（如多个因子计算）互不依赖，可以并行执行
+        tiers: Dict[int, List[str]] = {}
+        for node_id, node in self.nodes.items():
+            tiers.setdefault(priority.get(node.node_type, 999), []).append(node_id)
+        sorted_tiers = [tiers[level] for level in sorted(tiers)]
 
-            # 根据节点类型推断端口
-            output_port = self._infer_output_port(from_node.node_type)
-            input_port = self._infer_input_port(to_node.node_type)
+        # 每层节点连接到下一层的全部节点
+        for upper, lower in zip(sorted_tiers, sorted_tiers[1:]):
+            for from_id in upper:
+                for to_id in lower:
+                    # 根据节点类型推断端口
+                    output_port = self._infer_output_port(self.nodes[from_id].node_type)
+                    input_port = self._infer_input_port(self.nodes[to_id].node_type)
 
-            self.connect_nodes(from_id, to_id, output_port, input_port)
+                    self.connect_nodes(from_id, to_id, output_port, input_port)
 
         print(f"[DEBUG] 自动连接了 {len(self.connections)} 个节点")
 
@@ -178,19 +265,180 @@ class WorkflowEngine:
         # 计算执行顺序
         self.execution_order = self._topological_sort()
 
+        # 每个节点只能看到其上游（祖先）节点的结果；同一层级的节点互不依赖
+        ancestors = self._collect_ancestors()
+        levels = self._group_levels()
+
         results = {}
+        fingerprints: Dict[str, str] = {}
+        cached_count = 0
+
+        for level_nodes in levels:
+            pending = []
+            for node_id in level_nodes:
+                node = self.nodes[node_id]
+                upstream_ids = [nid for nid in self.execution_order if nid in ancestors[node_id]]
+                cache_key = self._node_cache_key(node, upstream_ids, fingerprints)
+                entry = self._load_cached_result(cache_key) if cache_key else None
+                if entry is not None:
+                    results[node_id], fingerprints[node_id] = entry
+                    cached_count += 1
+                    print(f"[DEBUG] 节点 {node_id[:8]} ({node.node_type}) 命中缓存")
+                else:
+                    pending.append((node_id, upstream_ids, cache_key))
+
+            for node_id, result, error in self._execute_level(pending, results):
+                node = self.nodes[node_id]
+                if error is not None:
+                    print(f"执行节点 {node_id} ({node.node_type}) 时出错: {error}")
+                    results[node_id] = None
+                else:
+                    results[node_id] = result
+                fingerprints[node_id] = fingerprint(results[node_id])
+
+            for node_id, _, cache_key in pending:
+                if cache_key and results[node_id] is not None:
+                    self._save_cached_result(cache_key, results[node_id], fingerprints[node_id])
+
+        for node_id in self.execution_order:
+            self.nodes[node_id].data = results[node_id]
+
+        if cached_count:
+            print(f"[DEBUG] 工作流执行完成: {cached_count}/{len(self.execution_order)} 个节点复用缓存")
 
+        return {node_id: results[node_id] for node_id in self.execution_order}
+
+    def _collect_ancestors(self) -> Dict[str, Set[str]]:
+        """每个节点的全部上游节点（按连接关系传递闭包）"""
+        parents: Dict[str, Set[str]] = {node_id: set() for node_id in self.nodes}
+        for conn in self.connections:
+            parents[conn['to_node']].add(conn['from_node'])
+
+        ancestors: Dict[str, Set[str]] = {}
         for node_id in self.execution_order:
-            node = self.nodes[node_id]
+            collected = set(parents[node_id])
+            for parent_id in parents[node_id]:
+                collected |= ancestors[parent_id]
+            ancestors[node_id] = collected
+        return ancestors
+
+    def _group_levels(self) -> List[List[str]]:
+        """按依赖深度把执行顺序划分为层级，同层节点可以并行执行"""
+        parents: Dict[str, Set[str]] = {node_id: set() for node_id in self.nodes}
+        for conn in self.connections:
+            parents[conn['to_node']].add(conn['from_node'])
+
+        depth: Dict[str, int] = {}
+        levels: List[List[str]] = []
+        for node_id in self.execution_order:
+            depth[node_id] = 1 + max((depth[p] for p in parents[node_id]), default=-1)
+            if depth[node_id] == len(levels):
+                levels.append([])
+            levels[depth[node_id]].append(node_id)
+        return levels
+
+    def _execute_level(self, pending: List[tuple], results: Dict[str, Any]) -> List[tuple]:
+        """
+        执行同一层级的节点
+
+        多个节点时提交到进程池并行执行，进程池不可用（如结果无法序列化）的节点
+        退回当前进程执行。
+
+        Returns:
+            List[(节点ID, 结果, 异常)]
+        """
+        outcomes = {}
+        workers = self.max_workers or min(len(pending), os.cpu_count() or 1)
+
+        if len(pending) > 1 and workers > 1:
+            state = self._isolated_state()
+            try:
+                with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                    futures = {
+                        node_id: pool.submit(
+                            _execute_node_isolated, state, node_id,
+                            {nid: results[nid] for nid in upstream_ids}
+                        )
+                        for node_id, upstream_ids, _ in pending
+                    }
+                    for node_id, future in futures.items():
+                        try:
+                            outcomes[node_id] = future.result()
+                        except Exception as e:
+                            print(f"[DEBUG] 节点 {node_id[:8]} 并行执行失败，改为当前进程执行: {e}")
+            except Exception as e:
+                print(f"[DEBUG] 进程池不可用，改为顺序执行: {e}")
+
+        for node_id, upstream_ids, _ in pending:
+            if node_id in outcomes:
+                continue
+            upstream = {nid: results[nid] for nid in upstream_ids}
             try:
-                result = self._execute_node(node, results)
-                results[node_id] = result
-                node.data = result
+                outcomes[node_id] = (self._execute_node(self.nodes[node_id], upstream), None)
             except Exception as e:
-                print(f"执行节点 {node_id} ({node.node_type}) 时出错: {e}")
-                results[node_id] = None
+                outcomes[node_id] = (None, e)
+
+        return [(node_id, *outcomes[node_id]) for node_id, _, _ in pending]
+
+    def _isolated_state(self) -> Dict[str, Any]:
+        """子进程重建引擎所需的状态（不含节点的上次执行结果）"""
+        return {
+            'nodes': {node_id: replace(node, data=None) for node_id, node in self.nodes.items()},
+            'connections': self.connections,
+            'execution_order': self.execution_order,
+        }
 
-        return results
+    # ==================== 节点结果缓存 ====================
+
+    def _node_cache_key(self, node: Node, upstream_ids: List[str],
+                        fingerprints: Dict[str, str]) -> Optional[str]:
+        """节点缓存键 = 节点类型 + 参数 + 上游节点（类型与结果指纹，按执行顺序）"""
+        if not self.use_cache or node.node_type in NON_CACHEABLE_TYPES:
+            return None
+        upstream = [(self.nodes[nid].node_type, fingerprints[nid]) for nid in upstream_ids]
+        return fingerprint([CACHE_VERSION, _module_fingerprint(), node.node_type, node.params, upstream])
+
+    def _cache_path(self, cache_key: str) -> str:
+        return os.path.join(self.cache_dir, cache_key[:2], f"{cache_key}.pkl")
+
+    def _load_cached_result(self, cache_key: str) -> Optional[tuple]:
+        """读取缓存的 (结果, 结果指纹)，不存在或损坏时返回 None"""
+        path = self._cache_path(cache_key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            return entry['result'], entry['fingerprint']
+        except Exception as e:
+            print(f"[DEBUG] 读取节点缓存失败，将重新计算: {e}")
+            return None
+
+    def _save_cached_result(self, cache_key: str, result: Any, result_fingerprint: str):
+        """原子写入节点缓存（先写临时文件再替换）"""
+        path = self._cache_path(cache_key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'result': result, 'fingerprint': result_fingerprint}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            # 图表等无法序列化的结果不缓存
+            print(f"[DEBUG] 节点结果无法缓存: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def clear_cache(self) -> int:
+        """删除全部节点结果缓存，返回删除的文件数"""
+        import shutil
+
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        count = sum(len(files) for _, _, files in os.walk(self.cache_dir))
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        return count
 
     def _fix_data_loader_symbols(self):
         """自动修复数据加载节点的空 symbols 参数"""
@@ -1581,6 +1829,18 @@ class WorkflowEngine:
             raise
 
 
+def _execute_node_isolated(state: Dict[str, Any], node_id: str, upstream: Dict[str, Any]) -> tuple:
+    """在子进程中执行单个节点，返回 (结果, 异常)；节点自身的异常不视为进程池故障"""
+    engine = WorkflowEngine(use_cache=False, max_workers=1)
+    engine.nodes = state['nodes']
+    engine.connections = state['connections']
+    engine.execution_order = state['execution_order']
+    try:
+        return engine._execute_node(engine.nodes[node_id], upstream), None
+    except Exception as e:
+        return None, e
+
+
 # 测试代码
 if __name__ == '__main__':
     # 创建测试工作流
@@ -86,8 +86,7 @@ class FactorCombinationNode(TransformNode):
             if 'price_data' in input_data:
                 data = input_data['price_data']
                 calculator = FactorCalculator()
-                for name in factor_names:
-                    factor_data_list.append(calculator.calculate_single_factor(data, name))
+                factor_data_list = calculator.calculate_multiple_factors(data, factor_names)
         
         if not factor_data_list:
             raise ValueError("没有找到因子数据进行组合")
@@ -6,6 +6,8 @@
 - 数据管理（data_manager）
 - 路径管理（path_manager）
 - 配置管理（config）
+- 共享因子缓存（factor_cache）
+- 交易日历服务（trading_calendar）
 - Alpha分析（alpha_analysis）
 """
 
@@ -34,6 +36,12 @@ from .path_manager import (
     get_logs_path,
 )
 
+# 共享因子缓存
+from .factor_cache import FactorCache, get_factor_cache
+
+# 交易日历服务
+from .trading_calendar import TradingCalendarService, get_trading_calendar
+
 __all__ = [
     # 数据管理
     'BaseDataSource',
@@ -51,4 +59,10 @@ __all__ = [
     'get_xueqiu_config_path',
     'get_reports_path',
     'get_logs_path',
+    # 共享因子缓存
+    'FactorCache',
+    'get_factor_cache',
+    # 交易日历服务
+    'TradingCalendarService',
+    'get_trading_calendar',
 ]
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+因子相关系数矩阵的批量计算
+
+逐对对齐两个因子再求相关系数，在 101+191 个因子时需要上万次对齐。
+本模块把全部因子按日期分块堆叠成 (日期·股票) × 因子 的矩阵，每块只做一次矩阵乘法，
+累加出所有因子两两之间的统计量：
+
+- 混合相关（pooled）：把全部 (日期, 股票) 观测放在一起计算，与
+  DataFrame(各因子 stack 后的数据).corr() 一致（缺失值按因子对成对剔除）
+- 截面相关（cross_sectional）：每个交易日在股票之间计算相关系数，再对日期取平均；
+  每块日期用一次批量矩阵乘法（np.matmul）得到每天的相关系数矩阵
+
+缺失值的成对剔除通过有效值掩码完成：设 Z 为缺失值置 0 后的数据、M 为有效值掩码，
+[Z, Z², M]ᵀ · [Z, M] 一次给出成对的观测数、一阶矩、二阶矩与交叉矩。
+
+Spearman 相关先把每个因子转为秩再计算 Pearson：混合相关按因子在全部观测中排序，
+截面相关按每个交易日排序。因子缺失位置不一致时，秩在各因子自身的有效值上计算
+（pandas 按每对因子的共同有效值重新排序），结果会有细微差别。
+
+内存占用由日期分块控制，每块展开的数据量约为 CHUNK_BYTES。
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 每个日期块展开的数据量上限（约 64MB）
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def _chunk_dates(n_dates: int, n_stocks: int, n_factors: int, chunk_dates: Optional[int]) -> int:
+    if chunk_dates:
+        return max(1, int(chunk_dates))
+    # 每个 (日期, 股票) 展开 [Z, Z², M] 与 [Z, M] 共 5 个因子宽度
+    per_date = max(1, n_stocks * n_factors * 5 * 8)
+    return max(1, min(n_dates, CHUNK_BYTES // per_date))
+
+
+def _pairwise_moments(z: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """一次矩阵乘法得到成对统计量，z/mask 的最后两维为 (观测, 因子)
+
+    Returns:
+        形状 (..., 3K, 2K) 的矩阵：行块为 [Z, Z², M]，列块为 [Z, M]
+    """
+    left = np.concatenate([z, z * z, mask], axis=-1)
+    right = np.concatenate([z, mask], axis=-1)
+    return np.matmul(np.swapaxes(left, -1, -2), right)
+
+
+def _correlation_from_moments(moments: np.ndarray, n_factors: int, min_periods: int = 2) -> np.ndarray:
+    """由 _pairwise_moments 的（累加）结果计算成对 Pearson 相关系数"""
+    k = n_factors
+    sxy = moments[..., :k, :k]             # Σ x_i·x_j
+    sx = moments[..., :k, k:]              # Σ x_i（x_j 有效处）
+    sxx = moments[..., k:2 * k, k:]        # Σ x_i²（x_j 有效处）
+    n = moments[..., 2 * k:, k:]           # 共同有效观测数
+    sy = np.swapaxes(sx, -1, -2)           # Σ x_j（x_i 有效处）
+    syy = np.swapaxes(sxx, -1, -2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(n < min_periods) | (var_x <= 0) | (var_y <= 0)] = np.nan
+    # 消除舍入造成的不对称，对角线取 1（聚类时 squareform 要求严格对称）
+    corr = np.clip((corr + np.swapaxes(corr, -1, -2)) / 2, -1.0, 1.0)
+    diagonal = np.arange(k)
+    corr[..., diagonal, diagonal] = np.where(np.isnan(corr[..., diagonal, diagonal]), np.nan, 1.0)
+    return corr
+
+
+def _stack_chunk(panels: Sequence[np.ndarray], rows: slice, offsets: Optional[np.ndarray] = None):
+    """取一块日期，返回 (Z, M)，形状均为 (日期数, 股票数, 因子数)"""
+    block = np.stack([panel[rows] for panel in panels], axis=-1).astype(float, copy=False)
+    mask = np.isfinite(block)
+    if offsets is not None:
+        block = block - offsets
+    z = np.where(mask, block, 0.0)
+    return z, mask.astype(float)
+
+
+def pooled_correlation(panels: Sequence[np.ndarray], chunk_dates: Optional[int] = None,
+                       min_periods: int = 2) -> np.ndarray:
+    """全部 (日期, 股票) 观测上的成对 Pearson 相关系数矩阵
+
+    Args:
+        panels: 各因子的 日期 × 股票 数组（已对齐）
+        chunk_dates: 每块日期数，默认按 CHUNK_BYTES 估算
+        min_periods: 成对有效观测数下限
+
+    Returns:
+        K × K 相关系数矩阵
+    """
+    n_factors = len(panels)
+    n_dates, n_stocks = panels[0].shape
+    step = _chunk_dates(n_dates, n_stocks, n_factors, chunk_dates)
+
+    # 减去各因子的参考值（首个非空值所在块的均值），减小平方和相减时的精度损失
+    offsets = np.zeros(n_factors)
+    for i, panel in enumerate(panels):
+        finite = np.isfinite(panel)
+        if finite.any():
+            first = finite.any(axis=1).argmax()
+            offsets[i] = panel[first:first + step][finite[first:first + step]].mean()
+
+    moments = np.zeros((3 * n_factors, 2 * n_factors))
+    for start in range(0, n_dates, step):
+        z, mask = _stack_chunk(panels, slice(start, start + step), offsets)
+        moments += _pairwise_moments(z.reshape(-1, n_factors), mask.reshape(-1, n_factors))
+    return _correlation_from_moments(moments, n_factors, min_periods)
+
+
+def cross_sectional_correlation(panels: Sequence[np.ndarray], method: str = 'pearson',
+                                chunk_dates: Optional[int] = None,
+                                min_stocks: int = 3) -> np.ndarray:
+    """逐日截面相关系数矩阵的时间平均
+
+    Args:
+        panels: 各因子的 日期 × 股票 数组（已对齐）
+        method: 'pearson' 或 'spearman'（每日按股票排序）
+        chunk_dates: 每块日期数，默认按 CHUNK_BYTES 估算
+        min_stocks: 当天成对有效股票数下限，不足的日期不参与平均
+
+    Returns:
+        K × K 相关系数矩阵（各日期的简单平均）
+    """
+    n_factors = len(panels)
+    n_dates, n_stocks = panels[0].shape
+    step = _chunk_dates(n_dates, n_stocks, n_factors, chunk_dates)
+
+    total = np.zeros((n_factors, n_factors))
+    count = np.zeros((n_factors, n_factors))
+    for start in range(0, n_dates, step):
+        rows = slice(start, start + step)
+        if method == 'spearman':
+            chunk = [pd.DataFrame(panel[rows]).rank(axis=1).to_numpy() for panel in panels]
+            z, mask = _stack_chunk(chunk, slice(None))
+        else:
+            z, mask = _stack_chunk(panels, rows)
+            # 截面去均值，减小平方和相减时的精度损失
+            with np.errstate(invalid='ignore'):
+                means = z.sum(axis=1, keepdims=True) / np.maximum(mask.sum(axis=1, keepdims=True), 1)
+            z = (z - means) * mask
+        daily = _correlation_from_moments(_pairwise_moments(z, mask), n_factors, min_stocks)
+        valid = np.isfinite(daily)
+        total += np.where(valid, daily, 0.0).sum(axis=0)
+        count += valid.sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return total / count
+
+
+def _rank_panel(panel: np.ndarray) -> np.ndarray:
+    """在全部观测中排序（平均秩，缺失值保持缺失）"""
+    return pd.Series(panel.ravel()).rank().to_numpy().reshape(panel.shape)
+
+
+def factor_correlation_matrix(factors: Dict[str, pd.DataFrame],
+                              method: str = 'pearson',
+                              cross_sectional: bool = False,
+                              chunk_dates: Optional[int] = None) -> pd.DataFrame:
+    """因子相关系数矩阵
+
+    Args:
+        factors: {因子名: DataFrame(index=date, columns=stock)}，各因子已对齐到相同的日期和股票
+        method: 'pearson' 或 'spearman'
+        cross_sectional: True 时计算逐日截面相关的时间平均，否则计算混合相关
+        chunk_dates: 每块日期数，默认按 CHUNK_BYTES 估算
+
+    Returns:
+        以因子名为行列索引的相关系数矩阵
+    """
+    if method not in ('pearson', 'spearman'):
+        raise ValueError(f"不支持的相关系数计算方法: {method}")
+
+    names: List[str] = list(factors)
+    panels = [factors[name].to_numpy(dtype=float) for name in names]
+    if not panels or panels[0].size == 0:
+        return pd.DataFrame(np.nan, index=names, columns=names)
+
+    if cross_sectional:
+        matrix = cross_sectional_correlation(panels, method, chunk_dates)
+    else:
+        if method == 'spearman':
+            panels = [_rank_panel(panel) for panel in panels]
+        matrix = pooled_correlation(panels, chunk_dates)
+
+    return pd.DataFrame(matrix, index=names, columns=names)
@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+"""
+共享因子缓存
+
+EasyFactor（easy_xt/factor_library.py）和 101因子平台（factor_engine）各自计算因子。
+本模块提供它们共用的缓存服务，一个界面组件或回测算过的因子，其他组件/进程可以直接复用。
+
+- 缓存键 = (因子定义哈希, 股票池, 日期范围, 其他参数)；因子定义为可调用对象时按源码哈希，
+  修改实现后旧结果自然失效
+- 两级存储：
+  - 内存：按字节数 LRU 淘汰（max_memory_bytes）
+  - 磁盘：Arrow IPC 文件（未压缩），读取时内存映射，多个进程共享同一份页缓存；
+    按字节数 LRU 淘汰（max_disk_bytes，以文件修改时间作为最近使用时间，命中时刷新）。
+    写入时只累加本进程记录的文件数与总字节数（首次使用时扫描一次目录得到初值），
+    超过上限才扫描目录并淘汰到上限的 90%，避免每次写入都遍历全部文件
+- stats() 报告命中率与各级缓存占用的字节数（磁盘层为本进程记录的计数，
+  不包含其他进程在下次扫描前写入的文件）
+
+使用方法：
+    from core.factor_cache import get_factor_cache
+
+    cache = get_factor_cache()
+    value = cache.get_or_compute(calc_func, universe, start_date, end_date,
+                                 lambda: calc_func(data), params={'period': 20})
+    print(cache.stats())
+
+未安装 pyarrow 时只使用内存缓存。
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 缓存目录可通过环境变量指定，默认 <项目根目录>/data/factor_cache
+CACHE_DIR_ENV = 'EASYXT_FACTOR_CACHE_DIR'
+
+DEFAULT_MAX_MEMORY_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 4 * 1024 * 1024 * 1024
+
+# 磁盘淘汰到上限的这个比例，之后的若干次写入不需要再扫描目录
+_DISK_EVICT_TARGET = 0.9
+
+# 写入 Arrow schema 元数据，读取时还原 Series（unnamed_series 表示 name 为 None）
+_KIND_KEY = b'easyxt_factor_cache_kind'
+_SERIES_KINDS = (b'series', b'unnamed_series')
+
+_callable_hashes: Dict[Any, str] = {}
+
+
+def _callable_source(obj) -> str:
+    """可调用对象/模块的标识：模块 + 限定名 + 源码（取不到源码时用字节码）"""
+    target = getattr(obj, '__func__', obj)
+    name = f"{getattr(target, '__module__', '')}.{getattr(target, '__qualname__', getattr(target, '__name__', repr(target)))}"
+    try:
+        return name + '\n' + inspect.getsource(target)
+    except (OSError, TypeError):
+        code = getattr(target, '__code__', None)
+        return name + '\n' + (code.co_code.hex() if code is not None else '')
+
+
+def _hash_part(part) -> str:
+    if callable(part) or inspect.ismodule(part):
+        key = getattr(part, '__func__', part)
+        try:
+            cached = _callable_hashes.get(key)
+        except TypeError:
+            cached = None
+        if cached is None:
+            cached = hashlib.sha256(_callable_source(part).encode('utf-8')).hexdigest()
+            try:
+                _callable_hashes[key] = cached
+            except TypeError:
+                pass
+        return cached
+    if hasattr(part, '__dataclass_fields__'):
+        part = {name: getattr(part, name) for name in part.__dataclass_fields__}
+    return json.dumps(part, sort_keys=True, default=str, ensure_ascii=False)
+
+
+def factor_definition_hash(*parts) -> str:
+    """因子定义的哈希
+
+    parts 可以是因子名称、参数字典、配置 dataclass 或计算函数/类/模块（按源码哈希）。
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(_hash_part(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def data_fingerprint(data: Union[pd.DataFrame, pd.Series]) -> str:
+    """输入数据的内容哈希，用于区分同一日期范围内不同来源/复权方式的数据"""
+    hashed = pd.util.hash_pandas_object(data, index=True).to_numpy()
+    digest = hashlib.sha256(hashed.tobytes())
+    if isinstance(data, pd.DataFrame):
+        digest.update(json.dumps([str(c) for c in data.columns]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _normalize_date(value) -> str:
+    if value is None:
+        return ''
+    try:
+        return pd.Timestamp(value).strftime('%Y%m%d')
+    except (ValueError, TypeError):
+        return str(value)
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return 0
+
+
+class FactorCache:
+    """
+    因子缓存（线程安全；磁盘层可被多个进程共享）
+
+    Attributes:
+        root_dir: 磁盘缓存目录（None 表示只使用内存缓存）
+        max_memory_bytes: 内存缓存字节数上限
+        max_disk_bytes: 磁盘缓存字节数上限
+    """
+
+    def __init__(self, root_dir: Optional[Union[str, Path]] = None,
+                 max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        self.root_dir = Path(root_dir) if root_dir is not None and PYARROW_AVAILABLE else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()  # key -> (value, nbytes)
+        self._memory_bytes = 0
+        # 磁盘文件数与占用的字节数（首次使用时扫描目录得到初值）
+        self._disk_count: Optional[int] = None
+        self._disk_bytes: Optional[int] = None
+        self._lock = threading.RLock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.root_dir is not None:
+            self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    # ==================== 键 ====================
+
+    @staticmethod
+    def make_key(definition, universe: Union[str, Iterable[str], None],
+                 start_date=None, end_date=None, **extra) -> str:
+        """
+        缓存键
+
+        Args:
+            definition: 因子定义（名称/参数/配置/计算函数，或它们组成的元组）
+            universe: 股票池（代码列表，顺序无关；或股票池名称）
+            start_date: 开始日期
+            end_date: 结束日期
+            **extra: 其他影响结果的参数（如复权方式、数据指纹）
+
+        Returns:
+            十六进制哈希字符串
+        """
+        parts = definition if isinstance(definition, tuple) else (definition,)
+        if universe is None or isinstance(universe, str):
+            universe_key = universe
+        else:
+            universe_key = sorted(str(code) for code in universe)
+        payload = json.dumps({
+            'definition': factor_definition_hash(*parts),
+            'universe': universe_key,
+            'start': _normalize_date(start_date),
+            'end': _normalize_date(end_date),
+            'extra': {name: _hash_part(value) for name, value in sorted(extra.items())},
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # ==================== 读写 ====================
+
+    def get(self, key: str):
+        """读取缓存，未命中时返回 None（返回副本，调用方可以修改）"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0].copy()
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value.copy()
+
+    def put(self, key: str, value: Union[pd.DataFrame, pd.Series]) -> None:
+        """写入缓存（内存 + 磁盘）"""
+        if not isinstance(value, (pd.DataFrame, pd.Series)):
+            raise TypeError(f"因子缓存只支持 DataFrame/Series，收到 {type(value).__name__}")
+        value = value.copy()
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    def get_or_compute(self, definition, universe, start_date, end_date,
+                       compute: Callable[[], Union[pd.DataFrame, pd.Series]], **extra):
+        """命中时直接返回，否则调用 compute() 计算并写入缓存（结果为空时不缓存）"""
+        key = self.make_key(definition, universe, start_date, end_date, **extra)
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if isinstance(value, (pd.DataFrame, pd.Series)) and not value.empty:
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key: str) -> None:
+        """删除一个缓存项"""
+        with self._lock:
+            entry = self._memory.pop(key, None)
+            if entry is not None:
+                self._memory_bytes -= entry[1]
+        path = self._path(key)
+        if path is not None:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                # 已被其他进程删除，或文件仍被映射（Windows）
+                return
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_count = max(0, self._disk_count - 1)
+                    self._disk_bytes = max(0, self._disk_bytes - size)
+
+    def clear(self, disk: bool = True) -> None:
+        """清空缓存（disk=False 时只清空本进程的内存缓存）"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if disk and self.root_dir is not None:
+            for path in self._disk_files():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            with self._lock:
+                self._disk_count = None
+                self._disk_bytes = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存统计
+
+        Returns:
+            {'hits', 'memory_hits', 'disk_hits', 'misses', 'hit_ratio',
+             'memory_entries', 'memory_bytes', 'disk_entries', 'disk_bytes'}
+        """
+        with self._lock:
+            if self.root_dir is not None and self._disk_bytes is None:
+                self._scan_disk()
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                'hits': hits,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': hits / total if total else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': self._disk_count or 0,
+                'disk_bytes': self._disk_bytes or 0,
+            }
+
+    # ==================== 内存层 ====================
+
+    def _remember(self, key: str, value) -> None:
+        nbytes = _nbytes(value)
+        if nbytes > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        self._memory[key] = (value, nbytes)
+        self._memory_bytes += nbytes
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted
+
+    # ==================== 磁盘层 ====================
+
+    def _path(self, key: str) -> Optional[Path]:
+        if self.root_dir is None:
+            return None
+        return self.root_dir / key[:2] / f'{key}.arrow'
+
+    def _disk_files(self):
+        return list(self.root_dir.glob('*/*.arrow'))
+
+    def _read_disk(self, key: str):
+        path = self._path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            source = pa.memory_map(str(path), 'r')
+            table = ipc.open_file(source).read_all()
+            value = table.to_pandas()
+            kind = (table.schema.metadata or {}).get(_KIND_KEY)
+            if kind in _SERIES_KINDS:
+                value = value.iloc[:, 0]
+                if kind == b'unnamed_series':
+                    value.name = None
+            # 刷新修改时间，作为磁盘 LRU 的最近使用时间
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取因子缓存失败，已忽略: {path}, {e}")
+            return None
+
+    def _write_disk(self, key: str, value) -> None:
+        path = self._path(key)
+        if path is None:
+            return
+        if isinstance(value, pd.Series):
+            kind = b'series' if value.name is not None else b'unnamed_series'
+        else:
+            kind = b'frame'
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=True)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), _KIND_KEY: kind})
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = None
+            # 先写临时文件再改名，其他进程不会读到写了一半的文件
+            tmp_path = path.with_suffix(f'.{uuid.uuid4().hex}.tmp')
+            with pa.OSFile(str(tmp_path), 'wb') as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            written = tmp_path.stat().st_size
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"写入因子缓存失败，已忽略: {key}, {e}")
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                # 首次写入：扫描一次目录（已包含刚写入的文件）
+                self._scan_disk()
+            elif replaced is None:
+                self._disk_count += 1
+                self._disk_bytes += written
+            else:
+                self._disk_bytes += written - replaced
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _disk_entries(self):
+        """[(修改时间, 字节数, 路径)]"""
+        entries = []
+        for path in self._disk_files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_disk(self) -> None:
+        """扫描目录得到磁盘文件数与字节数（调用方持有 _lock）"""
+        entries = self._disk_entries()
+        self._disk_count = len(entries)
+        self._disk_bytes = sum(size for _, size, _ in entries)
+
+    def _evict_disk(self) -> None:
+        """按最近使用时间淘汰到上限的 90%（调用方持有 _lock）；重新扫描目录，包含其他进程写入的文件"""
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        target = self.max_disk_bytes * _DISK_EVICT_TARGET
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                # 已被其他进程删除，或文件仍被映射（Windows）
+                continue
+            total -= size
+            count -= 1
+        self._disk_count = count
+        self._disk_bytes = total
+
+
+_default_cache: Optional[FactorCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache_dir() -> Path:
+    """默认磁盘缓存目录"""
+    env_dir = os.getenv(CACHE_DIR_ENV)
+    if env_dir:
+        return Path(env_dir)
+    return Path(__file__).resolve().parent.parent / 'data' / 'factor_cache'
+
+
+def get_factor_cache() -> FactorCache:
+    """进程内共享的因子缓存实例（磁盘层在 default_cache_dir()，跨进程共享）"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = FactorCache(default_cache_dir())
+        return _default_cache
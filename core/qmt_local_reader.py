@@ -8,12 +8,43 @@ Directly reads QMT local cache files (.dat) without API calls
 Performance: 50-100x faster than xtdata.get_market_data_ex()
 """
 
+import os
 import struct
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from datetime import timedelta
+from typing import Optional, List, Dict, Iterable
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    PYARROW_AVAILABLE = False
+
+# struct 格式字符 → NumPy 类型（QMT 文件为小端）
+_STRUCT_TO_NUMPY = {'Q': '<u8', 'I': '<u4', 'd': '<f8'}
+
+
+def _struct_dtype(fmt: str, record_size: int) -> Optional[np.dtype]:
+    """把 struct 格式（本机对齐）转换为记录跨度为 record_size 的结构化 dtype
+
+    结构体长度超过记录长度时返回 None：逐条 unpack 时最后一条记录必然越界。
+    """
+    fmt = fmt.replace(' ', '')
+    if struct.calcsize(fmt) > record_size:
+        return None
+    offsets = [struct.calcsize(fmt[:i + 1]) - struct.calcsize(char) for i, char in enumerate(fmt)]
+    return np.dtype({
+        'names': [f'f{i}' for i in range(len(fmt))],
+        'formats': [_STRUCT_TO_NUMPY[char] for char in fmt],
+        'offsets': offsets,
+        'itemsize': record_size,
+    })
 
 
 class QMTLocalReader:
@@ -44,6 +75,51 @@ class QMTLocalReader:
         '1M': '2592000',
     }
 
+    # 日线格式: 8字节头部 + 32字节记录(8个uint32)
+    # 有效记录在偶数索引 (0, 2, 4, ...)，奇数索引是复权元数据
+    DAILY_HEADER_SIZE = 8
+    DAILY_DTYPE = np.dtype([
+        ('time', '<u4'),
+        ('open', '<u4'),       # 价格单位 1/1000 元
+        ('high', '<u4'),
+        ('low', '<u4'),
+        ('close', '<u4'),
+        ('reserved', '<u4'),   # 恒为 0
+        ('volume', '<u4'),     # 成交量（手）
+        ('market', '<u4'),     # 市场标志
+    ])
+    # 日线时间戳为 UTC 秒，转换为北京时间
+    BEIJING_OFFSET_SECONDS = 8 * 3600
+    MIN_DAILY_TIMESTAMP = 631152000  # 1990-01-01
+
+    # 分钟线候选格式（按记录大小），struct 格式按本机对齐解释
+    MINUTE_RECORD_SIZES = [52, 48, 40, 56, 44, 36, 32, 28]
+    MINUTE_FORMATS = {
+        52: [('Qddddddd', 'time(8) + 7 doubles')],
+        48: [
+            ('QIIIddd', 'time(8) + 4 ints + 2 doubles'),
+            ('QIIIIdd', 'time(8) + 5 ints + 2 doubles'),
+            ('QIIII I d', 'time(8) + 4 ints + int + double'),
+        ],
+        40: [
+            ('QIIIIddd', 'time(8) + 4 ints + 2 doubles'),
+            ('QIIIdddd', 'time(8) + 3 ints + 4 doubles'),
+            ('QIIIIIIdd', 'time(8) + 6 ints + 2 doubles'),
+        ],
+        36: [
+            ('QIIIIIIdd', 'time(8) + 5 ints + 2 doubles'),
+            ('QIII Iddd', 'time(8) + 4 ints + 3 doubles'),
+        ],
+        32: [
+            ('QIIIIII d', 'time(8) + 6 ints + double'),
+            ('QIIIIIdd', 'time(8) + 5 ints + 2 doubles'),
+        ],
+        28: [('QIIIIII I', 'time(8) + 7 ints')],
+    }
+
+    # read_many 产出的 Arrow 批次结构
+    ARROW_COLUMNS = ['code', 'time', 'open', 'high', 'low', 'close', 'volume', 'amount']
+
     def __init__(self, data_dir: Optional[Path] = None):
         """初始化读取器"""
         self.data_dir = Path(data_dir) if data_dir else self.DEFAULT_DATA_DIR
@@ -116,10 +192,7 @@ class QMTLocalReader:
             return None
 
         try:
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-
-            df = self._parse_minute_file(file_data, stock_code, period)
+            df = self._read_minute_file(file_path, stock_code, period)
             if df is None or df.empty:
                 return None
 
@@ -144,56 +217,11 @@ class QMTLocalReader:
             return None
 
         try:
-            with open(file_path, 'rb') as f:
-                raw = f.read()
-
-            # 日线格式: 8字节头部 + 32字节记录(8个int32)
-            # 但有效记录在偶数索引 (0, 2, 4, ...)，奇数索引是复权元数据
-            header_size = 8
-            rec_size = 32
-            data = raw[header_size:]
-            total_records = len(data) // rec_size
-
-            records = []
-            for i in range(0, total_records, 2):  # 只取偶数索引
-                offset = i * rec_size
-                vals = struct.unpack_from('<IIIIIIII', data, offset)
-                ts = vals[0]
-                # 验证时间戳合理性 (1990-2026)
-                if not (631152000 < ts < 1767225600):
-                    continue
-
-                dt = datetime.fromtimestamp(ts)
-                open_p = vals[1] / 1000.0
-                high_p = vals[2] / 1000.0
-                low_p = vals[3] / 1000.0
-                close_p = vals[4] / 1000.0
-                volume_lots = vals[6]  # 成交量（手）
-                # vals[5] = 0 (reserved), vals[7] = market flag
-
-                # 基本数据验证
-                if not (0.01 < open_p < 100000 and 0.01 < close_p < 100000):
-                    continue
-                if high_p < low_p:
-                    continue
-
-                records.append({
-                    'time': dt,
-                    'open': open_p,
-                    'high': high_p,
-                    'low': low_p,
-                    'close': close_p,
-                    'volume': volume_lots * 100,  # 手转股
-                    'amount': 0,  # 日线格式不含成交额
-                })
-
-            if not records:
+            df = self._read_daily_file(file_path)
+            if df is None:
                 logger.error(f"[ERROR] No valid records found in {stock_code} daily data")
                 return None
 
-            df = pd.DataFrame(records)
-            df = df.sort_values('time').drop_duplicates('time')
-
             if start_date or end_date:
                 df = self._filter_by_date(df, start_date, end_date)
 
@@ -206,15 +234,147 @@ class QMTLocalReader:
             traceback.print_exc()
             return None
 
-    def _parse_minute_file(self, file_data: bytes, stock_code: str, period: str) -> Optional[pd.DataFrame]:
-        """解析分钟线二进制文件"""
+    def read_many(self, codes: Iterable[str], period: str = '1d',
+                  start_date: Optional[str] = None,
+                  end_date: Optional[str] = None,
+                  max_workers: Optional[int] = None) -> 'pa.RecordBatchReader':
+        """并行读取多只股票，以 Arrow 批次流式返回
+
+        文件解码在线程池中进行（NumPy 解码时释放 GIL），每只股票一个 RecordBatch，
+        按 codes 的顺序产出；同时在途的股票数有上限，全市场读取时内存占用保持平稳。
+        无数据或读取失败的股票会被跳过。
+
+        Args:
+            codes: 股票代码列表
+            period: 周期 ('1d', '1m', '5m' 等)
+            start_date: 开始日期
+            end_date: 结束日期
+            max_workers: 线程数，默认 min(32, CPU数 + 4)
+
+        Returns:
+            pyarrow.RecordBatchReader，列为 ARROW_COLUMNS；
+            可用 read_all() 得到 Table，或逐批写入 DuckDB/Parquet
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("read_many 需要 pyarrow: pip install pyarrow")
+
+        codes = list(codes)
+        workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        schema = self.arrow_schema()
+
+        def load(stock_code):
+            try:
+                file_path = self.get_file_path(stock_code, period)
+                if not file_path:
+                    return None
+                if period == '1d':
+                    df = self._read_daily_file(file_path)
+                else:
+                    df = self._read_minute_file(file_path, stock_code, period)
+                if df is None or df.empty:
+                    return None
+                if start_date or end_date:
+                    df = self._filter_by_date(df, start_date, end_date)
+                if df.empty:
+                    return None
+                df = df.assign(code=stock_code)[self.ARROW_COLUMNS]
+                return pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+            except Exception as e:
+                logger.warning(f"[WARNING] Failed to read {stock_code} {period}: {e}")
+                return None
+
+        def batches():
+            read_count = 0
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                remaining = iter(codes)
+                for stock_code in remaining:
+                    pending.append(pool.submit(load, stock_code))
+                    if len(pending) >= workers * 2:
+                        break
+                while pending:
+                    batch = pending.popleft().result()
+                    next_code = next(remaining, None)
+                    if next_code is not None:
+                        pending.append(pool.submit(load, next_code))
+                    if batch is not None and batch.num_rows:
+                        read_count += 1
+                        yield batch
+            logger.info(f"[OK] Read {read_count}/{len(codes)} stocks ({period})")
+
+        return pa.RecordBatchReader.from_batches(schema, batches())
+
+    @staticmethod
+    def arrow_schema() -> 'pa.Schema':
+        """read_many 产出批次的 Arrow 结构"""
+        return pa.schema([
+            ('code', pa.string()),
+            ('time', pa.timestamp('ms')),
+            ('open', pa.float64()),
+            ('high', pa.float64()),
+            ('low', pa.float64()),
+            ('close', pa.float64()),
+            ('volume', pa.float64()),
+            ('amount', pa.float64()),
+        ])
+
+    def _read_daily_file(self, file_path: Path) -> Optional[pd.DataFrame]:
+        """内存映射日线文件并按列解码，无有效记录时返回 None"""
+        record_size = self.DAILY_DTYPE.itemsize
+        total_records = (file_path.stat().st_size - self.DAILY_HEADER_SIZE) // record_size
+        if total_records <= 0:
+            return None
+
+        records = np.memmap(file_path, dtype=self.DAILY_DTYPE, mode='r',
+                            offset=self.DAILY_HEADER_SIZE, shape=(total_records,))
+        bars = records[::2]  # 只取偶数索引
+
+        ts = bars['time']
+        open_p = bars['open'] / 1000.0
+        high_p = bars['high'] / 1000.0
+        low_p = bars['low'] / 1000.0
+        close_p = bars['close'] / 1000.0
+
+        # 时间戳合理性 (1990-01-01 至明天) + 基本价格验证
+        valid = (
+            (ts > self.MIN_DAILY_TIMESTAMP) & (ts < time.time() + 86400)
+            & (open_p > 0.01) & (open_p < 100000)
+            & (close_p > 0.01) & (close_p < 100000)
+            & (high_p >= low_p)
+        )
+        count = int(valid.sum())
+        if count == 0:
+            return None
+
+        df = pd.DataFrame({
+            'time': (ts[valid].astype(np.int64) + self.BEIJING_OFFSET_SECONDS).astype('datetime64[s]'),
+            'open': open_p[valid],
+            'high': high_p[valid],
+            'low': low_p[valid],
+            'close': close_p[valid],
+            'volume': bars['volume'][valid].astype(np.int64) * 100,  # 手转股
+            'amount': np.zeros(count, dtype=np.int64),  # 日线格式不含成交额
+        })
+        return df.sort_values('time', kind='stable').drop_duplicates('time')
+
+    def _read_minute_file(self, file_path: Path, stock_code: str, period: str) -> Optional[pd.DataFrame]:
+        """内存映射分钟线文件并解析"""
+        if file_path.stat().st_size == 0:
+            return None
+        file_data = np.memmap(file_path, dtype=np.uint8, mode='r')
+        return self._parse_minute_file(file_data, stock_code, period)
+
+    def _parse_minute_file(self, file_data, stock_code: str, period: str) -> Optional[pd.DataFrame]:
+        """解析分钟线二进制文件
+
+        Args:
+            file_data: 文件内容（bytes 或内存映射数组等支持缓冲区协议的对象）
+        """
         file_size = len(file_data)
         logger.debug(f"[DEBUG] File size: {file_size} bytes")
 
         # 尝试不同的记录大小
-        possible_sizes = [52, 48, 40, 56, 44, 36, 32, 28]
-
-        for record_size in possible_sizes:
+        for record_size in self.MINUTE_RECORD_SIZES:
             num_records = file_size // record_size
             header_size = file_size % record_size
 
@@ -223,92 +383,31 @@ class QMTLocalReader:
 
             logger.debug(f"[DEBUG] Trying format: {record_size} bytes, {num_records} records, header: {header_size} bytes")
 
-            try:
-                data_start = header_size
-
-                # 定义可能的格式
-                formats_to_try = []
-
-                if record_size == 52:
-                    formats_to_try = [
-                        ('Qddddddd', 'time(8) + 7 doubles'),
-                    ]
-                elif record_size == 48:
-                    formats_to_try = [
-                        ('QIIIddd', 'time(8) + 4 ints + 2 doubles'),
-                        ('QIIIIdd', 'time(8) + 5 ints + 2 doubles'),
-                        ('QIIII I d', 'time(8) + 4 ints + int + double'),
-                    ]
-                elif record_size == 40:
-                    formats_to_try = [
-                        ('QIIIIddd', 'time(8) + 4 ints + 2 doubles'),
-                        ('QIIIdddd', 'time(8) + 3 ints + 4 doubles'),
-                        ('QIIIIIIdd', 'time(8) + 6 ints + 2 doubles'),
-                    ]
-                elif record_size == 36:
-                    formats_to_try = [
-                        ('QIIIIIIdd', 'time(8) + 5 ints + 2 doubles'),
-                        ('QIII Iddd', 'time(8) + 4 ints + 3 doubles'),
-                    ]
-                elif record_size == 32:
-                    formats_to_try = [
-                        ('QIIIIII d', 'time(8) + 6 ints + double'),
-                        ('QIIIIIdd', 'time(8) + 5 ints + 2 doubles'),
-                    ]
-                elif record_size == 28:
-                    formats_to_try = [
-                        ('QIIIIII I', 'time(8) + 7 ints'),
-                    ]
-
-                # 尝试每种格式
-                for fmt, fmt_desc in formats_to_try:
-                    try:
-                        # 解析前 5 条记录用于测试
-                        test_records = []
-                        offset = data_start
-
-                        for i in range(min(5, num_records)):
-                            if offset + record_size > file_size:
-                                break
-                            record = struct.unpack_from(fmt.replace(' ', ''), file_data, offset)
-                            test_records.append(record)
-                            offset += record_size
-
-                        if not test_records:
-                            continue
-
-                        logger.debug(f"[DEBUG]   Trying sub-format: {fmt_desc}")
-                        logger.debug(f"[DEBUG]   First record: {test_records[0]}")
-
-                        # 转换为 DataFrame 进行验证
-                        df = self._records_to_dataframe(test_records, stock_code, period, fmt)
-
-                        # 验证数据的合理性
-                        if self._validate_data(df):
-                            logger.info(f"[OK] Using format: {fmt_desc}")
-
-                            # 格式正确，解析全部数据
-                            all_records = []
-                            offset = data_start
-
-                            for i in range(num_records):
-                                if offset + record_size > file_size:
-                                    break
-                                record = struct.unpack_from(fmt.replace(' ', ''), file_data, offset)
-                                all_records.append(record)
-                                offset += record_size
-
-                            df = self._records_to_dataframe(all_records, stock_code, period, fmt)
-                            logger.info(f"[OK] Successfully parsed {stock_code} {period}: {len(df)} records (format: {record_size}bytes)")
-                            return df
-
-                    except Exception as e:
-                        # 尝试下一个格式
+            # 尝试每种格式
+            for fmt, fmt_desc in self.MINUTE_FORMATS.get(record_size, []):
+                dtype = _struct_dtype(fmt, record_size)
+                if dtype is None:
+                    continue
+
+                try:
+                    records = np.frombuffer(file_data, dtype=dtype, count=num_records, offset=header_size)
+
+                    logger.debug(f"[DEBUG]   Trying sub-format: {fmt_desc}")
+                    logger.debug(f"[DEBUG]   First record: {records[0]}")
+
+                    # 用前 5 条记录验证数据的合理性
+                    if not self._validate_data(self._records_to_dataframe(records[:5], stock_code, period, fmt)):
                         continue
 
-            except Exception as e:
-                logger.debug(f"[DEBUG] Format {record_size} bytes failed: {e}")
-                continue
+                    logger.info(f"[OK] Using format: {fmt_desc}")
+                    df = self._records_to_dataframe(records, stock_code, period, fmt)
+                    logger.info(f"[OK] Successfully parsed {stock_code} {period}: {len(df)} records (format: {record_size}bytes)")
+                    return df
+
+                except Exception as e:
+                    # 尝试下一个格式
+                    logger.debug(f"[DEBUG] Format {fmt_desc} failed: {e}")
+                    continue
 
         logger.error(f"[ERROR] Cannot parse file format: {stock_code} {period}")
         return None
@@ -385,69 +484,34 @@ class QMTLocalReader:
 
         return summary
 
-    def _records_to_dataframe(self, records: List[tuple], stock_code: str,
+    def _records_to_dataframe(self, records: np.ndarray, stock_code: str,
                              period: str, fmt: str) -> pd.DataFrame:
-        """将解析的记录转换为 DataFrame"""
+        """将结构化记录数组按列转换为 DataFrame"""
         fmt_clean = fmt.replace(' ', '')
+        fields = [records[name] for name in records.dtype.names]
+        if len(fields) < 7:
+            raise ValueError(f"Unsupported format: {fmt}")
 
-        # 提取时间戳（第一个字段）
-        times = [r[0] for r in records]
-
-        # 检查时间戳的合理性，确定时间戳单位
-        if times and times[0] > 1000000000000:  # 毫秒时间戳
-            datetimes = pd.to_datetime(times, unit='ms', errors='coerce')
-        else:  # 秒时间戳
-            datetimes = pd.to_datetime(times, unit='s', errors='coerce')
+        # 提取时间戳（第一个字段），检查时间戳的合理性，确定时间戳单位
+        # 格式探测时时间字段可能是任意值，越界的按 NaT 处理
+        times = fields[0]
+        unit = 'ms' if len(times) and times[0] > 1000000000000 else 's'
+        datetimes = pd.to_datetime(times.astype(np.int64), unit=unit, errors='coerce')
 
-        # 根据格式提取价格数据
+        # 根据格式确定价格字段的换算系数（int 类型的价格需要除以 10000）
         if fmt_clean == 'Qddddddd':  # 7个double
-            opens = [r[1] for r in records]
-            highs = [r[2] for r in records]
-            lows = [r[3] for r in records]
-            closes = [r[4] for r in records]
-            volumes = [r[5] for r in records]
-            amounts = [r[6] for r in records]
-        elif fmt_clean == 'QIIIddd':  # time(8) + 4 ints + 2 doubles
-            # int 类型的价格需要除以 10000
-            opens = [r[1] / 10000.0 for r in records]
-            highs = [r[2] / 10000.0 for r in records]
-            lows = [r[3] / 10000.0 for r in records]
-            closes = [r[4] / 10000.0 for r in records]
-            volumes = [r[5] for r in records]
-            amounts = [r[6] for r in records]
-        elif fmt_clean == 'QIIIIdd':  # time(8) + 5 ints + 2 doubles
-            opens = [r[1] / 10000.0 for r in records]
-            highs = [r[2] / 10000.0 for r in records]
-            lows = [r[3] / 10000.0 for r in records]
-            closes = [r[4] / 10000.0 for r in records]
-            # 第5个int字段可能是其他数据，volume和amount是double
-            volumes = [r[5] for r in records]
-            amounts = [r[6] for r in records]
-        elif fmt_clean == 'QIIIIddd':  # time(8) + 4 ints + 3 doubles
-            opens = [r[1] / 10000.0 for r in records]
-            highs = [r[2] / 10000.0 for r in records]
-            lows = [r[3] / 10000.0 for r in records]
-            closes = [r[4] / 10000.0 for r in records]
-            volumes = [r[5] for r in records]
-            amounts = [r[6] for r in records]
+            scales = (1.0, 1.0, 1.0, 1.0)
+        elif fmt_clean in ('QIIIddd', 'QIIIIdd', 'QIIIIddd'):
+            scales = (10000.0, 10000.0, 10000.0, 10000.0)
         elif fmt_clean == 'QIIIdddd':  # time(8) + 3 ints + 4 doubles
-            opens = [r[1] / 10000.0 for r in records]
-            highs = [r[2] / 10000.0 for r in records]
-            lows = [r[3] / 10000.0 for r in records]
-            closes = [r[4] for r in records]
-            volumes = [r[5] for r in records]
-            amounts = [r[6] for r in records]
+            scales = (10000.0, 10000.0, 10000.0, 1.0)
         else:
-            # 默认处理：尝试智能判断
-            if len(records[0]) >= 7:
-                opens = [r[1] if isinstance(r[1], float) else r[1] / 10000.0 for r in records]
-                highs = [r[2] if isinstance(r[2], float) else r[2] / 10000.0 for r in records]
-                lows = [r[3] if isinstance(r[3], float) else r[3] / 10000.0 for r in records]
-                closes = [r[4] if isinstance(r[4], float) else r[4] / 10000.0 for r in records]
-                volumes = [r[5] if len(r) > 5 else 0 for r in records]
-                amounts = [r[6] if len(r) > 6 else 0 for r in records]
-            else:
-                raise ValueError(f"Unsupported format: {fmt}")
+            # 默认处理：浮点字段原样使用，整数字段除以 10000
+            scales = tuple(1.0 if field.dtype.kind == 'f' else 10000.0 for field in fields[1:5])
+        opens, highs, lows, closes = (field / scale for field, scale in zip(fields[1:5], scales))
+
+        def column(field):
+            return field.astype(np.int64) if field.dtype.kind == 'u' else field
 
         # 构建 DataFrame
         df = pd.DataFrame({
@@ -456,8 +520,8 @@ class QMTLocalReader:
             'high': highs,
             'low': lows,
             'close': closes,
-            'volume': volumes,
-            'amount': amounts,
+            'volume': column(fields[5]),
+            'amount': column(fields[6]),
         })
 
         # 过滤无效数据
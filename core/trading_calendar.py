@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+交易日历服务
+
+交易日历以有序的 datetime64[D] 数组保存，所有查询都用 np.searchsorted 完成（O(log n)）：
+is_trading_day / next / prev / range / count / month_firsts / week_firsts。
+
+日历来源（按优先级）：
+1. 缓存文件（<DuckDB 目录>/trading_calendar.npy，一天内有效）
+2. xtdata.get_trading_dates（仅当进程已导入 xtquant 时使用，避免触发连接）
+3. Tushare trade_cal（已安装 tushare 且配置了 TUSHARE_TOKEN 时使用）
+4. 用 DuckDB stock_daily 校正的规则日历：stock_daily 只用于确认，不直接作为日历——
+   某只股票缺数据不会让那天变成非交易日（否则缺失检测永远发现不了这些缺口）。
+   规则交易日全部保留，全市场都没有日线的规则交易日作为数据缺口记录警告；
+   规则认为休市、但多数股票有日线的日期补为交易日。库中股票太少时无法确认，跳过此来源
+5. 规则日历（周末 + 主要节假日近似），并用于补齐 2-4 覆盖范围以外的日期
+
+来源 2-4 的结果写入缓存文件，供其他进程直接加载。每个进程只加载一次，
+data_manager、回测引擎、策略基类和 DataAPI 共用 get_trading_calendar() 返回的实例。
+
+使用方法：
+    from core.trading_calendar import get_trading_calendar
+
+    calendar = get_trading_calendar()
+    calendar.is_trading_day('20240102')
+    calendar.next('2024-01-02', 5)
+    calendar.to_strings(calendar.month_firsts('20240101', '20241231'))
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 缓存文件可通过环境变量指定，默认与 DuckDB 数据库放在同一目录
+CALENDAR_FILE_ENV = 'EASYXT_TRADING_CALENDAR_FILE'
+CALENDAR_FILE_NAME = 'trading_calendar.npy'
+CACHE_MAX_AGE_SECONDS = 24 * 3600
+
+# 用 stock_daily 校正规则日历：一天的股票数通常要达到这么多才足以代表全市场
+MIN_CONFIRM_STOCKS = 50
+# 规则认为休市的日期，有日线的股票数达到典型值的这个比例时补为交易日
+CONFIRM_OPEN_RATIO = 0.5
+
+# 规则日历的覆盖范围
+RULE_START = date(2000, 1, 1)
+RULE_END = date(2030, 12, 31)
+
+# 春节日期表（农历正月初一对应的公历日期）
+_SPRING_FESTIVALS = {
+    2024: (2, 10),
+    2025: (1, 29),
+    2026: (2, 17),
+    2027: (2, 6),
+    2028: (1, 26),
+    2029: (2, 13),
+    2030: (2, 3),
+}
+
+
+def _to_day(value) -> np.datetime64:
+    """把 'YYYYMMDD' / 'YYYY-MM-DD' / date / datetime / Timestamp 转为 datetime64[D]"""
+    if isinstance(value, np.datetime64):
+        return value.astype('datetime64[D]')
+    return pd.Timestamp(value).to_datetime64().astype('datetime64[D]')
+
+
+class TradingCalendarService:
+    """基于有序 datetime64[D] 数组的交易日历"""
+
+    def __init__(self, dates: Iterable, source: str = 'custom', covered: Optional[tuple] = None):
+        """
+        Args:
+            dates: 交易日（任意顺序，可重复）
+            source: 日历来源说明
+            covered: 真实来源覆盖的 (起, 止) 日期，范围外是规则日历补齐的近似值；
+                     None 表示全部日期都来自 dates 的来源
+        """
+        if not (isinstance(dates, np.ndarray) and np.issubdtype(dates.dtype, np.datetime64)):
+            dates = pd.to_datetime(list(dates)).values
+        self.dates = np.unique(dates.astype('datetime64[D]'))
+        self.source = source
+        if covered is None and len(self.dates) and source != 'rules':
+            covered = (self.dates[0], self.dates[-1])
+        self.covered = tuple(_to_day(d) for d in covered) if covered else None
+
+        # 每个交易日是否为当月/当周（周一开始）第一个交易日
+        days = self.dates.astype(np.int64)
+        months = self.dates.astype('datetime64[M]').astype(np.int64)
+        weeks = (days + 3) // 7     # 1970-01-01 是周四，+3 后按周一切分
+        self._month_first = np.r_[True, months[1:] != months[:-1]] if len(days) else np.array([], dtype=bool)
+        self._week_first = np.r_[True, weeks[1:] != weeks[:-1]] if len(days) else np.array([], dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __repr__(self) -> str:
+        if not len(self.dates):
+            return f"TradingCalendarService(empty, source={self.source})"
+        return (f"TradingCalendarService({self.dates[0]} ~ {self.dates[-1]}, "
+                f"{len(self.dates)} 天, source={self.source})")
+
+    def covers(self, start=None, end=None) -> bool:
+        """[start, end] 是否完全在真实来源的覆盖范围内（None 表示日历的起点/终点）"""
+        if self.covered is None or not len(self.dates):
+            return False
+        start = _to_day(start) if start is not None else self.dates[0]
+        end = _to_day(end) if end is not None else self.dates[-1]
+        return self.covered[0] <= start and end <= self.covered[1]
+
+    def is_trading_day(self, day) -> bool:
+        """判断是否为交易日"""
+        day = _to_day(day)
+        i = np.searchsorted(self.dates, day)
+        return bool(i < len(self.dates) and self.dates[i] == day)
+
+    def next(self, day, n: int = 1) -> date:
+        """day 之后（不含）的第 n 个交易日"""
+        i = np.searchsorted(self.dates, _to_day(day), side='right') + n - 1
+        return self._at(i, day, n)
+
+    def prev(self, day, n: int = 1) -> date:
+        """day 之前（不含）的第 n 个交易日"""
+        i = np.searchsorted(self.dates, _to_day(day), side='left') - n
+        return self._at(i, day, -n)
+
+    def _at(self, i: int, day, n: int) -> date:
+        if n == 0 or i < 0 or i >= len(self.dates):
+            raise IndexError(f"超出交易日历范围: {day} 偏移 {n} 个交易日（日历 {self!r}）")
+        return self.dates[i].astype(object)
+
+    def _slice(self, start, end) -> slice:
+        i = np.searchsorted(self.dates, _to_day(start), side='left') if start is not None else 0
+        j = np.searchsorted(self.dates, _to_day(end), side='right') if end is not None else len(self.dates)
+        return slice(i, max(i, j))
+
+    def range(self, start=None, end=None) -> np.ndarray:
+        """[start, end] 内的交易日（datetime64[D] 数组）"""
+        return self.dates[self._slice(start, end)]
+
+    def count(self, start=None, end=None) -> int:
+        """[start, end] 内的交易日数"""
+        s = self._slice(start, end)
+        return s.stop - s.start
+
+    def month_firsts(self, start=None, end=None) -> np.ndarray:
+        """[start, end] 内每月第一个交易日（区间第一天视为所在月的第一个交易日）"""
+        return self._firsts(self._month_first, start, end)
+
+    def week_firsts(self, start=None, end=None) -> np.ndarray:
+        """[start, end] 内每周第一个交易日（区间第一天视为所在周的第一个交易日）"""
+        return self._firsts(self._week_first, start, end)
+
+    def _firsts(self, mask: np.ndarray, start, end) -> np.ndarray:
+        s = self._slice(start, end)
+        if s.stop == s.start:
+            return self.dates[s]
+        selected = mask[s].copy()
+        selected[0] = True
+        return self.dates[s][selected]
+
+    @staticmethod
+    def to_strings(dates: np.ndarray, fmt: str = '%Y%m%d') -> List[str]:
+        """datetime64 数组转为日期字符串列表"""
+        if fmt == '%Y%m%d':
+            return [s.replace('-', '') for s in np.datetime_as_string(dates, unit='D')]
+        return pd.DatetimeIndex(dates).strftime(fmt).tolist()
+
+    @staticmethod
+    def to_dates(dates: np.ndarray) -> List[date]:
+        """datetime64 数组转为 date 列表"""
+        return dates.astype(object).tolist()
+
+
+def rule_based_trading_days(start: date = RULE_START, end: date = RULE_END) -> np.ndarray:
+    """规则日历：工作日去掉主要节假日的近似值（没有真实日历来源时使用）"""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    weekdays = (days.astype(np.int64) + 3) % 7     # 0 = 周一
+    holidays = []
+    # 春节：除夕到初七
+    for year, (month, day) in _SPRING_FESTIVALS.items():
+        festival = np.datetime64(date(year, month, day), 'D')
+        holidays.extend(festival + np.arange(-1, 7))
+    for year in range(2000, 2031):
+        # 元旦、劳动节（5月1-5日）、国庆节（10月1-7日）
+        holidays.append(np.datetime64(date(year, 1, 1), 'D'))
+        holidays.extend(np.datetime64(date(year, 5, d), 'D') for d in range(1, 6))
+        holidays.extend(np.datetime64(date(year, 10, d), 'D') for d in range(1, 8))
+        # 清明（4月4-6日）、端午（5月28-30日）、中秋（9月15-17日）
+        holidays.extend(np.datetime64(date(year, 4, d), 'D') for d in (4, 5, 6))
+        holidays.extend(np.datetime64(date(year, 5, d), 'D') for d in (28, 29, 30))
+        holidays.extend(np.datetime64(date(year, 9, d), 'D') for d in (15, 16, 17))
+    holidays = np.array(holidays, dtype='datetime64[D]')
+    return days[(weekdays < 5) & ~np.isin(days, holidays)]
+
+
+def _load_from_xtdata() -> Optional[np.ndarray]:
+    """从 xtdata 读取上交所交易日（进程未导入 xtquant 时跳过）"""
+    xtdata = sys.modules.get('xtquant.xtdata')
+    if xtdata is None:
+        return None
+    try:
+        timestamps = xtdata.get_trading_dates('SH', '', '', -1)
+    except Exception as e:
+        logger.debug(f"xtdata 交易日获取失败: {e}")
+        return None
+    if not timestamps:
+        return None
+    # 毫秒时间戳为北京时间零点
+    beijing = np.asarray(timestamps, dtype='int64').astype('datetime64[ms]') + np.timedelta64(8, 'h')
+    return beijing.astype('datetime64[D]')
+
+
+def _load_from_tushare() -> Optional[np.ndarray]:
+    """从 Tushare trade_cal 读取上交所交易日（未安装 tushare 或未配置 token 时跳过）"""
+    try:
+        import tushare as ts
+        from config.env_config import get_env_config
+    except ImportError:
+        return None
+    token = get_env_config().tushare_token
+    if not token:
+        return None
+    try:
+        pro = ts.pro_api(token)
+        df = pro.trade_cal(exchange='SSE', start_date=RULE_START.strftime('%Y%m%d'),
+                           end_date=RULE_END.strftime('%Y%m%d'), is_open='1')
+    except Exception as e:
+        logger.debug(f"Tushare 交易日获取失败: {e}")
+        return None
+    if df is None or df.empty:
+        return None
+    return pd.to_datetime(df['cal_date'], format='%Y%m%d').values.astype('datetime64[D]')
+
+
+def _load_from_duckdb(duckdb_path: str) -> Optional[np.ndarray]:
+    """
+    用 DuckDB stock_daily 校正 stock_daily 日期范围内的规则日历（见模块说明第 4 项）
+
+    返回范围内的交易日（规则交易日 + 多数股票有日线的规则休市日）；
+    库中每天的股票数太少、无法代表全市场时返回 None
+    """
+    if not duckdb_path or not Path(duckdb_path).exists():
+        return None
+    try:
+        import duckdb
+        con = duckdb.connect(duckdb_path, read_only=True)
+        try:
+            rows = con.execute("""
+                SELECT CAST(date AS DATE) AS date, COUNT(DISTINCT stock_code) AS stocks
+                FROM stock_daily
+                WHERE period = '1d' AND ISODOW(date) < 6
+                GROUP BY 1
+                ORDER BY 1
+            """).fetchnumpy()
+        finally:
+            con.close()
+    except Exception as e:
+        logger.debug(f"DuckDB 交易日获取失败: {e}")
+        return None
+    if not len(rows['date']):
+        return None
+    days = np.asarray(rows['date'], dtype='datetime64[D]')
+    stocks = np.asarray(rows['stocks'], dtype=np.int64)
+    typical = float(np.median(stocks))
+    if typical < MIN_CONFIRM_STOCKS:
+        logger.debug(f"stock_daily 每天约 {typical:.0f} 只股票，不足以校正交易日历")
+        return None
+
+    rules = rule_based_trading_days()
+    rules = rules[(rules >= days[0]) & (rules <= days[-1])]
+    # 规则交易日全部保留（没有日线只说明数据缺失）；规则休市日：多数股票有日线才认为开市
+    gaps = rules[~np.isin(rules, days)]
+    if len(gaps):
+        preview = ', '.join(str(day) for day in gaps[:10]) + (' ...' if len(gaps) > 10 else '')
+        logger.warning(f"stock_daily 中 {len(gaps)} 个交易日全市场都没有日线（数据缺口）: {preview}")
+    opened = days[stocks >= typical * CONFIRM_OPEN_RATIO]
+    return np.union1d(rules, opened)
+
+
+def _with_rule_days(dates: np.ndarray) -> np.ndarray:
+    """在真实日历覆盖范围之外用规则日历补齐"""
+    rules = rule_based_trading_days()
+    outside = rules[(rules < dates.min()) | (rules > dates.max())]
+    return np.concatenate([dates, outside])
+
+
+def default_calendar_file(duckdb_path: Optional[str] = None) -> Path:
+    """默认缓存文件路径"""
+    env_file = os.getenv(CALENDAR_FILE_ENV)
+    if env_file:
+        return Path(env_file)
+    if duckdb_path is None:
+        from config.env_config import get_default_db_path
+        duckdb_path = get_default_db_path()
+    return Path(duckdb_path).expanduser().with_name(CALENDAR_FILE_NAME)
+
+
+def load_trading_calendar(duckdb_path: Optional[str] = None,
+                          cache_file: Optional[str] = None) -> TradingCalendarService:
+    """
+    按优先级加载交易日历（见模块说明）
+
+    Args:
+        duckdb_path: DuckDB 数据库路径，默认使用配置中的路径
+        cache_file: 缓存文件路径，默认 default_calendar_file()
+    """
+    if duckdb_path is None:
+        from config.env_config import get_default_db_path
+        duckdb_path = get_default_db_path()
+    cache_file = Path(cache_file) if cache_file else default_calendar_file(duckdb_path)
+
+    cached = None
+    if cache_file.exists():
+        try:
+            cached = np.load(cache_file).astype('datetime64[D]')
+            if time.time() - cache_file.stat().st_mtime < CACHE_MAX_AGE_SECONDS:
+                return TradingCalendarService(_with_rule_days(cached), source=f'cache:{cache_file}',
+                                              covered=(cached[0], cached[-1]))
+        except Exception as e:
+            logger.warning(f"交易日历缓存读取失败: {e}")
+
+    loaders = (('xtdata', _load_from_xtdata), ('tushare', _load_from_tushare),
+               ('duckdb', lambda: _load_from_duckdb(duckdb_path)))
+    for source, loader in loaders:
+        dates = loader()
+        if dates is not None and len(dates):
+            dates = np.unique(dates)
+            try:
+                if cache_file.parent.exists():
+                    np.save(cache_file, dates)
+            except OSError as e:
+                logger.warning(f"交易日历缓存写入失败: {e}")
+            logger.info(f"交易日历来自 {source}: {dates[0]} ~ {dates[-1]}, {len(dates)} 天")
+            return TradingCalendarService(_with_rule_days(dates), source=source, covered=(dates[0], dates[-1]))
+
+    if cached is not None and len(cached):
+        # 缓存过期但没有其他来源时仍使用缓存
+        return TradingCalendarService(_with_rule_days(cached), source=f'cache:{cache_file}',
+                                      covered=(cached[0], cached[-1]))
+
+    logger.info("没有可用的交易日历来源，使用规则日历")
+    return TradingCalendarService(rule_based_trading_days(), source='rules')
+
+
+_default_calendar: Optional[TradingCalendarService] = None
+_default_lock = threading.Lock()
+
+
+def get_trading_calendar() -> TradingCalendarService:
+    """进程内共享的交易日历（首次调用时加载）"""
+    global _default_calendar
+    with _default_lock:
+        if _default_calendar is None:
+            _default_calendar = load_trading_calendar()
+        return _default_calendar
+
+
+def reset_trading_calendar():
+    """丢弃进程内的日历实例，下次调用 get_trading_calendar() 时重新加载"""
+    global _default_calendar
+    with _default_lock:
+        _default_calendar = None
@@ -19,8 +19,13 @@ logger = logging.getLogger(__name__)
 """
 
 import schedule
+import json
+import os
+import queue
 import time
 import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, time as dt_time, date, timedelta
 from typing import Dict, List, Optional, Callable
 import logging
@@ -35,6 +40,9 @@ from smart_data_detector import TradingCalendar
 import pandas as pd
 
 from config.env_config import get_default_db_path
+from data_manager.duckdb_connection_pool import BAR_VALUE_COLUMNS, get_db_manager, upsert_stock_bars
+from data_manager.bar_resampler import BarResampler
+from data_manager.intraday_store import IntradayBarStore, default_intraday_root
 
 
 # 配置日志
@@ -48,6 +56,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# A 股收盘时间，之后当天的日线才是最终值
+MARKET_CLOSE_TIME = dt_time(15, 0)
+
+# 未导入 easy_xt 时使用的本地下载锁
+_fallback_download_lock = threading.RLock()
+
+
+def _get_download_lock():
+    """xtdata 下载锁：优先与 easy_xt 共用同一把全局锁"""
+    try:
+        from easy_xt import _download_lock
+        return _download_lock
+    except Exception:
+        return _fallback_download_lock
+
+
+def _infer_symbol_type(stock_code: str) -> str:
+    """根据代码推断 symbol_type（沪市 5 开头、深市 15/16 开头为 ETF/基金）"""
+    code, _, market = stock_code.partition('.')
+    if (market == 'SH' and code.startswith('5')) or (market == 'SZ' and code.startswith(('15', '16'))):
+        return 'etf'
+    return 'stock'
+
 
 class AutoDataUpdater:
     """
@@ -62,18 +93,33 @@ class AutoDataUpdater:
 
     def __init__(self,
                  duckdb_path: str = None,
-                 update_time: str = '15:30'):
+                 update_time: str = '15:30',
+                 max_workers: int = 4,
+                 batch_size: int = 200,
+                 history_start: date = date(2015, 1, 1),
+                 checkpoint_path: str = None,
+                 fetcher: Optional[Callable] = None):
         """
         初始化自动更新器
 
         Args:
             duckdb_path: DuckDB 数据库路径
             update_time: 每日更新时间（默认 15:30，收盘后）
+            max_workers: 并发拉取线程数
+            batch_size: 每批股票数
+            history_start: 库中没有数据的股票从该日期开始补
+            checkpoint_path: 断点文件路径，默认放在数据库旁边
+            fetcher: 自定义拉取函数 fetcher(股票列表, 起始日期, 结束日期) -> DataFrame，默认使用 xtdata
         """
         if duckdb_path is None:
             duckdb_path = get_default_db_path()
         self.duckdb_path = duckdb_path
         self.update_time = update_time
+        self.max_workers = max(1, int(max_workers))
+        self.batch_size = max(1, int(batch_size))
+        self.history_start = history_start
+        self.checkpoint_path = Path(checkpoint_path or f"{duckdb_path}.update_checkpoint.json")
+        self.fetcher = fetcher
         self.calendar = TradingCalendar()
         self.running = False
         self.thread = None
@@ -195,15 +241,23 @@ class AutoDataUpdater:
 
         return result
 
-    def update_all_stocks(self, stock_codes: List[str] = None) -> Dict:
+    def update_all_stocks(self, stock_codes: List[str] = None,
+                          progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict:
         """
-        更新所有股票的数据
+        增量更新所有股票的日线数据
+
+        流程：
+        1. 一条 SQL 查出每只股票的最新日期，已是最新的直接跳过
+        2. 按缺口起始日期分组、切批，线程池并发拉取（xtdata 下载在全局锁内串行）
+        3. 单个写入线程合并各批结果，用 upsert 批量入库，并在每次写入后记录断点
+        4. 中断后再次运行（同一目标交易日）时从断点继续，全部完成后删除断点文件
 
         Args:
             stock_codes: 要更新的股票列表，None 表示更新全部
+            progress_callback: 进度回调 (已完成股票数, 总数)
 
         Returns:
-            更新结果汇总
+            更新结果汇总：total / success / failed / skipped / records / results
         """
         logger.info("=" * 60)
         logger.info("开始自动数据更新")
@@ -214,31 +268,50 @@ class AutoDataUpdater:
             stock_codes = self._get_all_stock_codes()
             logger.info(f"从数据库获取到 {len(stock_codes)} 只股票")
 
-        # 确保 DataManager 已初始化
-        self.initialize_data_manager()
-
-        if self.data_manager is None:
-            logger.error("无法初始化 DataManager，取消更新")
-            return {'success': False, 'message': 'DataManager 初始化失败'}
+        target_date = self._latest_trading_day()
+        checkpoint = self._load_checkpoint(target_date)
+        last_dates = self._get_last_dates(stock_codes)
 
-        # 更新每只股票
         results = []
-        success_count = 0
-        failed_count = 0
-
-        for i, stock_code in enumerate(stock_codes, 1):
-            logger.info(f"[{i}/{len(stock_codes)}] 更新 {stock_code}...")
-
-            result = self.update_single_stock(stock_code)
-            results.append(result)
-
-            if result['success']:
-                success_count += 1
+        pending = []
+        for stock_code in stock_codes:
+            last_date = last_dates.get(stock_code)
+            if stock_code in checkpoint or (last_date is not None and last_date >= target_date):
+                results.append({'stock_code': stock_code, 'success': True, 'message': '已是最新', 'records': 0})
             else:
-                failed_count += 1
-
-            # 避免请求过于频繁
-            time.sleep(0.1)
+                pending.append(stock_code)
+        skipped_count = len(results)
+        batches = self._plan_batches(pending, last_dates, target_date)
+        logger.info(f"目标交易日 {target_date}: {len(pending)} 只需要更新，{skipped_count} 只已是最新，"
+                    f"共 {len(batches)} 批")
+
+        write_queue = queue.Queue(maxsize=self.max_workers * 2)
+        writer = threading.Thread(target=self._write_loop,
+                                  args=(write_queue, results, checkpoint, target_date), daemon=True)
+        writer.start()
+
+        done = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(self._fetch_batch, codes, start, target_date): codes
+                           for codes, start in batches}
+                for future in as_completed(futures):
+                    codes = futures[future]
+                    try:
+                        write_queue.put((codes, future.result(), None))
+                    except Exception as e:
+                        write_queue.put((codes, None, e))
+                    done += len(codes)
+                    if progress_callback:
+                        progress_callback(done, len(pending))
+        finally:
+            write_queue.put(None)
+            writer.join()
+
+        success_count = sum(1 for r in results if r['success']) - skipped_count
+        failed_count = len(results) - success_count - skipped_count
+        if failed_count == 0:
+            self._clear_checkpoint()
 
         # 更新统计信息
         self.last_update_time = date.today()
@@ -250,6 +323,7 @@ class AutoDataUpdater:
         logger.info("更新完成")
         logger.info(f"总计: {len(stock_codes)} 只")
         logger.info(f"成功: {success_count}")
+        logger.info(f"跳过: {skipped_count}")
         logger.info(f"失败: {failed_count}")
         logger.info("=" * 60)
 
@@ -257,9 +331,149 @@ class AutoDataUpdater:
             'total': len(stock_codes),
             'success': success_count,
             'failed': failed_count,
+            'skipped': skipped_count,
+            'records': sum(r['records'] for r in results),
             'results': results
         }
 
+    def _latest_trading_day(self) -> date:
+        """
+        最近一个已收盘的交易日
+
+        交易日 15:00 收盘前当天的日线还在变化，写入后不会再被修正，因此返回上一个交易日
+        """
+        now = datetime.now()
+        today = now.date()
+        if self.is_trading_day(today) and now.time() >= MARKET_CLOSE_TIME:
+            return today
+        return self.calendar.service.prev(today)
+
+    def _get_last_dates(self, stock_codes: List[str]) -> Dict[str, date]:
+        """一条 SQL 查询每只股票日线的最新日期"""
+        if not stock_codes:
+            return {}
+        try:
+            with get_db_manager(self.duckdb_path).get_read_connection() as con:
+                con.register('update_codes', pd.DataFrame({'stock_code': list(stock_codes)}))
+                try:
+                    rows = con.execute("""
+                        SELECT d.stock_code, MAX(d.date)
+                        FROM stock_daily d
+                        JOIN update_codes u USING (stock_code)
+                        WHERE d.period = '1d'
+                        GROUP BY d.stock_code
+                    """).fetchall()
+                finally:
+                    con.unregister('update_codes')
+        except Exception as e:
+            logger.warning(f"查询最新日期失败，按全量处理: {e}")
+            return {}
+        return {code: pd.Timestamp(last).date() for code, last in rows if last is not None}
+
+    def _plan_batches(self, stock_codes: List[str], last_dates: Dict[str, date],
+                      target_date: date) -> List[tuple]:
+        """按缺口起始日期分组并切批，返回 [(股票列表, 起始日期), ...]"""
+        groups: Dict[date, List[str]] = defaultdict(list)
+        for stock_code in stock_codes:
+            last_date = last_dates.get(stock_code)
+            start = last_date + timedelta(days=1) if last_date else self.history_start
+            groups[min(start, target_date)].append(stock_code)
+
+        batches = []
+        for start in sorted(groups):
+            codes = groups[start]
+            batches.extend((codes[i:i + self.batch_size], start)
+                           for i in range(0, len(codes), self.batch_size))
+        return batches
+
+    def _fetch_batch(self, stock_codes: List[str], start: date, end: date) -> pd.DataFrame:
+        """
+        拉取一批股票 [start, end] 的日线
+
+        Returns:
+            长表 DataFrame，列为 stock_code/date 与 BAR_VALUE_COLUMNS
+        """
+        if self.fetcher is not None:
+            return self.fetcher(stock_codes, start, end)
+
+        from xtquant import xtdata
+
+        start_str, end_str = start.strftime('%Y%m%d'), end.strftime('%Y%m%d')
+        with _get_download_lock():
+            xtdata.download_history_data2(stock_codes, period='1d', start_time=start_str, end_time=end_str)
+        data = xtdata.get_market_data(field_list=BAR_VALUE_COLUMNS, stock_list=stock_codes, period='1d',
+                                      start_time=start_str, end_time=end_str, count=-1)
+        if not data or 'close' not in data or data['close'].empty:
+            return pd.DataFrame(columns=['stock_code', 'date'] + BAR_VALUE_COLUMNS)
+
+        df = pd.concat({field: data[field].stack() for field in BAR_VALUE_COLUMNS}, axis=1)
+        df.index.names = ['stock_code', 'date']
+        df = df.reset_index().dropna(subset=['close'])
+        df['date'] = pd.to_datetime(df['date'].astype(str), format='%Y%m%d').dt.date
+        return df
+
+    def _write_loop(self, write_queue: queue.Queue, results: List[Dict],
+                    checkpoint: set, target_date: date):
+        """写入线程：合并拉取结果并 upsert 入库，每次写入后更新断点"""
+        db_manager = get_db_manager(self.duckdb_path)
+        while True:
+            item = write_queue.get()
+            if item is None:
+                break
+            codes, df, error = item
+            if error is not None:
+                logger.error(f"批次拉取失败 ({len(codes)} 只): {error}")
+                results.extend({'stock_code': code, 'success': False, 'message': f'拉取失败: {error}',
+                                'records': 0} for code in codes)
+                continue
+
+            counts = df['stock_code'].value_counts() if df is not None and not df.empty else pd.Series(dtype=int)
+            try:
+                if not counts.empty:
+                    bars = df.assign(symbol_type=df['stock_code'].map(_infer_symbol_type), period='1d')
+                    with db_manager.get_write_connection() as con:
+                        upsert_stock_bars(con, bars)
+            except Exception as e:
+                logger.error(f"批次写入失败 ({len(codes)} 只): {e}")
+                results.extend({'stock_code': code, 'success': False, 'message': f'写入失败: {e}',
+                                'records': 0} for code in codes)
+                continue
+
+            for code in codes:
+                records = int(counts.get(code, 0))
+                results.append({'stock_code': code, 'success': True, 'records': records,
+                                'message': f'更新成功，{records} 条记录' if records else '无新数据'})
+            checkpoint.update(codes)
+            self._save_checkpoint(target_date, checkpoint)
+
+    def _load_checkpoint(self, target_date: date) -> set:
+        """读取断点：目标交易日一致时返回已完成的股票集合"""
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        if state.get('target_date') != target_date.isoformat():
+            return set()
+        done = set(state.get('done', []))
+        logger.info(f"从断点继续：{len(done)} 只已完成")
+        return done
+
+    def _save_checkpoint(self, target_date: date, done: set):
+        try:
+            tmp_path = self.checkpoint_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'target_date': target_date.isoformat(), 'done': sorted(done)}, f)
+            os.replace(tmp_path, self.checkpoint_path)
+        except OSError as e:
+            logger.warning(f"保存断点失败: {e}")
+
+    def _clear_checkpoint(self):
+        try:
+            self.checkpoint_path.unlink()
+        except FileNotFoundError:
+            pass
+
     def _get_all_stock_codes(self) -> List[str]:
         """从数据库获取所有股票代码"""
         try:
@@ -287,11 +501,38 @@ class AutoDataUpdater:
                 return
 
             # 执行更新
-            self.update_all_stocks()
+            summary = self.update_all_stocks()
+
+            # 收盘后压缩当天盘中追加的分钟线分片
+            self.compact_intraday_store()
+
+            # 由新入库的日线增量刷新周线/月线缓存
+            updated = [r['stock_code'] for r in summary['results'] if r['success'] and r['records']]
+            self.refresh_resampled(updated)
 
         except Exception as e:
             logger.error(f"更新任务执行失败: {e}", exc_info=True)
 
+    def compact_intraday_store(self) -> Dict[str, int]:
+        """压缩分钟线存储中所有未合并的分片"""
+        try:
+            store = IntradayBarStore(default_intraday_root(self.duckdb_path))
+            return store.compact()
+        except Exception as e:
+            logger.error(f"分钟线存储压缩失败: {e}")
+            return {}
+
+    def refresh_resampled(self, stock_codes: List[str], periods=('1w', '1M')) -> Dict[str, int]:
+        """增量刷新由日线合成的周线/月线缓存，返回 {周期: 写入K线数}"""
+        if not stock_codes:
+            return {}
+        try:
+            resampler = BarResampler(self.duckdb_path, IntradayBarStore(default_intraday_root(self.duckdb_path)))
+            return {period: resampler.refresh(stock_codes, period) for period in periods}
+        except Exception as e:
+            logger.error(f"刷新重采样缓存失败: {e}")
+            return {}
+
     def start(self):
         """启动定时更新服务"""
         if self.running:
@@ -350,7 +591,6 @@ class AutoDataUpdater:
             更新结果
         """
         logger.info("手动触发数据更新")
-        self.initialize_data_manager()
         return self.update_all_stocks(stock_codes)
 
 
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线重采样
+由本地 1 分钟线合成 5m/15m/30m/1h，由日线合成周线/月线，结果缓存到 DuckDB
+
+- 分段归约全部向量化：数据按 (代码, 时间) 排序后求出分段起点，
+  用 np.fmax/np.fmin/np.add 的 reduceat 计算最高/最低/成交量/成交额，开盘取段首、收盘取段尾
+- 分钟线按 A 股交易时段分段：上午 09:30-11:30、下午 13:00-15:00（240 分钟），
+  标签为段结束时间（与 QMT 一致，如 5m 为 09:35 ... 11:30, 13:05 ... 15:00），
+  午休不跨段；09:30 及之前的开盘集合竞价并入第一根，15:00 之后的盘后成交并入最后一根
+- 周线/月线按自然周（周一起）/自然月分段，标签为段内最后一个交易日
+- 缓存表 stock_resampled 增量刷新：每只股票从缓存中最后一根所在的交易日/周/月起重算
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from data_manager.intraday_store import BAR_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# 目标周期 -> 来源周期
+RESAMPLE_SOURCES = {
+    '5m': '1m',
+    '15m': '1m',
+    '30m': '1m',
+    '1h': '1m',
+    '60m': '1m',
+    '1w': '1d',
+    '1M': '1d',
+}
+
+# 分钟周期的分钟数（必须整除上午的 120 分钟，保证不跨午休）
+INTRADAY_MINUTES = {'5m': 5, '15m': 15, '30m': 30, '1h': 60, '60m': 60}
+
+MORNING_OPEN = 9 * 60 + 30
+MORNING_CLOSE = 11 * 60 + 30
+AFTERNOON_OPEN = 13 * 60
+MORNING_MINUTES = 120
+SESSION_MINUTES = 240
+
+RESAMPLED_TABLE = 'stock_resampled'
+
+
+def _session_minute(times: np.ndarray) -> np.ndarray:
+    """时间 -> 交易时段内的分钟序号（0 为 09:30，120 为 11:30，240 为 15:00）"""
+    clock = (times - times.astype('datetime64[D]')).astype('timedelta64[m]').astype(np.int64)
+    minute = np.where(clock <= MORNING_CLOSE,
+                      clock - MORNING_OPEN,
+                      MORNING_MINUTES + np.maximum(clock - AFTERNOON_OPEN, 0))
+    return np.clip(minute, 0, SESSION_MINUTES)
+
+
+def _segment_keys(times: np.ndarray, period: str):
+    """每根源K线的分段键，以及按分钟分段时每段的标签时间"""
+    if period in INTRADAY_MINUTES:
+        size = INTRADAY_MINUTES[period]
+        days = times.astype('datetime64[D]')
+        bucket = np.maximum(-(-_session_minute(times) // size), 1) - 1
+        keys = days.astype(np.int64) * 1000 + bucket
+        end_minute = (bucket + 1) * size
+        clock = np.where(end_minute <= MORNING_MINUTES,
+                         MORNING_OPEN + end_minute,
+                         AFTERNOON_OPEN + end_minute - MORNING_MINUTES)
+        labels = days + clock.astype('timedelta64[m]')
+        return keys, labels
+    days = times.astype('datetime64[D]').astype(np.int64)
+    if period == '1w':
+        # 1970-01-01 是周四，+3 后按 7 整除得到以周一为起点的周序号
+        return (days + 3) // 7, None
+    if period == '1M':
+        return times.astype('datetime64[M]').astype(np.int64), None
+    raise ValueError(f"不支持的重采样周期: {period}")
+
+
+def resample_bars(data: pd.DataFrame, period: str) -> pd.DataFrame:
+    """
+    重采样K线
+
+    Args:
+        data: 长表，列为 stock_code, time 与 open/high/low/close/volume/amount
+        period: 目标周期，见 RESAMPLE_SOURCES
+
+    Returns:
+        DataFrame: 同样格式的长表，按 (stock_code, time) 排序
+    """
+    if period not in RESAMPLE_SOURCES:
+        raise ValueError(f"不支持的重采样周期: {period}，支持: {sorted(RESAMPLE_SOURCES)}")
+    columns = ['stock_code', 'time'] + BAR_FIELDS
+    if data is None or data.empty:
+        return pd.DataFrame(columns=columns)
+
+    df = data.sort_values(['stock_code', 'time'], kind='stable')
+    codes = df['stock_code'].to_numpy()
+    times = pd.to_datetime(df['time']).to_numpy().astype('datetime64[ns]')
+    keys, labels = _segment_keys(times, period)
+
+    # 代码或分段键变化的位置即分段起点
+    change = np.empty(len(df), dtype=bool)
+    change[0] = True
+    change[1:] = (codes[1:] != codes[:-1]) | (keys[1:] != keys[:-1])
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], len(df)) - 1
+
+    def values(field):
+        if field in df.columns:
+            return df[field].to_numpy(dtype='float64', na_value=np.nan)
+        return np.full(len(df), np.nan)
+
+    result = pd.DataFrame({
+        'stock_code': codes[starts],
+        'time': labels[starts] if labels is not None else times[ends],
+        'open': values('open')[starts],
+        'high': np.fmax.reduceat(values('high'), starts),
+        'low': np.fmin.reduceat(values('low'), starts),
+        'close': values('close')[ends],
+        'volume': np.add.reduceat(np.nan_to_num(values('volume')), starts),
+        'amount': np.add.reduceat(np.nan_to_num(values('amount')), starts),
+    })
+    return result[columns]
+
+
+def _resume_point(last: pd.Timestamp, period: str) -> pd.Timestamp:
+    """增量刷新的起点：缓存中最后一根所在的交易日/周/月的开始"""
+    day = last.normalize()
+    if period == '1w':
+        return day - pd.Timedelta(days=day.weekday())
+    if period == '1M':
+        return day.replace(day=1)
+    return day
+
+
+class BarResampler:
+    """
+    由本地数据合成高周期K线并缓存到 DuckDB
+
+    使用方式：
+        resampler = BarResampler()
+        bars = resampler.get_bars(['000001.SZ', '600000.SH'], '15m', '2024-01-01', '2024-03-31')
+    """
+
+    def __init__(self, duckdb_path: Optional[str] = None, intraday_store=None,
+                 table_name: str = RESAMPLED_TABLE):
+        """
+        Args:
+            duckdb_path: DuckDB 数据库路径（日线来源和缓存表所在库），默认使用配置中的路径
+            intraday_store: 1 分钟线来源（IntradayBarStore），默认为数据库旁边的分钟线存储
+            table_name: 缓存表名
+        """
+        if duckdb_path is None:
+            from config.env_config import get_default_db_path
+            duckdb_path = get_default_db_path()
+        self.duckdb_path = duckdb_path
+        if intraday_store is None:
+            from data_manager.intraday_store import IntradayBarStore, default_intraday_root
+            intraday_store = IntradayBarStore(default_intraday_root(duckdb_path))
+        self.intraday_store = intraday_store
+        self.table_name = table_name
+
+    def refresh(self, codes: Union[str, Sequence[str]], period: str, con=None) -> int:
+        """
+        增量刷新缓存（在下载/更新数据后调用，读取路径不再触发写入）
+
+        每只股票从缓存中最后一根所在的交易日（周线为所在周、月线为所在月）起重新合成，
+        未完成的最后一段会在之后的刷新中被替换。
+
+        Args:
+            codes: 股票代码
+            period: 目标周期
+            con: 调用方持有的读写连接（在其事务中写入），默认从连接池获取写连接
+
+        Returns:
+            int: 写入的K线数
+        """
+        from data_manager.duckdb_connection_pool import get_db_manager
+
+        if period not in RESAMPLE_SOURCES:
+            raise ValueError(f"不支持的重采样周期: {period}，支持: {sorted(RESAMPLE_SOURCES)}")
+        codes = [codes] if isinstance(codes, str) else list(dict.fromkeys(codes))
+        if not codes:
+            return 0
+
+        if con is not None:
+            written = self._refresh_with(con, codes, period)
+        else:
+            with get_db_manager(self.duckdb_path).get_write_connection() as con:
+                written = self._refresh_with(con, codes, period)
+        if written:
+            logger.info(f"重采样 {period}: {len(codes)} 只股票，写入 {written} 根K线")
+        return written
+
+    def get_bars(self, codes: Union[str, Sequence[str]], period: str,
+                 start: Optional[str] = None, end: Optional[str] = None,
+                 refresh: bool = True) -> pd.DataFrame:
+        """
+        读取合成的K线（长表：stock_code, time, open/high/low/close/volume/amount）
+
+        Args:
+            codes: 股票代码
+            period: 目标周期
+            start: 开始日期，包含
+            end: 结束日期，包含当天
+            refresh: 读取前是否先增量刷新缓存
+        """
+        from data_manager.duckdb_connection_pool import get_db_manager
+
+        codes = [codes] if isinstance(codes, str) else list(dict.fromkeys(codes))
+        if refresh:
+            self.refresh(codes, period)
+        with get_db_manager(self.duckdb_path).get_read_connection() as con:
+            return self.read_cached(con, codes, period, start, end)
+
+    def read_cached(self, con, codes: Union[str, Sequence[str]], period: str,
+                    start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """
+        通过调用方已有的连接（可以是只读连接）读取缓存，不刷新
+
+        缓存表不存在或读取失败时返回空表
+        """
+        codes = [codes] if isinstance(codes, str) else list(dict.fromkeys(codes))
+        where = ["r.period = ?"]
+        params: List = [period]
+        if start:
+            where.append("r.time >= ?")
+            params.append(pd.Timestamp(start))
+        if end:
+            where.append("r.time < ?")
+            params.append(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+
+        empty = pd.DataFrame(columns=['stock_code', 'time'] + BAR_FIELDS)
+        exists = con.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [self.table_name]
+        ).fetchone()[0]
+        if not exists:
+            return empty
+        con.register('resample_codes', pd.DataFrame({'stock_code': codes}))
+        try:
+            return con.execute(f"""
+                SELECT r.stock_code, r.time, {', '.join('r.' + f for f in BAR_FIELDS)}
+                FROM {self.table_name} r
+                JOIN resample_codes USING (stock_code)
+                WHERE {' AND '.join(where)}
+                ORDER BY r.stock_code, r.time
+            """, params).df()
+        except Exception as e:
+            logger.warning(f"读取重采样缓存失败: {e}")
+            return empty
+        finally:
+            con.unregister('resample_codes')
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+
+    def _refresh_with(self, con, codes: List[str], period: str) -> int:
+        self._ensure_table(con)
+        resume = self._resume_points(con, codes, period)
+        since = min(resume.values()) if len(resume) == len(codes) else None
+
+        if RESAMPLE_SOURCES[period] == '1d':
+            raw = self._read_daily(con, codes, since)
+        else:
+            raw = self._read_minutes(codes, since)
+        if raw.empty:
+            return 0
+
+        # 每只股票只保留各自起点之后的源数据
+        if resume:
+            starts = raw['stock_code'].map(resume)
+            raw = raw[starts.isna() | (raw['time'] >= starts)]
+        bars = resample_bars(raw, period)
+        if bars.empty:
+            return 0
+        bars.insert(1, 'period', period)
+
+        con.register('resume_points', pd.DataFrame({
+            'stock_code': pd.Series(list(resume.keys()), dtype=object),
+            'resume': pd.Series(list(resume.values()), dtype='datetime64[us]'),
+        }))
+        con.register('resampled_bars', bars)
+        try:
+            con.execute(f"""
+                DELETE FROM {self.table_name} AS t
+                USING resume_points AS r
+                WHERE t.stock_code = r.stock_code AND t.period = ? AND t.time >= r.resume
+            """, [period])
+            con.execute(f"""
+                INSERT INTO {self.table_name}
+                SELECT stock_code, period, time, {', '.join(BAR_FIELDS)}, ? FROM resampled_bars
+            """, [datetime.now()])
+        finally:
+            con.unregister('resume_points')
+            con.unregister('resampled_bars')
+        return len(bars)
+
+    def _ensure_table(self, con):
+        con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name} (
+                stock_code VARCHAR NOT NULL,
+                period VARCHAR NOT NULL,
+                time TIMESTAMP NOT NULL,
+                open DOUBLE,
+                high DOUBLE,
+                low DOUBLE,
+                close DOUBLE,
+                volume DOUBLE,
+                amount DOUBLE,
+                updated_at TIMESTAMP,
+                PRIMARY KEY (stock_code, period, time)
+            )
+        """)
+
+    def _resume_points(self, con, codes: List[str], period: str) -> Dict[str, pd.Timestamp]:
+        """一条 SQL 查询每只股票缓存中的最后时间，换算为刷新起点"""
+        con.register('resample_codes', pd.DataFrame({'stock_code': codes}))
+        try:
+            rows = con.execute(f"""
+                SELECT r.stock_code, MAX(r.time)
+                FROM {self.table_name} r
+                JOIN resample_codes USING (stock_code)
+                WHERE r.period = ?
+                GROUP BY r.stock_code
+            """, [period]).fetchall()
+        finally:
+            con.unregister('resample_codes')
+        return {code: _resume_point(pd.Timestamp(last), period) for code, last in rows if last is not None}
+
+    def _read_daily(self, con, codes: List[str], since: Optional[pd.Timestamp]) -> pd.DataFrame:
+        """从 stock_daily 读取日线"""
+        exists = con.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'stock_daily'"
+        ).fetchone()[0]
+        if not exists:
+            return pd.DataFrame()
+        sql = f"""
+            SELECT d.stock_code, CAST(d.date AS TIMESTAMP) AS time, {', '.join('d.' + f for f in BAR_FIELDS)}
+            FROM stock_daily d
+            JOIN resample_codes USING (stock_code)
+            WHERE d.period = '1d'
+        """
+        params = []
+        if since is not None:
+            sql += " AND d.date >= ?"
+            params.append(since.date())
+        con.register('resample_codes', pd.DataFrame({'stock_code': codes}))
+        try:
+            return con.execute(sql, params).df()
+        finally:
+            con.unregister('resample_codes')
+
+    def _read_minutes(self, codes: List[str], since: Optional[pd.Timestamp]) -> pd.DataFrame:
+        """从分钟线存储读取 1 分钟线"""
+        days = self.intraday_store.available_days('1m')
+        if not days:
+            return pd.DataFrame()
+        start = since.strftime('%Y-%m-%d') if since is not None else days[0]
+        return self.intraday_store.read(codes, start, days[-1], '1m')
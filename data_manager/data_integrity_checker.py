@@ -27,6 +27,13 @@ from smart_data_detector import SmartDataDetector, TradingCalendar
 
 from config.env_config import get_default_db_path
 
+# 质量检查参数（逐只检查与批量检查共用）
+QUALITY_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+EXTREME_RETURN = 0.20       # 单日涨跌幅阈值
+VOLUME_MIN_DAYS = 10        # 成交量检查所需最少天数
+VOLUME_STD_MULTIPLE = 5     # 成交量超过 均值 + N 倍标准差 视为异常
+
 
 class DataQualityReport:
     """数据质量报告"""
@@ -107,51 +114,47 @@ class DataIntegrityChecker:
         Returns:
             完整性报告
         """
-        report = DataQualityReport()
-
         # 1. 检查缺失交易日
         logger.info(f"[1/5] 检查缺失交易日...")
         missing_report = self.detector.detect_missing_data(stock_code, start_date, end_date)
 
-        if missing_report['missing_count'] > 0:
-            report.add_issue('WARNING',
-                           f"缺失 {missing_report['missing_count']} 个交易日: "
-                           f"{[str(d) for d in missing_report['missing_trading_days'][:10]]}"
-                           )
-        else:
-            report.add_issue('INFO', "交易日数据完整")
-
         # 2. 检查数据质量
         logger.info(f"[2/5] 检查数据质量...")
-        quality_issues = self._check_data_quality(stock_code, start_date, end_date)
-
-        for issue in quality_issues:
-            report.add_issue(issue['level'], issue['message'])
+        issues = self._check_data_quality(stock_code, start_date, end_date)
 
         # 3. 检查价格关系
         logger.info(f"[3/5] 检查价格关系...")
-        price_issues = self._check_price_relations(stock_code, start_date, end_date)
-
-        for issue in price_issues:
-            report.add_issue(issue['level'], issue['message'])
+        issues += self._check_price_relations(stock_code, start_date, end_date)
 
         # 4. 检查异常值
         logger.info(f"[4/5] 检查异常值...")
-        outlier_issues = self._check_outliers(stock_code, start_date, end_date)
-
-        for issue in outlier_issues:
-            report.add_issue(issue['level'], issue['message'])
+        issues += self._check_outliers(stock_code, start_date, end_date)
 
         # 5. 检查成交量异常
         if detailed:
             logger.info(f"[5/5] 检查成交量...")
-            volume_issues = self._check_volume_anomalies(stock_code, start_date, end_date)
+            issues += self._check_volume_anomalies(stock_code, start_date, end_date)
+
+        return self._build_summary(stock_code, start_date, end_date, missing_report, issues)
 
-            for issue in volume_issues:
-                report.add_issue(issue['level'], issue['message'])
+    @staticmethod
+    def _build_summary(stock_code: str, start_date: str, end_date: str,
+                       missing_report: Dict, issues: List[Dict]) -> Dict:
+        """汇总缺失交易日与质量问题，生成完整性报告"""
+        report = DataQualityReport()
 
-        # 汇总报告
-        summary = {
+        if missing_report['missing_count'] > 0:
+            report.add_issue('WARNING',
+                           f"缺失 {missing_report['missing_count']} 个交易日: "
+                           f"{[str(d) for d in missing_report['missing_trading_days'][:10]]}"
+                           )
+        else:
+            report.add_issue('INFO', "交易日数据完整")
+
+        for issue in issues:
+            report.add_issue(issue['level'], issue['message'])
+
+        return {
             'stock_code': stock_code,
             'check_range': (start_date, end_date),
             'missing_trading_days': missing_report['missing_count'],
@@ -166,8 +169,6 @@ class DataIntegrityChecker:
             )
         }
 
-        return summary
-
     def _check_data_quality(self, stock_code: str, start_date: str, end_date: str) -> List[Dict]:
         """检查数据质量"""
         issues = []
@@ -197,7 +198,7 @@ class DataIntegrityChecker:
                     })
 
             # 检查零值或负值价格
-            for col in ['open', 'high', 'low', 'close']:
+            for col in PRICE_COLUMNS:
                 if col in df.columns:
                     invalid_count = (df[col] <= 0).sum()
                     if invalid_count > 0:
@@ -278,7 +279,7 @@ class DataIntegrityChecker:
 
             # 检查异常波动（单日涨跌幅超过 20%）
             returns = df['close'].pct_change()
-            extreme_returns = returns[returns.abs() > 0.20]
+            extreme_returns = returns[returns.abs() > EXTREME_RETURN]
 
             if len(extreme_returns) > 0:
                 dates_str = [str(d) for d in df.loc[extreme_returns.index, 'date'].tolist()[:5]]
@@ -312,13 +313,13 @@ class DataIntegrityChecker:
         try:
             df = self.detector.con.execute(query).df()
 
-            if df.empty or len(df) < 10:
+            if df.empty or len(df) < VOLUME_MIN_DAYS:
                 return []
 
             # 检查成交量异常（超过均值的 5 倍）
             volume_mean = df['volume'].mean()
             volume_std = df['volume'].std()
-            outliers = df[df['volume'] > volume_mean + 5 * volume_std]
+            outliers = df[df['volume'] > volume_mean + VOLUME_STD_MULTIPLE * volume_std]
 
             if len(outliers) > 0:
                 dates_str = [str(d) for d in outliers['date'].tolist()[:5]]
@@ -336,30 +337,127 @@ class DataIntegrityChecker:
         return issues
 
     def batch_check_integrity(self,
-                              stock_codes: List[str],
+                              stock_codes: Optional[List[str]],
                               start_date: str,
-                              end_date: str) -> Dict[str, Dict]:
+                              end_date: str,
+                              detailed: bool = True) -> Dict[str, Dict]:
         """
         批量检查多只股票的数据完整性
 
+        缺失交易日由 SmartDataDetector.batch_detect_missing 一次算出；
+        空值/非正价格/价格关系/涨跌幅/成交量检查用一条按股票分组的窗口查询完成，
+        检查规则与 check_integrity 相同。
+
         Args:
-            stock_codes: 股票代码列表
+            stock_codes: 股票代码列表，None 表示 stock_daily 中的全部股票
             start_date: 检查开始日期
             end_date: 检查结束日期
+            detailed: 是否执行成交量检查
 
         Returns:
             股票代码到完整性报告的字典
         """
-        reports = {}
+        missing_reports = self.detector.batch_detect_missing(stock_codes, start_date, end_date)
+        stock_codes = list(missing_reports)
+        logger.info(f"批量检查 {len(stock_codes)} 只股票: {start_date} ~ {end_date}")
 
-        total = len(stock_codes)
-        for i, stock_code in enumerate(stock_codes, 1):
-            logger.info(f"\n检查进度: {i}/{total} - {stock_code}")
-            report = self.check_integrity(stock_code, start_date, end_date)
-            reports[stock_code] = report
+        try:
+            stats = self._batch_quality_stats(stock_codes, start_date, end_date)
+        except Exception as e:
+            error = [{'level': 'ERROR', 'message': f'数据质量检查失败: {e}'}]
+            stats = None
 
+        reports = {}
+        for stock_code in stock_codes:
+            issues = error if stats is None else self._quality_issues_from_stats(stats.get(stock_code), detailed)
+            reports[stock_code] = self._build_summary(stock_code, start_date, end_date,
+                                                      missing_reports[stock_code], issues)
         return reports
 
+    def _batch_quality_stats(self, stock_codes: List[str], start_date: str, end_date: str) -> Dict[str, Dict]:
+        """一条分组窗口查询统计所有股票的质量指标"""
+        null_columns = ', '.join(f"COUNT(*) FILTER (WHERE {col} IS NULL) AS null_{col}"
+                                 for col in QUALITY_COLUMNS)
+        nonpositive_columns = ', '.join(f"COUNT(*) FILTER (WHERE {col} <= 0) AS nonpositive_{col}"
+                                        for col in PRICE_COLUMNS)
+        con = self.detector.con
+        con.register('check_codes', pd.DataFrame({'stock_code': stock_codes}, dtype=object))
+        try:
+            df = con.execute(f"""
+                WITH bars AS (
+                    SELECT d.stock_code, d.date, d.open, d.high, d.low, d.close, d.volume,
+                           d.close / LAG(d.close) OVER (PARTITION BY d.stock_code ORDER BY d.date) - 1 AS ret
+                    FROM stock_daily d
+                    JOIN check_codes c USING (stock_code)
+                    WHERE d.date >= CAST(? AS DATE) AND d.date <= CAST(? AS DATE)
+                ),
+                volumes AS (
+                    SELECT stock_code, date, volume,
+                           COUNT(*) OVER w AS n,
+                           AVG(volume) OVER w AS volume_mean,
+                           STDDEV_SAMP(volume) OVER w AS volume_std
+                    FROM bars
+                    WHERE volume > 0
+                    WINDOW w AS (PARTITION BY stock_code)
+                ),
+                volume_stats AS (
+                    SELECT stock_code,
+                           COUNT(*) AS volume_outliers,
+                           LIST(date ORDER BY date) AS volume_outlier_dates
+                    FROM volumes
+                    WHERE n >= {VOLUME_MIN_DAYS} AND volume > volume_mean + {VOLUME_STD_MULTIPLE} * volume_std
+                    GROUP BY stock_code
+                ),
+                bar_stats AS (
+                    SELECT stock_code,
+                           COUNT(*) AS row_count,
+                           {null_columns},
+                           {nonpositive_columns},
+                           COUNT(*) FILTER (WHERE high < GREATEST(open, close)) AS invalid_high,
+                           COUNT(*) FILTER (WHERE low > LEAST(open, close)) AS invalid_low,
+                           COUNT(*) FILTER (WHERE ABS(ret) > {EXTREME_RETURN}) AS extreme_returns,
+                           LIST(date ORDER BY date) FILTER (WHERE ABS(ret) > {EXTREME_RETURN}) AS extreme_dates
+                    FROM bars
+                    GROUP BY stock_code
+                )
+                SELECT b.*, COALESCE(v.volume_outliers, 0) AS volume_outliers, v.volume_outlier_dates
+                FROM bar_stats b
+                LEFT JOIN volume_stats v USING (stock_code)
+            """, [start_date, end_date]).df()
+        finally:
+            con.unregister('check_codes')
+        return {row['stock_code']: row for row in df.to_dict('records')}
+
+    @staticmethod
+    def _quality_issues_from_stats(stats: Optional[Dict], detailed: bool) -> List[Dict]:
+        """把分组统计转换为与逐只检查相同的问题列表"""
+        if not stats or not stats['row_count']:
+            return [{'level': 'ERROR', 'message': '数据库中无数据'}]
+
+        issues = []
+        for col in QUALITY_COLUMNS:
+            if stats[f'null_{col}']:
+                issues.append({'level': 'ERROR', 'message': f"{col} 列有 {stats[f'null_{col}']} 个空值"})
+        for col in PRICE_COLUMNS:
+            if stats[f'nonpositive_{col}']:
+                issues.append({'level': 'ERROR', 'message': f"{col} 列有 {stats[f'nonpositive_{col}']} 个非正值"})
+
+        if stats['invalid_high']:
+            issues.append({'level': 'WARNING',
+                           'message': f"有 {stats['invalid_high']} 条数据的最高价小于开盘价或收盘价"})
+        if stats['invalid_low']:
+            issues.append({'level': 'WARNING',
+                           'message': f"有 {stats['invalid_low']} 条数据的最低价大于开盘价或收盘价"})
+        if stats['extreme_returns']:
+            dates_str = [str(d.date()) for d in pd.to_datetime(list(stats['extreme_dates'])[:5])]
+            issues.append({'level': 'WARNING',
+                           'message': f"有 {stats['extreme_returns']} 天的涨跌幅超过 20%: {dates_str}..."})
+        if detailed and stats['volume_outliers']:
+            dates_str = [str(d.date()) for d in pd.to_datetime(list(stats['volume_outlier_dates'])[:5])]
+            issues.append({'level': 'INFO',
+                           'message': f"有 {stats['volume_outliers']} 天的成交量异常偏高: {dates_str}..."})
+        return issues
+
     def generate_integrity_report(self, reports: Dict[str, Dict]) -> str:
         """
         生成完整性检查报告
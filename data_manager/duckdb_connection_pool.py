@@ -289,6 +289,68 @@ class DuckDBConnectionManager:
             return len(df)
 
 
+# stock_daily 结构的行情表：主键与写入列
+BAR_KEY_COLUMNS = ['stock_code', 'date', 'period']
+BAR_VALUE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+def upsert_stock_bars(con, data, table_name: str = 'stock_daily') -> int:
+    """
+    一条 INSERT ... SELECT 批量写入行情数据，(stock_code, date, period) 冲突时更新
+
+    Args:
+        con: DuckDB 写连接（通常来自 get_write_connection，处于事务中）
+        data: DataFrame 或 Arrow 表，列为 stock_code/symbol_type/date/period 与 BAR_VALUE_COLUMNS
+        table_name: 目标表
+
+    Returns:
+        int: 写入的记录数
+
+    表有对应主键时使用 ON CONFLICT DO UPDATE（保留 created_at）；
+    没有主键约束的表先删除同键旧数据再插入。
+    """
+    from datetime import datetime
+
+    rows = data.num_rows if hasattr(data, 'num_rows') else len(data)
+    if rows == 0:
+        return 0
+
+    now = datetime.now()
+    columns = ['stock_code', 'symbol_type', 'date', 'period'] + BAR_VALUE_COLUMNS + ['created_at', 'updated_at']
+    select_sql = """
+        SELECT stock_code, symbol_type, CAST(date AS DATE), period,
+               open, high, low, close, CAST(volume AS BIGINT), amount, ?, ?
+        FROM incoming_bars
+    """
+
+    con.register('incoming_bars', data)
+    try:
+        pk_rows = con.execute("""
+            SELECT constraint_column_names FROM duckdb_constraints()
+            WHERE table_name = ? AND constraint_type = 'PRIMARY KEY'
+        """, [table_name]).fetchall()
+        has_key = any(sorted(row[0]) == sorted(BAR_KEY_COLUMNS) for row in pk_rows)
+
+        if has_key:
+            updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in BAR_VALUE_COLUMNS + ['updated_at'])
+            con.execute(f"""
+                INSERT INTO {table_name} ({', '.join(columns)}) {select_sql}
+                ON CONFLICT ({', '.join(BAR_KEY_COLUMNS)}) DO UPDATE SET {updates}
+            """, [now, now])
+        else:
+            con.execute(f"""
+                DELETE FROM {table_name}
+                WHERE (stock_code, date, period) IN (
+                    SELECT stock_code, CAST(date AS DATE), period FROM incoming_bars
+                )
+            """)
+            con.execute(f"INSERT INTO {table_name} ({', '.join(columns)}) {select_sql}", [now, now])
+    finally:
+        con.unregister('incoming_bars')
+
+    return rows
+
+
 # 全局单例
 _db_manager = None
 _db_managers = {}
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分钟线列式存储
+按 周期 / 交易日 / 代码分桶 分区的 Parquet 文件，与日线 DuckDB 库分开存放
+
+目录结构：
+    <root>/period=1m/date=2024-01-02/bucket=03/part-<时间戳>.parquet   盘中追加的分片
+    <root>/period=1m/date=2024-01-02/bucket=03/data.parquet            收盘压缩后的文件
+
+- 每个文件内按 (stock_code, time) 排序，Parquet 行组自带 min/max 统计（zone map），
+  查询少量代码时 DuckDB 只读取命中的行组
+- 读取某一交易日时只打开该日、所需代码所在分桶的文件，不扫描其他日期
+- 盘中每次追加写一个新分片；compact_day() 把同一分桶的分片合并、去重、重排为一个文件，
+  同一 (代码, 时间) 以最后写入的分片为准
+"""
+
+import logging
+import os
+import time
+import uuid
+import zlib
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import duckdb
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 存入分钟线存储的周期
+INTRADAY_PERIODS = ('1m', '5m', '15m', '30m', '60m')
+
+# 行情字段（Parquet 中的列顺序为 stock_code, time + 这些字段）
+BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+# 分钟线存储目录的环境变量
+INTRADAY_STORE_ENV = 'EASYXT_INTRADAY_STORE_DIR'
+
+COMPACTED_FILE = 'data.parquet'
+
+DateLike = Union[str, date, datetime, pd.Timestamp]
+
+
+def default_intraday_root(duckdb_path: Optional[str] = None) -> str:
+    """分钟线存储目录：环境变量优先，否则为 DuckDB 文件同目录下的 intraday"""
+    env_dir = os.environ.get(INTRADAY_STORE_ENV)
+    if env_dir:
+        return env_dir
+    if duckdb_path is None:
+        from config.env_config import get_default_db_path
+        duckdb_path = get_default_db_path()
+    return str(Path(duckdb_path).parent / 'intraday')
+
+
+def symbol_bucket(stock_code: str, buckets: int) -> int:
+    """代码所在分桶（crc32，跨进程稳定）"""
+    return zlib.crc32(stock_code.encode('utf-8')) % buckets
+
+
+def _day_str(day: DateLike) -> str:
+    return pd.Timestamp(str(day)).strftime('%Y-%m-%d')
+
+
+def _sql_list(paths: Sequence[Path]) -> str:
+    return '[' + ', '.join("'" + str(p).replace("'", "''") + "'" for p in paths) + ']'
+
+
+class IntradayBarStore:
+    """
+    分钟线列式存储
+
+    使用方式：
+        store = IntradayBarStore(default_intraday_root())
+        store.append(df, period='1m')                    # 盘中追加
+        store.compact_day('2024-01-02', period='1m')     # 收盘后压缩
+        panel = store.read_day_panel('2024-01-02', codes, field='close')
+    """
+
+    def __init__(self, root: Union[str, Path], buckets: int = 16, row_group_size: int = 8192):
+        """
+        Args:
+            root: 存储根目录
+            buckets: 每个交易日的代码分桶数（建库后不可更改）
+            row_group_size: Parquet 行组大小，越小 zone map 越细（最小 2048）
+        """
+        self.root = Path(root)
+        self.buckets = max(1, int(buckets))
+        self.row_group_size = max(2048, int(row_group_size))
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, data: pd.DataFrame, period: str = '1m', stock_code: Optional[str] = None) -> int:
+        """
+        追加分钟线，按交易日和分桶各写一个分片
+
+        Args:
+            data: K线数据，时间在索引或 time/datetime/date 列中，代码在 stock_code/code 列中
+            period: 周期
+            stock_code: data 中没有代码列时使用的代码
+
+        Returns:
+            int: 写入的记录数
+        """
+        df = self._normalize(data, stock_code)
+        if df.empty:
+            return 0
+
+        df['_day'] = df['time'].dt.strftime('%Y-%m-%d')
+        bucket_of = {code: symbol_bucket(code, self.buckets) for code in df['stock_code'].unique()}
+        df['_bucket'] = df['stock_code'].map(bucket_of)
+
+        con = duckdb.connect()
+        try:
+            for (day, bucket), part in df.groupby(['_day', '_bucket'], sort=False):
+                bucket_dir = self._bucket_dir(period, day, bucket)
+                bucket_dir.mkdir(parents=True, exist_ok=True)
+                name = f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+                self._write_sorted(con, part.drop(columns=['_day', '_bucket']), bucket_dir / name)
+        finally:
+            con.close()
+
+        logger.debug(f"分钟线追加 {len(df)} 条 ({period})")
+        return len(df)
+
+    def compact_day(self, day: DateLike, period: str = '1m') -> int:
+        """
+        压缩某个交易日：每个分桶的分片合并、去重、按 (stock_code, time) 重排为一个文件
+
+        Returns:
+            int: 被合并的文件数
+        """
+        day_dir = self.root / f"period={period}" / f"date={_day_str(day)}"
+        if not day_dir.exists():
+            return 0
+
+        merged = 0
+        con = duckdb.connect()
+        try:
+            for bucket_dir in sorted(p for p in day_dir.iterdir() if p.is_dir()):
+                files = sorted(bucket_dir.glob('*.parquet'))
+                if not files or [f.name for f in files] == [COMPACTED_FILE]:
+                    continue
+                tmp = bucket_dir / f".compact-{uuid.uuid4().hex[:8]}.tmp"
+                con.execute(f"""
+                    COPY ({self._select_sql(files, dedupe=True)} ORDER BY stock_code, time)
+                    TO '{tmp}' (FORMAT PARQUET, ROW_GROUP_SIZE {self.row_group_size}, COMPRESSION ZSTD)
+                """)
+                os.replace(tmp, bucket_dir / COMPACTED_FILE)
+                # 压缩期间新追加的分片不在 files 中，会保留到下次压缩
+                for f in files:
+                    if f.name != COMPACTED_FILE:
+                        f.unlink()
+                merged += len(files)
+        finally:
+            con.close()
+
+        if merged:
+            logger.info(f"分钟线压缩完成: {period} {_day_str(day)}，合并 {merged} 个文件")
+        return merged
+
+    def compact(self, period: Optional[str] = None) -> Dict[str, int]:
+        """压缩所有存在未合并分片的交易日，返回 {'周期 日期': 合并文件数}"""
+        periods = [period] if period else self.periods()
+        result = {}
+        for p in periods:
+            for day in self.available_days(p):
+                day_dir = self.root / f"period={p}" / f"date={day}"
+                if any(day_dir.glob('bucket=*/part-*.parquet')):
+                    result[f"{p} {day}"] = self.compact_day(day, p)
+        return result
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def read_day(self, day: DateLike, codes: Optional[Sequence[str]] = None, period: str = '1m',
+                 fields: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        读取一个交易日的分钟线（长表：stock_code, time, 字段...，按代码和时间排序）
+
+        Args:
+            day: 交易日
+            codes: 股票代码，None 表示全部
+            period: 周期
+            fields: 行情字段，默认全部
+        """
+        return self.read(codes, day, day, period, fields)
+
+    def read_day_panel(self, day: DateLike, codes: Optional[Sequence[str]] = None, period: str = '1m',
+                       field: Union[str, Sequence[str]] = 'close') -> pd.DataFrame:
+        """
+        读取一个交易日的面板：索引为时间，列为代码；field 为列表时列为 (字段, 代码)
+        """
+        fields = [field] if isinstance(field, str) else list(field)
+        df = self.read_day(day, codes, period, fields)
+        panel = df.pivot(index='time', columns='stock_code', values=field)
+        if codes is not None and isinstance(field, str):
+            panel = panel.reindex(columns=[c for c in codes if c in panel.columns])
+        return panel
+
+    def read(self, codes: Optional[Sequence[str]], start: DateLike, end: DateLike, period: str = '1m',
+             fields: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        读取日期区间内的分钟线（长表）
+
+        只打开区间内交易日、所需分桶的文件；代码条件下推到 Parquet 扫描，
+        按 zone map 跳过不含这些代码的行组。
+        """
+        fields = list(fields) if fields else list(BAR_FIELDS)
+        unknown = set(fields) - set(BAR_FIELDS)
+        if unknown:
+            raise ValueError(f"未知字段: {sorted(unknown)}")
+        columns = ['stock_code', 'time'] + fields
+        if isinstance(codes, str):
+            codes = [codes]
+
+        files, dedupe = self._files(period, _day_str(start), _day_str(end), codes)
+        if not files:
+            return pd.DataFrame(columns=columns)
+
+        start_ts = pd.Timestamp(_day_str(start))
+        end_ts = pd.Timestamp(_day_str(end)) + pd.Timedelta(days=1)
+        where = ["time >= ?", "time < ?"]
+        params: List = [start_ts, end_ts]
+        if codes is not None:
+            codes = sorted(set(codes))
+            # 显式的上下界保证按行组统计裁剪，IN 列表再做精确过滤
+            where.append(f"stock_code BETWEEN ? AND ? AND stock_code IN ({', '.join('?' * len(codes))})")
+            params += [codes[0], codes[-1]] + codes
+
+        sql = (f"SELECT {', '.join(columns)} FROM ({self._select_sql(files, dedupe)}) "
+               f"WHERE {' AND '.join(where)} ORDER BY stock_code, time")
+        con = duckdb.connect()
+        try:
+            return con.execute(sql, params).df()
+        finally:
+            con.close()
+
+    def available_days(self, period: str = '1m') -> List[str]:
+        """已有数据的交易日（YYYY-MM-DD）"""
+        period_dir = self.root / f"period={period}"
+        if not period_dir.exists():
+            return []
+        return sorted(p.name[len('date='):] for p in period_dir.glob('date=*') if p.is_dir())
+
+    def periods(self) -> List[str]:
+        """已有数据的周期"""
+        if not self.root.exists():
+            return []
+        return sorted(p.name[len('period='):] for p in self.root.glob('period=*') if p.is_dir())
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+
+    def _bucket_dir(self, period: str, day: str, bucket: int) -> Path:
+        return self.root / f"period={period}" / f"date={day}" / f"bucket={bucket:02d}"
+
+    def _files(self, period: str, start: str, end: str, codes: Optional[Sequence[str]]):
+        """区间内需要读取的文件，以及是否存在未压缩的分桶（需要去重）"""
+        buckets = None if codes is None else {symbol_bucket(c, self.buckets) for c in codes}
+        files: List[Path] = []
+        dedupe = False
+        for day in self.available_days(period):
+            if not start <= day <= end:
+                continue
+            day_dir = self.root / f"period={period}" / f"date={day}"
+            for bucket_dir in sorted(day_dir.glob('bucket=*')):
+                if buckets is not None and int(bucket_dir.name[len('bucket='):]) not in buckets:
+                    continue
+                bucket_files = sorted(bucket_dir.glob('*.parquet'))
+                dedupe = dedupe or len(bucket_files) > 1
+                files.extend(bucket_files)
+        return files, dedupe
+
+    @staticmethod
+    def _select_sql(files: Sequence[Path], dedupe: bool) -> str:
+        """读取文件的 SELECT；dedupe 时同一 (代码, 时间) 取文件名最大的分片（最后写入）"""
+        source = f"read_parquet({_sql_list(files)}, filename=true, hive_partitioning=false)"
+        columns = ', '.join(['stock_code', 'time'] + BAR_FIELDS)
+        if not dedupe:
+            return f"SELECT {columns} FROM {source}"
+        return (f"SELECT {columns} FROM {source} "
+                f"QUALIFY ROW_NUMBER() OVER (PARTITION BY stock_code, time ORDER BY filename DESC) = 1")
+
+    def _write_sorted(self, con, df: pd.DataFrame, path: Path):
+        """按 (stock_code, time) 排序写 Parquet（先写临时文件再改名，读者不会看到半个文件）"""
+        tmp = path.with_name(f".{path.name}.tmp")
+        con.register('intraday_part', df)
+        try:
+            con.execute(f"""
+                COPY (SELECT stock_code, time, {', '.join(BAR_FIELDS)} FROM intraday_part
+                      ORDER BY stock_code, time)
+                TO '{tmp}' (FORMAT PARQUET, ROW_GROUP_SIZE {self.row_group_size}, COMPRESSION ZSTD)
+            """)
+        finally:
+            con.unregister('intraday_part')
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _normalize(data: pd.DataFrame, stock_code: Optional[str]) -> pd.DataFrame:
+        """统一为 stock_code, time(无时区的北京时间), 行情字段"""
+        if data is None or data.empty:
+            return pd.DataFrame()
+        df = data
+        if 'time' not in df.columns and 'datetime' not in df.columns and 'date' not in df.columns:
+            df = df.reset_index()
+            df = df.rename(columns={df.columns[0]: 'time'})
+        df = df.rename(columns={'datetime': 'time', 'date': 'time', 'code': 'stock_code'})
+        if 'stock_code' not in df.columns:
+            if not stock_code:
+                raise ValueError("数据中没有 stock_code 列，需要指定 stock_code")
+            df = df.assign(stock_code=stock_code)
+
+        times = df['time']
+        if pd.api.types.is_numeric_dtype(times):
+            # QMT 毫秒时间戳
+            times = pd.to_datetime(times, unit='ms', utc=True)
+        else:
+            times = pd.to_datetime(times)
+        if times.dt.tz is not None:
+            times = times.dt.tz_convert('Asia/Shanghai').dt.tz_localize(None)
+
+        out = pd.DataFrame({'stock_code': df['stock_code'].astype(str).values,
+                            'time': times.astype('datetime64[us]').values})
+        for field in BAR_FIELDS:
+            out[field] = pd.to_numeric(df[field], errors='coerce').astype('float64').values \
+                if field in df.columns else float('nan')
+        return out.dropna(subset=['time'])
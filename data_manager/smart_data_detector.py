@@ -18,6 +18,7 @@ from datetime import datetime, date, timedelta
 import duckdb
 
 from config.env_config import get_default_db_path
+from core.trading_calendar import TradingCalendarService, get_trading_calendar
 
 import logging
 
@@ -27,120 +28,21 @@ logger = logging.getLogger(__name__)
 class TradingCalendar:
     """
     A股交易日历管理器
-    内置完整的A股交易日历，用于数据完整性检查
+    core.trading_calendar 共享日历服务的适配层（日期以 date 对象进出），用于数据完整性检查
     """
 
-    def __init__(self):
-        """初始化交易日历"""
-        self.holidays = self._load_holidays()
-
-    def _load_holidays(self) -> set:
-        """
-        加载A股节假日和周末
-        返回非交易日的日期集合
+    def __init__(self, service: Optional[TradingCalendarService] = None):
         """
-        # 生成2000年至今的所有周末和主要节假日
-        holidays = set()
-
-        # 生成周末
-        start_date = date(2000, 1, 1)
-        end_date = date(2030, 12, 31)
-
-        current_date = start_date
-        while current_date <= end_date:
-            # 周六周日
-            if current_date.weekday() >= 5:
-                holidays.add(current_date)
-            current_date += timedelta(days=1)
-
-        # 添加主要节假日（春节、国庆等）
-        # 这些是固定的或常见的节假日，实际应用中应该从官方日历获取
-        major_holidays = [
-            # 元旦
-            *self._generate_holiday_range(date(2000, 1, 1), date(2000, 1, 3)),
-            # 春节（每年不同，这里只是示例）
-            *self._generate_spring_festival_holidays(),
-            # 清明节
-            *self._generate_qingming_holidays(),
-            # 劳动节
-            *self._generate_holiday_range(date(2000, 5, 1), date(2000, 5, 7)),
-            # 端午节
-            *self._generate_dragon_boat_holidays(),
-            # 中秋节
-            *self._generate_mid_autumn_holidays(),
-            # 国庆节
-            *self._generate_holiday_range(date(2000, 10, 1), date(2000, 10, 10)),
-        ]
-
-        holidays.update(major_holidays)
-
-        return holidays
-
-    def _generate_holiday_range(self, start: date, end: date) -> List[date]:
-        """生成节假日范围"""
-        dates = []
-        current = start
-        while current <= end:
-            dates.append(current)
-            current = current + timedelta(days=1)
-        return dates
-
-    def _generate_spring_festival_holidays(self) -> List[date]:
-        """生成春节假期（2000-2030）"""
-        # 春节日期表（农历正月初一对应的公历日期）
-        spring_festivals = {
-            2024: (2, 10),
-            2025: (1, 29),
-            2026: (2, 17),
-            2027: (2, 6),
-            2028: (1, 26),
-            2029: (2, 13),
-            2030: (2, 3),
-        }
+        初始化交易日历
 
-        holidays = []
-        for year, (month, day) in spring_festivals.items():
-            # 春节假期通常从除夕到初七（8天）
-            festival_date = date(year, month, day)
-            for i in range(-1, 7):  # 除夕到初七
-                holidays.append(festival_date + timedelta(days=i))
-
-        return holidays
-
-    def _generate_qingming_holidays(self) -> List[date]:
-        """生成清明节假期（通常4月4-6日）"""
-        holidays = []
-        for year in range(2000, 2031):
-            # 清明节通常是4月4日或5日
-            for day in [4, 5, 6]:
-                holidays.append(date(year, 4, day))
-        return holidays
-
-    def _generate_dragon_boat_holidays(self) -> List[date]:
-        """生成端午节假期（通常5月28-30日）"""
-        holidays = []
-        for year in range(2000, 2031):
-            for day in [28, 29, 30]:
-                try:
-                    holidays.append(date(year, 5, day))
-                except Exception:
-                    pass
-        return holidays
-
-    def _generate_mid_autumn_holidays(self) -> List[date]:
-        """生成中秋节假期（通常9月中旬）"""
-        holidays = []
-        for year in range(2000, 2031):
-            for day in range(15, 18):
-                try:
-                    holidays.append(date(year, 9, day))
-                except Exception:
-                    pass
-        return holidays
+        Args:
+            service: 交易日历服务，默认使用进程内共享的实例
+        """
+        self.service = service or get_trading_calendar()
 
     def is_trading_day(self, check_date: date) -> bool:
         """判断是否为交易日"""
-        return check_date not in self.holidays
+        return self.service.is_trading_day(check_date)
 
     def get_trading_days(self, start_date: date, end_date: date) -> List[date]:
         """
@@ -153,15 +55,7 @@ class TradingCalendar:
         Returns:
             交易日列表
         """
-        trading_days = []
-        current_date = start_date
-
-        while current_date <= end_date:
-            if self.is_trading_day(current_date):
-                trading_days.append(current_date)
-            current_date += timedelta(days=1)
-
-        return trading_days
+        return self.service.to_dates(self.service.range(start_date, end_date))
 
     def get_missing_trading_days(self, start_date: date, end_date: date,
                                  existing_dates: List[date]) -> List[date]:
@@ -339,30 +233,143 @@ class SmartDataDetector:
         return segments
 
     def batch_detect_missing(self,
-                             stock_codes: List[str],
+                             stock_codes: Optional[List[str]],
                              start_date: str,
                              end_date: str) -> Dict[str, Dict]:
         """
-        批量检测多只股票的数据缺失情况
+        批量检测多只股票的数据缺失情况（全市场一次 SQL）
+
+        交易日历注册为临时表，与每只股票的检查区间（有 stock_basic.list_date 时从上市日开始）
+        交叉连接后，与 stock_daily 做反连接得到全部缺失的 (股票, 交易日)，
+        再按"交易日序号 - 行号"分组（gaps-and-islands）合并为连续缺失段。
 
         Args:
-            stock_codes: 股票代码列表
+            stock_codes: 股票代码列表，None 表示 stock_daily 中的全部股票
             start_date: 检查开始日期
             end_date: 检查结束日期
 
         Returns:
-            股票代码到缺失报告的字典
+            股票代码到缺失报告的字典；报告结构与 detect_missing_data 相同，
+            但 existing_data 中不含逐日的 dates 列表
         """
+        if not self.con:
+            logger.error("[ERROR] 请先连接数据库")
+            return {}
+
+        start = pd.to_datetime(start_date).date()
+        end = pd.to_datetime(end_date).date()
+        calendar = self.calendar.service.range(start, end)
+
+        try:
+            if stock_codes is None:
+                stock_codes = [row[0] for row in self.con.execute(
+                    "SELECT DISTINCT stock_code FROM stock_daily ORDER BY stock_code").fetchall()]
+            self.con.register('detect_codes', pd.DataFrame({'stock_code': list(stock_codes)}, dtype=object))
+            self.con.register('detect_calendar', pd.DataFrame({
+                'date': calendar.astype('datetime64[ns]'), 'day_index': np.arange(len(calendar))}))
+            try:
+                listing = self._listing_dates_sql()
+                universe = f"""
+                    SELECT c.stock_code, GREATEST(CAST(? AS DATE), COALESCE(l.list_date, CAST(? AS DATE))) AS range_start
+                    FROM detect_codes c LEFT JOIN ({listing}) l USING (stock_code)
+                """
+                existing = self.con.execute(f"""
+                    WITH universe AS ({universe})
+                    SELECT u.stock_code, u.range_start, MIN(d.date), MAX(d.date), COUNT(DISTINCT d.date)
+                    FROM universe u
+                    LEFT JOIN stock_daily d
+                      ON d.stock_code = u.stock_code AND d.date >= CAST(? AS DATE) AND d.date <= CAST(? AS DATE)
+                    GROUP BY u.stock_code, u.range_start
+                """, [start, start, start, end]).fetchall()
+                segments = self.con.execute(f"""
+                    WITH universe AS ({universe}),
+                    missing AS (
+                        SELECT u.stock_code, cal.date, cal.day_index
+                        FROM universe u
+                        JOIN (SELECT CAST(date AS DATE) AS date, day_index FROM detect_calendar) cal
+                          ON cal.date >= u.range_start
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM stock_daily d
+                            WHERE d.stock_code = u.stock_code AND d.date = cal.date
+                        )
+                    )
+                    SELECT stock_code, MIN(day_index), MAX(day_index)
+                    FROM (
+                        SELECT *, day_index - ROW_NUMBER() OVER (PARTITION BY stock_code ORDER BY date) AS island
+                        FROM missing
+                    )
+                    GROUP BY stock_code, island
+                    ORDER BY stock_code, MIN(day_index)
+                """, [start, start]).fetchall()
+            finally:
+                self.con.unregister('detect_codes')
+                self.con.unregister('detect_calendar')
+        except Exception as e:
+            logger.error(f"[ERROR] 批量缺失检测失败，改为逐只检测: {e}")
+            if stock_codes is None:
+                return {}
+            return {code: self.detect_missing_data(code, start_date, end_date) for code in stock_codes}
+
+        trading_days = pd.to_datetime(calendar).date
+        segments_by_code: Dict[str, List[Tuple[int, int]]] = {}
+        for stock_code, first, last in segments:
+            segments_by_code.setdefault(stock_code, []).append((first, last))
+
         reports = {}
+        for stock_code, range_start, first_date, last_date, count in existing:
+            expected = len(calendar) - int(np.searchsorted(calendar, np.datetime64(range_start, 'D')))
+            code_segments = segments_by_code.get(stock_code, [])
+            missing_days = [day for first, last in code_segments for day in trading_days[first:last + 1]]
+            reports[stock_code] = {
+                'stock_code': stock_code,
+                'check_range': (start_date, end_date),
+                'expected_trading_days': expected,
+                'existing_data': {
+                    'first_date': first_date,
+                    'last_date': last_date,
+                    'count': count,
+                },
+                'missing_trading_days': missing_days,
+                'missing_segments': [
+                    {'start': trading_days[first], 'end': trading_days[last], 'days': last - first + 1}
+                    for first, last in code_segments
+                ],
+                'missing_count': len(missing_days),
+                'completeness_ratio': count / expected if expected else 0
+            }
+
+        # 保持输入顺序
+        return {code: reports[code] for code in stock_codes if code in reports}
 
-        for stock_code in stock_codes:
-            report = self.detect_missing_data(stock_code, start_date, end_date)
-            reports[stock_code] = report
+    def _listing_dates_sql(self) -> str:
+        """
+        各股票上市日期的子查询；没有 stock_basic 表或查询失败时返回空结果
 
-        return reports
+        list_date 可能是 DATE，也可能是 tushare 写入的 'YYYYMMDD' 字符串，两种格式都解析，
+        无法解析的值视为未知上市日期。
+        """
+        empty = "SELECT NULL::VARCHAR AS stock_code, NULL::DATE AS list_date WHERE FALSE"
+        has_basic = self.con.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_name = 'stock_basic' AND column_name IN ('ts_code', 'list_date')
+        """).fetchone()[0] == 2
+        if not has_basic:
+            return empty
+        listing = """
+            SELECT ts_code AS stock_code,
+                   MIN(COALESCE(TRY_CAST(list_date AS DATE),
+                                TRY_STRPTIME(CAST(list_date AS VARCHAR), '%Y%m%d')::DATE)) AS list_date
+            FROM stock_basic GROUP BY ts_code
+        """
+        try:
+            self.con.execute(f"SELECT COUNT(*) FROM ({listing})").fetchone()
+        except Exception as e:
+            logger.warning(f"[WARN] 读取上市日期失败，按检查区间起点处理: {e}")
+            return empty
+        return listing
 
     def get_download_plan(self,
-                         stock_codes: List[str],
+                         stock_codes: Optional[List[str]],
                          start_date: str,
                          end_date: str) -> Dict:
         """
@@ -371,7 +378,7 @@ class SmartDataDetector:
         只下载缺失的数据段，避免重复下载
 
         Args:
-            stock_codes: 股票代码列表
+            stock_codes: 股票代码列表，None 表示 stock_daily 中的全部股票
             start_date: 检查开始日期
             end_date: 检查结束日期
 
@@ -410,7 +417,7 @@ class SmartDataDetector:
                 })
 
         plan = {
-            'total_stocks': len(stock_codes),
+            'total_stocks': len(reports),
             'stocks_with_missing_data': stocks_with_missing,
             'total_missing_days': total_missing_days,
             'download_tasks': download_tasks
@@ -12,6 +12,8 @@ import pandas as pd
 import numpy as np
 from typing import Optional, Union, List, Dict
 from datetime import datetime, timedelta
+from contextlib import contextmanager
+import threading
 import warnings
 
 import logging
@@ -33,12 +35,13 @@ class UnifiedDataInterface:
     5. 支持5种复权类型（通过QMT API按需获取，不预存复权列）
     """
 
-    def __init__(self, duckdb_path: str = None):
+    def __init__(self, duckdb_path: str = None, write_behind: bool = True):
         """
         初始化统一数据接口
 
         Args:
             duckdb_path: DuckDB数据库路径
+            write_behind: 从QMT获取的数据是否交给后台线程写入DuckDB（调用方不等待写锁和提交）
         """
         if duckdb_path is None:
             duckdb_path = get_default_db_path()
@@ -47,6 +50,11 @@ class UnifiedDataInterface:
         self.qmt_available = False
         self._tables_initialized = False  # 记录表是否已初始化
         self.db_manager = None  # 使用连接池管理器
+        self.intraday_store = None  # 分钟线列式存储（按需创建）
+        self.write_behind = write_behind
+        self._writer = None  # 后台写入队列（按需创建）
+        self._con_lock = threading.RLock()  # 保护 self.con：写入期间需要暂时关闭只读连接
+        self._reported_write_failures = 0  # 已告警的后台写入失败数
 
         # 尝试导入DuckDB
         try:
@@ -141,6 +149,31 @@ class UnifiedDataInterface:
             self.con = None
             return False
 
+    @contextmanager
+    def _write_connection(self):
+        """
+        获取写连接
+
+        同一进程内不能对同一个 DuckDB 文件同时持有只读连接和读写连接
+        （Can't open a connection to same database file with a different configuration），
+        写入期间先关闭 self.con，写完（提交或回滚）后重新以只读方式打开
+        """
+        from data_manager.duckdb_connection_pool import get_db_manager
+
+        if self.db_manager is None:
+            self.db_manager = get_db_manager(self.duckdb_path)
+        with self._con_lock:
+            reopen = self.con is not None
+            if reopen:
+                self.con.close()
+                self.con = None
+            try:
+                with self.db_manager.get_write_connection() as con:
+                    yield con
+            finally:
+                if reopen:
+                    self.connect(read_only=True)
+
     def _ensure_tables_exist(self):
         """确保所有必需的表都存在
 
@@ -189,52 +222,63 @@ class UnifiedDataInterface:
         """
         logger.info(f"\n[获取数据] {stock_code} | {start_date} ~ {end_date} | {period} | {adjust}")
 
-        # 确保数据库已连接
-        if self.duckdb_available and self.con is None:
-            self.connect(read_only=True)
+        # 确保数据库已连接（后台写入期间只读连接会被暂时关闭，持锁检查）
+        with self._con_lock:
+            if self.duckdb_available and self.con is None:
+                self.connect(read_only=True)
 
         # 确保表存在（修复首次使用问题）
         self._ensure_tables_exist()
 
+        # 该股票还有未写完的数据时先等待写入，避免读到旧数据后重复下载
+        if self._writer is not None and self._writer.is_pending((stock_code, period)):
+            self.flush()
+
         # Step 1: 尝试从DuckDB读取（使用QMT API复权方案）
         data = None
-        if self.duckdb_available and self.con:
-            logger.info(f"  [INFO] 使用QMT API复权方案查询数据 [股票:{stock_code}]")
+        with self._con_lock:
+            db_ready = self.duckdb_available and self.con is not None
+            if db_ready:
+                logger.info(f"  [INFO] 使用QMT API复权方案查询数据 [股票:{stock_code}]")
 
-            try:
-                # 导入复权缓存模块
-                from data_manager.adjustment_cache import AdjustmentCache
-
-                if not hasattr(self, 'adjustment_cache'):
-                    self.adjustment_cache = AdjustmentCache(self.duckdb_path)
-
-                # 使用缓存管理器获取数据
-                if period == '1d':
-                    data = self.adjustment_cache.get_adjusted_data(
-                        stock_code=stock_code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        adjust_type=adjust,
-                        con=self.con
-                    )
-
-                    if data is not None and not data.empty:
-                        logger.info(f"  [OK] 从DuckDB获取成功 {len(data)} 条记录 [股票:{stock_code}]")
-                        # 验证stock_code列是否存在且正确
-                        if 'stock_code' in data.columns and not data.empty:
-                            actual_codes = data['stock_code'].unique()
-                            logger.debug(f"  [DEBUG] 返回数据中的stock_code: {actual_codes}")
+                try:
+                    # 导入复权缓存模块
+                    from data_manager.adjustment_cache import AdjustmentCache
+
+                    if not hasattr(self, 'adjustment_cache'):
+                        self.adjustment_cache = AdjustmentCache(self.duckdb_path)
+
+                    # 使用缓存管理器获取数据
+                    if period == '1d':
+                        data = self.adjustment_cache.get_adjusted_data(
+                            stock_code=stock_code,
+                            start_date=start_date,
+                            end_date=end_date,
+                            adjust_type=adjust,
+                            con=self.con
+                        )
+
+                        if data is not None and not data.empty:
+                            logger.info(f"  [OK] 从DuckDB获取成功 {len(data)} 条记录 [股票:{stock_code}]")
+                            # 验证stock_code列是否存在且正确
+                            if 'stock_code' in data.columns and not data.empty:
+                                actual_codes = data['stock_code'].unique()
+                                logger.debug(f"  [DEBUG] 返回数据中的stock_code: {actual_codes}")
+                        else:
+                            data = None
                     else:
-                        data = None
-                else:
-                    # 分钟线数据不需要复权，直接查询
-                    data = self._read_from_duckdb(stock_code, start_date, end_date, period, 'none')
+                        # 分钟线数据不需要复权，优先读分钟线存储，旧的 stock_1m/stock_5m 表兜底
+                        data = self._read_from_intraday_store(stock_code, start_date, end_date, period)
+                        if data is None:
+                            data = self._read_resampled(stock_code, start_date, end_date, period)
+                        if data is None:
+                            data = self._read_from_duckdb(stock_code, start_date, end_date, period, 'none')
 
-            except Exception as e:
-                logger.warning(f"  [WARN] 复权缓存查询失败: {e}")
-                logger.info(f"  [INFO] 降级到原有的_read_from_duckdb方法")
-                # 降级到原有的 _read_from_duckdb 方法
-                data = self._read_from_duckdb(stock_code, start_date, end_date, period, adjust)
+                except Exception as e:
+                    logger.warning(f"  [WARN] 复权缓存查询失败: {e}")
+                    logger.info(f"  [INFO] 降级到原有的_read_from_duckdb方法")
+                    # 降级到原有的 _read_from_duckdb 方法
+                    data = self._read_from_duckdb(stock_code, start_date, end_date, period, adjust)
 
         # Step 2: 检查数据完整性
         need_download = False
@@ -287,10 +331,19 @@ class UnifiedDataInterface:
                 data = qmt_data
 
             # Step 4: 保存到DuckDB
-            if auto_save and self.duckdb_available and self.con:
-                logger.info(f"  → 保存数据到 DuckDB...")
-                self._save_to_duckdb(data, stock_code, period)
-                logger.info(f"  [OK] 数据已保存到 DuckDB")
+            if auto_save and db_ready:
+                if self._is_intraday(period):
+                    logger.info(f"  → 保存数据到分钟线存储...")
+                    self._get_intraday_store().append(data, period, stock_code)
+                    logger.info(f"  [OK] 数据已保存到分钟线存储")
+                    if period == '1m':
+                        self._refresh_resampled(stock_code)
+                elif self.write_behind and self._submit_write(data, stock_code, period):
+                    logger.info(f"  [OK] 数据已加入后台写入队列")
+                else:
+                    logger.info(f"  → 保存数据到 DuckDB...")
+                    self._save_to_duckdb(data, stock_code, period)
+                    logger.info(f"  [OK] 数据已保存到 DuckDB")
         else:
             logger.info(f"  [OK] 从 DuckDB 读取成功（{len(data)} 条记录）")
 
@@ -391,6 +444,76 @@ class UnifiedDataInterface:
             # 可能是表不存在或列不存在
             return None
 
+    @staticmethod
+    def _is_intraday(period: str) -> bool:
+        from data_manager.intraday_store import INTRADAY_PERIODS
+        return period in INTRADAY_PERIODS
+
+    def _get_intraday_store(self):
+        """分钟线列式存储（位于 DuckDB 文件同目录下的 intraday）"""
+        if self.intraday_store is None:
+            from data_manager.intraday_store import IntradayBarStore, default_intraday_root
+            self.intraday_store = IntradayBarStore(default_intraday_root(self.duckdb_path))
+        return self.intraday_store
+
+    def _read_from_intraday_store(
+        self,
+        stock_code: str,
+        start_date: str,
+        end_date: str,
+        period: str
+    ) -> Optional[pd.DataFrame]:
+        """从分钟线存储读取（只打开区间内交易日、该代码所在分桶的文件）"""
+        if not self._is_intraday(period):
+            return None
+        try:
+            df = self._get_intraday_store().read(stock_code, start_date, end_date, period)
+        except Exception as e:
+            logger.warning(f"  [WARN] 分钟线存储读取失败: {e}")
+            return None
+        if df.empty:
+            return None
+        df = df.rename(columns={'time': 'datetime'}).set_index('datetime')
+        return df
+
+    def _read_resampled(
+        self,
+        stock_code: str,
+        start_date: str,
+        end_date: str,
+        period: str
+    ) -> Optional[pd.DataFrame]:
+        """通过只读连接读取本地合成的高周期K线（缓存在下载/更新数据时刷新）"""
+        from data_manager.bar_resampler import RESAMPLE_SOURCES, BarResampler
+
+        if period not in RESAMPLE_SOURCES or self.con is None:
+            return None
+        try:
+            resampler = BarResampler(self.duckdb_path, self._get_intraday_store())
+            df = resampler.read_cached(self.con, stock_code, period, start_date, end_date)
+        except Exception as e:
+            logger.warning(f"  [WARN] 读取本地重采样K线失败: {e}")
+            return None
+        if df.empty:
+            return None
+        df = df.rename(columns={'time': 'datetime'}).set_index('datetime')
+        return df
+
+    def _refresh_resampled(self, stock_code: str):
+        """1 分钟线入库后增量刷新由其合成的分钟周期缓存"""
+        from data_manager.bar_resampler import RESAMPLE_SOURCES, BarResampler
+
+        if not self.duckdb_available:
+            return
+        periods = [p for p, source in RESAMPLE_SOURCES.items() if source == '1m']
+        try:
+            resampler = BarResampler(self.duckdb_path, self._get_intraday_store())
+            with self._write_connection() as con:
+                for period in periods:
+                    resampler.refresh(stock_code, period, con=con)
+        except Exception as e:
+            logger.warning(f"  [WARN] 刷新重采样缓存失败: {e}")
+
     def _read_from_qmt(
         self,
         stock_code: str,
@@ -689,167 +812,220 @@ class UnifiedDataInterface:
         try:
             logger.debug(f"    [DEBUG] _save_to_duckdb: 开始保存 {stock_code} 的 {len(data)} 条记录...")
 
-            # 使用连接池的写锁（确保原子性操作）
-            from data_manager.duckdb_connection_pool import get_db_manager
-
-            if self.db_manager is None:
-                self.db_manager = get_db_manager(self.duckdb_path)
-
-            # 使用写连接的上下文管理器（自动处理并发冲突）
-            with self.db_manager.get_write_connection() as con:
+            # 使用连接池的写锁（确保原子性操作），写入期间暂时关闭只读连接
+            with self._write_connection() as con:
                 logger.debug(f"    [DEBUG] 获取写连接成功")
+                self._write_frame(con, data, stock_code, period)
 
-                # 确保表存在
-                self._ensure_tables_exist_with_con(con)
-
-                # 确定表名
-                table_map = {
-                    '1d': 'stock_daily',
-                    '1m': 'stock_1m',
-                    '5m': 'stock_5m',
-                    'tick': 'stock_tick'
-                }
-                table_name = table_map.get(period, 'stock_daily')
+        except Exception as e:
+            logger.error(f"    [ERROR] 保存失败: {e}")
+            import traceback
+            traceback.print_exc()
+            raise
 
-                # 重置索引，把datetime变成列
-                df_to_save = data.reset_index()
-                df_to_save = df_to_save.rename(columns={'index': 'date', 'datetime': 'date'})
+    def _write_frame(self, con, data: pd.DataFrame, stock_code: str, period: str):
+        """在给定的写连接（事务）中保存一只股票的数据，写入后校验记录数"""
+        # 确保表存在
+        self._ensure_tables_exist_with_con(con)
+
+        # 确定表名
+        table_map = {
+            '1d': 'stock_daily',
+            '1m': 'stock_1m',
+            '5m': 'stock_5m',
+            'tick': 'stock_tick'
+        }
+        table_name = table_map.get(period, 'stock_daily')
+
+        # 重置索引，把datetime变成列
+        df_to_save = data.reset_index()
+        df_to_save = df_to_save.rename(columns={'index': 'date', 'datetime': 'date'})
+
+        logger.debug(f"    [DEBUG] reset_index后列名: {list(df_to_save.columns)[:5]}...")
+        logger.debug(f"    [DEBUG] 保存数据日期范围: {df_to_save['date'].min()} ~ {df_to_save['date'].max()}")
+
+        # 确保有stock_code列（并且验证不为None）
+        if 'stock_code' not in df_to_save.columns:
+            df_to_save['stock_code'] = stock_code
+        else:
+            # 如果已存在stock_code列，检查是否有None值，如果有则替换
+            if df_to_save['stock_code'].isna().any() or (df_to_save['stock_code'] == 'None').any():
+                logger.warning(f"    [WARN] 发现stock_code列包含None值，将替换为: {stock_code}")
+                df_to_save['stock_code'] = stock_code
+
+        # 确保有period列
+        if 'period' not in df_to_save.columns:
+            df_to_save['period'] = period
+
+        # 确保有symbol_type列
+        if 'symbol_type' not in df_to_save.columns:
+            # 判断是股票、指数还是ETF
+            if stock_code.endswith('.SH'):
+                if stock_code.startswith('5') or stock_code.startswith('51'):
+                    df_to_save['symbol_type'] = 'etf'
+                elif stock_code.startswith('688'):
+                    df_to_save['symbol_type'] = 'stock'
+                else:
+                    df_to_save['symbol_type'] = 'stock'
+            elif stock_code.endswith('.SZ'):
+                if stock_code.startswith('15') or stock_code.startswith('16'):
+                    df_to_save['symbol_type'] = 'etf'
+                elif stock_code.startswith('30'):
+                    df_to_save['symbol_type'] = 'stock'
+                else:
+                    df_to_save['symbol_type'] = 'stock'
+            else:
+                df_to_save['symbol_type'] = 'stock'
+
+        # 过滤掉stock_code为None的行（额外保护）
+        before_filter = len(df_to_save)
+        df_to_save = df_to_save[df_to_save['stock_code'].notna()]
+        df_to_save = df_to_save[df_to_save['stock_code'] != 'None']
+        after_filter = len(df_to_save)
+        if before_filter != after_filter:
+            logger.warning(f"    [WARN] 过滤掉 {before_filter - after_filter} 条stock_code为None的记录")
+
+        date_min = str(df_to_save['date'].min())
+        date_max = str(df_to_save['date'].max())
+
+        logger.debug(f"    [DEBUG] 删除范围: {date_min} ~ {date_max}")
+
+        # 添加缺失的元数据列
+        if table_name == 'stock_daily':
+            import time
+            current_time = pd.Timestamp.now()
+            if 'created_at' not in df_to_save.columns:
+                df_to_save['created_at'] = current_time
+            if 'updated_at' not in df_to_save.columns:
+                df_to_save['updated_at'] = current_time
+
+        # 获取表的列顺序
+        table_columns = con.execute(f"DESCRIBE {table_name}").fetchdf()['column_name'].tolist()
+
+        # 按表的列顺序重新排列DataFrame
+        df_ordered = pd.DataFrame()
+        for col in table_columns:
+            if col in df_to_save.columns:
+                df_ordered[col] = df_to_save[col]
+            else:
+                df_ordered[col] = None
 
-                logger.debug(f"    [DEBUG] reset_index后列名: {list(df_to_save.columns)[:5]}...")
-                logger.debug(f"    [DEBUG] 保存数据日期范围: {df_to_save['date'].min()} ~ {df_to_save['date'].max()}")
+        logger.debug(f"    [DEBUG] 准备插入 {len(df_ordered)} 条记录...")
 
-                # 确保有stock_code列（并且验证不为None）
-                if 'stock_code' not in df_to_save.columns:
-                    df_to_save['stock_code'] = stock_code
-                else:
-                    # 如果已存在stock_code列，检查是否有None值，如果有则替换
-                    if df_to_save['stock_code'].isna().any() or (df_to_save['stock_code'] == 'None').any():
-                        logger.warning(f"    [WARN] 发现stock_code列包含None值，将替换为: {stock_code}")
-                        df_to_save['stock_code'] = stock_code
-
-                # 确保有period列
-                if 'period' not in df_to_save.columns:
-                    df_to_save['period'] = period
-
-                # 确保有symbol_type列
-                if 'symbol_type' not in df_to_save.columns:
-                    # 判断是股票、指数还是ETF
-                    if stock_code.endswith('.SH'):
-                        if stock_code.startswith('5') or stock_code.startswith('51'):
-                            df_to_save['symbol_type'] = 'etf'
-                        elif stock_code.startswith('688'):
-                            df_to_save['symbol_type'] = 'stock'
-                        else:
-                            df_to_save['symbol_type'] = 'stock'
-                    elif stock_code.endswith('.SZ'):
-                        if stock_code.startswith('15') or stock_code.startswith('16'):
-                            df_to_save['symbol_type'] = 'etf'
-                        elif stock_code.startswith('30'):
-                            df_to_save['symbol_type'] = 'stock'
-                        else:
-                            df_to_save['symbol_type'] = 'stock'
-                    else:
-                        df_to_save['symbol_type'] = 'stock'
-
-                # 过滤掉stock_code为None的行（额外保护）
-                before_filter = len(df_to_save)
-                df_to_save = df_to_save[df_to_save['stock_code'].notna()]
-                df_to_save = df_to_save[df_to_save['stock_code'] != 'None']
-                after_filter = len(df_to_save)
-                if before_filter != after_filter:
-                    logger.warning(f"    [WARN] 过滤掉 {before_filter - after_filter} 条stock_code为None的记录")
-
-                date_min = str(df_to_save['date'].min())
-                date_max = str(df_to_save['date'].max())
-
-                logger.debug(f"    [DEBUG] 删除范围: {date_min} ~ {date_max}")
-
-                # 添加缺失的元数据列
-                if table_name == 'stock_daily':
-                    import time
-                    current_time = pd.Timestamp.now()
-                    if 'created_at' not in df_to_save.columns:
-                        df_to_save['created_at'] = current_time
-                    if 'updated_at' not in df_to_save.columns:
-                        df_to_save['updated_at'] = current_time
-
-                # 获取表的列顺序
-                table_columns = con.execute(f"DESCRIBE {table_name}").fetchdf()['column_name'].tolist()
-
-                # 按表的列顺序重新排列DataFrame
-                df_ordered = pd.DataFrame()
-                for col in table_columns:
-                    if col in df_to_save.columns:
-                        df_ordered[col] = df_to_save[col]
-                    else:
-                        df_ordered[col] = None
+        # 策略：使用DELETE+INSERT确保数据保存成功
+        try:
+            # 注册临时表
+            con.register('df_to_save_temp', df_ordered)
+
+            # 先删除重复数据
+            logger.debug(f"    [DEBUG] 删除重复数据...")
+            con.execute(f"""
+                DELETE FROM {table_name}
+                WHERE stock_code = ? AND period = ?
+                    AND date >= ? AND date <= ?
+            """, [stock_code, period, date_min, date_max])
+
+            # 插入新数据（明确指定所有列，避免列数不匹配）
+            logger.debug(f"    [DEBUG] 插入新数据...")
+            con.execute(f"""
+                INSERT INTO {table_name} (
+                    stock_code, symbol_type, date, period,
+                    open, high, low, close, volume, amount,
+                    created_at, updated_at
+                )
+                SELECT
+                    stock_code, symbol_type, CAST(date AS DATE), period,
+                    open, high, low, close, volume, amount,
+                    created_at, updated_at
+                FROM df_to_save_temp
+            """)
+
+            con.unregister('df_to_save_temp')
+            logger.info(f"    → 已保存 {len(df_ordered)} 条记录到 {table_name}")
+
+        except Exception as insert_err:
+            logger.error(f"    [ERROR] INSERT失败: {insert_err}")
+            # 当前写连接处于事务中。任何插入错误都必须向外抛出，
+            # 由连接管理器回滚之前的 DELETE，不能继续二次删除。
+            raise
 
-                logger.debug(f"    [DEBUG] 准备插入 {len(df_ordered)} 条记录...")
+        # 验证保存结果
+        verify_sql = f"""
+            SELECT COUNT(*) as count, MIN(date) as min_date, MAX(date) as max_date
+            FROM {table_name}
+            WHERE stock_code = '{stock_code}'
+                AND date >= '{date_min}'
+                AND date <= '{date_max}'
+        """
+        verify_result = con.execute(verify_sql).fetchdf()
+        verify_dict = verify_result.to_dict('records')[0]
+        logger.debug(f"    [DEBUG] 验证保存结果（{date_min} ~ {date_max}）: count={verify_dict['count']}, max_date={verify_dict['max_date']}")
+
+        # 检查是否真的保存成功了
+        if verify_dict['count'] == 0:
+            raise RuntimeError("保存失败：数据未写入数据库")
+        elif verify_dict['count'] != len(df_ordered):
+            raise RuntimeError(
+                f"保存记录数不一致：期望{len(df_ordered)}条，实际{verify_dict['count']}条"
+            )
+        else:
+            logger.info(f"    [OK] 数据保存成功！")
 
-                # 策略：使用DELETE+INSERT确保数据保存成功
-                try:
-                    # 注册临时表
-                    con.register('df_to_save_temp', df_ordered)
-
-                    # 先删除重复数据
-                    logger.debug(f"    [DEBUG] 删除重复数据...")
-                    con.execute(f"""
-                        DELETE FROM {table_name}
-                        WHERE stock_code = ? AND period = ?
-                            AND date >= ? AND date <= ?
-                    """, [stock_code, period, date_min, date_max])
-
-                    # 插入新数据（明确指定所有列，避免列数不匹配）
-                    logger.debug(f"    [DEBUG] 插入新数据...")
-                    con.execute(f"""
-                        INSERT INTO {table_name} (
-                            stock_code, symbol_type, date, period,
-                            open, high, low, close, volume, amount,
-                            created_at, updated_at
-                        )
-                        SELECT
-                            stock_code, symbol_type, CAST(date AS DATE), period,
-                            open, high, low, close, volume, amount,
-                            created_at, updated_at
-                        FROM df_to_save_temp
-                    """)
-
-                    con.unregister('df_to_save_temp')
-                    logger.info(f"    → 已保存 {len(df_ordered)} 条记录到 {table_name}")
-
-                except Exception as insert_err:
-                    logger.error(f"    [ERROR] INSERT失败: {insert_err}")
-                    # 当前写连接处于事务中。任何插入错误都必须向外抛出，
-                    # 由连接管理器回滚之前的 DELETE，不能继续二次删除。
-                    raise
-
-                # 验证保存结果
-                verify_sql = f"""
-                    SELECT COUNT(*) as count, MIN(date) as min_date, MAX(date) as max_date
-                    FROM {table_name}
-                    WHERE stock_code = '{stock_code}'
-                        AND date >= '{date_min}'
-                        AND date <= '{date_max}'
-                """
-                verify_result = con.execute(verify_sql).fetchdf()
-                verify_dict = verify_result.to_dict('records')[0]
-                logger.debug(f"    [DEBUG] 验证保存结果（{date_min} ~ {date_max}）: count={verify_dict['count']}, max_date={verify_dict['max_date']}")
-
-                # 检查是否真的保存成功了
-                if verify_dict['count'] == 0:
-                    raise RuntimeError("保存失败：数据未写入数据库")
-                elif verify_dict['count'] != len(df_ordered):
-                    raise RuntimeError(
-                        f"保存记录数不一致：期望{len(df_ordered)}条，实际{verify_dict['count']}条"
-                    )
-                else:
-                    logger.info(f"    [OK] 数据保存成功！")
+    def _submit_write(self, data: pd.DataFrame, stock_code: str, period: str) -> bool:
+        """放入后台写入队列（复制一份，调用方后续修改不影响写入），队列已关闭时返回 False"""
+        if data is None or data.empty:
+            return True
+        if self._writer is None:
+            from data_manager.write_behind import WriteBehindQueue
+            self._writer = WriteBehindQueue(self._save_batch_to_duckdb, name='duckdb-write-behind')
+        self._warn_write_failures()
+        try:
+            self._writer.submit((stock_code, period), (data.copy(), stock_code, period), rows=len(data))
+            return True
+        except RuntimeError:
+            return False
 
+    def _save_batch_to_duckdb(self, frames: List[tuple]):
+        """后台写入线程：一批股票在一个事务中写入，整批失败时逐只重试"""
+        try:
+            with self._write_connection() as con:
+                for data, stock_code, period in frames:
+                    self._write_frame(con, data, stock_code, period)
+            logger.info(f"    [OK] 后台写入 {len(frames)} 只股票 {sum(len(f[0]) for f in frames)} 条记录")
         except Exception as e:
-            logger.error(f"    [ERROR] 保存失败: {e}")
-            import traceback
-            traceback.print_exc()
-            raise
+            if len(frames) == 1:
+                raise
+            logger.warning(f"    [WARN] 批量写入失败，逐只重试: {e}")
+            failed = []
+            for data, stock_code, period in frames:
+                try:
+                    self._save_to_duckdb(data, stock_code, period)
+                except Exception:
+                    failed.append(stock_code)
+            if failed:
+                raise RuntimeError(f"{len(failed)} 只股票写入失败: {failed[:5]}")
+
+    def flush(self, timeout: float = None) -> bool:
+        """等待后台写入队列中的数据全部写入DuckDB，返回是否在超时前完成（有写入失败时告警）"""
+        if self._writer is None:
+            return True
+        done = self._writer.flush(timeout)
+        self._warn_write_failures()
+        return done
+
+    def _warn_write_failures(self):
+        """后台写入失败只记录在写入线程里，在调用方（提交/等待写入时）补发告警"""
+        metrics = self._writer.metrics()
+        failed = metrics['failed_frames'] - self._reported_write_failures
+        if failed > 0:
+            self._reported_write_failures = metrics['failed_frames']
+            logger.warning(f"  [WARN] 后台写入 DuckDB 失败 {failed} 份数据，数据未持久化: {metrics['last_error']}")
+
+    def write_metrics(self) -> Dict:
+        """后台写入指标：队列深度、写入速度（rows_per_sec）、提交耗时（commit_latency_ms）等"""
+        if self._writer is None:
+            return {}
+        return self._writer.metrics()
 
     def _ensure_tables_exist_with_con(self, con):
         """确保所有必需的表都存在（使用指定连接）
@@ -925,11 +1101,15 @@ class UnifiedDataInterface:
         return result
 
     def close(self):
-        """关闭数据库连接"""
-        if self.con:
-            self.con.close()
-            self.con = None
-            logger.info("[INFO] DuckDB 连接已关闭")
+        """写完后台队列中的数据并关闭数据库连接"""
+        if self._writer is not None:
+            self._writer.close()
+            self._warn_write_failures()
+        with self._con_lock:
+            if self.con:
+                self.con.close()
+                self.con = None
+                logger.info("[INFO] DuckDB 连接已关闭")
 
 
 # 便捷函数
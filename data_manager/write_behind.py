@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台写入队列（write-behind）
+调用方把待写入的数据放入有界队列后立即返回，由单个写入线程取出并成批写入
+
+- 队列满时 submit() 阻塞，形成背压，内存占用有上限
+- 写入线程每次取出当前队列中已有的数据（最多 max_batch_size 份），交给 write_batch 一次写入，
+  多只股票共用一个事务和一次提交
+- flush() 等待已提交的数据全部写完；close() 写完后停止线程（进程退出时自动调用）
+- metrics() 返回队列深度、写入速度和提交耗时
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    有界后台写入队列
+
+    使用方式：
+        writer = WriteBehindQueue(lambda payloads: save_all(payloads))
+        writer.submit(('000001.SZ', '1d'), payload, rows=len(df))
+        writer.flush()
+        print(writer.metrics())
+    """
+
+    def __init__(self, write_batch: Callable[[List[Any]], Any], max_queue_size: int = 256,
+                 max_batch_size: int = 64, name: str = 'write-behind'):
+        """
+        Args:
+            write_batch: 写入函数，参数为一批 payload 列表，在写入线程中调用；抛出异常表示整批失败
+            max_queue_size: 队列容量，满时 submit() 阻塞
+            max_batch_size: 每批最多合并的 payload 数
+            name: 写入线程名
+        """
+        self._write_batch = write_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.name = name
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue_size)))
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._pending = 0
+        self._pending_keys: Counter = Counter()
+
+        self._batches = 0
+        self._frames = 0
+        self._rows = 0
+        self._failed_frames = 0
+        self._write_seconds = 0.0
+        self._last_commit = 0.0
+        self._max_commit = 0.0
+        self._last_error: Optional[str] = None
+
+    def submit(self, key: Hashable, payload: Any, rows: int = 0, timeout: Optional[float] = None):
+        """
+        提交一份待写入的数据
+
+        Args:
+            key: 数据键（如 (股票代码, 周期)），用于 is_pending()
+            payload: 交给 write_batch 的数据
+            rows: 记录数，用于统计
+            timeout: 队列满时最多等待的秒数，None 表示一直等待
+
+        Raises:
+            RuntimeError: 队列已关闭
+            queue.Full: 等待超时
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("后台写入队列已关闭")
+            self._ensure_thread()
+            self._pending += 1
+            self._pending_keys[key] += 1
+        try:
+            self._queue.put((key, payload, rows), timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._finish([(key, payload, rows)])
+            raise
+
+    def is_pending(self, key: Hashable) -> bool:
+        """该键是否有尚未写完的数据"""
+        with self._lock:
+            return self._pending_keys[key] > 0
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已提交的数据全部写完，返回是否在超时前完成"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """写完队列中的数据后停止写入线程"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            atexit.unregister(self.close)
+            if thread.is_alive():
+                return
+        # 与 close() 并发提交、排在停止标记之后的数据
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._write(leftovers)
+
+    def metrics(self) -> Dict:
+        """
+        运行指标
+
+        Returns:
+            {'queue_depth', 'pending', 'batches', 'frames', 'rows', 'failed_frames',
+             'rows_per_sec'（按写入耗时计算）, 'commit_latency_ms': {'last', 'avg', 'max'}, 'last_error'}
+        """
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'pending': self._pending,
+                'batches': self._batches,
+                'frames': self._frames,
+                'rows': self._rows,
+                'failed_frames': self._failed_frames,
+                'rows_per_sec': self._rows / self._write_seconds if self._write_seconds > 0 else 0.0,
+                'commit_latency_ms': {
+                    'last': self._last_commit * 1000,
+                    'avg': self._write_seconds / self._batches * 1000 if self._batches else 0.0,
+                    'max': self._max_commit * 1000,
+                },
+                'last_error': self._last_error,
+            }
+
+    # ------------------------------------------------------------------
+    # 写入线程
+    # ------------------------------------------------------------------
+
+    def _ensure_thread(self):
+        """启动写入线程（调用方持有 _lock）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # 取出队列中已有的数据合并为一批，不等待新数据
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: List):
+        started = time.monotonic()
+        error = None
+        try:
+            self._write_batch([payload for _, payload, _ in batch])
+        except Exception as e:
+            error = str(e)
+            logger.error(f"后台写入失败（{len(batch)} 份数据）: {e}")
+        elapsed = time.monotonic() - started
+
+        with self._lock:
+            self._batches += 1
+            self._write_seconds += elapsed
+            self._last_commit = elapsed
+            self._max_commit = max(self._max_commit, elapsed)
+            if error is None:
+                self._frames += len(batch)
+                self._rows += sum(rows for _, _, rows in batch)
+            else:
+                self._failed_frames += len(batch)
+                self._last_error = error
+            self._finish(batch)
+
+    def _finish(self, batch: List):
+        """标记一批数据已处理（调用方持有 _lock）"""
+        for key, _, _ in batch:
+            self._pending -= 1
+            self._pending_keys[key] -= 1
+            if self._pending_keys[key] <= 0:
+                del self._pending_keys[key]
+        self._idle.notify_all()
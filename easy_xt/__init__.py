@@ -121,6 +121,9 @@ def __getattr__(name):
     elif name == 'TradeAPI':
         from .trade_api import TradeAPI
         return TradeAPI
+    elif name == 'DownloadOrchestrator':
+        from .download_orchestrator import DownloadOrchestrator
+        return DownloadOrchestrator
     elif name == 'EasyXTAI':
         from .ai_assistant import EasyXTAI
         return EasyXTAI
@@ -141,6 +144,7 @@ __all__ = [
     'AdvancedTradeAPI',
     'DataAPI',
     'TradeAPI',
+    'DownloadOrchestrator',
     'EasyXTAI',
     'get_api',
     'get_extended_api',
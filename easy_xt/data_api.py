@@ -259,6 +259,8 @@ from .config import config
 
 from .data_types import ConnectionError, DataError
 
+from .download_orchestrator import get_download_orchestrator
+
 from typing import Dict, List, Optional
 
 from datetime import datetime, timedelta
@@ -268,6 +270,12 @@ import subprocess
 
 import pandas as pd
 
+# 共享交易日历（在 EasyXT 项目目录外单独使用 easy_xt 时不可用）
+try:
+    from core.trading_calendar import get_trading_calendar
+except ImportError:
+    get_trading_calendar = None
+
 
 # ── 大QMT 快速进程检测（tasklist，瞬时完成，不依赖 pywinauto）──
 _big_qmt_cache = None  # None=未检测, True=运行中, False=未运行
@@ -3287,6 +3295,22 @@ class DataAPI:
 
         
 
+        # 沪深交易日相同：共享日历的真实来源覆盖查询区间时直接切片返回
+
+        if market in ('SH', 'SZ') and get_trading_calendar is not None:
+
+            calendar = get_trading_calendar()
+
+            query_end = end_date or datetime.now().strftime('%Y%m%d')
+
+            if calendar.covers(start_date or None, query_end):
+
+                dates = calendar.to_strings(calendar.range(start_date or None, query_end))
+
+                return dates[-count:] if count > 0 else dates
+
+        
+
         try:
 
             dates = self.xt.get_trading_dates(market, start_date, end_date, count)
@@ -3455,6 +3479,20 @@ class DataAPI:
 
         
 
+        # 优先交给下载进程：独占 xtdata 会话、合并成批下载，卡死时自动重启
+
+        try:
+
+            report = get_download_orchestrator().download(stock_list, period, start_time, end_time)
+
+            return {item['code']: item['success'] for item in report['results']}
+
+        except Exception as e:
+
+            logger.info(f"下载进程不可用，在当前进程内下载: {e}")
+
+        
+
         # 结果字典
 
         results = {}
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+历史数据下载编排器
+
+xtdata.download_history_data2 并发调用可能卡死，原来的做法是在全局锁内逐只下载。
+编排器改为：
+1. 下载任务 (代码, 周期, 起止日期) 进入优先级队列（priority 越小越先下载）
+2. 同一代码同一周期的重复/重叠/相邻区间合并为一个区间；
+   周期和区间相同的代码合并成一批，用 download_history_data2 的多代码批量下载
+3. 由独立的工作进程持有 xtdata 会话并串行执行各批；某批长时间无进度时结束并重启工作进程，
+   卡死不会拖住调用方
+4. 通过回调报告进度，返回每个任务的 K 线数、延迟以及整体吞吐（bars/sec）
+
+使用方法：
+    from easy_xt.download_orchestrator import get_download_orchestrator
+
+    orchestrator = get_download_orchestrator()
+    report = orchestrator.download(['000001.SZ', '600000.SH'], '1m', '20240101', '20240331')
+    print(report['bars_per_sec'])
+"""
+import atexit
+import heapq
+import importlib
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+# 一批在该时长内没有任何进度视为卡死
+DEFAULT_BATCH_TIMEOUT = 600.0
+DEFAULT_START_TIMEOUT = 60.0
+
+# 开放区间的比较键
+_OPEN_END = '99999999'
+
+
+@dataclass(order=True)
+class DownloadJob:
+    """一个下载任务；按 (priority, seq) 排序"""
+    priority: int
+    seq: int
+    code: str = field(compare=False)
+    period: str = field(compare=False)
+    start: str = field(compare=False, default='')
+    end: str = field(compare=False, default='')
+    submitted_at: float = field(compare=False, default_factory=time.monotonic)
+    collect: bool = field(compare=False, default=False)
+
+
+@dataclass
+class DownloadBatch:
+    """一次 download_history_data2 调用"""
+    period: str
+    start: str
+    end: str
+    codes: List[str]
+    jobs: List[DownloadJob]
+
+    @property
+    def priority(self):
+        return min((job.priority, job.seq) for job in self.jobs)
+
+
+def _day_after(end: str) -> str:
+    """区间终点的下一天（YYYYMMDD）；带时间的终点原样返回，只合并重叠区间"""
+    if len(end) != 8:
+        return end
+    return (datetime.strptime(end, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
+
+
+def _end_key(end: str) -> str:
+    return end or _OPEN_END
+
+
+def coalesce_jobs(jobs: List[DownloadJob], max_batch_size: int = DEFAULT_BATCH_SIZE) -> List[DownloadBatch]:
+    """
+    合并任务：同一 (代码, 周期) 的重复/重叠/相邻区间合并，再把周期与区间相同的代码合并成批
+
+    Returns:
+        按优先级排序的批次列表
+    """
+    by_code: Dict[tuple, List[DownloadJob]] = defaultdict(list)
+    for job in jobs:
+        by_code[(job.code, job.period)].append(job)
+
+    groups: Dict[tuple, list] = defaultdict(list)
+    for (code, period), items in by_code.items():
+        items.sort(key=lambda j: (j.start, _end_key(j.end)))
+        start, end, members = items[0].start, items[0].end, [items[0]]
+        for job in items[1:]:
+            if not end or job.start <= _day_after(end):
+                if _end_key(job.end) > _end_key(end):
+                    end = job.end
+                members.append(job)
+            else:
+                groups[(period, start, end)].append((code, members))
+                start, end, members = job.start, job.end, [job]
+        groups[(period, start, end)].append((code, members))
+
+    batches = []
+    for (period, start, end), members in groups.items():
+        members.sort(key=lambda m: min((j.priority, j.seq) for j in m[1]))
+        for i in range(0, len(members), max_batch_size):
+            chunk = members[i:i + max_batch_size]
+            batches.append(DownloadBatch(period, start, end, [code for code, _ in chunk],
+                                         [job for _, jobs_ in chunk for job in jobs_]))
+    batches.sort(key=lambda b: b.priority)
+    return batches
+
+
+def _count_bars(xtdata, codes: List[str], period: str, start: str, end: str) -> Dict[str, int]:
+    """本地已有的 K 线数"""
+    try:
+        data = xtdata.get_local_data(field_list=[] if period == 'tick' else ['close'], stock_list=codes,
+                                     period=period, start_time=start, end_time=end)
+    except Exception:
+        return {code: 0 for code in codes}
+    return {code: len(data[code]) if data.get(code) is not None else 0 for code in codes}
+
+
+def _worker_main(requests, responses, xtdata_module: str):
+    """工作进程：持有 xtdata 会话，逐批下载并回报进度"""
+    try:
+        xtdata = importlib.import_module(xtdata_module)
+    except Exception as e:
+        responses.put(('failed', None, f"{type(e).__name__}: {e}"))
+        return
+    responses.put(('ready', None))
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        batch_id, codes, period, start, end, incrementally = request
+
+        def on_progress(data, batch_id=batch_id, total=len(codes)):
+            responses.put(('progress', batch_id, data.get('finished', 0), data.get('total', total),
+                           data.get('stockcode', '')))
+
+        kwargs = {} if incrementally is None else {'incrementally': incrementally}
+        error = None
+        try:
+            xtdata.download_history_data2(codes, period, start, end, callback=on_progress, **kwargs)
+        except Exception as e:
+            error = str(e)
+        responses.put(('done', batch_id, _count_bars(xtdata, codes, period, start, end), error))
+
+
+class DownloadOrchestrator:
+    """在独立工作进程中批量执行 xtdata 历史数据下载"""
+
+    def __init__(self, max_batch_size: int = DEFAULT_BATCH_SIZE,
+                 batch_timeout: float = DEFAULT_BATCH_TIMEOUT,
+                 start_timeout: float = DEFAULT_START_TIMEOUT,
+                 xtdata_module: str = 'xtquant.xtdata'):
+        """
+        Args:
+            max_batch_size: 每批最多代码数
+            batch_timeout: 一批在该秒数内没有进度时结束工作进程并记为失败
+            start_timeout: 等待工作进程导入 xtdata 的秒数
+            xtdata_module: 工作进程中导入的 xtdata 模块
+        """
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_timeout = batch_timeout
+        self.start_timeout = start_timeout
+        self.xtdata_module = xtdata_module
+
+        self._jobs: List[DownloadJob] = []
+        self._seq = itertools.count()
+        self._batch_ids = itertools.count(1)
+        self._jobs_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._finished: Dict[int, Dict] = {}
+
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._requests = None
+        self._responses = None
+        self._unavailable: Optional[str] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ==================== 任务队列 ====================
+
+    def submit(self, codes: Union[str, List[str]], period: str = '1d', start: str = '', end: str = '',
+               priority: int = 0, collect: bool = False) -> List[int]:
+        """
+        提交下载任务
+
+        Args:
+            codes: 股票代码
+            period: 周期
+            start: 开始时间 (YYYYMMDD)，空字符串表示最早
+            end: 结束时间 (YYYYMMDD)，空字符串表示最新
+            priority: 优先级，越小越先下载
+            collect: 是否保留结果供 download() 取回
+
+        Returns:
+            任务编号列表
+        """
+        if isinstance(codes, str):
+            codes = [codes]
+        ids = []
+        with self._jobs_lock:
+            for code in codes:
+                job = DownloadJob(priority, next(self._seq), code, period, start or '', end or '', collect=collect)
+                heapq.heappush(self._jobs, job)
+                ids.append(job.seq)
+        return ids
+
+    def pending(self) -> int:
+        """队列中尚未下载的任务数"""
+        with self._jobs_lock:
+            return len(self._jobs)
+
+    def _next_batch(self) -> Optional[DownloadBatch]:
+        """合并当前队列，取出优先级最高的一批（其余任务留在队列中，可被后来的高优先级任务插队）"""
+        with self._jobs_lock:
+            if not self._jobs:
+                return None
+            batches = coalesce_jobs(self._jobs, self.max_batch_size)
+            batch = batches[0]
+            taken = {job.seq for job in batch.jobs}
+            self._jobs = [job for job in self._jobs if job.seq not in taken]
+            heapq.heapify(self._jobs)
+            return batch
+
+    # ==================== 执行 ====================
+
+    def download(self, codes: Union[str, List[str]], period: str = '1d', start: str = '', end: str = '',
+                 priority: int = 0, incrementally: Optional[bool] = None,
+                 progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """提交任务并执行到队列清空，返回本次提交任务的报告（格式同 run）"""
+        ids = self.submit(codes, period, start, end, priority, collect=True)
+        report = self.run(progress_callback, incrementally)
+        with self._run_lock:
+            results = [self._finished.pop(job_id) for job_id in ids if job_id in self._finished]
+        report['results'] = results
+        report['failed'] = [r['code'] for r in results if not r['success']]
+        return report
+
+    def run(self, progress_callback: Optional[Callable[[Dict], None]] = None,
+            incrementally: Optional[bool] = None) -> Dict:
+        """
+        执行队列中的全部任务（执行期间提交的任务也会被处理）
+
+        Args:
+            progress_callback: 进度回调，参数为 dict：
+                batch / finished / total / code（当前批次及批内进度）,
+                codes_done / codes_total / bars / bars_per_sec（整体进度）
+            incrementally: 传给 download_history_data2 的 incrementally，None 表示使用默认值
+
+        Returns:
+            {'results': [每个任务: code/period/start/end/bars/success/latency/error],
+             'batches': 批次数, 'bars': K 线总数, 'elapsed': 秒, 'bars_per_sec': 吞吐,
+             'failed': 失败代码列表, 'errors': 批次错误列表}
+        """
+        with self._run_lock:
+            started = time.monotonic()
+            report = {'results': [], 'batches': 0, 'bars': 0, 'elapsed': 0.0, 'bars_per_sec': 0.0,
+                      'failed': [], 'errors': []}
+            codes_done = 0
+
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                batch_id = next(self._batch_ids)
+                report['batches'] += 1
+                codes_total = codes_done + len(batch.codes) + self.pending()
+
+                def on_progress(finished, total, code):
+                    if progress_callback:
+                        elapsed = time.monotonic() - started
+                        progress_callback({
+                            'batch': batch_id, 'finished': finished, 'total': total, 'code': code,
+                            'codes_done': codes_done + finished, 'codes_total': codes_total,
+                            'bars': report['bars'],
+                            'bars_per_sec': report['bars'] / elapsed if elapsed > 0 else 0.0,
+                        })
+
+                try:
+                    bars, error = self._execute(batch_id, batch, incrementally, on_progress)
+                except RuntimeError:
+                    # 工作进程无法启动，队列中的任务都无法执行
+                    with self._jobs_lock:
+                        self._jobs.clear()
+                    raise
+                if error:
+                    report['errors'].append(f"{batch.period} {batch.start}~{batch.end} "
+                                            f"({len(batch.codes)} 只): {error}")
+                finished_at = time.monotonic()
+                for job in batch.jobs:
+                    count = bars.get(job.code, 0)
+                    result = {'code': job.code, 'period': job.period, 'start': job.start, 'end': job.end,
+                              'bars': count, 'success': count > 0,
+                              'latency': finished_at - job.submitted_at, 'error': error}
+                    report['results'].append(result)
+                    if job.collect:
+                        self._finished[job.seq] = result
+                report['bars'] += sum(bars.values())
+                on_progress(len(batch.codes), len(batch.codes), '')
+                codes_done += len(batch.codes)
+
+            report['elapsed'] = time.monotonic() - started
+            report['bars_per_sec'] = report['bars'] / report['elapsed'] if report['elapsed'] > 0 else 0.0
+            report['failed'] = [r['code'] for r in report['results'] if not r['success']]
+            if report['batches']:
+                logger.info(f"下载完成: {report['batches']} 批, {report['bars']} 条K线, "
+                            f"{report['elapsed']:.1f}s, {report['bars_per_sec']:.0f} bars/s, "
+                            f"失败 {len(report['failed'])}")
+            return report
+
+    def _execute(self, batch_id: int, batch: DownloadBatch, incrementally, on_progress):
+        """把一批交给工作进程，返回 ({代码: K 线数}, 错误信息)"""
+        self._ensure_worker()
+        self._requests.put((batch_id, batch.codes, batch.period, batch.start, batch.end, incrementally))
+        while True:
+            try:
+                message = self._responses.get(timeout=self.batch_timeout)
+            except queue.Empty:
+                logger.error(f"批次 {batch_id} 超过 {self.batch_timeout:.0f}s 无进度，重启下载进程")
+                self._stop_worker(force=True)
+                return {}, f"超过 {self.batch_timeout:.0f}s 无进度"
+            kind, message_batch = message[0], message[1]
+            if message_batch != batch_id:
+                continue
+            if kind == 'progress':
+                on_progress(*message[2:])
+            elif kind == 'done':
+                return message[2], message[3]
+
+    # ==================== 工作进程 ====================
+
+    def _ensure_worker(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        if self._unavailable:
+            raise RuntimeError(f"下载进程不可用: {self._unavailable}")
+
+        self._requests = self._context.Queue()
+        self._responses = self._context.Queue()
+        self._process = self._context.Process(target=_worker_main, name='xtdata-downloader',
+                                              args=(self._requests, self._responses, self.xtdata_module),
+                                              daemon=True)
+        self._process.start()
+        try:
+            message = self._responses.get(timeout=self.start_timeout)
+        except queue.Empty:
+            message = ('failed', None, f"{self.start_timeout:.0f}s 内未就绪")
+        if message[0] != 'ready':
+            self._unavailable = message[2]
+            self._stop_worker(force=True)
+            raise RuntimeError(f"下载进程启动失败: {self._unavailable}")
+        logger.info(f"下载进程已启动 (pid={self._process.pid})")
+
+    def _stop_worker(self, force: bool = False):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if not force and process.is_alive():
+            self._requests.put(None)
+            process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=5)
+
+    def close(self):
+        """结束工作进程"""
+        with self._run_lock:
+            self._stop_worker()
+
+
+_default_orchestrator: Optional[DownloadOrchestrator] = None
+_default_lock = threading.Lock()
+
+
+def get_download_orchestrator() -> DownloadOrchestrator:
+    """进程内共享的下载编排器（工作进程在首次下载时启动，退出时结束）"""
+    global _default_orchestrator
+    with _default_lock:
+        if _default_orchestrator is None:
+            _default_orchestrator = DownloadOrchestrator()
+            atexit.register(_default_orchestrator.close)
+        return _default_orchestrator
@@ -67,6 +67,12 @@ import warnings
 
 from .data_api import DuckDBDataReader
 
+# 共享因子缓存（在 EasyXT 项目目录外单独使用 easy_xt 时不可用）
+try:
+    from core.factor_cache import get_factor_cache, data_fingerprint
+except ImportError:
+    get_factor_cache = None
+
 
 
 warnings.filterwarnings('ignore')
@@ -426,97 +432,62 @@ class EasyFactor:
 
 
 
-        # 根据因子名称计算
-
+        # 根据因子名称计算（结果写入共享因子缓存，其他界面组件/回测可直接复用）
         try:
-
-            if factor_name.startswith('momentum_'):
-
-                period = int(factor_name.split('_')[1].replace('d', ''))
-
-                return self._calc_momentum(df, period)
-
-            elif factor_name.startswith('reversal_'):
-
-                period_map = {'short': 5, 'mid': 20, 'long': 60}
-
-                period = period_map.get(factor_name.split('_')[1], 20)
-
-                return self._calc_reversal(df, period)
-
-            elif factor_name.startswith('volatility_'):
-
-                period = int(factor_name.split('_')[1].replace('d', ''))
-
-                return self._calc_volatility(df, period)
-
-            elif factor_name.startswith('ma') and 'signal' in factor_name:
-
-                period = int(factor_name.replace('ma', '').replace('_signal', ''))
-
-                return self._calc_ma_signal(df, period)
-
-            elif factor_name == 'rsi':
-
-                return self._calc_rsi(df)
-
-            elif factor_name == 'macd':
-
-                return self._calc_macd(df)
-
-            elif factor_name == 'kdj':
-
-                return self._calc_kdj(df)
-
-            elif factor_name == 'atr':
-
-                return self._calc_atr(df)
-
-            elif factor_name == 'obv':
-
-                return self._calc_obv(df)
-
-            elif factor_name == 'bollinger':
-
-                return self._calc_bollinger(df)
-
-            elif factor_name == 'max_drawdown':
-
-                return self._calc_max_drawdown(df)
-
-            elif factor_name in ['volume_ratio', 'turnover_rate', 'amplitude']:
-
-                return self._calc_volume_price(df, factor_name)
-
-            elif factor_name == 'ma_trend':
-
-                return self._calc_ma_trend(df)
-
-            elif factor_name == 'momentum_vol':
-
-                return self._calc_momentum_volume(df)
-
-            elif factor_name == 'price_volume_trend':
-
-                return self._calc_price_volume_trend(df)
-
-            else:
-
-                logger.warning(f"[WARNING] 未知因子: {factor_name}")
-                return pd.DataFrame()
-
-
-
+            cache = get_factor_cache() if get_factor_cache is not None else None
+            if cache is None:
+                return self._calc_factor(df, factor_name)
+            return cache.get_or_compute(
+                (EasyFactor, factor_name), [stock_code], start_date, end_date,
+                lambda: self._calc_factor(df, factor_name),
+                data=data_fingerprint(df)
+            )
         except Exception as e:
-
             logger.error(f"[ERROR] 计算因子失败 {factor_name}: {e}")
             import traceback
-
             traceback.print_exc()
-
             return pd.DataFrame()
 
-
+    def _calc_factor(self, df: pd.DataFrame, factor_name: str) -> pd.DataFrame:
+        """按因子名称计算单只股票的因子"""
+        if factor_name.startswith('momentum_'):
+            period = int(factor_name.split('_')[1].replace('d', ''))
+            return self._calc_momentum(df, period)
+        elif factor_name.startswith('reversal_'):
+            period_map = {'short': 5, 'mid': 20, 'long': 60}
+            period = period_map.get(factor_name.split('_')[1], 20)
+            return self._calc_reversal(df, period)
+        elif factor_name.startswith('volatility_'):
+            period = int(factor_name.split('_')[1].replace('d', ''))
+            return self._calc_volatility(df, period)
+        elif factor_name.startswith('ma') and 'signal' in factor_name:
+            period = int(factor_name.replace('ma', '').replace('_signal', ''))
+            return self._calc_ma_signal(df, period)
+        elif factor_name == 'rsi':
+            return self._calc_rsi(df)
+        elif factor_name == 'macd':
+            return self._calc_macd(df)
+        elif factor_name == 'kdj':
+            return self._calc_kdj(df)
+        elif factor_name == 'atr':
+            return self._calc_atr(df)
+        elif factor_name == 'obv':
+            return self._calc_obv(df)
+        elif factor_name == 'bollinger':
+            return self._calc_bollinger(df)
+        elif factor_name == 'max_drawdown':
+            return self._calc_max_drawdown(df)
+        elif factor_name in ['volume_ratio', 'turnover_rate', 'amplitude']:
+            return self._calc_volume_price(df, factor_name)
+        elif factor_name == 'ma_trend':
+            return self._calc_ma_trend(df)
+        elif factor_name == 'momentum_vol':
+            return self._calc_momentum_volume(df)
+        elif factor_name == 'price_volume_trend':
+            return self._calc_price_volume_trend(df)
+        else:
+            logger.warning(f"[WARNING] 未知因子: {factor_name}")
+            return pd.DataFrame()
 
     def get_factor_batch(self,
 
@@ -570,114 +541,72 @@ class EasyFactor:
 
 
 
+        # 批量计算各个因子（结果写入共享因子缓存）
+        cache = get_factor_cache() if get_factor_cache is not None else None
+        fingerprint = data_fingerprint(all_data) if cache is not None else None
         results = {}
-
-
-
-        # 批量计算各个因子
-
         for factor_name in factor_names:
+            if cache is None:
+                factor_df = self._calc_factor_batch(all_data, stock_list, factor_name)
+            else:
+                factor_df = cache.get_or_compute(
+                    (EasyFactor, factor_name), stock_list, start_date, end_date,
+                    lambda name=factor_name: self._calc_factor_batch(all_data, stock_list, name),
+                    data=fingerprint
+                )
+            if not factor_df.empty:
+                results[factor_name] = factor_df
 
-            factor_dfs = []
-
-
-
-            for stock_code in stock_list:
-
-                stock_data = all_data[all_data['stock_code'] == stock_code].copy()
-
-
-
-                if stock_data.empty:
-
-                    continue
-
-
-
-                try:
-
-                    if factor_name.startswith('momentum_'):
-
-                        period = int(factor_name.split('_')[1].replace('d', ''))
-
-                        df = self._calc_momentum(stock_data, period)
-
-                    elif factor_name.startswith('volatility_'):
-
-                        period = int(factor_name.split('_')[1].replace('d', ''))
-
-                        df = self._calc_volatility(stock_data, period)
-
-                    elif factor_name == 'max_drawdown':
-
-                        df = self._calc_max_drawdown(stock_data)
-
-                    elif factor_name == 'ma_trend':
-
-                        df = self._calc_ma_trend(stock_data)
-
-                    elif factor_name.startswith('ma') and 'signal' in factor_name:
-
-                        period = int(factor_name.replace('ma', '').replace('_signal', ''))
-
-                        df = self._calc_ma_signal(stock_data, period)
-
-                    elif factor_name == 'rsi':
-
-                        df = self._calc_rsi(stock_data)
-
-                    elif factor_name == 'macd':
-
-                        df = self._calc_macd(stock_data)
-
-                    elif factor_name == 'kdj':
-
-                        df = self._calc_kdj(stock_data)
-
-                    elif factor_name == 'atr':
-
-                        df = self._calc_atr(stock_data)
-
-                    elif factor_name == 'obv':
-
-                        df = self._calc_obv(stock_data)
-
-                    elif factor_name == 'bollinger':
-
-                        df = self._calc_bollinger(stock_data)
-
-                    elif factor_name in ['volume_ratio', 'turnover_rate', 'amplitude']:
-
-                        df = self._calc_volume_price(stock_data, factor_name)
-
-                    else:
-
-                        continue
-
-
-
-                    if not df.empty:
-
-                        df['stock_code'] = stock_code
-
-                        factor_dfs.append(df)
-
-
-
-                except Exception as e:
+        return results
 
-                    logger.warning(f"[WARNING] 计算{stock_code}的{factor_name}失败: {e}")
+    def _calc_factor_batch(self, all_data: pd.DataFrame, stock_list: List[str],
+                           factor_name: str) -> pd.DataFrame:
+        """逐只股票计算一个因子并合并，股票代码写入 stock_code 列"""
+        factor_dfs = []
+        for stock_code in stock_list:
+            stock_data = all_data[all_data['stock_code'] == stock_code].copy()
+            if stock_data.empty:
+                continue
+            try:
+                if factor_name.startswith('momentum_'):
+                    period = int(factor_name.split('_')[1].replace('d', ''))
+                    df = self._calc_momentum(stock_data, period)
+                elif factor_name.startswith('volatility_'):
+                    period = int(factor_name.split('_')[1].replace('d', ''))
+                    df = self._calc_volatility(stock_data, period)
+                elif factor_name == 'max_drawdown':
+                    df = self._calc_max_drawdown(stock_data)
+                elif factor_name == 'ma_trend':
+                    df = self._calc_ma_trend(stock_data)
+                elif factor_name.startswith('ma') and 'signal' in factor_name:
+                    period = int(factor_name.replace('ma', '').replace('_signal', ''))
+                    df = self._calc_ma_signal(stock_data, period)
+                elif factor_name == 'rsi':
+                    df = self._calc_rsi(stock_data)
+                elif factor_name == 'macd':
+                    df = self._calc_macd(stock_data)
+                elif factor_name == 'kdj':
+                    df = self._calc_kdj(stock_data)
+                elif factor_name == 'atr':
+                    df = self._calc_atr(stock_data)
+                elif factor_name == 'obv':
+                    df = self._calc_obv(stock_data)
+                elif factor_name == 'bollinger':
+                    df = self._calc_bollinger(stock_data)
+                elif factor_name in ['volume_ratio', 'turnover_rate', 'amplitude']:
+                    df = self._calc_volume_price(stock_data, factor_name)
+                else:
                     continue
-
-
-
-            if factor_dfs:
-
-                results[factor_name] = pd.concat(factor_dfs, ignore_index=True)
-
-
-
-        return results
+                if not df.empty:
+                    df['stock_code'] = stock_code
+                    factor_dfs.append(df)
+            except Exception as e:
+                logger.warning(f"[WARNING] 计算{stock_code}的{factor_name}失败: {e}")
+                continue
+
+        if not factor_dfs:
+            return pd.DataFrame()
+        return pd.concat(factor_dfs, ignore_index=True)
 
 
 
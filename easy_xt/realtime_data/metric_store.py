@@ -0,0 +1,195 @@
+"""
+指标时序存储
+
+为监控指标提供定长的环形缓冲区：
+- 时间戳和数值存放在预分配的 NumPy 数组中，每条序列内存固定
+- 数据按时间顺序追加，时间切片和过期清理使用二分查找
+- 同时维护窗口内数值的有序副本，分位数/中位数/极值查询无需排序
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+def exclusive_quantile(sorted_values: np.ndarray, i: int, n: int) -> float:
+    """有序数组上的分位点，与 statistics.quantiles(values, n=n)[i - 1] 一致"""
+    ld = len(sorted_values)
+    m = ld + 1
+    j = i * m // n
+    j = 1 if j < 1 else ld - 1 if j > ld - 1 else j
+    delta = i * m - j * n
+    return float((sorted_values[j - 1] * (n - delta) + sorted_values[j] * delta) / n)
+
+
+def describe_sorted(sorted_values: np.ndarray, values: np.ndarray) -> Dict[str, float]:
+    """计算统计摘要，字段与性能监控的 get_metric_statistics 保持一致"""
+    count = len(values)
+    mid = count // 2
+    if count % 2:
+        median = float(sorted_values[mid])
+    else:
+        median = float((sorted_values[mid - 1] + sorted_values[mid]) / 2)
+    max_value = float(sorted_values[-1])
+
+    return {
+        "count": count,
+        "min": float(sorted_values[0]),
+        "max": max_value,
+        "mean": float(np.mean(values)),
+        "median": median,
+        "std_dev": float(np.std(values, ddof=1)) if count > 1 else 0.0,
+        "p95": exclusive_quantile(sorted_values, 19, 20) if count >= 20 else max_value,
+        "p99": exclusive_quantile(sorted_values, 99, 100) if count >= 100 else max_value
+    }
+
+
+class RingSeries:
+    """定长时序环形缓冲区
+
+    写满后覆盖最旧的数据点。时间戳以 epoch 秒存储，要求按时间顺序追加。
+    可选的 payload 用于保存每个点附带的对象（如标签），首次使用时才分配。
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"capacity 必须为正数: {capacity}")
+
+        self.capacity = capacity
+        self._timestamps = np.empty(capacity, dtype=np.float64)
+        self._values = np.empty(capacity, dtype=np.float64)
+        self._sorted = np.empty(capacity, dtype=np.float64)
+        self._payloads: Optional[np.ndarray] = None
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """预分配数组占用的字节数"""
+        size = self._timestamps.nbytes + self._values.nbytes + self._sorted.nbytes
+        if self._payloads is not None:
+            size += self._payloads.nbytes
+        return size
+
+    def append(self, timestamp: float, value: float, payload: Any = None):
+        """追加数据点，缓冲区已满时覆盖最旧的点"""
+        value = float(value)
+        if self._size == self.capacity:
+            self._remove_sorted(self._values[self._start], self._size)
+            pos = self._start
+            self._start = (self._start + 1) % self.capacity
+            count = self._size - 1
+        else:
+            pos = (self._start + self._size) % self.capacity
+            count = self._size
+            self._size += 1
+
+        self._timestamps[pos] = timestamp
+        self._values[pos] = value
+        if payload is not None and self._payloads is None:
+            self._payloads = np.empty(self.capacity, dtype=object)
+        if self._payloads is not None:
+            self._payloads[pos] = payload
+        self._insert_sorted(value, count)
+
+    def evict_before(self, cutoff: float) -> int:
+        """删除时间戳早于 cutoff 的数据点，返回删除数量"""
+        removed = self._locate(cutoff, 'left')
+        if removed == 0:
+            return 0
+
+        if self._payloads is not None:
+            for k in range(removed):
+                self._payloads[(self._start + k) % self.capacity] = None
+        self._start = (self._start + removed) % self.capacity
+        self._size -= removed
+        self._sorted[:self._size] = np.sort(self._take(self._values, 0, self._size))
+        return removed
+
+    def clear(self):
+        """清空序列（不释放预分配内存）"""
+        self._start = 0
+        self._size = 0
+        if self._payloads is not None:
+            self._payloads[:] = None
+
+    def last_timestamp(self) -> Optional[float]:
+        if self._size == 0:
+            return None
+        return float(self._timestamps[(self._start + self._size - 1) % self.capacity])
+
+    def time_slice(self, start_time: Optional[float] = None,
+                   end_time: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """按时间范围（闭区间）取数据，返回 (时间戳, 数值, payload) 的副本"""
+        lo, hi = self._bounds(start_time, end_time)
+        payloads = self._take(self._payloads, lo, hi) if self._payloads is not None else None
+        return self._take(self._timestamps, lo, hi), self._take(self._values, lo, hi), payloads
+
+    def sorted_values(self, start_time: Optional[float] = None,
+                      end_time: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """返回时间范围内的 (有序数值, 原始顺序数值)
+
+        范围覆盖整个窗口时直接使用维护好的有序副本，否则只对切片排序。
+        """
+        lo, hi = self._bounds(start_time, end_time)
+        values = self._take(self._values, lo, hi)
+        if lo == 0 and hi == self._size:
+            return self._sorted[:self._size], values
+        return np.sort(values), values
+
+    def quantile(self, i: int, n: int = 100, start_time: Optional[float] = None,
+                 end_time: Optional[float] = None) -> Optional[float]:
+        """第 i 个 n 分位点，与 statistics.quantiles(values, n=n)[i - 1] 一致"""
+        sorted_values, _ = self.sorted_values(start_time, end_time)
+        if len(sorted_values) < 2:
+            return float(sorted_values[0]) if len(sorted_values) else None
+        return exclusive_quantile(sorted_values, i, n)
+
+    def describe(self, start_time: Optional[float] = None,
+                 end_time: Optional[float] = None) -> Dict[str, float]:
+        """统计摘要（count/min/max/mean/median/std_dev/p95/p99）"""
+        sorted_values, values = self.sorted_values(start_time, end_time)
+        if len(values) == 0:
+            return {}
+        return describe_sorted(sorted_values, values)
+
+    def _bounds(self, start_time: Optional[float], end_time: Optional[float]) -> Tuple[int, int]:
+        lo = self._locate(start_time, 'left') if start_time is not None else 0
+        hi = self._locate(end_time, 'right') if end_time is not None else self._size
+        return lo, max(lo, hi)
+
+    def _locate(self, timestamp: float, side: str) -> int:
+        """在逻辑顺序上二分查找时间戳位置"""
+        first_len = min(self._size, self.capacity - self._start)
+        first = self._timestamps[self._start:self._start + first_len]
+        second = self._timestamps[:self._size - first_len]
+        if first_len and (first[-1] >= timestamp if side == 'left' else first[-1] > timestamp):
+            return int(np.searchsorted(first, timestamp, side=side))
+        return first_len + int(np.searchsorted(second, timestamp, side=side))
+
+    def _take(self, array: np.ndarray, lo: int, hi: int) -> np.ndarray:
+        """按逻辑下标 [lo, hi) 取出副本"""
+        begin = self._start + lo
+        end = self._start + hi
+        if end <= self.capacity:
+            return array[begin:end].copy()
+        if begin >= self.capacity:
+            return array[begin - self.capacity:end - self.capacity].copy()
+        return np.concatenate((array[begin:], array[:end - self.capacity]))
+
+    def _insert_sorted(self, value: float, count: int):
+        idx = int(np.searchsorted(self._sorted[:count], value))
+        self._sorted[idx + 1:count + 1] = self._sorted[idx:count]
+        self._sorted[idx] = value
+
+    def _remove_sorted(self, value: float, count: int):
+        idx = int(np.searchsorted(self._sorted[:count], value))
+        self._sorted[idx:count - 1] = self._sorted[idx + 1:count]
+
+
+def to_epoch(dt: Optional[datetime]) -> Optional[float]:
+    return dt.timestamp() if dt is not None else None
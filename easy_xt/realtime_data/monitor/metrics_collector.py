@@ -7,11 +7,13 @@
 import time
 import logging
 import threading
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
 
+import numpy as np
+
+from ..metric_store import RingSeries, to_epoch
 from .system_monitor import SystemMonitor
 from .data_source_monitor import DataSourceMonitor
 from .api_monitor import APIMonitor
@@ -48,10 +50,9 @@ class MetricsCollector:
         self.retention_period = retention_period
         self.max_points_per_metric = max_points_per_metric
         
-        # 指标存储
-        self.metrics_data: Dict[str, deque] = defaultdict(
-            lambda: deque(maxlen=max_points_per_metric)
-        )
+        # 指标存储：每个指标键一个定长环形缓冲区，数据点来源作为 payload
+        self.metrics_data: Dict[str, RingSeries] = {}
+        self._series_info: Dict[str, Tuple[str, Dict[str, str]]] = {}  # key -> (metric_name, tags)
         
         # 监控器实例
         self.system_monitor: Optional[SystemMonitor] = None
@@ -424,7 +425,11 @@ class MetricsCollector:
         with self._lock:
             # 生成指标键（包含标签）
             metric_key = self._generate_metric_key(point.metric_name, point.tags)
-            self.metrics_data[metric_key].append(point)
+            series = self.metrics_data.get(metric_key)
+            if series is None:
+                series = self.metrics_data[metric_key] = RingSeries(self.max_points_per_metric)
+                self._series_info[metric_key] = (point.metric_name, dict(point.tags))
+            series.append(point.timestamp.timestamp(), point.value, point.source or None)
     
     def _generate_metric_key(self, metric_name: str, tags: Dict[str, str]) -> str:
         """生成指标键"""
@@ -437,20 +442,17 @@ class MetricsCollector:
     def _cleanup_old_data(self):
         """清理过期数据"""
         with self._lock:
-            cutoff_time = datetime.now() - self.retention_period
+            cutoff_time = (datetime.now() - self.retention_period).timestamp()
             
-            for metric_key, points in self.metrics_data.items():
-                # 过滤掉过期的数据点
-                valid_points = deque(
-                    (p for p in points if p.timestamp >= cutoff_time),
-                    maxlen=self.max_points_per_metric
-                )
-                self.metrics_data[metric_key] = valid_points
+            # 数据按时间追加，二分定位过期位置后整体前移
+            for series in self.metrics_data.values():
+                series.evict_before(cutoff_time)
             
             # 删除空的指标
-            empty_metrics = [k for k, v in self.metrics_data.items() if not v]
+            empty_metrics = [k for k, v in self.metrics_data.items() if not len(v)]
             for k in empty_metrics:
                 del self.metrics_data[k]
+                self._series_info.pop(k, None)
             
             logger.debug(f"数据清理完成，保留 {len(self.metrics_data)} 个指标")
     
@@ -472,20 +474,40 @@ class MetricsCollector:
         """
         with self._lock:
             metric_key = self._generate_metric_key(metric_name, tags or {})
-            points = self.metrics_data.get(metric_key, deque())
-            
-            # 时间过滤
-            if start_time or end_time:
-                filtered_points = []
-                for point in points:
-                    if start_time and point.timestamp < start_time:
-                        continue
-                    if end_time and point.timestamp > end_time:
-                        continue
-                    filtered_points.append(point)
-                return filtered_points
-            
-            return list(points)
+            series = self.metrics_data.get(metric_key)
+            if series is None:
+                return []
+            timestamps, values, sources = series.time_slice(to_epoch(start_time), to_epoch(end_time))
+            name, point_tags = self._series_info[metric_key]
+        
+        return [
+            MetricPoint(
+                timestamp=datetime.fromtimestamp(timestamps[i]),
+                metric_name=name,
+                value=float(values[i]),
+                tags=dict(point_tags),
+                source=(sources[i] or "") if sources is not None else ""
+            )
+            for i in range(len(values))
+        ]
+    
+    def query_values(self,
+                     metric_name: str,
+                     tags: Dict[str, str] = None,
+                     start_time: datetime = None,
+                     end_time: datetime = None) -> Tuple[np.ndarray, np.ndarray]:
+        """查询指标数据的数组形式
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (epoch 秒时间戳, 数值)
+        """
+        with self._lock:
+            metric_key = self._generate_metric_key(metric_name, tags or {})
+            series = self.metrics_data.get(metric_key)
+            if series is None:
+                return np.empty(0), np.empty(0)
+            timestamps, values, _ = series.time_slice(to_epoch(start_time), to_epoch(end_time))
+            return timestamps, values
     
     def get_metric_names(self) -> List[str]:
         """获取所有指标名称"""
@@ -528,7 +550,7 @@ class MetricsCollector:
         
         Args:
             metric_name: 指标名称
-            aggregation: 聚合方式 ('avg', 'sum', 'min', 'max', 'count')
+            aggregation: 聚合方式 ('avg', 'sum', 'min', 'max', 'count', 'median', 'p95', 'p99')
             duration: 聚合时间窗口
             tags: 标签过滤
             
@@ -538,30 +560,31 @@ class MetricsCollector:
         end_time = datetime.now()
         start_time = end_time - duration
         
-        points = self.query_metrics(metric_name, tags, start_time, end_time)
+        with self._lock:
+            metric_key = self._generate_metric_key(metric_name, tags or {})
+            series = self.metrics_data.get(metric_key)
+            if series is None:
+                return None
+            if aggregation == 'sum':
+                _, values, _ = series.time_slice(start_time.timestamp(), end_time.timestamp())
+                return float(values.sum()) if len(values) else None
+            stats = series.describe(start_time.timestamp(), end_time.timestamp())
         
-        if not points:
+        if not stats:
             return None
         
-        values = [p.value for p in points]
-        
         if aggregation == 'avg':
-            return sum(values) / len(values)
-        elif aggregation == 'sum':
-            return sum(values)
-        elif aggregation == 'min':
-            return min(values)
-        elif aggregation == 'max':
-            return max(values)
-        elif aggregation == 'count':
-            return len(values)
+            return stats['mean']
+        elif aggregation in ('min', 'max', 'count', 'median', 'p95', 'p99'):
+            return stats[aggregation]
         else:
             raise ValueError(f"不支持的聚合方式: {aggregation}")
     
     def get_stats(self) -> Dict[str, Any]:
         """获取收集器统计信息"""
         with self._lock:
-            total_points = sum(len(points) for points in self.metrics_data.values())
+            total_points = sum(len(series) for series in self.metrics_data.values())
+            total_bytes = sum(series.nbytes for series in self.metrics_data.values())
             
             return {
                 'collector_info': {
@@ -573,6 +596,7 @@ class MetricsCollector:
                 'data_info': {
                     'total_metrics': len(self.metrics_data),
                     'total_points': total_points,
+                    'memory_bytes': total_bytes,
                     'unique_metric_names': len(self.get_metric_names()),
                     'registered_monitors': {
                         'system_monitor': self.system_monitor is not None,
@@ -7,15 +7,15 @@ import time
 import psutil
 import threading
 import asyncio
-import statistics
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Tuple
 from dataclasses import dataclass, asdict
-from collections import defaultdict, deque
 from datetime import datetime, timedelta
 import json
 import logging
 from pathlib import Path
 
+from .metric_store import RingSeries, to_epoch
+
 
 @dataclass
 class PerformanceMetric:
@@ -54,65 +54,69 @@ class PerformanceReport:
 
 
 class MetricsCollector:
-    """指标收集器"""
+    """指标收集器
+    
+    每个指标使用定长环形缓冲区存储（见 metric_store.RingSeries），
+    统计查询中的中位数/p95/p99 直接取自维护好的有序窗口。
+    """
     
-    def __init__(self):
-        self.metrics = defaultdict(lambda: deque(maxlen=1000))
+    def __init__(self, max_points_per_metric: int = 1000):
+        self.max_points_per_metric = max_points_per_metric
+        self.metrics: Dict[str, RingSeries] = {}
+        self.metric_info: Dict[str, Tuple[str, str]] = {}  # name -> (unit, category)
         self.lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
     
     def record_metric(self, name: str, value: float, unit: str = "", 
                      category: str = "general", tags: Optional[Dict[str, str]] = None):
         """记录性能指标"""
-        metric = PerformanceMetric(
-            name=name,
-            value=value,
-            unit=unit,
-            timestamp=datetime.now(),
-            category=category,
-            tags=tags or {}
-        )
+        timestamp = time.time()
         
         with self.lock:
-            self.metrics[name].append(metric)
+            series = self.metrics.get(name)
+            if series is None:
+                series = self.metrics[name] = RingSeries(self.max_points_per_metric)
+            series.append(timestamp, value, tags or None)
+            self.metric_info[name] = (unit, category)
     
     def get_metrics(self, name: str, since: Optional[datetime] = None) -> List[PerformanceMetric]:
         """获取指标数据"""
         with self.lock:
-            metrics = list(self.metrics[name])
-        
-        if since:
-            metrics = [m for m in metrics if m.timestamp >= since]
-        
-        return metrics
+            series = self.metrics.get(name)
+            if series is None:
+                return []
+            timestamps, values, tags = series.time_slice(to_epoch(since))
+            unit, category = self.metric_info.get(name, ("", "general"))
+        
+        return [
+            PerformanceMetric(
+                name=name,
+                value=float(values[i]),
+                unit=unit,
+                timestamp=datetime.fromtimestamp(timestamps[i]),
+                category=category,
+                tags=dict(tags[i]) if tags is not None and tags[i] else {}
+            )
+            for i in range(len(values))
+        ]
     
     def get_metric_statistics(self, name: str, since: Optional[datetime] = None) -> Dict[str, float]:
         """获取指标统计信息"""
-        metrics = self.get_metrics(name, since)
-        
-        if not metrics:
-            return {}
-        
-        values = [m.value for m in metrics]
-        
-        return {
-            "count": len(values),
-            "min": min(values),
-            "max": max(values),
-            "mean": statistics.mean(values),
-            "median": statistics.median(values),
-            "std_dev": statistics.stdev(values) if len(values) > 1 else 0.0,
-            "p95": statistics.quantiles(values, n=20)[18] if len(values) >= 20 else max(values),
-            "p99": statistics.quantiles(values, n=100)[98] if len(values) >= 100 else max(values)
-        }
+        with self.lock:
+            series = self.metrics.get(name)
+            if series is None:
+                return {}
+            return series.describe(to_epoch(since))
     
     def clear_metrics(self, name: Optional[str] = None):
         """清除指标数据"""
         with self.lock:
             if name:
-                self.metrics[name].clear()
+                if name in self.metrics:
+                    self.metrics[name].clear()
             else:
                 self.metrics.clear()
+                self.metric_info.clear()
 
 
 class SystemMonitor:
@@ -6,7 +6,10 @@
 """
 
 import time
+import queue
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 from .base_provider import BaseDataProvider
@@ -28,11 +31,236 @@ except ImportError as e:
     )
 
 
+class _TdxSession:
+    """连接池中的一条通达信连接"""
+
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.api = None
+        self.server: Optional[Dict[str, Any]] = None
+        self.last_used = 0.0
+
+
+class TdxConnectionPool:
+    """通达信连接池
+
+    在性能排名靠前的多个服务器上各保持一条长连接，批量行情请求并行分发到各连接。
+    每条连接一次只处理一批（80只），n 批请求约需 ceil(n / size) 轮往返，
+    全市场约 65 批，默认 4 条连接时约 17 轮。
+    后台心跳线程定期探测空闲连接，失效的连接自动切换到下一个可用服务器。
+    所有服务器都连不上时按指数退避，退避期内 start() 直接返回 False。
+    """
+
+    # 建立失败后的重试间隔（秒），每次失败翻倍，不超过 MAX_RETRY_BACKOFF
+    RETRY_BACKOFF = 5.0
+    MAX_RETRY_BACKOFF = 300.0
+
+    def __init__(self, provider: 'TdxDataProvider', size: int = 4, heartbeat_interval: float = 30.0):
+        """初始化连接池
+
+        Args:
+            provider: 所属的通达信数据提供者（提供服务器列表与性能统计）
+            size: 连接数
+            heartbeat_interval: 心跳间隔（秒）
+        """
+        self.provider = provider
+        self.size = size
+        self.heartbeat_interval = heartbeat_interval
+        self.logger = provider.logger
+
+        self._sessions: List[_TdxSession] = []
+        self._idle: "queue.Queue[_TdxSession]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop_event = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def started(self) -> bool:
+        return bool(self._sessions)
+
+    def start(self) -> bool:
+        """并行建立连接，第 k 条连接优先使用排名第 k 的服务器
+
+        Returns:
+            bool: 是否至少建立了一条连接（退避期内不尝试，直接返回 False）
+        """
+        with self._lock:
+            if self._sessions:
+                return True
+            if time.time() < self._retry_at:
+                return False
+
+            servers = self.provider._sort_servers_by_performance()
+            if not servers:
+                return False
+
+            sessions = [_TdxSession(slot) for slot in range(self.size)]
+            with ThreadPoolExecutor(max_workers=self.size) as executor:
+                opened = list(executor.map(lambda s: self._open(s, servers, s.slot), sessions))
+
+            self._sessions = [s for s, ok in zip(sessions, opened) if ok]
+            if not self._sessions:
+                self._failures += 1
+                backoff = min(self.RETRY_BACKOFF * 2 ** (self._failures - 1), self.MAX_RETRY_BACKOFF)
+                self._retry_at = time.time() + backoff
+                self.logger.error(f"连接池建立失败：所有服务器均不可用，{backoff:.0f}秒后再试")
+                return False
+            self._failures = 0
+            self._retry_at = 0.0
+
+            for session in self._sessions:
+                self._idle.put(session)
+            self._executor = ThreadPoolExecutor(
+                max_workers=len(self._sessions), thread_name_prefix="TdxPool"
+            )
+            self._stop_event.clear()
+            self._heartbeat_thread = threading.Thread(
+                target=self._heartbeat_loop, name="TdxPoolHeartbeat", daemon=True
+            )
+            self._heartbeat_thread.start()
+
+            self.logger.info(
+                f"通达信连接池已建立 {len(self._sessions)} 条连接: "
+                f"{[s.server.get('name', s.server['host']) for s in self._sessions]}"
+            )
+            return True
+
+    def close(self):
+        """关闭连接池"""
+        with self._lock:
+            self._stop_event.set()
+            if self._heartbeat_thread and self._heartbeat_thread.is_alive():
+                self._heartbeat_thread.join(timeout=5)
+            if self._executor:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            for session in self._sessions:
+                self._disconnect(session)
+            self._sessions = []
+            self._idle = queue.Queue()
+
+    def fetch_quotes(self, batches: List[List[Tuple[int, str]]]) -> List[Optional[List[Dict]]]:
+        """并行获取多批行情
+
+        Args:
+            batches: 每批不超过80只的 (市场ID, 代码) 列表
+
+        Returns:
+            List: 与 batches 一一对应的原始行情列表，失败的批次为 None
+        """
+        if not self._executor:
+            return [None] * len(batches)
+        futures = [self._executor.submit(self._run_batch, batch) for batch in batches]
+        return [future.result() for future in futures]
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        """各连接状态"""
+        return [
+            {
+                'slot': s.slot,
+                'server': s.server.get('name', s.server['host']) if s.server else None,
+                'alive': s.api is not None,
+                'idle_seconds': round(time.time() - s.last_used, 1) if s.last_used else None
+            }
+            for s in self._sessions
+        ]
+
+    def _run_batch(self, batch: List[Tuple[int, str]]) -> Optional[List[Dict]]:
+        """占用一条空闲连接执行一批请求，连接失效时切换服务器后重试一次"""
+        for attempt in range(2):
+            try:
+                session = self._idle.get(timeout=self.provider.timeout)
+            except queue.Empty:
+                self.logger.error("连接池无空闲连接")
+                return None
+
+            try:
+                if session.api is None and not self._reconnect(session):
+                    continue
+                quotes = session.api.get_security_quotes(batch)
+                session.last_used = time.time()
+                if quotes is None:
+                    raise ConnectionError("服务器返回空结果")
+                return quotes
+            except Exception as e:
+                self.logger.warning(
+                    f"连接池批次请求失败 (连接 {session.slot}, 尝试 {attempt + 1}/2): {e}"
+                )
+                self._reconnect(session)
+            finally:
+                self._idle.put(session)
+        return None
+
+    def _heartbeat_loop(self):
+        """心跳循环：探测空闲超过心跳间隔的连接，失效的连接替换为其他服务器"""
+        while not self._stop_event.wait(self.heartbeat_interval):
+            for _ in range(self._idle.qsize()):
+                try:
+                    session = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    if time.time() - session.last_used >= self.heartbeat_interval:
+                        if session.api is None or session.api.get_security_count(0) <= 0:
+                            raise ConnectionError("心跳无响应")
+                        session.last_used = time.time()
+                except Exception as e:
+                    self.logger.warning(f"连接 {session.slot} 心跳失败，重新连接: {e}")
+                    self._reconnect(session)
+                finally:
+                    self._idle.put(session)
+
+    def _reconnect(self, session: _TdxSession) -> bool:
+        """断开连接并按排名重新选择服务器，优先避开其他连接正在使用的服务器"""
+        failed_host = session.server['host'] if session.server else None
+        self._disconnect(session)
+
+        in_use = {s.server['host'] for s in self._sessions if s is not session and s.server}
+        servers = self.provider._sort_servers_by_performance()
+        servers.sort(key=lambda srv: (srv['host'] == failed_host, srv['host'] in in_use))
+        return self._open(session, servers, 0)
+
+    def _open(self, session: _TdxSession, servers: List[Dict], start: int) -> bool:
+        """从 servers[start] 开始依次尝试连接"""
+        for offset in range(len(servers)):
+            server = servers[(start + offset) % len(servers)]
+            api = TdxHq_API()
+            start_time = time.time()
+            try:
+                ok = api.connect(server['host'], server['port'], time_out=self.provider.timeout)
+            except Exception as e:
+                self.logger.debug(f"连接池连接异常: {server['host']}, 错误: {e}")
+                ok = False
+            self.provider._record_server_performance(server['host'], time.time() - start_time, success=bool(ok))
+            if ok:
+                session.api = api
+                session.server = server
+                session.last_used = time.time()
+                return True
+        return False
+
+    @staticmethod
+    def _disconnect(session: _TdxSession):
+        if session.api is not None:
+            try:
+                session.api.disconnect()
+            except Exception:
+                pass
+        session.api = None
+        session.server = None
+
+
 class TdxDataProvider(BaseDataProvider):
     """通达信数据提供者
     
     提供通达信行情数据接口，包含连接管理、数据获取、异常处理等功能。
     """
+
+    # 通达信单次行情请求最多80只
+    QUOTE_BATCH_SIZE = 80
     
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         """初始化通达信数据提供者
@@ -88,6 +316,14 @@ class TdxDataProvider(BaseDataProvider):
         self.timeout = self.config.get('timeout', 10)
         self.retry_count = self.config.get('retry_count', 3)
         self.retry_delay = self.config.get('retry_delay', 1)
+
+        # 连接池：超过一批(80只)的行情请求并行分发到多个服务器，<=1 表示不使用
+        self.pool_size = self.config.get('pool_size', 4)
+        self.heartbeat_interval = self.config.get('heartbeat_interval', 30)
+        self._pool: Optional[TdxConnectionPool] = None
+        self._stats_lock = threading.Lock()
+        # 最近一次行情请求中失败批次的代码（未出现在返回结果中）
+        self.last_failed_codes: List[str] = []
         
     def connect(self) -> bool:
         """连接到通达信服务器（智能选择最快服务器）
@@ -149,14 +385,17 @@ class TdxDataProvider(BaseDataProvider):
             List[Dict]: 排序后的服务器列表
         """
         servers = self.servers.copy()
+        # 连接池线程会并发写入统计，排序前在锁内复制一份
+        with self._stats_lock:
+            server_stats = {host: dict(stats) for host, stats in self.server_stats.items()}
 
         def get_sort_key(server):
             host = server['host']
             priority = server.get('priority', 99)
 
             # 如果有历史性能数据
-            if host in self.server_stats and self.server_stats[host]['success_count'] > 0:
-                stats = self.server_stats[host]
+            if host in server_stats and server_stats[host]['success_count'] > 0:
+                stats = server_stats[host]
                 avg_time = stats['avg_time']
                 # 成功率
                 total = stats['success_count'] + stats['fail_count']
@@ -179,29 +418,33 @@ class TdxDataProvider(BaseDataProvider):
             connect_time: 连接耗时（秒）
             success: 是否连接成功
         """
-        if host not in self.server_stats:
-            self.server_stats[host] = {
-                'avg_time': 0,
-                'success_count': 0,
-                'fail_count': 0,
-                'total_time': 0,
-                'total_count': 0
-            }
-
-        stats = self.server_stats[host]
-
-        if success:
-            # 更新成功的连接时间（使用移动平均）
-            stats['success_count'] += 1
-            stats['total_time'] += connect_time
-            stats['total_count'] += 1
-            stats['avg_time'] = stats['total_time'] / stats['total_count']
-        else:
-            stats['fail_count'] += 1
-            stats['total_count'] += 1
+        with self._stats_lock:
+            if host not in self.server_stats:
+                self.server_stats[host] = {
+                    'avg_time': 0,
+                    'success_count': 0,
+                    'fail_count': 0,
+                    'total_time': 0,
+                    'total_count': 0
+                }
+
+            stats = self.server_stats[host]
+
+            if success:
+                # 更新成功的连接时间（使用移动平均）
+                stats['success_count'] += 1
+                stats['total_time'] += connect_time
+                stats['total_count'] += 1
+                stats['avg_time'] = stats['total_time'] / stats['total_count']
+            else:
+                stats['fail_count'] += 1
+                stats['total_count'] += 1
     
     def disconnect(self) -> None:
         """断开连接"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
         try:
             if self.connected:
                 self.api.disconnect()
@@ -267,6 +510,13 @@ class TdxDataProvider(BaseDataProvider):
         """
         if not codes:
             return []
+        self.last_failed_codes = []
+
+        # 多于一批时通过连接池并行获取，连接池不可用再退回单连接串行
+        if len(codes) > self.QUOTE_BATCH_SIZE and self.pool_size > 1:
+            quotes = self._get_realtime_quotes_parallel(codes)
+            if quotes is not None:
+                return quotes
         
         for attempt in range(self.retry_count):
             try:
@@ -281,8 +531,9 @@ class TdxDataProvider(BaseDataProvider):
                     stock_list.append((market, std_code))
                 
                 # 分批获取数据（通达信API限制每次最多80只股票）
-                batch_size = 80
+                batch_size = self.QUOTE_BATCH_SIZE
                 all_quotes = []
+                failed_codes = []
                 
                 for i in range(0, len(stock_list), batch_size):
                     batch = stock_list[i:i + batch_size]
@@ -303,8 +554,10 @@ class TdxDataProvider(BaseDataProvider):
                             
                     except Exception as e:
                         self.logger.error(f"获取批次数据失败: {e}")
+                        failed_codes.extend(codes[i:i + batch_size])
                         continue
                 
+                self._report_failed_codes(failed_codes, len(codes))
                 self.logger.info(f"成功获取 {len(all_quotes)} 只股票的实时行情")
                 return all_quotes
                 
@@ -318,6 +571,51 @@ class TdxDataProvider(BaseDataProvider):
         
         return []
     
+    def _get_realtime_quotes_parallel(self, codes: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """通过连接池并行获取实时行情
+
+        失败批次的代码记录在 last_failed_codes 中。
+
+        Returns:
+            List[Dict]: 行情数据列表；连接池无法建立（或处于退避期）时返回 None
+        """
+        if self._pool is None:
+            self._pool = TdxConnectionPool(self, self.pool_size, self.heartbeat_interval)
+        if not self._pool.start():
+            return None
+
+        stock_list = [self._parse_stock_code(code) for code in codes]
+        batches = [
+            stock_list[i:i + self.QUOTE_BATCH_SIZE]
+            for i in range(0, len(stock_list), self.QUOTE_BATCH_SIZE)
+        ]
+
+        start_time = time.time()
+        all_quotes = []
+        failed_codes = []
+        for i, quotes in enumerate(self._pool.fetch_quotes(batches)):
+            if quotes is None:
+                failed_codes.extend(codes[i * self.QUOTE_BATCH_SIZE:(i + 1) * self.QUOTE_BATCH_SIZE])
+                continue
+            for quote in quotes:
+                formatted_quote = self._format_quote_data(quote)
+                if formatted_quote:
+                    all_quotes.append(formatted_quote)
+
+        self._report_failed_codes(failed_codes, len(codes))
+        self.logger.info(
+            f"连接池成功获取 {len(all_quotes)} 只股票的实时行情 "
+            f"({len(batches)} 批, 耗时 {time.time() - start_time:.2f}秒)"
+        )
+        return all_quotes
+
+    def _report_failed_codes(self, failed_codes: List[str], total: int):
+        """记录并告警失败批次的代码"""
+        self.last_failed_codes = failed_codes
+        if failed_codes:
+            preview = ', '.join(failed_codes[:10]) + (' ...' if len(failed_codes) > 10 else '')
+            self.logger.warning(f"{len(failed_codes)}/{total} 只股票行情获取失败: {preview}")
+
     def _format_quote_data(self, quote: Dict) -> Optional[Dict[str, Any]]:
         """格式化行情数据为统一格式
 
@@ -552,11 +850,13 @@ class TdxDataProvider(BaseDataProvider):
             }
         """
         server_list = []
+        with self._stats_lock:
+            server_stats = {host: dict(stats) for host, stats in self.server_stats.items()}
 
         for server in self.servers:
             host = server['host']
-            if host in self.server_stats:
-                stats = self.server_stats[host]
+            if host in server_stats:
+                stats = server_stats[host]
                 total = stats['success_count'] + stats['fail_count']
                 success_rate = stats['success_count'] / total if total > 0 else 0
 
@@ -584,7 +884,8 @@ class TdxDataProvider(BaseDataProvider):
 
         return {
             'current_server': self.current_server,
-            'servers': server_list
+            'servers': server_list,
+            'pool': self._pool.get_status() if self._pool is not None else []
         }
 
     def get_index_quotes(self, codes: List[str]) -> List[Dict[str, Any]]:
@@ -884,6 +1185,9 @@ class TdxDataProvider(BaseDataProvider):
     def get_batch_realtime_quotes(self, codes: List[str], batch_size: int = 80) -> Dict[str, Dict[str, Any]]:
         """批量获取实时行情（优化版）
 
+        超过一批时由连接池在多个服务器上并行获取（见 pool_size 配置）。
+        获取失败的代码不在返回结果中，记录在 last_failed_codes。
+
         Args:
             codes: 股票代码列表
             batch_size: 每批数量（通达信限制80只）
@@ -58,6 +58,35 @@ class ValidationResult:
     rules_applied: List[str] = field(default_factory=list)
 
 
+@dataclass
+class BatchValidationResult:
+    """列式批量验证结果
+
+    error_bitmap 中第 i 位对应 rule_names[i]，置位表示该行未通过该规则。
+    """
+    is_valid: np.ndarray
+    error_bitmap: np.ndarray
+    rule_names: List[str] = field(default_factory=list)
+    cleaned_data: Optional[pd.DataFrame] = None
+    error_counts: Dict[str, int] = field(default_factory=dict)
+    validation_time: datetime = field(default_factory=datetime.now)
+
+    def failed_rules(self, row: int) -> List[str]:
+        """返回指定行(位置下标)未通过的规则名称"""
+        bits = int(self.error_bitmap[row])
+        return [name for i, name in enumerate(self.rule_names) if bits >> i & 1]
+
+
+@dataclass
+class _RuleMasks:
+    """单条规则在整批数据上的结果掩码"""
+    failed: np.ndarray
+    error: np.ndarray
+    warning: np.ndarray
+    cleaned: np.ndarray
+    cleaned_values: Optional[np.ndarray] = None
+
+
 class DataValidator:
     """数据验证器"""
     
@@ -208,7 +237,276 @@ class DataValidator:
             result = self._validate_data(data, data_type)
             results.append(result)
         return results
-    
+
+    def validate_batch_frame(self, data: Any, data_type: DataType) -> BatchValidationResult:
+        """列式批量验证数据
+
+        range/regex/required 规则以及价格精度、OHLC关系、数值有限性等自定义规则
+        以向量化掩码方式执行，其余规则逐行回退到 _apply_rule。统计信息与对
+        data.to_dict('records') 逐条调用 _validate_data 的结果一致。
+
+        Args:
+            data: pandas.DataFrame 或 pyarrow Table/RecordBatch
+            data_type: 数据类型
+
+        Returns:
+            BatchValidationResult: 每行错误位图及清洗后的数据
+        """
+        frame = self._to_frame(data)
+        n = len(frame)
+        rules = [r for r in self.rules.get(data_type, []) if r.enabled]
+        if len(rules) > 64:
+            raise ValueError(f"列式验证最多支持64条规则，当前 {len(rules)} 条")
+
+        self.statistics['total_validated'] += n
+
+        error_bitmap = np.zeros(n, dtype=np.uint64)
+        cleaned = frame.copy()
+        error_counts: Dict[str, int] = {}
+        records = None  # 逐行回退时才构造
+
+        for bit, rule in enumerate(rules):
+            masks = None
+            handler = self._get_vector_handler(rule)
+            if handler is not None:
+                try:
+                    masks = handler(frame, rule)
+                except Exception as e:
+                    logger.debug(f"规则 {rule.name} 向量化执行失败，回退逐行验证: {e}")
+            if masks is None:
+                if records is None:
+                    records = frame.to_dict('records')
+                masks = self._apply_rule_rows(records, rule)
+
+            error_bitmap[masks.failed] |= np.uint64(1) << np.uint64(bit)
+            error_counts[rule.name] = int(masks.failed.sum())
+            self.statistics['total_errors'] += int(masks.error.sum())
+            self.statistics['total_warnings'] += int(masks.warning.sum())
+
+            cleaned_count = int(masks.cleaned.sum())
+            if cleaned_count:
+                self.statistics['total_cleaned'] += cleaned_count
+                if rule.field in cleaned.columns:
+                    column = cleaned[rule.field]
+                else:
+                    column = pd.Series([None] * n, index=cleaned.index, dtype=object)
+                other = pd.Series(masks.cleaned_values, index=cleaned.index)
+                cleaned[rule.field] = column.where(~masks.cleaned, other)
+
+        return BatchValidationResult(
+            is_valid=error_bitmap == 0,
+            error_bitmap=error_bitmap,
+            rule_names=[r.name for r in rules],
+            cleaned_data=cleaned,
+            error_counts=error_counts
+        )
+
+    @staticmethod
+    def _to_frame(data: Any) -> pd.DataFrame:
+        """将批量输入统一为DataFrame"""
+        if isinstance(data, pd.DataFrame):
+            return data
+        if hasattr(data, 'to_pandas'):  # pyarrow.Table / RecordBatch
+            return data.to_pandas()
+        return pd.DataFrame(data)
+
+    def _get_vector_handler(self, rule: ValidationRule):
+        """获取规则的向量化实现，没有则返回None"""
+        if rule.rule_type == "custom":
+            func_name = rule.params.get("func")
+            handlers = {
+                'validate_price_precision': self._vec_price_precision,
+                'validate_ohlc_relationship': self._vec_ohlc_relationship,
+                'validate_finite_value': self._vec_finite_value,
+            }
+            # 子类重写了逐行函数时不能再使用内置的向量化实现
+            if func_name in handlers and getattr(type(self), func_name) is getattr(DataValidator, func_name):
+                return handlers[func_name]
+            return None
+        return {
+            'required': self._vec_required,
+            'range': self._vec_range,
+            'regex': self._vec_regex,
+        }.get(rule.rule_type)
+
+    def _apply_rule_rows(self, records: List[Dict[str, Any]], rule: ValidationRule) -> _RuleMasks:
+        """逐行执行规则(无向量化实现时的回退路径)"""
+        n = len(records)
+        masks = self._empty_masks(n)
+        masks.cleaned_values = np.empty(n, dtype=object)
+        failures = 0
+        for i, row in enumerate(records):
+            try:
+                rule_result = self._apply_rule(row, rule)
+            except Exception:
+                masks.failed[i] = True
+                failures += 1
+                continue
+            if not rule_result['valid']:
+                masks.failed[i] = True
+                masks.error[i] = bool(rule_result.get('error'))
+                masks.warning[i] = bool(rule_result.get('warning'))
+            if rule_result.get('cleaned_value') is not None:
+                masks.cleaned[i] = True
+                masks.cleaned_values[i] = rule_result['cleaned_value']
+        if failures:
+            logger.error(f"验证规则 {rule.name} 执行失败 {failures} 行")
+        return masks
+
+    @staticmethod
+    def _empty_masks(n: int) -> _RuleMasks:
+        return _RuleMasks(
+            failed=np.zeros(n, dtype=bool),
+            error=np.zeros(n, dtype=bool),
+            warning=np.zeros(n, dtype=bool),
+            cleaned=np.zeros(n, dtype=bool)
+        )
+
+    @staticmethod
+    def _none_mask(column: Optional[pd.Series], n: int) -> np.ndarray:
+        """字段缺失(即字典中取到None)的行"""
+        if column is None:
+            return np.ones(n, dtype=bool)
+        if column.dtype == object:
+            return np.equal(column.to_numpy(), None)
+        return np.zeros(n, dtype=bool)
+
+    @staticmethod
+    def _to_float(column: pd.Series, none: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """按 float(value) 的语义整列转换，返回 (数值, 无法转换的掩码)"""
+        n = len(column)
+        bad = np.zeros(n, dtype=bool)
+        if pd.api.types.is_numeric_dtype(column.dtype):
+            return column.to_numpy(dtype=np.float64, na_value=np.nan), bad
+
+        values = np.array(pd.to_numeric(column, errors='coerce'), dtype=np.float64)
+        raw = column.to_numpy()
+        # to_numeric 与 float() 的解析规则不完全相同，NaN 的位置逐个复核
+        for i in np.flatnonzero(np.isnan(values) & ~none):
+            try:
+                values[i] = float(raw[i])
+            except (ValueError, TypeError):
+                bad[i] = True
+        return values, bad
+
+    def _vec_required(self, frame: pd.DataFrame, rule: ValidationRule) -> _RuleMasks:
+        n = len(frame)
+        column = frame[rule.field] if rule.field in frame.columns else None
+        masks = self._empty_masks(n)
+        missing = self._none_mask(column, n)
+        if column is not None and not pd.api.types.is_numeric_dtype(column.dtype):
+            missing |= column.eq("").to_numpy(dtype=bool, na_value=False)
+        masks.failed = masks.error = missing
+        return masks
+
+    def _vec_range(self, frame: pd.DataFrame, rule: ValidationRule) -> _RuleMasks:
+        n = len(frame)
+        masks = self._empty_masks(n)
+        if rule.field not in frame.columns:
+            return masks
+
+        column = frame[rule.field]
+        none = self._none_mask(column, n)
+        values, bad = self._to_float(column, none)
+        checked = ~none & ~bad
+        min_val = rule.params.get("min")
+        max_val = rule.params.get("max")
+        below = checked & (values < min_val) if min_val is not None else np.zeros(n, dtype=bool)
+        above = checked & ~below & (values > max_val) if max_val is not None else np.zeros(n, dtype=bool)
+
+        if self.validation_level == ValidationLevel.STRICT:
+            masks.failed = masks.error = bad | below | above
+        else:
+            masks.failed = masks.error = bad
+            masks.cleaned = below | above
+            cleaned_values = np.empty(n, dtype=object)
+            cleaned_values[below] = min_val
+            cleaned_values[above] = max_val
+            masks.cleaned_values = cleaned_values
+        return masks
+
+    def _vec_regex(self, frame: pd.DataFrame, rule: ValidationRule) -> _RuleMasks:
+        n = len(frame)
+        masks = self._empty_masks(n)
+        pattern = rule.params.get("pattern")
+        if rule.field not in frame.columns or not pattern:
+            return masks
+
+        column = frame[rule.field]
+        none = self._none_mask(column, n)
+        matched = column.astype(str).str.match(pattern).to_numpy(dtype=bool, na_value=False)
+        masks.failed = masks.error = ~none & ~matched
+        return masks
+
+    def _vec_price_precision(self, frame: pd.DataFrame, rule: ValidationRule) -> _RuleMasks:
+        n = len(frame)
+        masks = self._empty_masks(n)
+        if rule.field not in frame.columns:
+            return masks
+
+        column = frame[rule.field]
+        none = self._none_mask(column, n)
+        values, bad = self._to_float(column, none)
+        masks.failed = masks.error = bad
+
+        finite = ~none & ~bad & np.isfinite(values)
+        abs_values = np.abs(values)
+        # str(float) 在该区间内不使用科学计数法，且 np.round 与 round 判定一致
+        plain = finite & ((abs_values >= 1e-4) | (values == 0)) & (abs_values < 1e9)
+        with np.errstate(invalid='ignore'):
+            too_precise = plain & (np.round(values, 3) != values)
+        for i in np.flatnonzero(finite & ~plain):
+            price_str = str(values[i])
+            too_precise[i] = '.' in price_str and len(price_str.split('.')[-1]) > 3
+
+        cleaned_values = np.empty(n, dtype=object)
+        cleaned_values[too_precise] = [round(float(v), 3) for v in values[too_precise]]
+        masks.cleaned = too_precise
+        masks.cleaned_values = cleaned_values
+        return masks
+
+    def _vec_ohlc_relationship(self, frame: pd.DataFrame, rule: ValidationRule) -> _RuleMasks:
+        n = len(frame)
+        masks = self._empty_masks(n)
+        names = ['open', 'high', 'low', 'close']
+        if any(name not in frame.columns for name in names):
+            return masks
+
+        skip = np.zeros(n, dtype=bool)
+        bad = np.zeros(n, dtype=bool)
+        prices = {}
+        for name in names:
+            none = self._none_mask(frame[name], n)
+            prices[name], col_bad = self._to_float(frame[name], none)
+            skip |= none
+            bad |= col_bad
+        bad &= ~skip
+        o, h, l, c = (prices[name] for name in names)
+
+        # 按内置 max/min 的比较顺序计算，NaN 的处理与逐行路径一致
+        highest = np.where(l > o, l, o)
+        highest = np.where(c > highest, c, highest)
+        lowest = np.where(h < o, h, o)
+        lowest = np.where(c < lowest, c, lowest)
+
+        checked = ~skip & ~bad
+        high_error = checked & (h < highest)
+        low_error = checked & ~high_error & (l > lowest)
+        masks.failed = masks.error = bad | high_error | low_error
+        return masks
+
+    def _vec_finite_value(self, frame: pd.DataFrame, rule: ValidationRule) -> _RuleMasks:
+        n = len(frame)
+        masks = self._empty_masks(n)
+        if rule.field not in frame.columns:
+            return masks
+
+        column = frame[rule.field]
+        none = self._none_mask(column, n)
+        values, bad = self._to_float(column, none)
+        masks.failed = masks.error = bad | (~none & ~bad & ~np.isfinite(values))
+        return masks
+
     def _validate_data(self, data: Dict[str, Any], data_type: DataType) -> ValidationResult:
         """验证数据的核心方法"""
         self.statistics['total_validated'] += 1
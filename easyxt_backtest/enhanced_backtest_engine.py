@@ -47,6 +47,11 @@ from easyxt_backtest.portfolio_daily_result import DailyResultManager, TradeReco
 
 from easyxt_backtest.position_manager import PositionManager
 
+try:
+    from core.trading_calendar import get_trading_calendar
+except ImportError:
+    get_trading_calendar = None
+
 
 
 
@@ -403,7 +408,15 @@ class EnhancedBacktestEngine:
 
         trading_dates = []
 
-        if self.data_manager and hasattr(self.data_manager, 'get_trading_dates'):
+        calendar = get_trading_calendar() if get_trading_calendar is not None else None
+        has_dm_dates = bool(self.data_manager) and hasattr(self.data_manager, 'get_trading_dates')
+
+        # 共享日历在回测区间内有规则日历补齐的近似日期时，优先用 data_manager 的交易日
+        if calendar is not None and (calendar.covers(start_date, end_date) or not has_dm_dates):
+
+            trading_dates = calendar.to_strings(calendar.range(start_date, end_date))
+
+        elif has_dm_dates:
 
             trading_dates = self.data_manager.get_trading_dates(start_date, end_date)
 
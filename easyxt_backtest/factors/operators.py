@@ -7,6 +7,17 @@
 import pandas as pd
 import numpy as np
 
+from . import rolling_kernels
+
+
+def _apply_kernel(df: pd.Series, kernel, *args) -> pd.Series:
+    """在整列数组上运行滚动内核，保持原索引"""
+    values = df.to_numpy(dtype=np.float64).reshape(len(df), -1)
+    result = kernel(values, *args)
+    if isinstance(df, pd.DataFrame):
+        return pd.DataFrame(result, index=df.index, columns=df.columns)
+    return pd.Series(result.ravel(), index=df.index, name=df.name)
+
 
 def ts_sum(df: pd.Series, window: int) -> pd.Series:
     """时间序列求和"""
@@ -35,7 +46,7 @@ def covariance(x: pd.Series, y: pd.Series, window: int) -> pd.Series:
 
 def rolling_rank(df: pd.Series, window: int) -> pd.Series:
     """滚动排名（返回最后一天在窗口内的排名）"""
-    return df.rolling(window=window).apply(lambda x: x.rank().iloc[-1])
+    return _apply_kernel(df, rolling_kernels.rolling_rank_last, window, 'average')
 
 
 def ts_min(df: pd.Series, window: int) -> pd.Series:
@@ -81,23 +92,17 @@ def decay_linear(df: pd.Series, window: int) -> pd.Series:
     """线性衰减加权移动平均"""
     weights = np.arange(1, window + 1)
     weights = weights / weights.sum()
-
-    def weighted_mean(x):
-        if len(x) < window:
-            return np.nan
-        return (x * weights).sum()
-
-    return df.rolling(window=window).apply(weighted_mean, raw=True)
+    return _apply_kernel(df, rolling_kernels.rolling_weighted_sum, weights)
 
 
 def ts_argmax(df: pd.Series, window: int) -> pd.Series:
     """滚动最大值位置"""
-    return df.rolling(window=window).apply(lambda x: x.argmax())
+    return _apply_kernel(df, rolling_kernels.rolling_argmax, window)
 
 
 def ts_argmin(df: pd.Series, window: int) -> pd.Series:
     """滚动最小值位置"""
-    return df.rolling(window=window).apply(lambda x: x.argmin())
+    return _apply_kernel(df, rolling_kernels.rolling_argmin, window)
 
 
 def sign(df: pd.Series) -> pd.Series:
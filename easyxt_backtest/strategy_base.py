@@ -2,11 +2,19 @@
 """
 策略基类 - 定义所有策略必须实现的接口
 """
+import logging
 from abc import ABC, abstractmethod
 from typing import List, Dict
 import pandas as pd
 from datetime import datetime, timedelta
 
+try:
+    from core.trading_calendar import get_trading_calendar
+except ImportError:
+    get_trading_calendar = None
+
+logger = logging.getLogger(__name__)
+
 
 class StrategyBase(ABC):
     """
@@ -156,6 +164,25 @@ class StrategyBase(ABC):
 
     # ==================== 工具方法 ====================
 
+    def _covering_calendar(self, start_date: str, end_date: str):
+        """
+        共享交易日历（core.trading_calendar）
+
+        日历在 [start_date, end_date] 内有规则日历补齐的近似日期时，
+        有 data_manager 则返回 None，改用 data_manager.get_trading_dates；
+        没有 data_manager 时仍返回日历，并警告结果含近似日期
+        """
+        if get_trading_calendar is None:
+            return None
+        calendar = get_trading_calendar()
+        if calendar.covers(start_date, end_date):
+            return calendar
+        if self.data_manager:
+            return None
+        logger.warning(f"交易日历（来源: {calendar.source}）未覆盖 {start_date}-{end_date}，"
+                       f"且没有 data_manager，使用规则日历近似（周末 + 主要节假日）")
+        return calendar
+
     def _get_first_trading_days_monthly(self,
                                        start_date: str,
                                        end_date: str) -> List[str]:
@@ -169,6 +196,10 @@ class StrategyBase(ABC):
         Returns:
             每月第一个交易日列表
         """
+        calendar = self._covering_calendar(start_date, end_date)
+        if calendar is not None:
+            return calendar.to_strings(calendar.month_firsts(start_date, end_date))
+
         if not self.data_manager:
             raise ValueError("需要data_manager来获取交易日历")
 
@@ -202,6 +233,10 @@ class StrategyBase(ABC):
         Returns:
             每周第一个交易日列表
         """
+        calendar = self._covering_calendar(start_date, end_date)
+        if calendar is not None:
+            return calendar.to_strings(calendar.week_firsts(start_date, end_date))
+
         if not self.data_manager:
             raise ValueError("需要data_manager来获取交易日历")
 
@@ -235,6 +270,10 @@ class StrategyBase(ABC):
         Returns:
             所有交易日列表
         """
+        calendar = self._covering_calendar(start_date, end_date)
+        if calendar is not None:
+            return calendar.to_strings(calendar.range(start_date, end_date))
+
         if not self.data_manager:
             raise ValueError("需要data_manager来获取交易日历")
 
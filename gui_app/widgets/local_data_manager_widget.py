@@ -773,7 +773,7 @@ class BigQMTImportThread(QThread):
     def _import_from_qmt_datadir(self):
         """从QMT数据目录直接导入数据到DuckDB"""
         from core.qmt_local_reader import QMTLocalReader
-        from data_manager.duckdb_connection_pool import get_db_manager
+        from data_manager.qmt_datadir_importer import QMTDatadirImporter
 
         if self.prefer_big_qmt:
             reader = QMTLocalReader(data_dir=r'D:\国金QMT交易端模拟\datadir')
@@ -807,95 +807,23 @@ class BigQMTImportThread(QThread):
             self.symbols = filtered
             self.log_signal.emit(f"✅ 找到 {len(self.symbols)} 只股票（已排除ETF）")
 
-        db_manager = get_db_manager(get_default_db_path())
-        total = len(self.symbols)
-        success_count = 0
-        failed_count = 0
-        failed_list = []
-
-        BATCH_SIZE = 200
-
-        for batch_idx in range(0, total, BATCH_SIZE):
-            if not self._is_running:
-                self.log_signal.emit("⚠️ 用户中断导入")
-                break
-
-            batch_codes = self.symbols[batch_idx:batch_idx + BATCH_SIZE]
-            batch_num = batch_idx // BATCH_SIZE + 1
-            total_batches = (total + BATCH_SIZE - 1) // BATCH_SIZE
-
-            self.progress_signal.emit(min(batch_idx + BATCH_SIZE, total), total)
-
-            if batch_num <= 3 or batch_num % 10 == 0:
-                self.log_signal.emit(
-                    f"📦 批次 {batch_num}/{total_batches}: "
-                    f"{batch_codes[0]} ~ {batch_codes[-1]}"
-                )
-
-            batch_save_data = []
-
-            for stock_code in batch_codes:
-                if not self._is_running:
-                    break
-                try:
-                    df = reader.read_daily_data(stock_code)
-                    if df is None or df.empty:
-                        failed_count += 1
-                        failed_list.append(f"{stock_code} - 无数据")
-                        continue
-
-                    if self.start_date:
-                        df = df[df['time'] >= pd.to_datetime(self.start_date)]
-                    if self.end_date:
-                        df = df[df['time'] <= pd.to_datetime(self.end_date)]
-
-                    if df.empty:
-                        failed_count += 1
-                        continue
-
-                    for _, row in df.iterrows():
-                        batch_save_data.append({
-                            'stock_code': stock_code,
-                            'symbol_type': 'stock',
-                            'date': row['time'].strftime('%Y-%m-%d') if hasattr(row['time'], 'strftime') else str(row['time'])[:10],
-                            'period': '1d',
-                            'open': float(row['open']),
-                            'high': float(row['high']),
-                            'low': float(row['low']),
-                            'close': float(row['close']),
-                            'volume': int(row['volume']),
-                            'amount': float(row.get('amount', 0)),
-                            'created_at': datetime.now(),
-                            'updated_at': datetime.now(),
-                        })
-
-                    success_count += 1
-
-                except Exception as e:
-                    failed_count += 1
-                    failed_list.append(f"{stock_code} - {str(e)[:50]}")
+        self.log_signal.emit(f"📦 共 {len(self.symbols)} 只股票，按批次解码并写入 DuckDB...")
+        importer = QMTDatadirImporter(data_dir=reader.data_dir, duckdb_path=get_default_db_path())
+        result = importer.import_daily(
+            self.symbols,
+            start_date=self.start_date or None,
+            end_date=self.end_date or None,
+            progress_callback=self.progress_signal.emit,
+            log_callback=self.log_signal.emit,
+            should_stop=lambda: not self._is_running,
+        )
+        if result['stopped']:
+            self.log_signal.emit("⚠️ 用户中断导入")
 
-            if batch_save_data:
-                try:
-                    df_batch = pd.DataFrame(batch_save_data)
-                    db_manager.insert_dataframe(df_batch, 'stock_daily',
-                                               conflict_handling='replace')
-                    self.log_signal.emit(
-                        f"  ✅ 批次 {batch_num}: {len(batch_save_data)} 条 → DuckDB"
-                    )
-                except Exception as e:
-                    self.log_signal.emit(f"  ⚠️ 保存失败: {str(e)[:80]}")
-
-        result = {
-            'total': total,
-            'success': success_count,
-            'failed': failed_count,
-            'failed_list': failed_list,
-            'task_type': 'big_qmt_import'
-        }
+        result['task_type'] = 'big_qmt_import'
         self.finished_signal.emit(result)
         self.log_signal.emit(
-            f"✅ 导入完成! 成功: {success_count}, 失败: {failed_count}"
+            f"✅ 导入完成! 成功: {result['success']}, 失败: {result['failed']}"
         )
 
     def stop(self):
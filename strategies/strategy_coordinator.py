@@ -11,6 +11,7 @@ logger = logging.getLogger(__name__)
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -124,10 +125,17 @@ def _wait_for_duckdb(max_retries: int = 10, delay: float = 2.0) -> bool:
 
 
 class StrategyCoordinator:
-    """单进程策略协调器（虚拟簿记 + 持仓感知）"""
-    def __init__(self, strategy_names, run_mode="dry_run"):
+    """单进程策略协调器（虚拟簿记 + 持仓感知）
+
+    默认逐个策略生成信号。策略共享同一个 QMT api 对象（非线程安全），
+    只有显式指定 max_workers > 1 时才在线程池中并行生成。
+    协调器不提供共享行情快照：各策略（quant_strategies/ 等外部模块）自行读取 DuckDB，
+    每个策略开始前都会等待数据库可用。
+    """
+    def __init__(self, strategy_names, run_mode="dry_run", max_workers: int = 1):
         self.strategy_names = strategy_names
         self.run_mode = run_mode
+        self.max_workers = max(1, int(max_workers or 1))
         self.api = None
         self.bookkeeper = None  # 延迟初始化
 
@@ -219,40 +227,28 @@ class StrategyCoordinator:
                 self.bookkeeper.sync_from_account(real_pos)
 
         # ── 每策略独立生成信号（注入虚拟持仓）──
+        total = len(self.strategy_names)
+        virt_positions = {name: self.bookkeeper.get_positions(name) for name in self.strategy_names}
+        jobs = [(i, total, name, virt_positions[name]) for i, name in enumerate(self.strategy_names, 1)]
+        if self.max_workers > 1 and len(jobs) > 1:
+            if self.api is not None:
+                logger.warning(f"并行生成信号（{self.max_workers} 线程）：各策略共享的 QMT api 对象不是线程安全的")
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="signal") as executor:
+                futures = [executor.submit(self._generate_signals, *job) for job in jobs]
+                # 按策略顺序合并，保持与串行执行相同的去重优先级
+                results = [future.result() for future in futures]
+        else:
+            results = [self._generate_signals(*job) for job in jobs]
+
         all_sells = []   # [(strategy_name, sell_dict), ...]
         all_buys = []    # [(strategy_name, buy_dict), ...]
         failed_names = []
-        for i, name in enumerate(self.strategy_names, 1):
-            total = len(self.strategy_names)
-            logger.info(f"[{i}/{total}] {name} 开始生成信号...")
-            _wait_for_duckdb()
-            success = False
-            for attempt in range(3):
-                try:
-                    cls = load_strategy_class(name)
-                    strategy = cls(api=self.api)
-                    # ── 注入虚拟持仓 ──
-                    virt_pos = self.bookkeeper.get_positions(name)
-                    if not virt_pos.empty:
-                        strategy.positions = virt_pos
-                    buy_list, sell_list = strategy.generate_signals()
-                    for _, row in sell_list.iterrows():
-                        all_sells.append((name, dict(row)))
-                    for _, row in buy_list.iterrows():
-                        all_buys.append((name, dict(row)))
-                    success = True
-                    buy_count = len(buy_list) if hasattr(buy_list, '__len__') else 0
-                    sell_count = len(sell_list) if hasattr(sell_list, '__len__') else 0
-                    logger.info(f"[{i}/{total}] {name} 完成 (买{buy_count} 卖{sell_count})")
-                    break
-                except Exception as e:
-                    if attempt < 2:
-                        logger.info(f"[{name}] 第{attempt+1}次失败，3s后重试...")
-                        import time
-                        time.sleep(3)
-                    else:
-                        logger.warning(f"[{name}] 信号生成失败: {e}")
-                        failed_names.append(name)
+        for name, sells, buys in results:
+            if sells is None:
+                failed_names.append(name)
+                continue
+            all_sells.extend((name, s) for s in sells)
+            all_buys.extend((name, b) for b in buys)
         if not all_sells and not all_buys:
             logger.warning("所有策略均无信号，本轮跳过")
             return
@@ -286,6 +282,36 @@ class StrategyCoordinator:
         if self.run_mode == "live" and self.api:
             self._execute(filtered_sells, filtered_buys, account_id=self.account_id)
 
+    def _generate_signals(self, i, total, name, virt_pos):
+        """生成单个策略的信号（并行时在工作线程中执行）
+
+        Returns:
+            (name, sells, buys)，失败时 sells/buys 为 None
+        """
+        logger.info(f"[{i}/{total}] {name} 开始生成信号...")
+        _wait_for_duckdb()
+        for attempt in range(3):
+            try:
+                cls = load_strategy_class(name)
+                strategy = cls(api=self.api)
+                # ── 注入虚拟持仓 ──
+                if not virt_pos.empty:
+                    strategy.positions = virt_pos
+                buy_list, sell_list = strategy.generate_signals()
+                sells = [dict(row) for _, row in sell_list.iterrows()]
+                buys = [dict(row) for _, row in buy_list.iterrows()]
+                buy_count = len(buy_list) if hasattr(buy_list, '__len__') else 0
+                sell_count = len(sell_list) if hasattr(sell_list, '__len__') else 0
+                logger.info(f"[{i}/{total}] {name} 完成 (买{buy_count} 卖{sell_count})")
+                return name, sells, buys
+            except Exception as e:
+                if attempt < 2:
+                    logger.info(f"[{name}] 第{attempt+1}次失败，3s后重试...")
+                    time.sleep(3)
+                else:
+                    logger.warning(f"[{name}] 信号生成失败: {e}")
+        return name, None, None
+
     def _query_asset(self) -> float:
         """查询账户可用资金（优先 xttrader，降级信号桥接）"""
         try:
@@ -415,6 +441,14 @@ class StrategyCoordinator:
             except Exception as e:
                 logger.info(f"  [买入失败] {sname}: {code}: {e}")
 
+        if self.bookkeeper:
+            self.bookkeeper.flush()
+
+    def close(self):
+        """关闭簿记日志并释放写入锁（协调器退出时调用）"""
+        if self.bookkeeper is not None:
+            self.bookkeeper.close()
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description="策略协调器")
@@ -423,33 +457,38 @@ def main():
     parser.add_argument("--schedule", default="daily", choices=["daily", "interval"])
     parser.add_argument("--interval", type=int, default=60)
     parser.add_argument("--daily-time", default="09:35")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="并行生成信号的线程数（默认 1，逐个策略执行；策略共享的 QMT api 非线程安全）")
     args = parser.parse_args()
 
     logger.info(f"策略协调器启动: {args.strategies} ({args.mode})")
-    coord = StrategyCoordinator(args.strategies, args.mode)
+    coord = StrategyCoordinator(args.strategies, args.mode, max_workers=args.workers)
     coord.init_trading()
 
     run_count = 0
-    while True:
-        try:
-            coord.run_once()
-            run_count += 1
-            logger.info(f"第 {run_count} 轮执行完成")
-            if args.schedule == "interval":
-                time.sleep(args.interval * 60)
-            else:
-                parts = args.daily_time.split(":")
-                target_h, target_m = int(parts[0]), int(parts[1])
-                now = datetime.now()
-                next_run = now.replace(hour=target_h, minute=target_m, second=0)
-                if next_run <= now:
-                    next_run += timedelta(days=1)
-                time.sleep((next_run - now).total_seconds())
-        except KeyboardInterrupt:
-            break
-        except Exception as e:
-            logger.error(f"主循环异常: {e}")
-            time.sleep(60)
+    try:
+        while True:
+            try:
+                coord.run_once()
+                run_count += 1
+                logger.info(f"第 {run_count} 轮执行完成")
+                if args.schedule == "interval":
+                    time.sleep(args.interval * 60)
+                else:
+                    parts = args.daily_time.split(":")
+                    target_h, target_m = int(parts[0]), int(parts[1])
+                    now = datetime.now()
+                    next_run = now.replace(hour=target_h, minute=target_m, second=0)
+                    if next_run <= now:
+                        next_run += timedelta(days=1)
+                    time.sleep((next_run - now).total_seconds())
+            except KeyboardInterrupt:
+                break
+            except Exception as e:
+                logger.error(f"主循环异常: {e}")
+                time.sleep(60)
+    finally:
+        coord.close()
 
 if __name__ == "__main__":
     main()
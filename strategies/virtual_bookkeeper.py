@@ -14,44 +14,208 @@
   bk = VirtualBookkeeper()
   bk.record_buy("cb_double_low", "000001.SZ", 100, 10.50)
   positions = bk.get_positions("cb_double_low")  # → pd.DataFrame
+
+存储：
+  virtual_book.json     快照（整本簿记）
+  virtual_book.journal  预写日志，每笔成交追加一行 JSON，记录该持仓变更后的状态
+  virtual_book.lock     日志写入锁，追加日志的实例（协调器）持有到 close()
+  加载时先读快照再重放日志；日志达到 COMPACT_EVERY 行或调用 _save() 时
+  合并为新快照（临时文件 + 原子替换）。只有拿到日志写入锁的实例才清空日志（原地截断，不删除文件），
+  其他进程（如 GUI 临时创建的实例）只写快照、保留日志——日志行记录的是变更后的完整持仓，重放是幂等的。
 """
 
 import json
 import os
 import logging
+import sys
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+if sys.platform == "win32":
+    import msvcrt
+
+    def _try_lock_file(f) -> bool:
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock_file(f):
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+else:
+    import fcntl
+
+    def _try_lock_file(f) -> bool:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
 DEFAULT_BOOK_FILE = Path(__file__).parent / "scheduler" / "logs" / "virtual_book.json"
 
 
 class VirtualBookkeeper:
     """虚拟簿记管理器"""
 
+    FSYNC_EVERY = 16      # 每追加 N 行日志 fsync 一次
+    COMPACT_EVERY = 500   # 日志达到 N 行时合并为快照
+
     def __init__(self, book_file: Optional[str] = None):
         self.book_file = Path(book_file) if book_file else DEFAULT_BOOK_FILE
         self.book_file.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_file = self.book_file.with_suffix(".journal")
+        self.lock_file = self.book_file.with_suffix(".lock")
+        self._journal = None
+        self._lock = None         # 持有日志写入锁时为锁文件句柄
+        self._journal_lines = 0
+        self._unsynced = 0
+        self._holders: Dict[str, Set[str]] = {}  # code → 持有该代码的策略集合
         self.data = self._load()
+        # 没有其他进程在写日志时才合并（其他进程正在追加时清空日志会丢失成交）
+        if self._journal_lines and self._acquire_lock():
+            try:
+                self._save()
+            finally:
+                self._release_lock()
+        self._rebuild_index()
 
     # ───── 持久化 ─────
 
     def _load(self) -> dict:
+        data = None
         if self.book_file.exists():
             try:
-                return json.loads(self.book_file.read_text(encoding="utf-8"))
+                data = json.loads(self.book_file.read_text(encoding="utf-8"))
             except (json.JSONDecodeError, OSError):
                 pass
-        return {"strategies": {}, "last_sync": None, "account_id": ""}
+        if data is None:
+            data = {"strategies": {}, "last_sync": None, "account_id": ""}
+        self._replay(data)
+        return data
+
+    def _replay(self, data: dict):
+        """重放快照之后的日志；崩溃时写了一半的末行直接跳过"""
+        if not self.journal_file.exists():
+            return
+        strategies = data.setdefault("strategies", {})
+        with open(self.journal_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"[簿记] 跳过损坏的日志行: {line.strip()[:80]}")
+                    continue
+                holdings = strategies.setdefault(entry["strategy"], {})
+                if entry["holding"] is None:
+                    holdings.pop(entry["code"], None)
+                else:
+                    holdings[entry["code"]] = entry["holding"]
+                data["last_sync"] = entry["time"]
+                self._journal_lines += 1
+
+    def _acquire_lock(self) -> bool:
+        """尝试获取日志写入锁（不等待），已持有时直接返回 True"""
+        if self._lock is not None:
+            return True
+        handle = open(self.lock_file, "a+")
+        if not _try_lock_file(handle):
+            handle.close()
+            return False
+        self._lock = handle
+        return True
+
+    def _release_lock(self):
+        if self._lock is not None:
+            _unlock_file(self._lock)
+            self._lock.close()
+            self._lock = None
 
     def _save(self):
+        """写出完整快照（原子替换，写入中途崩溃不会损坏旧快照）；持有写入锁时清空日志"""
         self.data["last_sync"] = datetime.now().isoformat()
-        self.book_file.write_text(
-            json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        tmp_file = self.book_file.with_suffix(".json.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.book_file)
+
+        owned = self._lock is not None
+        if owned or self._acquire_lock():
+            try:
+                # 原地截断而不是删除：文件句柄保持有效，Windows 上也不会因文件被占用而失败
+                if self._journal is not None:
+                    self._journal.truncate(0)
+                elif self.journal_file.exists():
+                    open(self.journal_file, "w").close()
+            finally:
+                if not owned:
+                    self._release_lock()
+            self._journal_lines = 0
+            self._unsynced = 0
+        # 外部代码可能直接修改 self.data 后调用 _save()，这里同步重建索引
+        self._rebuild_index()
+
+    def _append_journal(self, strategy_name: str, code: str, holding: Optional[dict]):
+        """追加一行日志，记录某策略某代码变更后的持仓（None 表示清仓）"""
+        now = datetime.now().isoformat()
+        if self._journal is None:
+            if not self._acquire_lock():
+                logger.warning("[簿记] 其他进程正在写入簿记日志，本实例追加的日志不会被合并")
+            self._journal = open(self.journal_file, "a", encoding="utf-8")
+        entry = {"strategy": strategy_name, "code": code, "holding": holding, "time": now}
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self.data["last_sync"] = now
+        self._journal_lines += 1
+        self._unsynced += 1
+        if self._journal_lines >= self.COMPACT_EVERY and self._lock is not None:
+            self._save()
+        elif self._unsynced >= self.FSYNC_EVERY:
+            self.flush()
+
+    def flush(self):
+        """将已追加的日志落盘（fsync）"""
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        """落盘并关闭日志文件，释放日志写入锁"""
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._release_lock()
+
+    def _rebuild_index(self):
+        self._holders = {}
+        for name, holdings in self.data.get("strategies", {}).items():
+            for code, info in holdings.items():
+                if info.get("volume", 0) > 0:
+                    self._holders.setdefault(code, set()).add(name)
+
+    def _index_holding(self, strategy_name: str, code: str, volume: int):
+        if volume > 0:
+            self._holders.setdefault(code, set()).add(strategy_name)
+        elif code in self._holders:
+            self._holders[code].discard(strategy_name)
+            if not self._holders[code]:
+                del self._holders[code]
 
     # ───── 持仓查询 ─────
 
@@ -91,10 +255,11 @@ class VirtualBookkeeper:
 
     def get_all_held_codes(self) -> set:
         """获取所有策略合计持有的股票代码集合"""
-        codes = set()
-        for name in self.data.get("strategies", {}):
-            codes |= self.get_held_codes(name)
-        return codes
+        return set(self._holders)
+
+    def get_holders(self, code: str) -> set:
+        """获取持有某代码的策略集合"""
+        return set(self._holders.get(code, ()))
 
     # ───── 交易记录 ─────
 
@@ -126,7 +291,8 @@ class VirtualBookkeeper:
                 "last_buy": datetime.now().isoformat(),
             }
 
-        self._save()
+        self._index_holding(strategy_name, code, holdings[code]["volume"])
+        self._append_journal(strategy_name, code, holdings[code])
         logger.info(f"[簿记] {strategy_name} 买入 {code} {volume}股 @{price:.3f} → 持仓{holdings[code]['volume']}股")
 
     def record_sell(self, strategy_name: str, code: str, volume: int, price: float = 0):
@@ -152,7 +318,8 @@ class VirtualBookkeeper:
         else:
             del holdings[code]
 
-        self._save()
+        self._index_holding(strategy_name, code, new_vol)
+        self._append_journal(strategy_name, code, holdings.get(code))
         logger.info(f"[簿记] {strategy_name} 卖出 {code} {min(volume, old_vol)}股 @{price:.3f} → 剩余{new_vol}股")
 
     def set_allocation(self, strategy_name: str, allocation: Dict[str, dict]):
@@ -51,6 +51,10 @@ except ImportError as e:
 
 
 
+from easy_xt.download_orchestrator import get_download_orchestrator
+
+
+
 PERIOD_MAP = {
 
     '1m': '1m',
@@ -69,24 +73,34 @@ PERIOD_MAP = {
 
 
 
-def download_minute_data(stock_code, period='1m', start_date="", end_date="", force_download=False):
+def default_date_range(start_date="", end_date=""):
 
-    """Download stock minute data"""
+    """Default to the last 90 days when no start date is given"""
 
-    try:
+    if not start_date:
 
-        logger.info(f"  Downloading {stock_code} {period} data...")
+        end_date = datetime.now().strftime('%Y%m%d')
+
+        start_date = (datetime.now() - timedelta(days=90)).strftime('%Y%m%d')
+
+    elif not end_date:
+
+        end_date = datetime.now().strftime('%Y%m%d')
 
+    return start_date, end_date
 
-        if not start_date:
 
-            end_date = datetime.now().strftime('%Y%m%d')
 
-            start_date = (datetime.now() - timedelta(days=90)).strftime('%Y%m%d')
+def download_minute_data(stock_code, period='1m', start_date="", end_date="", force_download=False):
+
+    """Download stock minute data"""
+
+    try:
+
+        logger.info(f"  Downloading {stock_code} {period} data...")
 
-        elif not end_date:
 
-            end_date = datetime.now().strftime('%Y%m%d')
+        start_date, end_date = default_date_range(start_date, end_date)
 
 
 
@@ -225,7 +239,45 @@ def download_stocks(stocks, period='1m', start_date="", end_date="", force_downl
     logger.info("-" * 60)
 
 
-    for i, stock_code in enumerate(stocks, 1):
+    # Hand the whole list to the download worker, which batches codes per download_history_data2 call
+
+    start, end = default_date_range(start_date, end_date)
+
+    try:
+
+        report = get_download_orchestrator().download(stocks, period, start, end,
+                                                      incrementally=not force_download)
+
+    except RuntimeError as e:
+
+        logger.warning(f"[WARN] Download worker unavailable, downloading one by one: {e}")
+        report = None
+
+
+
+    for item in (report['results'] if report else []):
+
+        if item['success']:
+
+            success_count += 1
+
+            if verify:
+
+                verify_download(item['code'], period)
+
+        else:
+
+            logger.error(f"  [ERROR] Failed to download {item['code']}: {item['error'] or 'no data'}")
+            failed_count += 1
+
+    if report:
+
+        logger.info(f"  Throughput: {report['bars']} bars in {report['elapsed']:.1f}s "
+                    f"({report['bars_per_sec']:.0f} bars/s)")
+
+
+
+    for i, stock_code in enumerate(stocks if report is None else [], 1):
 
         try:
 
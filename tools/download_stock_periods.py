@@ -36,6 +36,9 @@ except ImportError:
     logger.error("[ERROR] xtquant未安装，请先安装miniQMT")
     sys.exit(1)
 
+from easy_xt.download_orchestrator import get_download_orchestrator
+from data_manager.bar_resampler import RESAMPLE_SOURCES, BarResampler
+
 
 def check_qmt_connection():
     """检查QMT连接状态"""
@@ -103,6 +106,35 @@ def download_period_data(stock_code, period, start_date, end_date):
         return False
 
 
+def build_derived_periods(resampler, stock_code, start_date, end_date, derived_periods):
+    """
+    由已下载的 1 分钟线在本地合成高周期K线
+
+    1 分钟线写入分钟线存储，合成结果写入重采样缓存，不再逐个周期从 QMT 下载。
+
+    Returns:
+        dict: {周期: 合成的K线数}
+    """
+    try:
+        data = xtdata.get_market_data_ex(
+            field_list=['time', 'open', 'high', 'low', 'close', 'volume', 'amount'],
+            stock_list=[stock_code],
+            period='1m',
+            start_time=start_date,
+            end_time=end_date
+        )
+        df = data.get(stock_code) if data else None
+        if df is None or df.empty:
+            return {period: 0 for period in derived_periods}
+
+        resampler.intraday_store.append(df, '1m', stock_code)
+        return {period: resampler.refresh(stock_code, period) for period in derived_periods}
+
+    except Exception as e:
+        logger.error(f"  本地合成失败: {e}")
+        return {period: 0 for period in derived_periods}
+
+
 def verify_period_data(stock_code, period):
     """验证某个周期的数据"""
     try:
@@ -167,9 +199,34 @@ def download_all_periods(stock_code, start_date=None, end_date=None):
     logger.info("\n[开始下载]")
     logger.info("-" * 70)
 
-    # 逐个周期下载
+    # 只下载 1m 和日线，5m/15m/30m/1h 由 1 分钟线在本地合成
+    download_periods = [code for code, _ in periods if code not in RESAMPLE_SOURCES]
+    derived_periods = [code for code, _ in periods if code in RESAMPLE_SOURCES]
+
+    # 下载周期一次提交给下载进程，按列表顺序排优先级；下载进程不可用时逐个周期下载
+    orchestrator = get_download_orchestrator()
+    for priority, period_code in enumerate(download_periods):
+        orchestrator.submit(stock_code, period_code, start_date, end_date, priority=priority)
+    try:
+        report = orchestrator.run()
+        for item in report['results']:
+            results[item['period']] = item['success']
+        logger.info(f"  下载耗时 {report['elapsed']:.1f}s, {report['bars_per_sec']:.0f} 条/秒")
+    except RuntimeError as e:
+        logger.warning(f"  下载进程不可用，逐个周期下载: {e}")
+        for period_code in download_periods:
+            results[period_code] = download_period_data(stock_code, period_code, start_date, end_date)
+
+    resampler = BarResampler()
+    derived_counts = {}
+    if results.get('1m'):
+        logger.info(f"  本地合成 {', '.join(derived_periods)} ...")
+        derived_counts = build_derived_periods(resampler, stock_code, start_date, end_date, derived_periods)
+    for period_code in derived_periods:
+        results[period_code] = derived_counts.get(period_code, 0) > 0
+
     for period_code, period_name in periods:
-        success = download_period_data(stock_code, period_code, start_date, end_date)
+        success = results.get(period_code, False)
         results[period_code] = success
 
         if success:
@@ -194,7 +251,11 @@ def download_all_periods(stock_code, start_date=None, end_date=None):
     logger.info("-" * 70)
 
     for period_code, period_name in periods:
-        has_data, count = verify_period_data(stock_code, period_code)
+        if period_code in RESAMPLE_SOURCES:
+            count = len(resampler.get_bars(stock_code, period_code, start_date, end_date, refresh=False))
+            has_data = count > 0
+        else:
+            has_data, count = verify_period_data(stock_code, period_code)
         if has_data:
             logger.info(f"  {period_name:8} ({period_code}): ✓ 有数据 ({count} 条)")
         else:
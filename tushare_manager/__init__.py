@@ -7,6 +7,8 @@ Tushare数据管理模块
 
 from .tushare_config import TushareConfig, get_config
 from .tushare_downloader import TushareDownloader
+from .download_planner import TushareDownloadPlanner
+from .rate_limiter import TokenBucket, get_rate_limiter
 from .download_basic_data import (
     download_adj_factor,
     download_stk_limit,
@@ -19,6 +21,9 @@ __all__ = [
     'TushareConfig',
     'get_config',
     'TushareDownloader',
+    'TushareDownloadPlanner',
+    'TokenBucket',
+    'get_rate_limiter',
     'download_adj_factor',
     'download_stk_limit',
     'download_suspend',
@@ -33,8 +33,10 @@ from pathlib import Path
 
 try:
     from .tushare_config import TushareConfig
+    from .rate_limiter import get_rate_limiter
 except ImportError:
     from tushare_config import TushareConfig
+    from rate_limiter import get_rate_limiter
 
 
 # ─── 工具函数 ──────────────────────────────────────────────
@@ -65,21 +67,37 @@ def _get_db_path(db_path: Optional[str] = None) -> str:
     return config.db_path
 
 
+_rate_limiter = None
+
+# 未配置积分时的每分钟调用上限：与原来 0.06 秒的最小调用间隔相同
+_DEFAULT_CALLS_PER_MINUTE = 1000
+
+
+def _get_rate_limiter():
+    """按配置的积分获取共享限流器（首次使用时读取配置）"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = get_rate_limiter(TushareConfig().points,
+                                         default_calls_per_minute=_DEFAULT_CALLS_PER_MINUTE)
+    return _rate_limiter
+
+
 def _api_call_with_retry(api_func, max_retries: int = 3, delay: float = 0.05,
                          log_label: str = "") -> Optional[pd.DataFrame]:
     """
-    带重试的 API 调用（适配 5000 积分用户，500次/分钟）
+    带重试的 API 调用（按积分额度限流，见 rate_limiter）
 
     Args:
         api_func: 无参 lambda，返回 DataFrame
         max_retries: 最大重试次数
-        delay: 调用间隔（秒），5000分用户可设更短
+        delay: 失败重试前的等待基数（秒）
         log_label: 日志标签
     """
+    limiter = _get_rate_limiter()
     for attempt in range(max_retries):
         try:
+            limiter.acquire()
             df = api_func()
-            time.sleep(delay)
             if df is not None and not df.empty:
                 return df
             return df  # 返回空 DataFrame 也正常（可能该日期无数据）
@@ -838,24 +856,17 @@ def download_cb_share(db_path: Optional[str] = None,
     total_records = 0
     errors = []
     total = len(codes)
-    last_request_time = 0
-    request_interval = 0.06
 
     for i, ts_code in enumerate(codes):
         if progress_callback:
             progress_callback(i + 1, total, f"下载 {ts_code} 转股进度")
 
-        elapsed = time.time() - last_request_time
-        if elapsed < request_interval:
-            time.sleep(request_interval - elapsed)
-
         try:
             df = _api_call_with_retry(
                 lambda tc=ts_code: pro.cb_share(ts_code=tc),
                 log_label=f"cb_share[{ts_code}]",
                 max_retries=2
             )
-            last_request_time = time.time()
 
             if df is not None and not df.empty:
                 # 转换日期列
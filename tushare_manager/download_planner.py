@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按交易日/报告期的全市场批量下载
+
+逐只股票调用接口时，刷新全市场需要数千次调用。Tushare 的很多接口支持按日期一次返回全市场数据：
+- 财务报表 income_vip / balancesheet_vip / cashflow_vip / fina_indicator_vip：period=报告期（5000积分）
+- 分红送股 dividend：ex_date=除权除息日（只包含已确定除权日的分红）
+- 个股资金流向 moneyflow：trade_date=交易日
+
+规划器把下载任务展开为 (接口, 日期) 列表，在线程池中并发调用（共享令牌桶限流，总频率不超过积分额度），
+返回行数达到分页大小时自动翻页；结果按表累积，达到 flush_rows 行后用 save_to_duckdb 批量写入。
+
+用法:
+    downloader = TushareDownloader()
+    downloader.download_by_dates(['income', 'balancesheet', 'cashflow'], start_date='20200101')
+"""
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+# 每次请求的行数上限（不超过各接口的单次返回上限），返回满页时继续翻页
+PAGE_SIZE = 3000
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """一类按日期下载的数据"""
+    api_name: str
+    table_name: str
+    primary_keys: tuple
+    date_param: str             # 传给接口的日期参数名
+    date_kind: str = 'trade'    # 'trade' 交易日, 'period' 报告期（季末）
+    min_points: int = 0
+
+
+DATASETS: Dict[str, DatasetSpec] = {
+    'income': DatasetSpec('income_vip', 'financial_income', ('ts_code', 'end_date'),
+                          'period', 'period', min_points=5000),
+    'balancesheet': DatasetSpec('balancesheet_vip', 'financial_balance', ('ts_code', 'end_date'),
+                                'period', 'period', min_points=5000),
+    'cashflow': DatasetSpec('cashflow_vip', 'financial_cashflow', ('ts_code', 'end_date'),
+                            'period', 'period', min_points=5000),
+    'fina_indicator': DatasetSpec('fina_indicator_vip', 'financial_indicator', ('ts_code', 'end_date'),
+                                  'period', 'period', min_points=5000),
+    'dividend': DatasetSpec('dividend', 'dividends', ('ts_code', 'ex_date'), 'ex_date'),
+    'moneyflow': DatasetSpec('moneyflow', 'moneyflow', ('ts_code', 'trade_date'), 'trade_date'),
+}
+
+
+@dataclass
+class DownloadTask:
+    """一次全市场调用：某个数据集在某个日期的数据"""
+    dataset: str
+    spec: DatasetSpec
+    date: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+def report_periods(start_date: str, end_date: str) -> List[str]:
+    """[start_date, end_date] 之间的报告期（季末日期，YYYYMMDD）"""
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    periods = []
+    for year in range(start.year, end.year + 1):
+        for month, day in ((3, 31), (6, 30), (9, 30), (12, 31)):
+            period = pd.Timestamp(year, month, day)
+            if start <= period <= end:
+                periods.append(period.strftime('%Y%m%d'))
+    return periods
+
+
+class TushareDownloadPlanner:
+    """按日期规划并并发执行全市场下载"""
+
+    def __init__(self, downloader, max_workers: int = 4, flush_rows: int = 200_000,
+                 page_size: int = PAGE_SIZE):
+        """
+        Args:
+            downloader: TushareDownloader 实例（提供 _api_call 与 save_to_duckdb）
+            max_workers: 并发线程数（总频率由共享限流器控制）
+            flush_rows: 每张表累积到该行数后写入一次 DuckDB
+            page_size: 单次请求行数，返回满页时翻页
+        """
+        self.downloader = downloader
+        self.max_workers = max(1, int(max_workers))
+        self.flush_rows = flush_rows
+        self.page_size = page_size
+
+    def plan(self, datasets: Sequence[str], start_date: str,
+             end_date: Optional[str] = None) -> List[DownloadTask]:
+        """把数据集展开为 (接口, 日期) 任务列表"""
+        end_date = end_date or datetime.now().strftime('%Y%m%d')
+        unknown = [name for name in datasets if name not in DATASETS]
+        if unknown:
+            raise ValueError(f"不支持按日期下载的数据集: {unknown}，可选: {list(DATASETS)}")
+
+        points = getattr(self.downloader, 'points', 0)
+        insufficient = [name for name in datasets if DATASETS[name].min_points > points]
+        if insufficient:
+            raise ValueError(
+                f"{insufficient} 的全市场接口需要 {max(DATASETS[n].min_points for n in insufficient)} 积分"
+                f"（当前 {points}），请使用按股票下载的 batch_download_* 方法"
+            )
+
+        trade_dates = None
+        tasks = []
+        for name in datasets:
+            spec = DATASETS[name]
+            if spec.date_kind == 'period':
+                dates = report_periods(start_date, end_date)
+            else:
+                if trade_dates is None:
+                    trade_dates = self._trade_dates(start_date, end_date)
+                dates = trade_dates
+            tasks.extend(DownloadTask(name, spec, date, {spec.date_param: date}) for date in dates)
+        return tasks
+
+    def run(self, datasets: Sequence[str], start_date: str, end_date: Optional[str] = None,
+            progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        执行下载
+
+        Args:
+            datasets: 数据集名称（DATASETS 的键）
+            start_date: 开始日期 (YYYYMMDD)
+            end_date: 结束日期 (YYYYMMDD)，默认今天
+            progress_callback: 进度回调 callback(current, total, message)
+
+        Returns:
+            {'total_calls': 任务数, 'api_calls': 实际请求数, 'total_records': {表名: 行数}, 'errors': [...]}
+        """
+        tasks = self.plan(datasets, start_date, end_date)
+        result = {'total_calls': len(tasks), 'api_calls': 0,
+                  'total_records': defaultdict(int), 'errors': []}
+        buffers: Dict[str, List[pd.DataFrame]] = defaultdict(list)
+        buffered_rows: Dict[str, int] = defaultdict(int)
+        specs = {task.spec.table_name: task.spec for task in tasks}
+
+        def flush(table_name):
+            if not buffers[table_name]:
+                return
+            df = pd.concat(buffers[table_name], ignore_index=True)
+            buffers[table_name].clear()
+            buffered_rows[table_name] = 0
+            try:
+                self.downloader.save_to_duckdb(df, table_name, list(specs[table_name].primary_keys))
+                result['total_records'][table_name] += len(df)
+            except Exception as e:
+                result['errors'].append(f"{table_name}: 保存失败 {e}")
+
+        self.downloader._log(f"按日期下载 {list(datasets)}: {len(tasks)} 次全市场调用，{self.max_workers} 线程")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._fetch, task): task for task in tasks}
+            for i, future in enumerate(as_completed(futures), 1):
+                task = futures[future]
+                df, calls, error = future.result()
+                result['api_calls'] += calls
+                if error:
+                    result['errors'].append(f"{task.spec.api_name}[{task.date}]: {error}")
+                elif df is not None and not df.empty:
+                    table_name = task.spec.table_name
+                    buffers[table_name].append(df)
+                    buffered_rows[table_name] += len(df)
+                    if buffered_rows[table_name] >= self.flush_rows:
+                        flush(table_name)
+                if progress_callback:
+                    progress_callback(i, len(tasks), f"{task.dataset} {task.date}")
+
+        for table_name in list(buffers):
+            flush(table_name)
+
+        result['total_records'] = dict(result['total_records'])
+        self.downloader._log(f"按日期下载完成: {result['total_records']}，请求 {result['api_calls']} 次")
+        return result
+
+    def _fetch(self, task: DownloadTask):
+        """执行一个任务（自动翻页），返回 (DataFrame, 请求次数, 错误信息)"""
+        frames = []
+        calls = 0
+        offset = 0
+        while True:
+            calls += 1
+            df = self.downloader._api_call(task.spec.api_name, **task.params,
+                                           offset=offset, limit=self.page_size)
+            if df is None:
+                return None, calls, "API调用失败"
+            if not df.empty:
+                frames.append(df)
+            if len(df) < self.page_size:
+                break
+            offset += self.page_size
+        if not frames:
+            return None, calls, None
+        return pd.concat(frames, ignore_index=True), calls, None
+
+    def _trade_dates(self, start_date: str, end_date: str) -> List[str]:
+        df = self.downloader._api_call('trade_cal', exchange='SSE', start_date=start_date,
+                                       end_date=end_date, is_open='1')
+        if df is None or df.empty:
+            raise RuntimeError(f"未获取到交易日列表: {start_date} ~ {end_date}")
+        return sorted(df['cal_date'].astype(str).tolist())
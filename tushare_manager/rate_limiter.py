@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tushare 调用频率限制
+按账户积分对应的每分钟调用上限，用令牌桶控制调用节奏（线程安全）
+
+替代每次调用后固定 sleep 的做法：额度有富余时不等待，多线程并发时总频率仍不超过上限。
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# 积分档位 → 每分钟调用上限（Tushare 官方说明，按常用接口）
+POINTS_CALLS_PER_MINUTE = [
+    (10000, 1000),
+    (5000, 500),
+    (2000, 200),
+    (0, 50),
+]
+
+# 实际使用的比例，给网络抖动和其他程序留余量
+SAFETY_RATIO = 0.9
+
+# 未配置积分时的每分钟调用上限：与原来每次调用后 sleep(0.12) 的节奏相同
+DEFAULT_CALLS_PER_MINUTE = 500
+
+# 令牌桶容量占每分钟额度的比例（允许的瞬时突发）
+BURST_RATIO = 0.05
+
+
+def calls_per_minute_for_points(points: int) -> int:
+    """积分对应的每分钟调用上限"""
+    for min_points, calls in POINTS_CALLS_PER_MINUTE:
+        if points >= min_points:
+            return calls
+    return POINTS_CALLS_PER_MINUTE[-1][1]
+
+
+class TokenBucket:
+    """令牌桶限流器
+
+    令牌按 rate_per_minute 匀速补充，桶容量为 capacity；
+    任意 60 秒内的调用次数不超过 capacity + rate_per_minute。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate_per_minute: 每分钟补充的令牌数
+            capacity: 桶容量，默认 rate_per_minute * BURST_RATIO（至少 1）
+        """
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute 必须大于 0")
+        self.rate_per_minute = float(rate_per_minute)
+        self.capacity = float(capacity) if capacity else max(1.0, rate_per_minute * BURST_RATIO)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_minute / 60.0)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """有足够令牌时立即取走并返回 True，否则返回 False"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, on_acquire: Optional[Callable[[], None]] = None) -> float:
+        """阻塞直到取得令牌
+
+        Args:
+            tokens: 令牌数
+            on_acquire: 取得令牌后在限流器锁内调用（如累计调用次数），多线程下不会丢失更新
+
+        Returns:
+            等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    if on_acquire is not None:
+                        on_acquire()
+                    return waited
+                wait = (tokens - self._tokens) * 60.0 / self.rate_per_minute
+            time.sleep(wait)
+            waited += wait
+
+
+_limiters: Dict[int, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(points: Optional[int] = None,
+                     calls_per_minute: Optional[int] = None,
+                     default_calls_per_minute: int = DEFAULT_CALLS_PER_MINUTE) -> TokenBucket:
+    """获取共享限流器
+
+    同一进程内相同额度的调用方共享一个令牌桶（同一 Token 的额度是共享的）。
+    配置了积分时按积分档位额度的 SAFETY_RATIO 限流；未配置积分时使用 default_calls_per_minute，
+    不比原来的固定间隔慢。
+
+    Args:
+        points: 账户积分，默认读取配置（TUSHARE_POINTS），0 表示未配置
+        calls_per_minute: 直接指定每分钟调用上限，优先于 points
+        default_calls_per_minute: 未配置积分时的每分钟调用上限
+    """
+    if calls_per_minute is None:
+        if points is None:
+            from .tushare_config import get_config
+            points = get_config().points
+        if points:
+            calls_per_minute = calls_per_minute_for_points(points) * SAFETY_RATIO
+        else:
+            calls_per_minute = default_calls_per_minute
+
+    rate = max(1, int(calls_per_minute))
+    with _limiters_lock:
+        if rate not in _limiters:
+            _limiters[rate] = TokenBucket(rate)
+        return _limiters[rate]
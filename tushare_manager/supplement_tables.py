@@ -11,7 +11,6 @@
 """
 
 import argparse
-import time
 import pandas as pd
 from datetime import datetime
 from typing import List, Optional
@@ -74,7 +73,7 @@ def download_index_components(
     for index_code in index_codes:
         dl._log(f"下载指数成分股: {index_code} (从 {start_date})...")
 
-        # 按月批量下载，尊重 Tushare 频率限制
+        # 按月批量下载（_api_call 按积分额度限流）
         start = datetime.strptime(start_date, '%Y%m%d')
         end = datetime.now()
         current = start
@@ -96,9 +95,6 @@ def download_index_components(
                 all_dfs.append(df)
                 count += len(df)
 
-            # 每批间隔稍长
-            time.sleep(0.2)
-
             # 推进到下个月
             if current.month == 12:
                 current = datetime(current.year + 1, 1, 1)
@@ -67,9 +67,13 @@ class TushareConfig:
             except Exception as e:
                 print(f"[WARN] Failed to load config file: {e}")
 
+        # 账户积分（决定每分钟调用上限）
+        env_points = self.env_config.get_int('TUSHARE_POINTS', 0) if self.env_config else 0
+
         # 合并配置（环境变量优先级更高）
         default_config = {
             'token': env_token or file_config.get('token', ''),
+            'points': env_points or int(file_config.get('points', 0)),
             'db_path': self.env_config.duckdb_path if self.env_config else self._default_db_path(),
             'sync_settings': {
                 'financial_years': 5,
@@ -96,6 +100,11 @@ class TushareConfig:
         """获取DuckDB数据库路径"""
         return self.config.get('db_path', self._default_db_path())
 
+    @property
+    def points(self) -> int:
+        """获取账户积分（TUSHARE_POINTS，0 表示未配置）"""
+        return int(self.config.get('points', 0))
+
     @property
     def financial_years(self) -> int:
         """获取财务数据年数"""
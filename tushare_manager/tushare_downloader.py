@@ -5,6 +5,7 @@ Tushare数据下载模块
 支持从Tushare下载各类数据并保存到DuckDB
 """
 
+import threading
 import time
 import pandas as pd
 import tushare as ts
@@ -13,18 +14,22 @@ from typing import List, Dict, Optional, Any
 import duckdb
 
 from .tushare_config import TushareConfig
+from .rate_limiter import get_rate_limiter
+from .download_planner import TushareDownloadPlanner
 
 
 class TushareDownloader:
     """Tushare数据下载器"""
 
-    def __init__(self, token: Optional[str] = None, db_path: Optional[str] = None):
+    def __init__(self, token: Optional[str] = None, db_path: Optional[str] = None,
+                 points: Optional[int] = None):
         """
         初始化下载器
 
         Args:
             token: Tushare token，默认从配置读取
             db_path: DuckDB路径，默认从配置读取
+            points: 账户积分，决定限流频率，默认从配置读取
         """
         self.config = TushareConfig()
 
@@ -38,6 +43,12 @@ class TushareDownloader:
         # 设置数据库路径
         self.db_path = db_path or self.config.db_path
 
+        # 限流：按积分对应的每分钟调用上限（同进程内共享；未配置积分时沿用原来的调用节奏）
+        self.points = points or self.config.points
+        self.rate_limiter = get_rate_limiter(self.points)
+        # total_requests 在限流器锁内累计；其他计数由 _stats_lock 保护（下载计划在多线程中调用）
+        self._stats_lock = threading.Lock()
+
         # 统计信息
         self.stats = {
             'total_requests': 0,
@@ -64,21 +75,20 @@ class TushareDownloader:
         """
         # 内部使用的合理默认值
         max_retries = 3
-        retry_delay = 0.12  # 保守值，适配2000积分用户（每分钟500次）
+        retry_delay = 0.12
 
         for attempt in range(max_retries):
             try:
-                self.stats['total_requests'] += 1
+                # 限流 - 按积分额度取令牌，额度有富余时不等待
+                self.rate_limiter.acquire(on_acquire=self._count_request)
 
                 # 调用API
                 api_method = getattr(self.pro, api_name)
                 df = api_method(**kwargs)
 
-                # 限流 - 每次调用后等待
-                time.sleep(retry_delay)
-
                 if df is not None and not df.empty:
-                    self.stats['total_records'] += len(df)
+                    with self._stats_lock:
+                        self.stats['total_records'] += len(df)
 
                 return df
 
@@ -88,9 +98,14 @@ class TushareDownloader:
                     time.sleep(retry_delay * 2)
                 else:
                     self._log(f"API调用失败: {e}", "ERROR")
-                    self.stats['errors'].append(f"{api_name}: {str(e)}")
+                    with self._stats_lock:
+                        self.stats['errors'].append(f"{api_name}: {str(e)}")
                     return None
 
+    def _count_request(self):
+        """累计调用次数（由限流器在锁内调用）"""
+        self.stats['total_requests'] += 1
+
     def _get_db_connection(self):
         """获取数据库连接"""
         return duckdb.connect(self.db_path)
@@ -497,6 +512,25 @@ class TushareDownloader:
 
         return result
 
+    def download_by_dates(self, datasets: List[str], start_date: str, end_date: str = None,
+                          max_workers: int = 4, progress_callback=None) -> Dict[str, Any]:
+        """
+        按交易日/报告期下载全市场数据（每次调用返回一个日期的全部股票）
+
+        Args:
+            datasets: 数据集，如 ['income', 'balancesheet', 'cashflow', 'dividend']，
+                      可选项见 download_planner.DATASETS
+            start_date: 开始日期 (YYYYMMDD)
+            end_date: 结束日期 (YYYYMMDD)，默认今天
+            max_workers: 并发线程数（总频率受积分额度限制）
+            progress_callback: 进度回调函数 callback(current, total, message)
+
+        Returns:
+            结果统计
+        """
+        planner = TushareDownloadPlanner(self, max_workers=max_workers)
+        return planner.run(datasets, start_date, end_date, progress_callback)
+
     def get_stock_list(self, list_status: str = 'L') -> pd.DataFrame:
         """
         获取股票列表
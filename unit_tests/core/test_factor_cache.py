@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+FactorCache 单元测试
+
+测试缓存键、内存/磁盘两级缓存的命中与按字节数淘汰。
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import factor_cache
+from core.factor_cache import FactorCache
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2024-01-01', periods=50, name='date')
+    return pd.DataFrame(rng.standard_normal((50, 4)), index=dates,
+                        columns=['000001.SZ', '000002.SZ', '600000.SH', '600519.SH'])
+
+
+def momentum(data, period=20):
+    return data.pct_change(period)
+
+
+class TestMakeKey:
+    """测试缓存键"""
+
+    def test_universe_order_does_not_matter(self):
+        a = FactorCache.make_key(momentum, ['A', 'B'], '2024-01-01', '2024-03-01')
+        b = FactorCache.make_key(momentum, ['B', 'A'], '20240101', '20240301')
+        assert a == b
+
+    def test_definition_params_and_range_change_key(self):
+        base = FactorCache.make_key((momentum, {'period': 20}), ['A'], '2024-01-01', '2024-03-01')
+        assert base != FactorCache.make_key((momentum, {'period': 10}), ['A'], '2024-01-01', '2024-03-01')
+        assert base != FactorCache.make_key((momentum, {'period': 20}), ['A'], '2024-01-02', '2024-03-01')
+        assert base != FactorCache.make_key((momentum, {'period': 20}), ['A', 'B'], '2024-01-01', '2024-03-01')
+        assert base != FactorCache.make_key((momentum, {'period': 20}), ['A'], '2024-01-01', '2024-03-01',
+                                            data='other')
+
+
+class TestFactorCache:
+    """测试读写与统计"""
+
+    def test_get_or_compute_reuses_result(self, frame):
+        cache = FactorCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return momentum(frame)
+
+        first = cache.get_or_compute(momentum, frame.columns, '2024-01-01', '2024-02-19', compute)
+        second = cache.get_or_compute(momentum, frame.columns, '2024-01-01', '2024-02-19', compute)
+
+        assert len(calls) == 1
+        pd.testing.assert_frame_equal(first, second)
+        stats = cache.stats()
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        assert stats['hit_ratio'] == 0.5
+        assert stats['memory_bytes'] > 0
+
+    def test_returned_value_is_a_copy(self, frame):
+        cache = FactorCache()
+        cache.put('k', frame)
+        value = cache.get('k')
+        value.iloc[0, 0] = 1e9
+        assert cache.get('k').iloc[0, 0] == frame.iloc[0, 0]
+
+    @pytest.mark.skipif(not factor_cache.PYARROW_AVAILABLE, reason="pyarrow 未安装")
+    def test_disk_layer_is_shared_between_instances(self, frame, tmp_path):
+        series = frame.iloc[-1].rename('alpha')
+        FactorCache(tmp_path).put('frame', frame)
+        FactorCache(tmp_path).put('series', series)
+
+        other = FactorCache(tmp_path)
+        pd.testing.assert_frame_equal(other.get('frame'), frame, check_freq=False)
+        pd.testing.assert_series_equal(other.get('series'), series)
+        assert other.stats()['disk_hits'] == 2
+        assert other.stats()['disk_entries'] == 2
+
+    @pytest.mark.skipif(not factor_cache.PYARROW_AVAILABLE, reason="pyarrow 未安装")
+    def test_unnamed_series_keeps_name_none(self, frame, tmp_path):
+        series = frame.iloc[-1].rename(None)
+        FactorCache(tmp_path).put('series', series)
+
+        value = FactorCache(tmp_path).get('series')
+        assert value.name is None
+        pd.testing.assert_series_equal(value, series)
+
+    def test_memory_eviction_by_bytes(self, frame):
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        cache = FactorCache(max_memory_bytes=2 * nbytes)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, frame)
+        cache.get('b')
+        cache.put('d', frame)
+
+        assert cache.stats()['memory_entries'] == 2
+        assert cache.get('a') is None and cache.get('c') is None
+        assert cache.get('b') is not None and cache.get('d') is not None
+
+    @pytest.mark.skipif(not factor_cache.PYARROW_AVAILABLE, reason="pyarrow 未安装")
+    def test_disk_eviction_by_bytes(self, frame, tmp_path):
+        cache = FactorCache(tmp_path, max_memory_bytes=0)
+        cache.put('first', frame)
+        size = cache.stats()['disk_bytes']
+        cache.max_disk_bytes = int(size * 2.5)
+        for key in ('second', 'third', 'fourth'):
+            cache.put(key, frame)
+
+        stats = cache.stats()
+        assert stats['disk_entries'] == 2
+        assert stats['disk_bytes'] <= cache.max_disk_bytes
+        assert cache.get('first') is None
+        assert cache.get('fourth') is not None
+
+    @pytest.mark.skipif(not factor_cache.PYARROW_AVAILABLE, reason="pyarrow 未安装")
+    def test_disk_is_scanned_only_when_over_limit(self, frame, tmp_path, monkeypatch):
+        FactorCache(tmp_path).put('existing', frame)
+        cache = FactorCache(tmp_path, max_memory_bytes=0)
+        scans = []
+        original = cache._disk_files
+        monkeypatch.setattr(cache, '_disk_files', lambda: scans.append(1) or original())
+
+        for i in range(10):
+            cache.put(f'key{i}', frame)
+        assert len(scans) == 1                  # 只在首次写入时扫描目录得到初值
+        size = cache._disk_bytes // 11
+        assert cache._disk_bytes == cache.stats()['disk_bytes'] == size * 11
+        assert cache.stats()['disk_entries'] == 11
+        assert len(scans) == 1                  # stats() 使用累计值，不扫描目录
+
+        cache.max_disk_bytes = size * 10        # 超过上限：扫描一次，淘汰到上限的 90%
+        cache.put('key10', frame)
+        assert cache._disk_bytes <= size * 9
+        cache.invalidate('key10')
+        assert cache._disk_bytes == cache.stats()['disk_bytes']
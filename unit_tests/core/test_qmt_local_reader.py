@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+QMTLocalReader 单元测试
+
+用合成的 .DAT 文件测试日线/分钟线的向量化解码与批量读取。
+"""
+
+import struct
+
+import pandas as pd
+import pytest
+
+from core import qmt_local_reader
+from core.qmt_local_reader import QMTLocalReader
+
+# 2024-01-02 00:00 北京时间
+DAY0 = 1704124800
+
+
+def write_daily(root, code, bars):
+    """bars: [(ts, open, high, low, close, volume_lots)]，价格单位元"""
+    path = root / 'SZ' / '86400'
+    path.mkdir(parents=True, exist_ok=True)
+    content = bytearray(8)
+    for ts, o, h, l, c, v in bars:
+        content += struct.pack('<IIIIIIII', ts, int(o * 1000), int(h * 1000), int(l * 1000),
+                               int(c * 1000), 0, v, 1)
+        # 奇数索引：复权元数据
+        content += struct.pack('<IIIIIIII', 7, 7, 7, 7, 7, 7, 7, 7)
+    (path / f'{code}.DAT').write_bytes(bytes(content))
+
+
+@pytest.fixture
+def reader(tmp_path, monkeypatch):
+    monkeypatch.setattr(QMTLocalReader, 'BIG_QMT_DATA_DIR', tmp_path / 'missing')
+    return QMTLocalReader(tmp_path)
+
+
+class TestReadDaily:
+    """测试日线解码"""
+
+    def test_decodes_even_records_and_filters_invalid(self, reader, tmp_path):
+        write_daily(tmp_path, '000001', [
+            (DAY0, 10.0, 10.5, 9.8, 10.2, 1000),
+            (DAY0 + 86400, 10.2, 9.0, 10.0, 10.1, 1000),   # high < low
+            (5, 10.0, 10.5, 9.8, 10.2, 1000),              # 无效时间戳
+            (DAY0 - 86400, 9.9, 10.1, 9.7, 10.0, 2000),    # 乱序
+            (DAY0 + 2 * 86400, 10.3, 10.6, 10.1, 10.4, 1500),
+        ])
+
+        df = reader.read_daily_data('000001.SZ')
+
+        assert list(df['time']) == list(pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-04']))
+        assert df['close'].tolist() == pytest.approx([10.0, 10.2, 10.4])
+        assert df['volume'].tolist() == [200000, 100000, 150000]
+        assert (df['amount'] == 0).all()
+
+    def test_date_filter_and_missing_file(self, reader, tmp_path):
+        write_daily(tmp_path, '000001', [(DAY0 + i * 86400, 10, 11, 9, 10, 1) for i in range(5)])
+
+        df = reader.read_daily_data('000001.SZ', start_date='2024-01-03', end_date='2024-01-04')
+
+        assert len(df) == 2
+        assert reader.read_daily_data('000002.SZ') is None
+
+
+class TestParseMinute:
+    """测试分钟线格式探测"""
+
+    def test_48_byte_records(self, reader):
+        content = b''.join(
+            struct.pack('QIIIddd', 1700000000 + 60 * i, 100000, 101000, 99000, 10.05, 500.0, 5.0e5)
+            for i in range(120)
+        )
+
+        df = reader._parse_minute_file(content, '000001.SZ', '1m')
+
+        assert len(df) == 120
+        assert df['open'].iloc[0] == pytest.approx(10.0)
+        assert df['high'].iloc[0] == pytest.approx(10.1)
+        assert df['time'].iloc[1] - df['time'].iloc[0] == pd.Timedelta(minutes=1)
+
+    def test_unknown_layout_returns_none(self, reader):
+        assert reader._parse_minute_file(b'\0' * 4800, '000001.SZ', '1m') is None
+
+
+@pytest.mark.skipif(not qmt_local_reader.PYARROW_AVAILABLE, reason="pyarrow 未安装")
+class TestReadMany:
+    """测试批量读取为 Arrow 批次"""
+
+    def test_streams_batches_in_order(self, reader, tmp_path):
+        for k in range(5):
+            write_daily(tmp_path, f'00000{k}', [(DAY0 + i * 86400, 10 + k, 11 + k, 9 + k, 10 + k, 1)
+                                                for i in range(3)])
+
+        codes = [f'00000{k}.SZ' for k in range(5)] + ['600000.SH']
+        table = reader.read_many(codes, max_workers=2).read_all()
+
+        assert table.schema == QMTLocalReader.arrow_schema()
+        assert table.num_rows == 15
+        assert table.column('code').unique().to_pylist() == codes[:5]
+        single = reader.read_daily_data('000003.SZ')
+        subset = table.to_pandas().query("code == '000003.SZ'")
+        assert subset['close'].tolist() == single['close'].tolist()
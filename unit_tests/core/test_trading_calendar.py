@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+交易日历服务单元测试
+
+测试 searchsorted 查询、月/周首个交易日、缓存文件与 DuckDB 校正规则日历的加载。
+"""
+
+import logging
+import os
+import time
+from datetime import date
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.trading_calendar import TradingCalendarService, load_trading_calendar, rule_based_trading_days
+
+# 2024 年 1-2 月的真实交易日（春节休市 2/9-2/16）
+DAYS = [d for d in pd.bdate_range('2024-01-02', '2024-02-29').date
+        if not date(2024, 2, 9) <= d <= date(2024, 2, 16)]
+
+
+@pytest.fixture
+def calendar():
+    return TradingCalendarService(DAYS)
+
+
+class TestQueries:
+    """测试日历查询"""
+
+    def test_is_trading_day(self, calendar):
+        assert calendar.is_trading_day('20240102')
+        assert calendar.is_trading_day(date(2024, 2, 19))
+        assert not calendar.is_trading_day('2024-02-12')
+        assert not calendar.is_trading_day('20240106')
+        assert not calendar.is_trading_day('20240301')
+
+    def test_next_prev(self, calendar):
+        assert calendar.next('20240208') == date(2024, 2, 19)
+        assert calendar.next('20240210', 2) == date(2024, 2, 20)
+        assert calendar.prev('20240219') == date(2024, 2, 8)
+        assert calendar.prev('20240103', 1) == date(2024, 1, 2)
+        with pytest.raises(IndexError):
+            calendar.prev('20240102')
+        with pytest.raises(IndexError):
+            calendar.next('20240229')
+
+    def test_range_and_count(self, calendar):
+        days = calendar.range('20240205', '20240220')
+        assert calendar.to_strings(days) == ['20240205', '20240206', '20240207', '20240208',
+                                             '20240219', '20240220']
+        assert calendar.count('20240205', '20240220') == 6
+        assert calendar.count('20240210', '20240218') == 0
+        assert calendar.count() == len(DAYS)
+
+    def test_month_and_week_firsts(self, calendar):
+        assert calendar.to_strings(calendar.month_firsts()) == ['20240102', '20240201']
+        # 区间起点视为所在月第一个交易日
+        assert calendar.to_strings(calendar.month_firsts('20240115', '20240229')) == ['20240115', '20240201']
+        assert calendar.to_strings(calendar.week_firsts('20240205', '20240226')) == ['20240205', '20240219',
+                                                                                   '20240226']
+
+    def test_covers(self, calendar):
+        assert calendar.covers('20240105', '20240220')
+        assert not calendar.covers('20231229', '20240105')
+        assert not TradingCalendarService(DAYS, source='rules').covers('20240105', '20240110')
+
+
+class TestLoading:
+    """测试日历加载"""
+
+    def test_rule_calendar_without_sources(self, tmp_path):
+        calendar = load_trading_calendar(str(tmp_path / 'missing.ddb'))
+        assert calendar.source == 'rules'
+        assert np.array_equal(calendar.dates, rule_based_trading_days())
+        assert not (tmp_path / 'trading_calendar.npy').exists()
+
+    @staticmethod
+    def make_db(tmp_path, rows):
+        db_path = str(tmp_path / 'stock.ddb')
+        con = duckdb.connect(db_path)
+        con.execute("CREATE TABLE stock_daily (stock_code VARCHAR, date DATE, period VARCHAR)")
+        con.executemany("INSERT INTO stock_daily VALUES (?, ?, '1d')", rows)
+        con.close()
+        return db_path
+
+    def test_duckdb_confirms_rule_calendar_and_writes_cache(self, tmp_path, caplog):
+        codes = [f'{i:06d}.SZ' for i in range(60)]
+        rows = [[code, d] for code in codes for d in DAYS if d != date(2024, 1, 15)]
+        # 缺数据（部分股票或全市场）的规则交易日仍是交易日，全市场缺失的记为缺口；
+        # 规则认为休市、但全市场都有日线的日期补为交易日
+        rows = [r for r in rows if not (r[1] == date(2024, 1, 16) and r[0] < '000040')]
+        rows += [[code, date(2024, 2, 16)] for code in codes]
+        db_path = self.make_db(tmp_path, rows)
+
+        with caplog.at_level(logging.WARNING, logger='core.trading_calendar'):
+            calendar = load_trading_calendar(db_path)
+        assert calendar.source == 'duckdb'
+        assert not calendar.is_trading_day('20240212')
+        assert calendar.is_trading_day('20240115')
+        assert '2024-01-15' in caplog.text
+        assert calendar.is_trading_day('20240116')
+        assert calendar.is_trading_day('20240216')
+        # 真实来源范围外用规则日历补齐
+        assert calendar.next('20240229') == date(2024, 3, 1)
+        assert calendar.covers('20240102', '20240229')
+        assert not calendar.covers('20240102', '20240301')
+
+        cache_file = tmp_path / 'trading_calendar.npy'
+        assert cache_file.exists()
+        os.remove(db_path)
+        cached = load_trading_calendar(db_path)
+        assert cached.source.startswith('cache:')
+        assert np.array_equal(cached.dates, calendar.dates)
+
+        # 缓存过期且没有其他来源时仍使用缓存
+        old = time.time() - 2 * 24 * 3600
+        os.utime(cache_file, (old, old))
+        assert load_trading_calendar(db_path).source.startswith('cache:')
+
+    def test_small_database_does_not_define_calendar(self, tmp_path):
+        # 只有一只股票时，它缺数据的日期不能当作休市日
+        db_path = self.make_db(tmp_path, [['000001.SZ', d] for d in DAYS if d != date(2024, 1, 15)])
+        calendar = load_trading_calendar(db_path)
+        assert calendar.source == 'rules'
+        assert calendar.is_trading_day('20240115')
+        assert not calendar.covers('20240102', '20240229')
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+AutoDataUpdater 增量更新单元测试
+
+使用临时 DuckDB 与自定义 fetcher，检查缺口分组、跳过已是最新的股票、upsert 入库、断点续传与收盘前的目标交易日。
+"""
+
+import threading
+from datetime import date, datetime
+
+import duckdb
+import pandas as pd
+import pytest
+
+pytest.importorskip("schedule")
+
+from data_manager import auto_data_updater
+from data_manager.auto_data_updater import AutoDataUpdater
+
+TARGET = date(2024, 1, 10)
+
+STOCK_DAILY_DDL = """
+    CREATE TABLE stock_daily (
+        stock_code VARCHAR NOT NULL,
+        symbol_type VARCHAR NOT NULL,
+        date DATE NOT NULL,
+        period VARCHAR NOT NULL,
+        open DOUBLE,
+        high DOUBLE,
+        low DOUBLE,
+        close DOUBLE,
+        volume BIGINT,
+        amount DOUBLE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (stock_code, date, period)
+    )
+"""
+
+
+class FakeFetcher:
+    """按工作日生成日线，记录每次调用的 (股票, 起始, 结束)"""
+
+    def __init__(self, fail_codes=()):
+        self.calls = []
+        self.fail_codes = set(fail_codes)
+        self.lock = threading.Lock()
+
+    def __call__(self, codes, start, end):
+        with self.lock:
+            self.calls.append((tuple(codes), start, end))
+        if self.fail_codes & set(codes):
+            raise RuntimeError("模拟拉取失败")
+        days = [d.date() for d in pd.bdate_range(start, end)]
+        return pd.DataFrame([
+            {'stock_code': code, 'date': day, 'open': 10.0, 'high': 11.0, 'low': 9.0,
+             'close': 10.5, 'volume': 1000, 'amount': 10500.0}
+            for code in codes for day in days
+        ])
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "test.ddb")
+    con = duckdb.connect(path)
+    con.execute(STOCK_DAILY_DDL)
+    con.execute("""
+        INSERT INTO stock_daily (stock_code, symbol_type, date, period, close) VALUES
+        ('000001.SZ', 'stock', DATE '2024-01-05', '1d', 9.0),
+        ('600000.SH', 'stock', DATE '2024-01-10', '1d', 8.0)
+    """)
+    con.close()
+    return path
+
+
+def make_updater(db_path, fetcher, **kwargs):
+    updater = AutoDataUpdater(duckdb_path=db_path, fetcher=fetcher, history_start=date(2024, 1, 8), **kwargs)
+    updater._latest_trading_day = lambda: TARGET
+    return updater
+
+
+def test_update_groups_by_gap_and_skips_up_to_date(db_path):
+    fetcher = FakeFetcher()
+    updater = make_updater(db_path, fetcher)
+
+    result = updater.update_all_stocks(['000001.SZ', '600000.SH', '510300.SH'])
+
+    assert result['skipped'] == 1
+    assert result['success'] == 2
+    assert result['failed'] == 0
+    assert sorted(fetcher.calls) == [
+        (('000001.SZ',), date(2024, 1, 6), TARGET),
+        (('510300.SH',), date(2024, 1, 8), TARGET),
+    ]
+
+    con = duckdb.connect(db_path, read_only=True)
+    rows = dict(con.execute("""
+        SELECT stock_code, COUNT(*) FROM stock_daily GROUP BY stock_code
+    """).fetchall())
+    etf_type = con.execute("SELECT DISTINCT symbol_type FROM stock_daily WHERE stock_code = '510300.SH'").fetchone()
+    con.close()
+    assert rows == {'000001.SZ': 4, '600000.SH': 1, '510300.SH': 3}
+    assert etf_type == ('etf',)
+    assert not updater.checkpoint_path.exists()
+
+
+def test_update_resumes_from_checkpoint(db_path):
+    codes = ['000001.SZ', '000002.SZ', '000004.SZ']
+    failing = FakeFetcher(fail_codes={'000004.SZ'})
+    updater = make_updater(db_path, failing, batch_size=1)
+
+    result = updater.update_all_stocks(codes)
+    assert result['failed'] == 1
+    assert updater.checkpoint_path.exists()
+
+    fetcher = FakeFetcher()
+    updater = make_updater(db_path, fetcher, batch_size=1)
+    result = updater.update_all_stocks(codes)
+
+    assert [call[0] for call in fetcher.calls] == [('000004.SZ',)]
+    assert result['failed'] == 0
+    assert not updater.checkpoint_path.exists()
+
+    con = duckdb.connect(db_path, read_only=True)
+    last = con.execute("SELECT MAX(date) FROM stock_daily WHERE stock_code = '000004.SZ'").fetchone()[0]
+    con.close()
+    assert last == TARGET
+
+
+@pytest.mark.parametrize('now, expected', [
+    (datetime(2024, 1, 10, 10, 30), date(2024, 1, 9)),    # 盘中：当天日线未定型
+    (datetime(2024, 1, 10, 14, 59), date(2024, 1, 9)),
+    (datetime(2024, 1, 10, 15, 0), date(2024, 1, 10)),    # 收盘后
+    (datetime(2024, 1, 13, 10, 0), date(2024, 1, 12)),    # 周六
+])
+def test_latest_trading_day_waits_for_close(db_path, monkeypatch, now, expected):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    monkeypatch.setattr(auto_data_updater, 'datetime', FrozenDatetime)
+    updater = AutoDataUpdater(duckdb_path=db_path, fetcher=FakeFetcher())
+    assert updater._latest_trading_day() == expected
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+K线重采样单元测试
+
+测试 A 股交易时段分段（午休、集合竞价）、周线/月线分段，以及 DuckDB 缓存的增量刷新。
+"""
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_manager.bar_resampler import BarResampler, resample_bars
+from data_manager.intraday_store import IntradayBarStore
+
+
+def session_bars(day, code='000001.SZ'):
+    """QMT 格式的一天 1 分钟线：09:30 集合竞价 + 上午 120 根 + 下午 120 根"""
+    day = pd.Timestamp(day)
+    times = ([day + pd.Timedelta('09:30:00')]
+             + list(pd.date_range(day + pd.Timedelta('09:31:00'), day + pd.Timedelta('11:30:00'), freq='min'))
+             + list(pd.date_range(day + pd.Timedelta('13:01:00'), day + pd.Timedelta('15:00:00'), freq='min')))
+    df = pd.DataFrame({'stock_code': code, 'time': times})
+    df['open'] = np.arange(len(df), dtype=float)
+    df['high'] = df['open'] + 1
+    df['low'] = df['open'] - 1
+    df['close'] = df['open'] + 0.5
+    df['volume'] = 1.0
+    df['amount'] = 10.0
+    return df
+
+
+def daily_bars(start, end, code='000001.SZ'):
+    df = pd.DataFrame({'stock_code': code, 'time': pd.bdate_range(start, end)})
+    df['open'] = df['high'] = df['low'] = df['close'] = np.arange(len(df), dtype=float)
+    df['volume'] = 1.0
+    df['amount'] = 10.0
+    return df
+
+
+class TestResampleBars:
+    """测试分段归约"""
+
+    @pytest.mark.parametrize('period, count, labels', [
+        ('5m', 48, ['09:35', '09:40', '11:30', '13:05', '15:00']),
+        ('30m', 8, ['10:00', '10:30', '11:00', '11:30', '13:30', '14:00', '14:30', '15:00']),
+        ('1h', 4, ['10:30', '11:30', '14:00', '15:00']),
+    ])
+    def test_session_labels(self, period, count, labels):
+        bars = resample_bars(session_bars('2024-01-02'), period)
+        assert len(bars) == count
+        assert set(labels) <= set(bars['time'].dt.strftime('%H:%M'))
+        assert bars['volume'].sum() == 241
+
+    def test_segment_reductions(self):
+        bars = resample_bars(session_bars('2024-01-02'), '5m')
+        first, lunch = bars.iloc[0], bars.iloc[23]
+        # 09:30 集合竞价并入第一根 5 分钟线
+        assert (first['open'], first['high'], first['low'], first['close']) == (0, 6, -1, 5.5)
+        assert (first['volume'], first['amount']) == (6, 60)
+        assert lunch['time'] == pd.Timestamp('2024-01-02 11:30')
+        assert bars.iloc[24]['open'] == 121
+
+    def test_multiple_codes_and_unsorted_input(self):
+        raw = pd.concat([session_bars('2024-01-03', 'B'), session_bars('2024-01-02', 'A'),
+                         session_bars('2024-01-03', 'A')]).sample(frac=1, random_state=1)
+        bars = resample_bars(raw, '1h')
+        assert bars.groupby('stock_code').size().to_dict() == {'A': 8, 'B': 4}
+
+    def test_week_and_month(self):
+        raw = daily_bars('2024-01-01', '2024-02-29')
+        weeks = resample_bars(raw, '1w')
+        assert weeks['time'].iloc[0] == pd.Timestamp('2024-01-05')
+        assert (weeks['open'].iloc[1], weeks['close'].iloc[1], weeks['volume'].iloc[1]) == (5, 9, 5)
+        months = resample_bars(raw, '1M')
+        assert list(months['time']) == [pd.Timestamp('2024-01-31'), pd.Timestamp('2024-02-29')]
+        assert list(months['volume']) == [23, 21]
+
+    def test_unknown_period(self):
+        with pytest.raises(ValueError):
+            resample_bars(daily_bars('2024-01-01', '2024-01-31'), '7m')
+
+
+class TestBarResampler:
+    """测试 DuckDB 缓存与增量刷新"""
+
+    @pytest.fixture
+    def resampler(self, tmp_path):
+        db_path = str(tmp_path / 'stock.ddb')
+        con = duckdb.connect(db_path)
+        con.execute("""
+            CREATE TABLE stock_daily (stock_code VARCHAR, date DATE, period VARCHAR, open DOUBLE, high DOUBLE,
+                                      low DOUBLE, close DOUBLE, volume DOUBLE, amount DOUBLE)
+        """)
+        daily = daily_bars('2024-01-01', '2024-01-10').rename(columns={'time': 'date'})
+        con.execute("""INSERT INTO stock_daily SELECT stock_code, date, '1d', open, high, low, close, volume, amount
+                       FROM daily""")
+        con.close()
+        return BarResampler(db_path, IntradayBarStore(tmp_path / 'intraday', buckets=2))
+
+    def test_intraday_refresh_is_incremental(self, resampler):
+        store = resampler.intraday_store
+        store.append(session_bars('2024-01-02'))
+        store.append(session_bars('2024-01-03').iloc[:100])
+        assert resampler.refresh('000001.SZ', '30m') == 8 + 4
+
+        # 当天后续分钟线到达后只重算最后一个交易日
+        store.append(session_bars('2024-01-03').iloc[100:])
+        assert resampler.refresh('000001.SZ', '30m') == 8
+        bars = resampler.get_bars('000001.SZ', '30m', '2024-01-01', '2024-01-03', refresh=False)
+        assert len(bars) == 16
+        assert bars['volume'].sum() == 482
+        assert resampler.get_bars('000001.SZ', '30m', '2024-01-03', '2024-01-03')['time'].iloc[0] == \
+            pd.Timestamp('2024-01-03 10:00')
+
+    def test_weekly_partial_week_is_replaced(self, resampler, tmp_path):
+        weeks = resampler.get_bars(['000001.SZ'], '1w')
+        assert list(weeks['time']) == [pd.Timestamp('2024-01-05'), pd.Timestamp('2024-01-10')]
+
+        con = duckdb.connect(resampler.duckdb_path)
+        con.execute("INSERT INTO stock_daily VALUES ('000001.SZ', '2024-01-11', '1d', 8, 8, 8, 8, 1, 10)")
+        con.close()
+        weeks = resampler.get_bars(['000001.SZ'], '1w')
+        assert list(weeks['time']) == [pd.Timestamp('2024-01-05'), pd.Timestamp('2024-01-11')]
+        assert weeks['volume'].iloc[-1] == 4
+
+
+def test_unified_interface_reads_cache_through_read_only_connection(tmp_path, monkeypatch):
+    from data_manager.intraday_store import default_intraday_root
+    from data_manager.unified_data_interface import UnifiedDataInterface
+
+    monkeypatch.delenv('EASYXT_INTRADAY_STORE_DIR', raising=False)
+    db_path = str(tmp_path / 'stock.ddb')
+    con = duckdb.connect(db_path)
+    con.execute("""
+        CREATE TABLE stock_daily (stock_code VARCHAR, date DATE, period VARCHAR, open DOUBLE, high DOUBLE,
+                                  low DOUBLE, close DOUBLE, volume DOUBLE, amount DOUBLE)
+    """)
+    daily = daily_bars('2024-01-01', '2024-01-10').rename(columns={'time': 'date'})
+    con.execute("""INSERT INTO stock_daily SELECT stock_code, date, '1d', open, high, low, close, volume, amount
+                   FROM daily""")
+    con.close()
+    BarResampler(db_path).refresh('000001.SZ', '1w')
+    IntradayBarStore(default_intraday_root(db_path)).append(session_bars('2024-01-02'))
+
+    interface = UnifiedDataInterface(db_path)
+    interface.connect(read_only=True)
+    try:
+        weeks = interface.get_stock_data('000001.SZ', '2024-01-01', '2024-01-10', period='1w', local_only=True)
+        assert list(weeks.index) == [pd.Timestamp('2024-01-05'), pd.Timestamp('2024-01-10')]
+
+        # 1 分钟线入库后的刷新在持有只读连接时进行，之后仍通过只读连接读取
+        interface._refresh_resampled('000001.SZ')
+        assert interface.con is not None
+        bars = interface.get_stock_data('000001.SZ', '2024-01-02', '2024-01-02', period='30m', local_only=True)
+        assert len(bars) == 8 and bars['volume'].sum() == 241
+    finally:
+        interface.close()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+IntradayBarStore 单元测试
+
+测试按交易日/分桶分区的追加、收盘压缩去重、按日面板读取和区间读取。
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from data_manager.intraday_store import IntradayBarStore, symbol_bucket
+
+CODES = ['000001.SZ', '000002.SZ', '600000.SH', '600519.SH']
+DAYS = ['2024-01-02', '2024-01-03']
+
+
+def make_bars(day, codes=CODES, minutes=240):
+    times = pd.date_range(f'{day} 09:31', periods=minutes, freq='min')
+    df = pd.DataFrame({'stock_code': np.repeat(codes, minutes), 'time': np.tile(times, len(codes))})
+    df['close'] = np.arange(len(df), dtype=float)
+    df['open'] = df['high'] = df['low'] = df['close']
+    df['volume'] = 100.0
+    df['amount'] = 1000.0
+    return df
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = IntradayBarStore(tmp_path, buckets=4)
+    for day in DAYS:
+        bars = make_bars(day)
+        # 模拟盘中分两次追加，顺序打乱
+        store.append(bars.iloc[::2].sample(frac=1, random_state=0))
+        store.append(bars.iloc[1::2])
+    return store
+
+
+def test_append_partitions_by_day_and_bucket(store, tmp_path):
+    assert store.available_days() == DAYS
+    day_dir = tmp_path / 'period=1m' / 'date=2024-01-02'
+    expected = sorted({f'bucket={symbol_bucket(c, 4):02d}' for c in CODES})
+    assert sorted(p.name for p in day_dir.iterdir()) == expected
+
+
+def test_compact_merges_dedupes_and_sorts(store, tmp_path):
+    # 后写入的分片覆盖同一 (代码, 时间)
+    store.append(pd.DataFrame({'stock_code': ['600000.SH'], 'time': [pd.Timestamp('2024-01-02 09:31')],
+                               'close': [-1.0]}))
+    assert store.read_day('2024-01-02', ['600000.SH']).iloc[0]['close'] == -1.0
+
+    merged = store.compact()
+    assert set(merged) == {'1m 2024-01-02', '1m 2024-01-03'}
+    assert store.compact() == {}
+
+    bucket_dir = tmp_path / 'period=1m' / 'date=2024-01-02' / f"bucket={symbol_bucket('600000.SH', 4):02d}"
+    assert [p.name for p in bucket_dir.iterdir()] == ['data.parquet']
+    table = pq.read_table(bucket_dir / 'data.parquet').to_pandas()
+    assert table.equals(table.sort_values(['stock_code', 'time']).reset_index(drop=True))
+    assert pq.ParquetFile(bucket_dir / 'data.parquet').metadata.row_group(0).column(0).statistics.has_min_max
+
+    day = store.read_day('2024-01-02')
+    assert len(day) == 240 * len(CODES)
+    assert day.loc[(day['stock_code'] == '600000.SH')].iloc[0]['close'] == -1.0
+
+
+def test_read_day_panel(store):
+    panel = store.read_day_panel('2024-01-03', ['600519.SH', '000001.SZ'])
+    assert list(panel.columns) == ['600519.SH', '000001.SZ']
+    assert panel.shape == (240, 2)
+    assert panel.index[0] == pd.Timestamp('2024-01-03 09:31')
+
+    multi = store.read_day_panel('2024-01-03', ['000001.SZ'], field=['close', 'volume'])
+    assert set(multi.columns) == {('close', '000001.SZ'), ('volume', '000001.SZ')}
+
+    assert store.read_day('2024-01-04', CODES).empty
+    with pytest.raises(ValueError):
+        store.read_day('2024-01-03', CODES, fields=['close; DROP'])
+
+
+def test_read_range_and_timezone_normalization(store):
+    df = store.read('000002.SZ', '2024-01-01', '2024-01-31')
+    assert len(df) == 480 and set(df['stock_code']) == {'000002.SZ'}
+
+    # 带时区的索引（QMT 返回格式）转换为北京时间
+    qmt = pd.DataFrame({'close': [1.0]},
+                       index=pd.DatetimeIndex([pd.Timestamp('2024-01-05 01:31', tz='UTC')], name='datetime'))
+    store.append(qmt, period='5m', stock_code='000001.SZ')
+    bars = store.read('000001.SZ', '2024-01-05', '2024-01-05', period='5m')
+    assert bars.iloc[0]['time'] == pd.Timestamp('2024-01-05 09:31')
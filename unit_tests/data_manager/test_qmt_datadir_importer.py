@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+QMTDatadirImporter 单元测试
+
+用合成的 .DAT 日线文件导入临时 DuckDB，检查 upsert 与进度回调。
+"""
+
+import struct
+
+import duckdb
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from core.qmt_local_reader import QMTLocalReader
+from data_manager.qmt_datadir_importer import QMTDatadirImporter
+
+# 2024-01-02 00:00 北京时间
+DAY0 = 1704124800
+
+STOCK_DAILY_DDL = """
+    CREATE TABLE stock_daily (
+        stock_code VARCHAR NOT NULL,
+        symbol_type VARCHAR NOT NULL,
+        date DATE NOT NULL,
+        period VARCHAR NOT NULL,
+        open DOUBLE,
+        high DOUBLE,
+        low DOUBLE,
+        close DOUBLE,
+        volume BIGINT,
+        amount DOUBLE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (stock_code, date, period)
+    )
+"""
+
+
+def write_daily(root, code, closes):
+    path = root / 'SZ' / '86400'
+    path.mkdir(parents=True, exist_ok=True)
+    content = bytearray(8)
+    for i, close in enumerate(closes):
+        price = int(close * 1000)
+        content += struct.pack('<IIIIIIII', DAY0 + i * 86400, price, price + 100, price - 100, price, 0, 10, 1)
+        content += bytes(32)
+    (path / f'{code}.DAT').write_bytes(bytes(content))
+
+
+@pytest.fixture
+def datadir(tmp_path, monkeypatch):
+    monkeypatch.setattr(QMTLocalReader, 'BIG_QMT_DATA_DIR', tmp_path / 'missing')
+    root = tmp_path / 'datadir'
+    for k in range(5):
+        write_daily(root, f'00000{k}', [10 + k, 11 + k, 12 + k])
+    return root
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'test.duckdb'
+    with duckdb.connect(str(path)) as con:
+        con.execute(STOCK_DAILY_DDL)
+    return str(path)
+
+
+def test_import_daily_upserts_in_batches(datadir, db_path):
+    progress = []
+    importer = QMTDatadirImporter(datadir, db_path, batch_size=2, max_workers=1)
+    codes = [f'00000{k}.SZ' for k in range(5)] + ['000009.SZ']
+
+    result = importer.import_daily(codes, progress_callback=lambda done, total: progress.append(done))
+
+    assert result['success'] == 5 and result['rows'] == 15
+    assert result['failed_list'] == ['000009.SZ - 无数据']
+    assert progress == [2, 4, 6]
+
+    # 数据更新后再次导入：同键覆盖，不产生重复行
+    write_daily(datadir, '000001', [20, 21, 22, 23])
+    importer.import_daily(['000001.SZ'], start_date='2024-01-03')
+    with duckdb.connect(db_path, read_only=True) as con:
+        count, = con.execute("SELECT COUNT(*) FROM stock_daily").fetchone()
+        rows = con.execute("""
+            SELECT CAST(date AS VARCHAR), close, volume FROM stock_daily
+            WHERE stock_code = '000001.SZ' ORDER BY date
+        """).fetchall()
+    assert count == 16
+    assert rows == [('2024-01-02', 11.0, 1000), ('2024-01-03', 21.0, 1000),
+                    ('2024-01-04', 22.0, 1000), ('2024-01-05', 23.0, 1000)]
+
+
+def test_should_stop_after_current_batch(datadir, db_path):
+    importer = QMTDatadirImporter(datadir, db_path, batch_size=2, max_workers=1)
+
+    result = importer.import_daily([f'00000{k}.SZ' for k in range(5)], should_stop=lambda: True)
+
+    assert result['stopped'] and result['success'] == 2
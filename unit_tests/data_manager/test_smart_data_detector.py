@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+SmartDataDetector / DataIntegrityChecker 批量检查单元测试
+
+批量（全市场一次 SQL）结果应与逐只检查一致。
+"""
+
+from datetime import date
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_manager.data_integrity_checker import DataIntegrityChecker
+from data_manager.smart_data_detector import SmartDataDetector, TradingCalendar
+
+START, END = '2024-01-01', '2024-06-30'
+CODES = ['000001.SZ', '000002.SZ', '600000.SH']
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    days = TradingCalendar().get_trading_days(date(2024, 1, 1), date(2024, 6, 30))
+    rng = np.random.default_rng(0)
+    frames = []
+    for code in CODES[:2]:
+        n = len(days)
+        close = 10 * np.cumprod(1 + rng.normal(0, 0.08, n))
+        df = pd.DataFrame({
+            'stock_code': code, 'symbol_type': 'stock', 'date': days, 'period': '1d',
+            'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+            'volume': rng.integers(1000, 2000, n), 'amount': 1.0,
+        })
+        df.loc[df.index[5], 'high'] = df.loc[df.index[5], 'low'] * 0.5
+        df.loc[df.index[20], 'volume'] = 10 ** 7
+        frames.append(df.drop(index=rng.choice(n, 6, replace=False)))
+    bars = pd.concat(frames, ignore_index=True)
+
+    path = str(tmp_path / "test.ddb")
+    con = duckdb.connect(path)
+    con.execute("CREATE TABLE stock_daily AS SELECT * FROM bars")
+    con.close()
+    return path
+
+
+def test_batch_detect_missing_matches_single(db_path):
+    detector = SmartDataDetector(db_path)
+    assert detector.connect()
+
+    batch = detector.batch_detect_missing(CODES, START, END)
+    assert list(batch) == CODES
+    for code in CODES:
+        single = detector.detect_missing_data(code, START, END)
+        assert batch[code]['missing_trading_days'] == single['missing_trading_days']
+        assert batch[code]['completeness_ratio'] == pytest.approx(single['completeness_ratio'])
+        assert sum(seg['days'] for seg in batch[code]['missing_segments']) == single['missing_count']
+
+    plan = detector.get_download_plan(None, START, END)
+    assert plan['total_stocks'] == 2
+    assert plan['total_missing_days'] == 12
+    detector.close()
+
+
+def test_batch_detect_missing_starts_at_list_date(db_path):
+    con = duckdb.connect(db_path)
+    # tushare 写入的 stock_basic.list_date 是 'YYYYMMDD' 字符串
+    con.execute("CREATE TABLE stock_basic (ts_code VARCHAR, list_date VARCHAR)")
+    con.execute("INSERT INTO stock_basic VALUES ('600000.SH', '20240624')")
+    con.close()
+
+    detector = SmartDataDetector(db_path)
+    detector.connect()
+    report = detector.batch_detect_missing(['600000.SH'], START, END)['600000.SH']
+    detector.close()
+
+    assert report['missing_trading_days'] == [date(2024, 6, d) for d in (24, 25, 26, 27, 28)]
+    assert report['missing_segments'] == [{'start': date(2024, 6, 24), 'end': date(2024, 6, 28), 'days': 5}]
+
+
+def test_batch_check_integrity_matches_single(db_path):
+    checker = DataIntegrityChecker(db_path)
+    assert checker.connect()
+
+    batch = checker.batch_check_integrity(CODES, START, END)
+    for code in CODES:
+        single = checker.check_integrity(code, START, END)
+        assert batch[code]['status'] == single['status']
+        assert batch[code]['missing_trading_days'] == single['missing_trading_days']
+        # 日期格式可能不同，只比较冒号前的描述
+        for key in ('issues', 'warnings'):
+            assert ([msg.split(':')[0] for msg in batch[code]['quality_report'][key]]
+                    == [msg.split(':')[0] for msg in single['quality_report'][key]])
+    assert batch['600000.SH']['quality_report']['issues'] == ['数据库中无数据']
+    checker.close()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+后台写入队列单元测试
+
+测试成批写入、背压、flush/close、失败统计，以及 UnifiedDataInterface 的多股票单事务写入。
+"""
+
+import queue
+import threading
+
+import duckdb
+import pandas as pd
+import pytest
+
+from data_manager.write_behind import WriteBehindQueue
+
+
+class TestWriteBehindQueue:
+    """测试写入队列"""
+
+    def test_batches_pending_items_and_reports_metrics(self):
+        gate = threading.Event()
+        batches = []
+
+        def write(payloads):
+            gate.wait(5)
+            batches.append(list(payloads))
+
+        writer = WriteBehindQueue(write, max_batch_size=3)
+        for i in range(7):
+            writer.submit(('code', i % 2), i, rows=10)
+        assert writer.is_pending(('code', 0))
+        gate.set()
+        assert writer.flush(5)
+        writer.close()
+
+        assert sorted(sum(batches, [])) == list(range(7))
+        assert all(len(b) <= 3 for b in batches)
+        assert len(batches) < 7
+        metrics = writer.metrics()
+        assert (metrics['pending'], metrics['frames'], metrics['rows']) == (0, 7, 70)
+        assert metrics['batches'] == len(batches)
+        assert metrics['commit_latency_ms']['max'] >= metrics['commit_latency_ms']['last'] >= 0
+        assert not writer.is_pending(('code', 0))
+
+    def test_bounded_queue_applies_backpressure(self):
+        gate = threading.Event()
+        writer = WriteBehindQueue(lambda payloads: gate.wait(5), max_queue_size=1, max_batch_size=1)
+        writer.submit('a', 1)
+        writer.submit('b', 2)      # 第一份在写入线程中，第二份占满队列
+        with pytest.raises(queue.Full):
+            writer.submit('c', 3, timeout=0.2)
+        assert writer.metrics()['pending'] == 2
+        gate.set()
+        writer.close()
+        assert writer.metrics()['frames'] == 2
+
+    def test_failures_are_counted_and_close_rejects_new_items(self):
+        def write(payloads):
+            raise ValueError('disk full')
+
+        writer = WriteBehindQueue(write)
+        writer.submit('a', 1, rows=5)
+        assert writer.flush(5)
+        metrics = writer.metrics()
+        assert (metrics['failed_frames'], metrics['rows'], metrics['last_error']) == (1, 0, 'disk full')
+
+        writer.close()
+        with pytest.raises(RuntimeError):
+            writer.submit('b', 2)
+
+
+def create_daily_table(db_path):
+    con = duckdb.connect(db_path)
+    con.execute("""
+        CREATE TABLE stock_daily (
+            stock_code VARCHAR, symbol_type VARCHAR, date DATE, period VARCHAR,
+            open DOUBLE, high DOUBLE, low DOUBLE, close DOUBLE, volume BIGINT, amount DOUBLE,
+            created_at TIMESTAMP, updated_at TIMESTAMP,
+            PRIMARY KEY (stock_code, date, period)
+        )
+    """)
+    con.close()
+
+
+def daily_frame(periods=5):
+    index = pd.DatetimeIndex(pd.bdate_range('2024-01-02', periods=periods), name='datetime')
+    return pd.DataFrame({'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 100, 'amount': 1e4},
+                        index=index)
+
+
+def online_interface(db_path, monkeypatch):
+    """已连接（持有只读连接）的接口，在线数据源返回固定的 5 根日线"""
+    from data_manager.unified_data_interface import UnifiedDataInterface
+
+    interface = UnifiedDataInterface(db_path)
+    assert interface.connect(read_only=True)
+    interface.qmt_available = True
+    monkeypatch.setattr(interface, '_read_from_qmt', lambda code, start, end, period: daily_frame())
+    return interface
+
+
+def test_unified_interface_writes_batch_in_one_transaction(tmp_path):
+    from data_manager.unified_data_interface import UnifiedDataInterface
+
+    db_path = str(tmp_path / 'stock.ddb')
+    create_daily_table(db_path)
+    frame = daily_frame()
+
+    interface = UnifiedDataInterface(db_path)
+    for code in ['000001.SZ', '000002.SZ', '600000.SH']:
+        assert interface._submit_write(frame, code, '1d')
+    frame['close'] = -1.0        # 提交后修改不影响写入
+    assert interface.flush(10)
+    assert interface.write_metrics()['rows'] == 15
+    interface.close()
+
+    con = duckdb.connect(db_path, read_only=True)
+    rows = con.execute("SELECT stock_code, COUNT(*), MIN(close) FROM stock_daily GROUP BY 1 ORDER BY 1").fetchall()
+    con.close()
+    assert rows == [('000001.SZ', 5, 1.5), ('000002.SZ', 5, 1.5), ('600000.SH', 5, 1.5)]
+
+
+def test_fetched_data_is_persisted_while_read_connection_is_open(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'stock.ddb')
+    create_daily_table(db_path)
+    interface = online_interface(db_path, monkeypatch)
+    codes = ['000001.SZ', '000002.SZ', '600000.SH']
+    try:
+        for code in codes:
+            assert len(interface.get_stock_data(code, '2024-01-02', '2024-01-08')) == 5
+        assert interface.flush(10)
+        assert interface.write_metrics()['failed_frames'] == 0
+        assert interface.con is not None
+
+        # 写入后重新打开的只读连接能读到新数据，不再访问在线数据源
+        monkeypatch.setattr(interface, '_read_from_qmt', lambda *args: pytest.fail('不应再在线获取'))
+        for code in codes:
+            assert len(interface.get_stock_data(code, '2024-01-02', '2024-01-08', local_only=True)) == 5
+    finally:
+        interface.close()
+
+    con = duckdb.connect(db_path, read_only=True)
+    assert con.execute("SELECT COUNT(*) FROM stock_daily").fetchone()[0] == 15
+    con.close()
+
+
+def test_write_failures_are_reported_to_the_caller(tmp_path, monkeypatch, caplog):
+    db_path = str(tmp_path / 'stock.ddb')
+    duckdb.connect(db_path).close()          # 没有 stock_daily 表，写入必然失败
+    interface = online_interface(db_path, monkeypatch)
+    try:
+        with caplog.at_level('WARNING', logger='data_manager.unified_data_interface'):
+            interface.get_stock_data('000001.SZ', '2024-01-02', '2024-01-08')
+            interface.flush(10)
+        assert interface.write_metrics()['failed_frames'] == 1
+        assert any('数据未持久化' in r.getMessage() for r in caplog.records)
+    finally:
+        interface.close()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+RingSeries 单元测试
+
+验证环形缓冲区的覆盖、时间切片、过期清理以及分位数与 statistics 模块一致。
+"""
+
+import random
+import statistics
+
+import pytest
+
+from easy_xt.realtime_data.metric_store import RingSeries
+
+
+@pytest.fixture
+def series():
+    """容量为50、已写入200个点(只保留最后50个)的序列"""
+    random.seed(0)
+    s = RingSeries(50)
+    for t in range(200):
+        s.append(float(t), random.gauss(0, 1))
+    return s
+
+
+def test_capacity_is_fixed(series):
+    """写满后覆盖最旧数据，长度不超过容量"""
+    timestamps, _, _ = series.time_slice()
+    assert len(series) == 50
+    assert timestamps[0] == 150.0
+    assert timestamps[-1] == 199.0
+
+
+def test_time_slice_is_closed_interval(series):
+    """time_slice 按闭区间返回数据"""
+    timestamps, values, _ = series.time_slice(160, 170)
+    assert timestamps.tolist() == [float(t) for t in range(160, 171)]
+    assert len(values) == 11
+
+
+@pytest.mark.parametrize('start_time', [None, 175.0])
+def test_statistics_match_statistics_module(series, start_time):
+    """p95/p99/中位数与 statistics 模块的计算结果一致"""
+    _, values, _ = series.time_slice(start_time)
+    values = values.tolist()
+
+    stats = series.describe(start_time)
+
+    assert stats['count'] == len(values)
+    assert stats['median'] == statistics.median(values)
+    assert stats['p95'] == statistics.quantiles(values, n=20)[18]
+    assert series.quantile(99, 100, start_time) == statistics.quantiles(values, n=100)[98]
+
+
+def test_evict_before_keeps_sorted_window(series):
+    """过期清理后有序窗口同步更新"""
+    removed = series.evict_before(190.0)
+    _, values, _ = series.time_slice()
+
+    assert removed == 40
+    assert len(series) == 10
+    assert series.describe()['min'] == min(values)
+    assert series.describe()['max'] == max(values)
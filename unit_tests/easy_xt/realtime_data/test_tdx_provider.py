@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+通达信连接池单元测试
+
+用内存中的假 TdxHq_API 验证连接池的并行分批、失效切换、失败批次上报与建立失败后的退避。
+"""
+
+import pytest
+
+from easy_xt.realtime_data.providers import tdx_provider
+from easy_xt.realtime_data.providers.tdx_provider import TdxConnectionPool, TdxDataProvider
+
+SERVERS = [
+    {"host": f"10.0.0.{i}", "port": 7709, "name": f"测试{i}", "priority": 1}
+    for i in range(1, 5)
+]
+
+
+class FakeTdxApi:
+    """假的通达信连接：按 host 模拟宕机/请求失败，按代码模拟坏批次"""
+
+    down = set()
+    broken = set()
+    bad_codes = set()
+    connects = 0
+
+    def __init__(self):
+        self.host = None
+
+    def connect(self, host, port, time_out=None):
+        FakeTdxApi.connects += 1
+        if host in self.down:
+            return False
+        self.host = host
+        return True
+
+    def disconnect(self):
+        self.host = None
+
+    def get_security_count(self, market):
+        return 1
+
+    def get_security_quotes(self, batch):
+        if self.host in self.broken or any(code in self.bad_codes for _, code in batch):
+            raise ConnectionError("模拟请求失败")
+        return [{'code': code, 'price': 10.0, 'last_close': 9.5} for _, code in batch]
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """使用假连接、4 个服务器、3 条连接的提供者"""
+    monkeypatch.setattr(tdx_provider, "TdxHq_API", FakeTdxApi)
+    monkeypatch.setattr(FakeTdxApi, "down", set())
+    monkeypatch.setattr(FakeTdxApi, "broken", set())
+    monkeypatch.setattr(FakeTdxApi, "bad_codes", set())
+    monkeypatch.setattr(FakeTdxApi, "connects", 0)
+    p = TdxDataProvider({
+        'servers': SERVERS, 'timeout': 1, 'pool_size': 3, 'heartbeat_interval': 3600,
+        'retry_count': 1, 'retry_delay': 0,
+    })
+    yield p
+    p.disconnect()
+
+
+def make_codes(n):
+    return [str(600000 + i) for i in range(n)]
+
+
+def test_pool_fetches_every_batch(provider):
+    """多于一批的请求经连接池分发，每只股票都有行情，连接分布在不同服务器"""
+    codes = make_codes(250)
+    quotes = provider.get_realtime_quotes(codes)
+
+    assert sorted(q['code'] for q in quotes) == codes
+    assert provider.last_failed_codes == []
+    status = provider.get_server_performance_stats()['pool']
+    assert len(status) == 3
+    assert len({s['server'] for s in status}) == 3
+
+
+def test_failed_batch_retries_on_another_server(provider):
+    """请求失败的连接切换到其他服务器后重试，结果不丢失"""
+    codes = make_codes(250)
+    provider.get_realtime_quotes(codes)
+    FakeTdxApi.broken = {SERVERS[0]["host"]}
+
+    quotes = provider.get_realtime_quotes(codes)
+
+    assert sorted(q['code'] for q in quotes) == codes
+    assert provider.last_failed_codes == []
+    assert SERVERS[0]["name"] not in {s['server'] for s in provider.get_server_performance_stats()['pool']}
+
+
+def test_partial_failure_is_reported(provider):
+    """重试后仍失败的批次不静默丢弃：代码记录在 last_failed_codes"""
+    codes = make_codes(250)
+    FakeTdxApi.bad_codes = {codes[100]}
+
+    quotes = provider.get_realtime_quotes(codes)
+
+    failed_batch = codes[80:160]
+    assert provider.last_failed_codes == failed_batch
+    assert sorted(q['code'] for q in quotes) == sorted(set(codes) - set(failed_batch))
+
+
+def test_pool_backs_off_when_all_servers_are_down(provider):
+    """所有服务器不可用时，退避期内不再重复尝试建立连接池"""
+    FakeTdxApi.down = {s["host"] for s in SERVERS}
+    pool = TdxConnectionPool(provider, size=2)
+
+    assert not pool.start()
+    attempts = FakeTdxApi.connects
+    assert not pool.start()
+    assert FakeTdxApi.connects == attempts
+
+    FakeTdxApi.down = set()
+    pool._retry_at = 0.0
+    assert pool.start()
+    assert pool._failures == 0
+    pool.close()
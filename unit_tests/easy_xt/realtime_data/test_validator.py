@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+DataValidator 列式批量验证单元测试
+
+验证 validate_batch_frame() 与逐条 _validate_data() 的结果和统计一致。
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from easy_xt.realtime_data.validator import DataValidator, DataType, ValidationLevel
+
+
+@pytest.fixture
+def frame():
+    """构造包含各类异常值的行情/K线/指标混合数据"""
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        'code': rng.choice(['000001', '60000', 'abc', None, 600000], n),
+        'price': rng.choice([10.1234, 0.001, 2e4, np.nan, np.inf, 5.0, 'x', '3.14159', None, 1.0005], n),
+        'volume': rng.choice([100, -5, 2e12, np.nan], n),
+        'timestamp': rng.choice([1.7e9, None, ''], n),
+        'open': rng.normal(10, 1, n),
+        'high': rng.normal(10.5, 1, n),
+        'low': rng.normal(9.5, 1, n),
+        'close': rng.normal(10, 1, n),
+        'value': rng.choice([1.0, np.inf, np.nan, 50.0, 120.0], n),
+        'type': rng.choice(['RSI', 'KDJ_K', 'MACD'], n),
+    })
+    df.loc[::7, 'open'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('level', list(ValidationLevel))
+@pytest.mark.parametrize('data_type', [DataType.QUOTE, DataType.KLINE, DataType.INDICATOR])
+def test_batch_frame_matches_row_wise(frame, level, data_type):
+    """列式验证的有效性、清洗结果与统计信息应与逐条验证一致"""
+    row_validator = DataValidator(level)
+    batch_validator = DataValidator(level)
+
+    row_results = [row_validator._validate_data(r, data_type) for r in frame.to_dict('records')]
+    batch_result = batch_validator.validate_batch_frame(frame, data_type)
+
+    assert batch_validator.statistics == row_validator.statistics
+    assert batch_result.is_valid.tolist() == [r.is_valid for r in row_results]
+
+    cleaned_rows = batch_result.cleaned_data.to_dict('records')
+    for row_result, cleaned_row in zip(row_results, cleaned_rows):
+        for key, expected in row_result.cleaned_data.items():
+            actual = cleaned_row[key]
+            if isinstance(expected, float) and np.isnan(expected):
+                assert isinstance(actual, float) and np.isnan(actual)
+            else:
+                assert actual == expected
+
+
+def test_error_bitmap_marks_failed_rules():
+    """错误位图中的置位应对应未通过的规则"""
+    validator = DataValidator(ValidationLevel.STRICT)
+    df = pd.DataFrame({
+        'code': ['000001', 'bad'],
+        'price': [10.0, 10.0],
+        'volume': [100.0, -1.0],
+        'timestamp': [1.7e9, 1.7e9],
+    })
+
+    result = validator.validate_batch_frame(df, DataType.QUOTE)
+
+    assert result.is_valid.tolist() == [True, False]
+    assert result.failed_rules(0) == []
+    assert result.failed_rules(1) == ['code_format', 'volume_range']
+    assert result.error_counts['code_format'] == 1
+
+
+def test_accepts_arrow_table():
+    """支持直接传入 pyarrow.Table"""
+    pa = pytest.importorskip('pyarrow')
+    table = pa.table({'open': [10.0, 10.0], 'high': [11.0, 9.0], 'low': [9.0, 9.5], 'close': [10.5, 9.8]})
+
+    result = DataValidator().validate_batch_frame(table, DataType.KLINE)
+
+    assert result.is_valid.tolist() == [True, False]
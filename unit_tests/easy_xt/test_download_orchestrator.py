@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+DownloadOrchestrator 单元测试
+
+验证任务合并（重复/重叠/相邻区间、多代码成批、优先级），以及工作进程中的批量下载、
+进度回报和卡死后重启。工作进程导入的是写在临时目录里的替身 xtdata 模块。
+"""
+
+import json
+import textwrap
+
+import pytest
+
+from easy_xt.download_orchestrator import DownloadJob, DownloadOrchestrator, coalesce_jobs
+
+FAKE_XTDATA = textwrap.dedent('''
+    import json, os, time
+
+    LOG = os.environ['FAKE_XTDATA_LOG']
+
+    def download_history_data2(stock_list, period, start_time='', end_time='', callback=None, incrementally=None):
+        with open(LOG, 'a') as f:
+            f.write(json.dumps([stock_list, period, start_time, end_time]) + '\\n')
+        if 'HANG.SH' in stock_list:
+            time.sleep(30)
+        for i, code in enumerate(stock_list, 1):
+            if callback:
+                callback({'finished': i, 'total': len(stock_list), 'stockcode': code})
+
+    def get_local_data(field_list, stock_list, period, start_time='', end_time=''):
+        return {code: [0] * 10 for code in stock_list if not code.startswith('9')}
+''')
+
+
+def job(seq, code, start='', end='', period='1d', priority=0):
+    return DownloadJob(priority, seq, code, period, start, end)
+
+
+class TestCoalesce:
+    """测试任务合并"""
+
+    def test_merge_duplicate_overlapping_and_adjacent_ranges(self):
+        batches = coalesce_jobs([
+            job(0, 'A', '20240101', '20240110'),
+            job(1, 'A', '20240101', '20240110'),
+            job(2, 'A', '20240111', '20240120'),
+            job(3, 'A', '20240115', '20240131'),
+            job(4, 'A', '20240301', '20240310'),
+        ])
+        assert [(b.start, b.end, b.codes, len(b.jobs)) for b in batches] == [
+            ('20240101', '20240131', ['A'], 4),
+            ('20240301', '20240310', ['A'], 1),
+        ]
+
+    def test_open_ranges_absorb_later_jobs(self):
+        batches = coalesce_jobs([job(0, 'A', '20240101', ''), job(1, 'A', '20240301', '20240310')])
+        assert [(b.start, b.end) for b in batches] == [('20240101', '')]
+
+    def test_same_range_codes_share_a_batch(self):
+        batches = coalesce_jobs([job(i, f'C{i}', '20240101', '20240131') for i in range(5)]
+                                + [job(5, 'M', '20240101', '20240131', period='1m')], max_batch_size=2)
+        assert [(b.period, b.codes) for b in batches] == [
+            ('1d', ['C0', 'C1']), ('1d', ['C2', 'C3']), ('1d', ['C4']), ('1m', ['M']),
+        ]
+
+    def test_priority_orders_batches(self):
+        batches = coalesce_jobs([job(0, 'A', period='1m', priority=5), job(1, 'B', period='1d', priority=1)])
+        assert [b.codes for b in batches] == [['B'], ['A']]
+
+
+@pytest.fixture
+def fake_xtdata(tmp_path, monkeypatch):
+    (tmp_path / 'fake_xtdata.py').write_text(FAKE_XTDATA, encoding='utf-8')
+    log = tmp_path / 'calls.log'
+    monkeypatch.setenv('FAKE_XTDATA_LOG', str(log))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return log
+
+
+def read_calls(log):
+    return [json.loads(line) for line in log.read_text().splitlines()]
+
+
+def test_download_in_worker_process(fake_xtdata):
+    events = []
+    with DownloadOrchestrator(xtdata_module='fake_xtdata') as orchestrator:
+        orchestrator.submit(['000001.SZ', '000002.SZ'], '1d', '20240101', '20240131')
+        orchestrator.submit('000001.SZ', '1d', '20240201', '20240229')
+        orchestrator.submit('600000.SH', '1m', '20240101', '20240131', priority=-1)
+        report = orchestrator.run(progress_callback=events.append)
+
+        assert read_calls(fake_xtdata) == [
+            [['600000.SH'], '1m', '20240101', '20240131'],
+            [['000001.SZ'], '1d', '20240101', '20240229'],
+            [['000002.SZ'], '1d', '20240101', '20240131'],
+        ]
+        assert report['batches'] == 3
+        assert report['bars'] == 30
+        assert report['bars_per_sec'] > 0
+        assert len(report['results']) == 4
+        assert all(r['success'] and r['latency'] > 0 for r in report['results'])
+        assert events[-1]['codes_done'] == events[-1]['codes_total'] == 3
+
+        # download() 只返回本次提交的任务
+        result = orchestrator.download(['000001.SZ', '999999.SH'], '5m')
+        assert [(r['code'], r['success']) for r in result['results']] == [('000001.SZ', True),
+                                                                           ('999999.SH', False)]
+        assert result['failed'] == ['999999.SH']
+
+
+def test_hung_batch_restarts_worker(fake_xtdata):
+    with DownloadOrchestrator(xtdata_module='fake_xtdata', batch_timeout=3) as orchestrator:
+        report = orchestrator.download(['HANG.SH'], '1d')
+        assert report['failed'] == ['HANG.SH']
+        assert report['errors']
+
+        report = orchestrator.download(['000001.SZ'], '1d')
+        assert report['failed'] == []
+
+
+def test_unavailable_worker_raises_and_clears_queue():
+    orchestrator = DownloadOrchestrator(xtdata_module='missing_xtdata_module')
+    with pytest.raises(RuntimeError):
+        orchestrator.download(['000001.SZ', '000002.SZ'], '1d', '20240101', '20240131')
+    assert orchestrator.pending() == 0
+    with pytest.raises(RuntimeError):
+        orchestrator.download(['000001.SZ'], '1m')
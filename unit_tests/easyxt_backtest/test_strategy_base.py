@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+策略基类单元测试
+
+测试目标：easyxt_backtest/strategy_base.py 的交易日工具方法——
+共享交易日历覆盖回测区间时使用日历，否则回退到 data_manager.get_trading_dates
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.trading_calendar import TradingCalendarService, rule_based_trading_days
+from easyxt_backtest import strategy_base
+from easyxt_backtest.strategy_base import StrategyBase
+
+
+class DummyStrategy(StrategyBase):
+    def select_stocks(self, date):
+        return []
+
+    def get_target_weights(self, date, selected_stocks):
+        return {}
+
+    def get_rebalance_dates(self, start_date, end_date):
+        return self._get_first_trading_days_monthly(start_date, end_date)
+
+    def get_factor_values(self, date):
+        return None
+
+
+class DummyDataManager:
+    """2024-01-02 是交易日、2024-01-15 休市（与规则日历不同）"""
+
+    DATES = ['20240102', '20240103', '20240116', '20240201']
+
+    def get_trading_dates(self, start_date, end_date):
+        return [d for d in self.DATES if start_date <= d <= end_date]
+
+
+@pytest.fixture
+def use_calendar(monkeypatch):
+    def install(calendar):
+        monkeypatch.setattr(strategy_base, 'get_trading_calendar', lambda: calendar)
+    return install
+
+
+def test_rule_calendar_falls_back_to_data_manager(use_calendar):
+    use_calendar(TradingCalendarService(rule_based_trading_days(), source='rules'))
+    strategy = DummyStrategy(DummyDataManager())
+    assert strategy._get_all_trading_days('20240101', '20240131') == ['20240102', '20240103', '20240116']
+    assert strategy.get_rebalance_dates('20240101', '20240229') == ['20240102', '20240201']
+    assert strategy._get_first_trading_days_weekly('20240101', '20240131') == ['20240102', '20240116']
+
+
+def test_covering_calendar_is_used(use_calendar):
+    use_calendar(TradingCalendarService(['2024-01-02', '2024-01-05', '2024-02-05']))
+    strategy = DummyStrategy(DummyDataManager())
+    assert strategy._get_all_trading_days('20240102', '20240205') == ['20240102', '20240105', '20240205']
+    assert strategy.get_rebalance_dates('20240102', '20240205') == ['20240102', '20240205']
+
+
+def test_calendar_outside_coverage_is_used_without_data_manager(use_calendar, caplog):
+    use_calendar(TradingCalendarService(rule_based_trading_days(), source='rules'))
+    with caplog.at_level(logging.WARNING, logger=strategy_base.__name__):
+        days = DummyStrategy()._get_all_trading_days('20240101', '20240105')
+    assert days == ['20240102', '20240103', '20240104', '20240105']
+    assert '规则日历近似' in caplog.text
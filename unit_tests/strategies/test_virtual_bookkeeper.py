@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+虚拟簿记单元测试
+
+测试目标：strategies/virtual_bookkeeper.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from strategies.virtual_bookkeeper import VirtualBookkeeper
+
+
+def test_fills_are_journaled_and_replayed(tmp_path):
+    """成交只追加日志，重新加载时重放得到相同持仓。"""
+    book_file = tmp_path / "virtual_book.json"
+    bk = VirtualBookkeeper(str(book_file))
+    bk.record_buy("s1", "000001.SZ", 100, 10.0)
+    bk.record_buy("s1", "000001.SZ", 100, 12.0)
+    bk.record_buy("s2", "600000.SH", 200, 8.0)
+    bk.record_sell("s2", "600000.SH", 200, 8.5)
+    bk.close()
+
+    assert not book_file.exists()
+    assert len(bk.journal_file.read_text(encoding="utf-8").splitlines()) == 4
+
+    reloaded = VirtualBookkeeper(str(book_file))
+    assert reloaded.data["strategies"] == bk.data["strategies"]
+    assert reloaded.get_all_held_codes() == {"000001.SZ"}
+    assert reloaded.get_positions("s1")["cost_price"].iloc[0] == 11.0
+    # 加载时已合并为快照，日志被清空
+    assert reloaded.journal_file.read_text(encoding="utf-8") == ""
+    assert json.loads(book_file.read_text(encoding="utf-8"))["strategies"]["s1"]["000001.SZ"]["volume"] == 200
+
+
+def test_truncated_journal_line_is_skipped(tmp_path):
+    """日志末行写了一半（进程崩溃）时，其余记录仍能恢复。"""
+    book_file = tmp_path / "virtual_book.json"
+    bk = VirtualBookkeeper(str(book_file))
+    bk.record_buy("s1", "000001.SZ", 100, 10.0)
+    bk.close()
+    with open(bk.journal_file, "a", encoding="utf-8") as f:
+        f.write('{"strategy": "s1", "code": "0000')
+
+    reloaded = VirtualBookkeeper(str(book_file))
+    assert reloaded.get_held_codes("s1") == {"000001.SZ"}
+
+
+def test_index_follows_external_edits(tmp_path):
+    """直接修改 data 后调用 _save()，持有索引同步更新。"""
+    bk = VirtualBookkeeper(str(tmp_path / "virtual_book.json"))
+    bk.record_buy("s1", "000001.SZ", 100, 10.0)
+    bk.data["strategies"][VirtualBookkeeper.MANUAL_STRATEGY] = {"000002.SZ": {"volume": 300, "cost": 0}}
+    bk._save()
+
+    assert bk.get_all_held_codes() == {"000001.SZ", "000002.SZ"}
+    assert bk.get_holders("000002.SZ") == {VirtualBookkeeper.MANUAL_STRATEGY}
+    bk.clear_strategy("s1")
+    assert bk.get_all_held_codes() == {"000002.SZ"}
+
+
+def test_only_journal_writer_compacts(tmp_path):
+    """协调器持有日志时，GUI 临时创建的实例不会清空日志，后续成交不会丢失。"""
+    book_file = tmp_path / "virtual_book.json"
+    writer = VirtualBookkeeper(str(book_file))
+    writer.record_buy("s1", "000001.SZ", 100, 10.0)
+
+    viewer = VirtualBookkeeper(str(book_file))
+    assert viewer.get_held_codes("s1") == {"000001.SZ"}
+    viewer.set_allocation("s1", 0.5)          # 只写快照，保留日志
+    assert len(writer.journal_file.read_text(encoding="utf-8").splitlines()) == 1
+
+    writer.record_buy("s2", "600000.SH", 200, 8.0)
+    writer.close()
+    reloaded = VirtualBookkeeper(str(book_file))
+    assert reloaded.get_all_held_codes() == {"000001.SZ", "600000.SH"}
+    assert reloaded.get_allocation("s1") == 0.5
+
+    # 写入方合并后日志原地截断，之后的追加写入同一个文件
+    writer = VirtualBookkeeper(str(book_file))
+    writer.record_buy("s3", "000002.SZ", 100, 5.0)
+    writer._save()
+    writer.record_sell("s3", "000002.SZ", 100, 5.0)
+    writer.close()
+    assert VirtualBookkeeper(str(book_file)).get_held_codes("s3") == set()
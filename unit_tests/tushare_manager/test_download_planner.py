@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+TushareDownloadPlanner / TokenBucket 单元测试
+
+用内存中的假下载器测试任务规划、翻页、批量写入与限流。
+"""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("tushare")
+
+from tushare_manager.download_planner import TushareDownloadPlanner, report_periods
+from tushare_manager.rate_limiter import (DEFAULT_CALLS_PER_MINUTE, SAFETY_RATIO, TokenBucket,
+                                           calls_per_minute_for_points, get_rate_limiter)
+
+TRADE_DATES = ['20240102', '20240103', '20240104']
+
+
+class FakeDownloader:
+    """记录调用与保存的假下载器，每个日期返回 rows_per_date 行"""
+
+    def __init__(self, points=5000, rows_per_date=5):
+        self.points = points
+        self.rows_per_date = rows_per_date
+        self.calls = []
+        self.saved = []
+        self._lock = threading.Lock()
+
+    def _log(self, message, level="INFO"):
+        pass
+
+    def _api_call(self, api_name, **kwargs):
+        with self._lock:
+            self.calls.append((api_name, kwargs))
+        if api_name == 'trade_cal':
+            return pd.DataFrame({'cal_date': TRADE_DATES[::-1]})
+        date = kwargs.get('period') or kwargs.get('trade_date') or kwargs.get('ex_date')
+        offset, limit = kwargs['offset'], kwargs['limit']
+        codes = [f'{i:06d}.SZ' for i in range(self.rows_per_date)][offset:offset + limit]
+        return pd.DataFrame({'ts_code': codes, 'end_date': date, 'trade_date': date, 'value': 1.0})
+
+    def save_to_duckdb(self, df, table_name, primary_keys=None):
+        self.saved.append((table_name, len(df), primary_keys))
+
+
+def test_report_periods():
+    assert report_periods('20230215', '20231001') == ['20230331', '20230630', '20230930']
+
+
+def test_plan_expands_dates_and_checks_points():
+    planner = TushareDownloadPlanner(FakeDownloader(points=5000))
+    tasks = planner.plan(['income', 'moneyflow'], '20240101', '20240630')
+
+    assert [task.params for task in tasks] == [
+        {'period': '20240331'}, {'period': '20240630'},
+        {'trade_date': '20240102'}, {'trade_date': '20240103'}, {'trade_date': '20240104'},
+    ]
+    with pytest.raises(ValueError):
+        TushareDownloadPlanner(FakeDownloader(points=2000)).plan(['income'], '20240101', '20240630')
+    with pytest.raises(ValueError):
+        planner.plan(['unknown'], '20240101', '20240630')
+
+
+def test_run_pages_and_flushes_in_batches():
+    downloader = FakeDownloader(rows_per_date=5)
+    planner = TushareDownloadPlanner(downloader, max_workers=3, flush_rows=8, page_size=2)
+
+    result = planner.run(['moneyflow'], '20240101', '20240110')
+
+    # 每个交易日 5 行，分 3 页
+    assert result['api_calls'] == 9
+    assert result['total_records'] == {'moneyflow': 15}
+    assert sum(rows for _, rows, _ in downloader.saved) == 15
+    assert len(downloader.saved) == 2
+    assert downloader.saved[0][2] == ['ts_code', 'trade_date']
+
+
+def test_token_bucket_limits_rate():
+    assert calls_per_minute_for_points(5000) == 500
+    assert calls_per_minute_for_points(120) == 50
+
+    bucket = TokenBucket(rate_per_minute=600, capacity=2)  # 每秒 10 个
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.25
+
+
+def test_default_rate_is_not_slower_than_fixed_sleep():
+    """未配置积分时不比原来 sleep(0.12) 慢；配置积分时按档位额度限流"""
+    assert get_rate_limiter(0).rate_per_minute == DEFAULT_CALLS_PER_MINUTE >= 60 / 0.12
+    assert get_rate_limiter(5000).rate_per_minute == int(500 * SAFETY_RATIO)
+
+
+def test_on_acquire_counts_every_call_across_threads():
+    bucket = TokenBucket(rate_per_minute=600000, capacity=1000)
+    stats = {'total_requests': 0}
+
+    def count():
+        stats['total_requests'] += 1
+
+    def worker():
+        for _ in range(200):
+            bucket.acquire(on_acquire=count)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats['total_requests'] == 1600